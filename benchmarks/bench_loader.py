@@ -0,0 +1,134 @@
+"""
+Benchmark the single-pass parallel loader against the previous six-DirectoryLoader scan.
+
+Generates a synthetic knowledge base (txt, md, csv, pdf and docx files), then
+times the legacy approach – one DirectoryLoader glob per extension, parsed
+serially – against `src.core.loader.load_docs`.
+
+Usage:
+    python benchmarks/bench_loader.py --files 3000 --workers 8
+"""
+import argparse
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import docx  # noqa: E402
+import fitz  # noqa: E402
+from langchain_community.document_loaders import (  # noqa: E402
+    CSVLoader,
+    DirectoryLoader,
+    Docx2txtLoader,
+    PyMuPDFLoader,
+    TextLoader,
+)
+
+from src.core.config import get_config  # noqa: E402
+from src.core.loader import load_docs  # noqa: E402
+
+WORDS = (
+    "qdrant embedding retrieval chunk overlap azure gemini session history prompt "
+    "context document vector search latency throughput ingestion manifest"
+).split()
+
+
+def _paragraph(rng: random.Random, words: int = 120) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def build_corpus(root: Path, files: int, seed: int = 7) -> dict:
+    """Write `files` synthetic documents spread across a few folders and types."""
+    rng = random.Random(seed)
+    counts = {"txt": 0, "md": 0, "csv": 0, "pdf": 0, "docx": 0}
+    kinds = list(counts)
+    for i in range(files):
+        kind = kinds[i % len(kinds)]
+        folder = root / f"group_{i % 20:02d}"
+        folder.mkdir(parents=True, exist_ok=True)
+        path = folder / f"doc_{i:05d}.{kind}"
+        if kind in ("txt", "md"):
+            path.write_text("\n\n".join(_paragraph(rng) for _ in range(5)), encoding="utf-8")
+        elif kind == "csv":
+            rows = ["id,name,notes"] + [f"{j},{rng.choice(WORDS)},{_paragraph(rng, 12)}" for j in range(20)]
+            path.write_text("\n".join(rows), encoding="utf-8")
+        elif kind == "pdf":
+            pdf = fitz.open()
+            for _ in range(3):
+                page = pdf.new_page()
+                page.insert_textbox(fitz.Rect(50, 50, 550, 800), _paragraph(rng, 200))
+            pdf.save(str(path))
+            pdf.close()
+        else:
+            document = docx.Document()
+            for _ in range(5):
+                document.add_paragraph(_paragraph(rng))
+            document.save(str(path))
+        counts[kind] += 1
+    return counts
+
+
+def legacy_load_docs(base_dir: Path) -> list:
+    """The previous loader: one serial DirectoryLoader per glob."""
+    docs = []
+    for glob, loader_cls in (
+        ("**/*.pdf", PyMuPDFLoader),
+        ("**/*.txt", TextLoader),
+        ("**/*.md", TextLoader),
+        ("**/*.docx", Docx2txtLoader),
+        ("**/*.doc", Docx2txtLoader),
+        ("**/*.csv", CSVLoader),
+    ):
+        loader = DirectoryLoader(path=str(base_dir), glob=glob, loader_cls=loader_cls)
+        docs.extend(loader.load())
+    return docs
+
+
+def _time(fn, *args) -> tuple[float, int]:
+    started = time.perf_counter()
+    docs = fn(*args)
+    return time.perf_counter() - started, len(docs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=3000)
+    parser.add_argument("--workers", type=int, default=None, help="Parser processes (defaults to config)")
+    parser.add_argument("--output", type=str, default=None, help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    if args.workers is not None:
+        get_config().set_loader_workers(args.workers)
+
+    with tempfile.TemporaryDirectory(prefix="kb_bench_") as tmp:
+        root = Path(tmp)
+        print(f"Generating {args.files} files in {root} ...")
+        counts = build_corpus(root, args.files)
+
+        legacy_s, legacy_docs = _time(legacy_load_docs, root)
+        print(f"legacy (6 DirectoryLoaders): {legacy_s:8.2f}s  {legacy_docs} docs")
+
+        new_s, new_docs = _time(load_docs, str(root))
+        print(f"single-pass parallel loader: {new_s:8.2f}s  {new_docs} docs")
+        print(f"speedup: {legacy_s / new_s:.2f}x")
+
+    results = {
+        "files": args.files,
+        "file_types": counts,
+        "workers": get_config().loader_max_workers,
+        "legacy_seconds": round(legacy_s, 3),
+        "legacy_docs": legacy_docs,
+        "parallel_seconds": round(new_s, 3),
+        "parallel_docs": new_docs,
+        "speedup": round(legacy_s / new_s, 2),
+    }
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Embedded numpy vector index vs. a Qdrant server: search latency and resident memory.
+
+Builds a `NumpyVectorIndex` and a Qdrant collection (through
+`ensure_collection`, so with the configured schema) from the same synthetic
+vectors, then times the same pre-embedded queries against both. Embedding time
+is excluded, so the numbers show the network hop and search cost only.
+
+Resident memory is this process's RSS growth from loading and querying the
+numpy index, and Qdrant's own `memory_resident_bytes` from its /metrics
+endpoint (server-wide, so run it against an otherwise idle instance).
+
+Usage:
+    python benchmarks/bench_numpy_store.py --url http://localhost:6333 --points 5000 --dim 1536
+    python benchmarks/bench_numpy_store.py --skip-qdrant --points 5000 --dtype float16
+"""
+import argparse
+import json
+import re
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+from langchain_core.documents import Document
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from qdrant_client import QdrantClient  # noqa: E402
+
+from bench_qdrant_schema import make_vectors, wait_until_indexed  # noqa: E402
+from src.core.config import get_config  # noqa: E402
+from src.core.embeddings import ensure_collection, get_search_kwargs, upsert_chunks  # noqa: E402
+from src.core.numpy_store import NumpyVectorIndex  # noqa: E402
+
+
+def rss_mb() -> float:
+    """Resident set size of this process (Linux)."""
+    match = re.search(r"VmRSS:\s+(\d+) kB", Path("/proc/self/status").read_text())
+    return round(int(match.group(1)) / 1024, 1) if match else float("nan")
+
+
+def qdrant_rss_mb(url: str):
+    try:
+        text = httpx.get(f"{url}/metrics", timeout=10).text
+    except httpx.HTTPError:
+        return None
+    match = re.search(r"^memory_resident_bytes\s+([\d.e+]+)", text, re.MULTILINE)
+    return round(float(match.group(1)) / 2**20, 1) if match else None
+
+
+def latency_summary(latencies: list) -> dict:
+    cuts = statistics.quantiles(latencies, n=100)
+    return {
+        "p50_ms": round(statistics.median(latencies) * 1000, 3),
+        "p95_ms": round(cuts[94] * 1000, 3),
+        "p99_ms": round(cuts[98] * 1000, 3),
+    }
+
+
+def chunks_for(points: int) -> list:
+    return [
+        Document(page_content=f"chunk {i}", metadata={"source": f"doc_{i % 100}.txt", "doc_type": "txt"})
+        for i in range(points)
+    ]
+
+
+def bench_numpy(root: Path, vectors, queries, k: int, dtype: str) -> dict:
+    index = NumpyVectorIndex(root / "bench.vectors", "bench", dtype=dtype)
+    ids = [str(i) for i in range(len(vectors))]
+    started = time.perf_counter()
+    index.upsert(ids, vectors, chunks_for(len(vectors)))
+    build_s = time.perf_counter() - started
+
+    # Fresh reader, so the RSS growth reflects what an API worker would map
+    reader = NumpyVectorIndex(root / "bench.vectors", "bench")
+    before = rss_mb()
+    latencies = []
+    for query in queries:
+        started = time.perf_counter()
+        reader.search(query, k)
+        latencies.append(time.perf_counter() - started)
+    return {
+        "build_seconds": round(build_s, 2),
+        "file_mb": round((root / "bench.vectors" / "vectors.npy").stat().st_size / 2**20, 1),
+        "rss_growth_mb": round(rss_mb() - before, 1),
+        **latency_summary(latencies),
+    }
+
+
+def bench_qdrant(url: str, vectors, queries, k: int) -> dict:
+    client = QdrantClient(url=url, timeout=120)
+    name = "bench_numpy_comparison"
+    if client.collection_exists(name):
+        client.delete_collection(name)
+    before = qdrant_rss_mb(url)
+    try:
+        ensure_collection(client, name, vectors.shape[1])
+        chunks = chunks_for(len(vectors))
+        started = time.perf_counter()
+        for start in range(0, len(vectors), 512):
+            batch = vectors[start:start + 512].tolist()
+            ids = list(range(start, start + len(batch)))
+            upsert_chunks(client, name, chunks[start:start + len(batch)], batch, ids)
+        wait_until_indexed(client, name)
+        build_s = time.perf_counter() - started
+
+        search_kwargs = get_search_kwargs()
+        latencies = []
+        for query in queries:
+            started = time.perf_counter()
+            client.query_points(name, query=query.tolist(), limit=k, **search_kwargs)
+            latencies.append(time.perf_counter() - started)
+        after = qdrant_rss_mb(url)
+    finally:
+        client.delete_collection(name)
+    return {
+        "build_seconds": round(build_s, 2),
+        "rss_growth_mb": round(after - before, 1) if before is not None and after is not None else None,
+        **latency_summary(latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=None, help="Qdrant URL (defaults to config.qdrant_url)")
+    parser.add_argument("--skip-qdrant", action="store_true")
+    parser.add_argument("--points", type=int, default=5000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--dtype", choices=("float32", "float16"), default=None)
+    parser.add_argument("--output", type=str, default=None, help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    config = get_config()
+    dtype = args.dtype or config.numpy_vector_dtype
+    vectors = make_vectors(args.points, args.dim)
+    queries = make_vectors(args.queries, args.dim, seed=11)
+
+    results = {"points": args.points, "dim": args.dim, "k": args.k, "dtype": dtype}
+    with tempfile.TemporaryDirectory(prefix="numpy_bench_") as tmp:
+        results["numpy"] = bench_numpy(Path(tmp), vectors, queries, args.k, dtype)
+    if not args.skip_qdrant:
+        url = args.url or config.qdrant_url or "http://localhost:6333"
+        results["qdrant"] = bench_qdrant(url, vectors, queries, args.k)
+
+    print(f"{'backend':>8} {'build s':>8} {'RSS +MB':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for backend in ("numpy", "qdrant"):
+        if backend in results:
+            row = results[backend]
+            print(
+                f"{backend:>8} {row['build_seconds']:>8} {row['rss_growth_mb']!s:>8} "
+                f"{row['p50_ms']:>8} {row['p95_ms']:>8} {row['p99_ms']:>8}"
+            )
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
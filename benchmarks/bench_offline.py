@@ -0,0 +1,347 @@
+"""
+Offline end-to-end benchmark: ingestion and /chat_response with stand-in providers.
+
+Runs the real ingestion pipeline and API in-process against Qdrant in local
+mode (in memory, or on disk with --qdrant-path), with deterministic fake
+embeddings and a fake LLM whose time to first token and token rate are
+configurable (see benchmarks/fakes.py). Nothing leaves the machine, so runs
+are repeatable and comparable:
+
+- ingestion: documents/sec and chunks/sec for `ingest_knowledge_base`
+- serving: /chat_response p50/p95/p99 and throughput at each concurrency level
+- stages: per-stage latency (routing, retrieval, history load, context packing,
+  generation) at each level
+- coalescing: upstream embedding/retrieval/LLM calls saved at each level; use
+  --distinct-queries to replay a burst of the same few questions
+- query batching: upstream embedding requests per level; --embed-concurrency
+  caps concurrent embedding requests like a rate-limited deployment, which is
+  where merging queries raises sustained throughput (compare with
+  --no-query-batching)
+- admission: requests shed with 503 at each level; --llm-max-concurrency and
+  --queue-timeout set the limits, showing tail latency when load exceeds them
+
+Results are written as JSON; pass a previous run as --baseline to report
+regressions (exit code 1 if p95 latency or ingest throughput got worse than
+--tolerance).
+
+Usage:
+    python benchmarks/bench_offline.py --files 300 --requests 200 --concurrency 1 8 32 --output run.json
+    python benchmarks/bench_offline.py --output new.json --baseline run.json --tolerance 0.15
+    python benchmarks/bench_offline.py --distinct-queries 3 --concurrency 32
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+from datetime import datetime, timezone
+from pathlib import Path
+from uuid import uuid4
+
+import httpx
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+# Placeholders so the configuration checks pass; no request leaves the process
+os.environ.setdefault("AZURE_OPENAI_API_KEY", "offline-benchmark")
+os.environ.setdefault("AZURE_OPENAI_ENDPOINT", "https://offline-benchmark.invalid")
+os.environ.setdefault("GOOGLE_API_KEY", "offline-benchmark")
+
+from qdrant_client import QdrantClient  # noqa: E402
+
+from bench_loader import build_corpus  # noqa: E402
+from fakes import FakeChatModel, FakeEmbeddings, fake_query, latency_summary, timed  # noqa: E402
+from src.chatbot_backend import rag_api  # noqa: E402
+from src.core import chat_manager, embeddings, history_store, qdrant_db, retriver  # noqa: E402
+from src.core.coalesce import get_coalescing_stats  # noqa: E402
+from src.core.config import get_config  # noqa: E402
+from src.core.query_batcher import get_query_batching_stats  # noqa: E402
+
+SMALLTALK = ("hi", "thanks, bye", "how are you?")
+
+
+def install_fakes(tmp: Path, args, timings: dict) -> FakeEmbeddings:
+    """Point every provider and storage path at offline stand-ins under `tmp`."""
+    config = get_config()
+    config.ingest_manifest_dir = tmp / "vector_store"
+    config.embedding_cache_path = tmp / "vector_store" / "embedding_cache.db"
+    config.ocr_cache_path = tmp / "vector_store" / "ocr_cache.db"
+    config.embedding_cache_enabled = not args.no_embedding_cache
+    config.set_vector_backend(args.backend)
+    config.set_retrieval_mode(args.retrieval_mode)
+    config.set_coalescing(not args.no_coalescing)
+    config.set_admission(
+        enabled=not args.no_admission,
+        max_concurrency=args.llm_max_concurrency,
+        queue_timeout_seconds=args.queue_timeout,
+    )
+    config.set_query_batching(enabled=not args.no_query_batching)
+    history_store._store = history_store.ChatHistoryStore(str(tmp / "chat_history.db"))
+
+    fake_embeddings = FakeEmbeddings(
+        size=args.dim, latency_ms=args.embed_latency_ms, max_concurrency=args.embed_concurrency
+    )
+
+    def build_embeddings(max_retries=None):
+        return embeddings.wrap_embeddings(fake_embeddings, namespace="offline-benchmark")
+
+    client = QdrantClient(path=args.qdrant_path) if args.qdrant_path else QdrantClient(":memory:")
+    for module in (embeddings, qdrant_db):
+        module.build_embeddings = build_embeddings
+        module.get_qdrant_client = lambda qdrant_url=None: client
+
+    chat_manager._llms[config.model_name] = FakeChatModel(
+        first_token_ms=args.llm_first_token_ms,
+        tokens_per_second=args.llm_tokens_per_second,
+        answer_words=args.answer_words,
+    )
+
+    # Per-stage timings; every patched name is looked up through its module at call time
+    rag_api._route_intent = timed(rag_api._route_intent, "route", timings)
+    retriver.aget_relevant_docs = timed(retriver.aget_relevant_docs, "retrieval", timings)
+    chat_manager.aget_prompt_history = timed(chat_manager.aget_prompt_history, "history_load", timings)
+    chat_manager.build_context_text = timed(chat_manager.build_context_text, "context_packing", timings)
+    chat_manager.agenerate_response = timed(chat_manager.agenerate_response, "generate", timings)
+    return fake_embeddings
+
+
+def run_ingest(kb: Path, files: int, fake_embeddings: FakeEmbeddings) -> dict:
+    print(f"Generating {files} files ...")
+    build_corpus(kb, files)
+    requests_before = fake_embeddings.requests
+    started = time.perf_counter()
+    vectorstore, summary = qdrant_db.ingest_knowledge_base(kb)
+    seconds = time.perf_counter() - started
+    get_config()._vectorstore = vectorstore
+    return {
+        "files": files,
+        "documents": summary["documents"],
+        "chunks": summary["chunks"],
+        "seconds": round(seconds, 3),
+        "docs_per_second": round(summary["documents"] / seconds, 1),
+        "chunks_per_second": round(summary["chunks"] / seconds, 1),
+        "embedding_requests": fake_embeddings.requests - requests_before,
+    }
+
+
+async def run_level(
+    client: httpx.AsyncClient,
+    total: int,
+    concurrency: int,
+    smalltalk_ratio: float,
+    distinct_queries: int = 0,
+    query_offset: int = 0,
+) -> dict:
+    """Send `total` requests from `concurrency` parallel clients.
+
+    Document questions are ``fake_query(query_offset + i)``; give every level
+    its own offset so it does not replay questions an earlier level already
+    put in the embedding cache. With `distinct_queries` set, they cycle
+    through that many queries, like a burst of users asking about the same
+    document.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+    smalltalk_every = round(1 / smalltalk_ratio) if smalltalk_ratio else 0
+    for i in range(total):
+        is_smalltalk = smalltalk_every and i % smalltalk_every == 0
+        query_index = query_offset + (i % distinct_queries if distinct_queries else i)
+        queue.put_nowait(SMALLTALK[i % len(SMALLTALK)] if is_smalltalk else fake_query(query_index))
+    latencies, errors = [], []
+    shed = 0
+
+    async def worker():
+        nonlocal shed
+        while not queue.empty():
+            query = queue.get_nowait()
+            started = time.perf_counter()
+            try:
+                response = await client.post(
+                    "/chat_response", json={"query": query, "session_id": f"bench-{uuid4()}"}
+                )
+                if response.status_code == 503:
+                    shed += 1
+                    continue
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - started)
+            except Exception as exc:
+                errors.append(str(exc))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "errors": len(errors),
+        "shed": shed,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "latency": latency_summary(latencies),
+        "first_error": errors[0] if errors else None,
+    }
+
+
+async def run_serving(args, timings: dict, fake_embeddings: FakeEmbeddings) -> list:
+    levels = []
+    transport = httpx.ASGITransport(app=rag_api.app)
+    async with rag_api.lifespan(rag_api.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            # Each warmup and level asks new questions, so later levels are not all cache hits
+            query_offset = 0
+            for concurrency in args.concurrency:
+                if args.warmup:
+                    await run_level(
+                        client, args.warmup, min(concurrency, args.warmup), 0.0, query_offset=query_offset
+                    )
+                    query_offset += args.warmup
+                timings.clear()
+                before = get_coalescing_stats()
+                requests_before = fake_embeddings.requests
+                batched_before = get_query_batching_stats()["texts"]
+                level = await run_level(
+                    client,
+                    args.requests,
+                    concurrency,
+                    args.smalltalk_ratio,
+                    args.distinct_queries,
+                    query_offset=query_offset,
+                )
+                query_offset += args.requests
+                level["stages"] = {stage: latency_summary(values) for stage, values in timings.items()}
+                after = get_coalescing_stats()
+                level["coalescing"] = {
+                    stage: {name: after[stage][name] - before[stage][name] for name in after[stage]}
+                    for stage in ("embedding", "retrieval", "llm")
+                }
+                level["embedding_requests"] = fake_embeddings.requests - requests_before
+                level["query_embeddings_batched"] = get_query_batching_stats()["texts"] - batched_before
+                levels.append(level)
+                latency = level["latency"]
+                print(
+                    f"{concurrency:>8} {_succeeded(level):>5} {level['errors']:>5} "
+                    f"{level['throughput_rps']:>8} {latency.get('p50_ms')!s:>8} "
+                    f"{latency.get('p95_ms')!s:>8} {latency.get('p99_ms')!s:>8} "
+                    f"{sum(stage['coalesced'] for stage in level['coalescing'].values()):>7} "
+                    f"{level['embedding_requests']:>7} {level['shed']:>5}"
+                )
+    return levels
+
+
+def _succeeded(level: dict) -> int:
+    """Requests answered with a 2xx."""
+    return level["requests"] - level["errors"] - level["shed"]
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Human-readable regressions of `results` against `baseline`."""
+    regressions = []
+    base_ingest, ingest = baseline.get("ingest") or {}, results.get("ingest") or {}
+    if base_ingest.get("chunks_per_second") and ingest.get("chunks_per_second"):
+        if ingest["chunks_per_second"] < base_ingest["chunks_per_second"] * (1 - tolerance):
+            regressions.append(
+                f"ingest chunks/sec {base_ingest['chunks_per_second']} -> {ingest['chunks_per_second']}"
+            )
+    base_levels = {level["concurrency"]: level for level in baseline.get("serving", [])}
+    for level in results.get("serving", []):
+        base = base_levels.get(level["concurrency"])
+        if not base or "p95_ms" not in base["latency"] or "p95_ms" not in level["latency"]:
+            continue
+        if level["latency"]["p95_ms"] > base["latency"]["p95_ms"] * (1 + tolerance):
+            regressions.append(
+                f"p95 at concurrency {level['concurrency']}: "
+                f"{base['latency']['p95_ms']} ms -> {level['latency']['p95_ms']} ms"
+            )
+    return regressions
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "HEAD"], cwd=ROOT, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except Exception:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=100, help="Requests per concurrency level")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--warmup", type=int, default=5, help="Untimed requests before each level")
+    parser.add_argument("--smalltalk-ratio", type=float, default=0.0, help="Share of greetings/small talk")
+    parser.add_argument(
+        "--distinct-queries", type=int, default=0, help="Cycle through this many questions (0: all distinct)"
+    )
+    parser.add_argument("--no-coalescing", action="store_true", help="Disable request coalescing")
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--embed-latency-ms", type=float, default=20.0)
+    parser.add_argument(
+        "--embed-concurrency", type=int, default=0, help="Concurrent embedding requests served (0: unlimited)"
+    )
+    parser.add_argument("--no-query-batching", action="store_true", help="Disable query embedding batching")
+    parser.add_argument("--llm-max-concurrency", type=int, default=None, help="Chat turns admitted at once")
+    parser.add_argument("--queue-timeout", type=float, default=None, help="Admission queue deadline (seconds)")
+    parser.add_argument("--no-admission", action="store_true", help="Disable admission control")
+    parser.add_argument("--llm-first-token-ms", type=float, default=300.0)
+    parser.add_argument("--llm-tokens-per-second", type=float, default=80.0)
+    parser.add_argument("--answer-words", type=int, default=60)
+    parser.add_argument("--backend", choices=("qdrant", "numpy"), default="qdrant")
+    parser.add_argument("--retrieval-mode", choices=("dense", "hybrid", "hybrid_fast"), default="hybrid")
+    parser.add_argument("--qdrant-path", default=None, help="On-disk local Qdrant (default: in memory)")
+    parser.add_argument("--no-embedding-cache", action="store_true")
+    parser.add_argument("--output", type=str, default=None, help="Write results as JSON to this file")
+    parser.add_argument("--baseline", type=str, default=None, help="Previous JSON results to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Allowed relative regression")
+    args = parser.parse_args()
+
+    # Local mode warns that HNSW/quantization search parameters are ignored
+    warnings.filterwarnings("ignore", category=UserWarning, module="qdrant_client")
+
+    timings: dict = {}
+    with tempfile.TemporaryDirectory(prefix="offline_bench_") as tmp:
+        tmp = Path(tmp)
+        fake_embeddings = install_fakes(tmp, args, timings)
+        ingest = run_ingest(tmp / "knowledge_base", args.files, fake_embeddings)
+        print(
+            f"ingest: {ingest['documents']} docs, {ingest['chunks']} chunks in {ingest['seconds']}s "
+            f"({ingest['docs_per_second']} docs/s, {ingest['chunks_per_second']} chunks/s)"
+        )
+        print(
+            f"{'clients':>8} {'ok':>5} {'err':>5} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+            f"{'saved':>7} {'embeds':>7} {'shed':>5}"
+        )
+        serving = asyncio.run(run_serving(args, timings, fake_embeddings))
+
+    results = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_commit": _git_commit(),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "parameters": vars(args),
+        "ingest": ingest,
+        "serving": serving,
+    }
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+
+    if args.baseline:
+        regressions = compare(results, json.loads(Path(args.baseline).read_text()), args.tolerance)
+        for regression in regressions:
+            print(f"⚠ Regression: {regression}")
+        if regressions:
+            sys.exit(1)
+        print(f"✓ No regressions beyond {args.tolerance:.0%} of the baseline")
+
+
+if __name__ == "__main__":
+    main()
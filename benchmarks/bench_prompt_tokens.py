@@ -0,0 +1,130 @@
+"""
+Prompt tokens and parse failures of the two structured-output modes.
+
+Offline (default): renders the RAG prompt in ``instructions`` and ``native``
+mode for the same context, history and query and counts tokens locally. It
+reports the static prefix (identical across requests, so cacheable on the
+provider side), the total per request, and for ``native`` the size of the JSON
+schema sent alongside.
+
+With --live N, each mode also answers N real questions through Gemini
+(GOOGLE_API_KEY must be set). That reports the provider's input- and
+output-token counts and the share of responses that failed `QueryResponse`
+validation.
+
+Usage:
+    python benchmarks/bench_prompt_tokens.py --context-tokens 2000 --history-turns 4
+    python benchmarks/bench_prompt_tokens.py --live 50 --output prompt_tokens.json
+"""
+import argparse
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from langchain_core.documents import Document  # noqa: E402
+from langchain_core.messages import AIMessage, HumanMessage  # noqa: E402
+
+from fakes import WORDS, fake_query  # noqa: E402
+from src.core import chat_manager  # noqa: E402
+from src.core.config import get_config  # noqa: E402
+from src.core.memory import format_chat_history  # noqa: E402
+from src.core.tokens import count_tokens  # noqa: E402
+
+MODES = ("instructions", "native")
+# The prompt's variable part starts here; everything before it is the same for every request
+VARIABLE_MARKER = "**Information to use:**"
+
+
+def sample_inputs(context_tokens: int, history_turns: int, seed: int = 0) -> dict:
+    words = [WORDS[(seed + i * 5) % len(WORDS)] for i in range(int(context_tokens * 0.75))]
+    history = []
+    for turn in range(history_turns):
+        history.append(HumanMessage(content=fake_query(seed + turn)))
+        history.append(AIMessage(content=" ".join(WORDS[: 30])))
+    return {
+        "context_text": " ".join(words),
+        "chat_history": format_chat_history(history),
+        "query": fake_query(seed + history_turns),
+    }
+
+
+def measure_offline(inputs: dict) -> dict:
+    results = {}
+    for mode in MODES:
+        text = chat_manager._build_prompt(mode).invoke(inputs).to_string()
+        prefix = text[: text.index(VARIABLE_MARKER)]
+        results[mode] = {
+            "prompt_tokens": count_tokens(text),
+            "static_prefix_tokens": count_tokens(prefix),
+        }
+    schema = json.dumps(chat_manager.QueryResponse.model_json_schema())
+    results["native"]["schema_tokens"] = count_tokens(schema)
+    saved = results["instructions"]["prompt_tokens"] - results["native"]["prompt_tokens"]
+    results["prompt_tokens_saved"] = saved
+    results["prompt_tokens_saved_pct"] = round(100 * saved / results["instructions"]["prompt_tokens"], 1)
+    return results
+
+
+async def measure_live(requests: int, context_tokens: int, history_turns: int) -> dict:
+    config = get_config()
+    llm = chat_manager.get_llm()
+    results = {}
+    for mode in MODES:
+        config.set_structured_output(mode)
+        before = chat_manager.get_structured_output_stats()[mode]
+        for i in range(requests):
+            inputs = sample_inputs(context_tokens, history_turns, seed=i)
+            try:
+                await chat_manager._ainvoke_rag(llm, inputs)
+            except Exception as exc:
+                print(f"⚠ {mode} request {i} failed: {exc}")
+        after = chat_manager.get_structured_output_stats()[mode]
+        failures = after["parse_failures"] - before["parse_failures"]
+        results[mode] = {
+            "responses": after["responses"] - before["responses"],
+            "parse_failures": failures,
+            "parse_failure_rate": round(failures / requests, 4) if requests else 0.0,
+            "avg_prompt_tokens": after["avg_prompt_tokens"],
+            "avg_completion_tokens": after["avg_completion_tokens"],
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--context-tokens", type=int, default=2000)
+    parser.add_argument("--history-turns", type=int, default=4)
+    parser.add_argument("--live", type=int, default=0, help="Real Gemini requests per mode (0: offline only)")
+    parser.add_argument("--output", type=str, default=None, help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    inputs = sample_inputs(args.context_tokens, args.history_turns)
+    results = {"parameters": vars(args), "offline": measure_offline(inputs)}
+    offline = results["offline"]
+    print(f"{'mode':>13} {'prompt':>8} {'static':>8}")
+    for mode in MODES:
+        print(f"{mode:>13} {offline[mode]['prompt_tokens']:>8} {offline[mode]['static_prefix_tokens']:>8}")
+    print(
+        f"native saves {offline['prompt_tokens_saved']} prompt tokens per request "
+        f"({offline['prompt_tokens_saved_pct']}%); its schema is {offline['native']['schema_tokens']} tokens"
+    )
+
+    if args.live:
+        results["live"] = asyncio.run(measure_live(args.live, args.context_tokens, args.history_turns))
+        print(f"{'mode':>13} {'avg in':>8} {'avg out':>8} {'failures':>9}")
+        for mode in MODES:
+            row = results["live"][mode]
+            print(
+                f"{mode:>13} {row['avg_prompt_tokens']!s:>8} {row['avg_completion_tokens']!s:>8} "
+                f"{row['parse_failure_rate']:>9.2%}"
+            )
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Memory / latency / recall trade-off of the Qdrant collection schema.
+
+Creates one collection per variant (full precision, scalar and binary
+quantization, each optionally with the original vectors on disk) through
+`src.core.embeddings.ensure_collection`, fills it with the same synthetic
+clustered unit vectors and runs the same queries with `get_search_kwargs`.
+Recall@k is measured against an exact (brute-force) search of the full
+precision collection. RAM is an estimate of what each variant keeps resident:
+original vectors unless on disk, quantized vectors, and the HNSW graph.
+
+Needs a Qdrant server (local mode ignores HNSW and quantization settings).
+
+Usage:
+    python benchmarks/bench_qdrant_schema.py --url http://localhost:6333 --points 20000 --dim 768
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from qdrant_client import QdrantClient, models  # noqa: E402
+
+from src.core.config import get_config  # noqa: E402
+from src.core.embeddings import ensure_collection, get_search_kwargs  # noqa: E402
+
+VARIANTS = (
+    ("float", "none", False),
+    ("scalar", "scalar", False),
+    ("scalar_on_disk", "scalar", True),
+    ("binary", "binary", False),
+    ("binary_on_disk", "binary", True),
+)
+
+
+def make_vectors(points: int, dim: int, clusters: int = 50, seed: int = 7) -> np.ndarray:
+    """Unit vectors around `clusters` random centers, closer to real embeddings than uniform noise."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim))
+    vectors = centers[rng.integers(0, clusters, points)] + 0.6 * rng.normal(size=(points, dim))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def estimated_ram_mb(points: int, dim: int, quantization: str, on_disk: bool, m: int) -> float:
+    original = 0 if on_disk else points * dim * 4
+    quantized = {"none": 0, "scalar": points * dim, "binary": points * dim // 8}[quantization]
+    graph = points * m * 2 * 4  # two links per edge on level 0, 4-byte IDs
+    return round((original + quantized + graph) / 2**20, 1)
+
+
+def wait_until_indexed(client: QdrantClient, name: str, timeout: float = 600.0) -> float:
+    started = time.perf_counter()
+    while client.get_collection(name).status != models.CollectionStatus.GREEN:
+        if time.perf_counter() - started > timeout:
+            raise TimeoutError(f"Collection {name} was not indexed within {timeout}s")
+        time.sleep(0.5)
+    return time.perf_counter() - started
+
+
+def run_variant(client, name, vectors, queries, truth, k) -> dict:
+    client.upload_collection(name, vectors=vectors, ids=list(range(len(vectors))), batch_size=512, wait=True)
+    index_s = wait_until_indexed(client, name)
+
+    search_kwargs = get_search_kwargs()
+    latencies, recalls = [], []
+    for query, expected in zip(queries, truth):
+        started = time.perf_counter()
+        points = client.query_points(
+            name,
+            query=query.tolist(),
+            limit=k,
+            search_params=search_kwargs["search_params"],
+            score_threshold=search_kwargs["score_threshold"],
+        ).points
+        latencies.append(time.perf_counter() - started)
+        recalls.append(len({point.id for point in points} & expected) / k)
+
+    cuts = statistics.quantiles(latencies, n=100)
+    return {
+        "index_seconds": round(index_s, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p95_ms": round(cuts[94] * 1000, 2),
+        f"recall@{k}": round(statistics.mean(recalls), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=None, help="Qdrant URL (defaults to config.qdrant_url)")
+    parser.add_argument("--points", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--variants", nargs="+", default=[name for name, _, _ in VARIANTS])
+    parser.add_argument("--keep", action="store_true", help="Keep the benchmark collections")
+    parser.add_argument("--output", type=str, default=None, help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    config = get_config()
+    client = QdrantClient(url=args.url or config.qdrant_url or "http://localhost:6333", timeout=120)
+    vectors = make_vectors(args.points, args.dim)
+    queries = make_vectors(args.queries, args.dim, seed=11)
+
+    # Ground truth: exact search over full-precision vectors
+    config.set_qdrant_schema(quantization="none", on_disk=False)
+    truth_name = "bench_schema_truth"
+    if client.collection_exists(truth_name):
+        client.delete_collection(truth_name)
+    ensure_collection(client, truth_name, args.dim)
+    client.upload_collection(truth_name, vectors=vectors, ids=list(range(args.points)), batch_size=512, wait=True)
+    truth = [
+        {
+            point.id
+            for point in client.query_points(
+                truth_name, query=query.tolist(), limit=args.k, search_params=models.SearchParams(exact=True)
+            ).points
+        }
+        for query in queries
+    ]
+    if not args.keep:
+        client.delete_collection(truth_name)
+
+    results = {"points": args.points, "dim": args.dim, "hnsw_m": config.qdrant_hnsw_m, "variants": {}}
+    print(f"{'variant':>16} {'est RAM MB':>11} {'index s':>8} {'p50 ms':>8} {'p95 ms':>8} {'recall':>7}")
+    for name, quantization, on_disk in VARIANTS:
+        if name not in args.variants:
+            continue
+        collection = f"bench_schema_{name}"
+        if client.collection_exists(collection):
+            client.delete_collection(collection)
+        config.set_qdrant_schema(quantization=quantization, on_disk=on_disk)
+        ensure_collection(client, collection, args.dim)
+        try:
+            result = run_variant(client, collection, vectors, queries, truth, args.k)
+        finally:
+            if not args.keep:
+                client.delete_collection(collection)
+        result["est_ram_mb"] = estimated_ram_mb(args.points, args.dim, quantization, on_disk, config.qdrant_hnsw_m)
+        results["variants"][name] = result
+        print(
+            f"{name:>16} {result['est_ram_mb']:>11} {result['index_seconds']:>8} "
+            f"{result['p50_ms']:>8} {result['p95_ms']:>8} {result[f'recall@{args.k}']:>7}"
+        )
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
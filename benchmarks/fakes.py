@@ -0,0 +1,180 @@
+"""
+Deterministic stand-ins for the external providers, for offline benchmarks.
+
+`FakeEmbeddings` hashes text into unit vectors (identical text, identical
+vector) and `FakeChatModel` answers with a valid `QueryResponse` JSON for RAG
+prompts and plain text for the small-talk and summary prompts. Both simulate
+provider latency with sleeps, so concurrency behaves as it would against the
+real APIs while the CPU cost stays negligible.
+"""
+import asyncio
+import hashlib
+import json
+import random
+import time
+from typing import Any, AsyncIterator, Iterator, List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+WORDS = (
+    "qdrant embedding retrieval chunk overlap azure gemini session history prompt "
+    "context document vector search latency throughput ingestion manifest"
+).split()
+
+
+class FakeEmbeddings(Embeddings):
+    """Hash-seeded random unit vectors with a simulated per-request latency.
+
+    Args:
+        size: Vector dimension
+        latency_ms: Sleep per request (one request per `embed_documents` call)
+        max_concurrency: Async requests served at once, like a per-deployment
+            rate limit; further requests queue (0 for unlimited)
+    """
+
+    def __init__(self, size: int = 1536, latency_ms: float = 0.0, max_concurrency: int = 0):
+        self.size = size
+        self.latency_ms = latency_ms
+        self.max_concurrency = max_concurrency
+        self.requests = 0
+        self._semaphore = None
+
+    def _vector(self, text: str) -> List[float]:
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+        vector = np.random.default_rng(seed).normal(size=self.size)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.requests += 1
+        time.sleep(self.latency_ms / 1000)
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.requests += 1
+        if not self.max_concurrency:
+            await asyncio.sleep(self.latency_ms / 1000)
+        else:
+            if self._semaphore is None:
+                self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            async with self._semaphore:
+                await asyncio.sleep(self.latency_ms / 1000)
+        return [self._vector(text) for text in texts]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
+
+
+class FakeChatModel(BaseChatModel):
+    """Chat model with a fixed time to first token and a steady token rate.
+
+    RAG prompts (those carrying the `QueryResponse` format instructions) get a
+    JSON answer; other prompts get plain text. Streaming yields a few words per
+    chunk at `tokens_per_second`.
+    """
+
+    first_token_ms: float = 300.0
+    tokens_per_second: float = 80.0
+    answer_words: int = 60
+    words_per_chunk: int = 4
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-benchmark"
+
+    def _reply(self, messages: List[BaseMessage]) -> str:
+        prompt = "\n".join(str(message.content) for message in messages)
+        seed = int.from_bytes(hashlib.sha256(prompt.encode("utf-8")).digest()[:4], "little")
+        answer = " ".join(WORDS[(seed + i) % len(WORDS)] for i in range(self.answer_words))
+        if "context_used" not in prompt:
+            return answer
+        return json.dumps(
+            {"category": "document_query", "answer": answer, "diagram_suggested": False, "context_used": True}
+        )
+
+    def _seconds(self, text: str) -> float:
+        # Roughly 0.75 words per token
+        tokens = len(text.split()) / 0.75
+        return self.first_token_ms / 1000 + tokens / self.tokens_per_second
+
+    def _pieces(self, text: str) -> List[str]:
+        words = text.split(" ")
+        return [
+            " ".join(words[i:i + self.words_per_chunk]) + (" " if i + self.words_per_chunk < len(words) else "")
+            for i in range(0, len(words), self.words_per_chunk)
+        ]
+
+    def _generate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        text = self._reply(messages)
+        time.sleep(self._seconds(text))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        text = self._reply(messages)
+        await asyncio.sleep(self._seconds(text))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        pieces = self._pieces(self._reply(messages))
+        time.sleep(self.first_token_ms / 1000)
+        for piece in pieces:
+            time.sleep(len(piece.split()) / 0.75 / self.tokens_per_second)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=piece))
+
+    async def _astream(
+        self, messages, stop=None, run_manager=None, **kwargs: Any
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        pieces = self._pieces(self._reply(messages))
+        await asyncio.sleep(self.first_token_ms / 1000)
+        for piece in pieces:
+            await asyncio.sleep(len(piece.split()) / 0.75 / self.tokens_per_second)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=piece))
+
+
+def fake_query(i: int, words: int = 6) -> str:
+    """A deterministic document-style question built from the corpus vocabulary."""
+    rng = random.Random(i)
+    return "what does the " + " ".join(rng.choice(WORDS) for _ in range(words)) + " say"
+
+
+def latency_summary(seconds: List[float]) -> dict:
+    """p50/p95/p99 and mean in milliseconds."""
+    if not seconds:
+        return {"count": 0}
+    ms = np.asarray(seconds) * 1000
+    return {
+        "count": len(seconds),
+        "mean_ms": round(float(ms.mean()), 2),
+        "p50_ms": round(float(np.percentile(ms, 50)), 2),
+        "p95_ms": round(float(np.percentile(ms, 95)), 2),
+        "p99_ms": round(float(np.percentile(ms, 99)), 2),
+    }
+
+
+def timed(fn, stage: str, timings: dict):
+    """Wrap a sync or async function so each call's duration is appended to ``timings[stage]``."""
+    if asyncio.iscoroutinefunction(fn):
+
+        async def async_wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                timings.setdefault(stage, []).append(time.perf_counter() - started)
+
+        return async_wrapper
+
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            timings.setdefault(stage, []).append(time.perf_counter() - started)
+
+    return wrapper
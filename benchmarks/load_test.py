@@ -0,0 +1,83 @@
+"""
+Concurrent load test for the /chat_response endpoint.
+
+Fires the same number of requests at increasing concurrency levels against a
+running API and reports throughput, so a blocking request path (throughput flat
+as clients grow) is easy to tell apart from a non-blocking one.
+
+Usage:
+    python benchmarks/load_test.py --url http://localhost:8000 --requests 40 --concurrency 1 4 16
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from uuid import uuid4
+
+import httpx
+
+
+async def _worker(client, url, queue, latencies, errors):
+    while True:
+        try:
+            query = queue.get_nowait()
+        except asyncio.QueueEmpty:
+            return
+        started = time.perf_counter()
+        try:
+            response = await client.post(
+                f"{url}/chat_response",
+                json={"query": query, "session_id": f"loadtest-{uuid4()}"},
+            )
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - started)
+        except Exception as exc:
+            errors.append(str(exc))
+
+
+async def run_level(url: str, total: int, concurrency: int, query: str, timeout: float) -> dict:
+    """Send `total` requests using `concurrency` parallel clients."""
+    queue: asyncio.Queue = asyncio.Queue()
+    for _ in range(total):
+        queue.put_nowait(query)
+
+    latencies: list[float] = []
+    errors: list[str] = []
+    async with httpx.AsyncClient(timeout=timeout) as client:
+        started = time.perf_counter()
+        await asyncio.gather(
+            *(_worker(client, url, queue, latencies, errors) for _ in range(concurrency))
+        )
+        elapsed = time.perf_counter() - started
+
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "errors": len(errors),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(statistics.median(latencies) * 1000, 1) if latencies else None,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--requests", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--query", default="What topics do the documents cover?")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    args = parser.parse_args()
+
+    print(f"{'clients':>8} {'ok':>5} {'err':>5} {'elapsed s':>10} {'req/s':>8} {'p50 ms':>8}")
+    for level in args.concurrency:
+        result = await run_level(args.url, args.requests, level, args.query, args.timeout)
+        print(
+            f"{result['concurrency']:>8} {result['requests'] - result['errors']:>5} "
+            f"{result['errors']:>5} {result['elapsed_s']:>10} "
+            f"{result['throughput_rps']:>8} {result['p50_ms']!s:>8}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -6,11 +6,32 @@ import type { Message, ChatSession } from "./types";
 const API_URL = "/api";
 console.log("API_URL:", API_URL);
 
+interface HistoryMessage {
+  id: string;
+  text: string;
+  sender: "user" | "bot";
+  diagram_suggested?: boolean;
+}
+
+// History pages come newest first; the chat shows them oldest first
+const fromHistoryPage = (page: HistoryMessage[]): Message[] =>
+  page
+    .map((m) => ({
+      id: m.id,
+      text: m.text,
+      sender: m.sender,
+      messageId: Number(m.id),
+      diagramSuggested: m.diagram_suggested,
+    }))
+    .reverse();
+
 const App: React.FC = () => {
   const [messages, setMessages] = useState<Message[]>([]);
   const [isLoading, setIsLoading] = useState<boolean>(false);
   const [isSidebarOpen, setIsSidebarOpen] = useState(true);
   const [theme, setTheme] = useState<"light" | "dark">("dark");
+  // Cursor of the next, older history page; null once the oldest page is loaded
+  const [historyCursor, setHistoryCursor] = useState<number | null>(null);
 
   // Session Management
   const [sessions, setSessions] = useState<ChatSession[]>(() => {
@@ -47,16 +68,19 @@ const App: React.FC = () => {
     }
   }, []); // Run once
 
-  // Fetch history when switching sessions
+  // Fetch the latest history page when switching sessions. The server sends an
+  // ETag, so the browser revalidates and reuses an unchanged page (304).
   useEffect(() => {
     const fetchHistory = async () => {
       if (!sessionId) return;
       setIsLoading(true);
+      setHistoryCursor(null);
       try {
         const res = await fetch(`${API_URL}/chat_history/${sessionId}`);
         if (res.ok) {
           const data = await res.json();
-          setMessages(data.messages || []);
+          setMessages(fromHistoryPage(data.messages || []));
+          setHistoryCursor(data.next_cursor ?? null);
         } else {
           setMessages([]);
         }
@@ -71,6 +95,23 @@ const App: React.FC = () => {
     fetchHistory();
   }, [sessionId]);
 
+  const handleLoadEarlier = async () => {
+    if (historyCursor === null) return;
+    try {
+      const res = await fetch(
+        `${API_URL}/chat_history/${sessionId}?before=${historyCursor}`
+      );
+      if (!res.ok) {
+        throw new Error(`HTTP error! status: ${res.status}`);
+      }
+      const data = await res.json();
+      setMessages((prev) => [...fromHistoryPage(data.messages || []), ...prev]);
+      setHistoryCursor(data.next_cursor ?? null);
+    } catch (e) {
+      console.error("Failed to load earlier messages", e);
+    }
+  };
+
 
   useEffect(() => {
     if (theme === "dark") {
@@ -99,8 +140,25 @@ const App: React.FC = () => {
       return s;
     }));
 
+    const botId = (Date.now() + 1).toString();
+    let botStarted = false;
+    const updateBotMessage = (update: Partial<Message>) => {
+      if (!botStarted) {
+        botStarted = true;
+        setIsLoading(false);
+        setMessages((prev) => [
+          ...prev,
+          { id: botId, text: "", sender: "bot", ...update },
+        ]);
+        return;
+      }
+      setMessages((prev) =>
+        prev.map((m) => (m.id === botId ? { ...m, ...update } : m))
+      );
+    };
+
     try {
-      const response = await fetch(`${API_URL}/chat_response`, {
+      const response = await fetch(`${API_URL}/chat_response/stream`, {
         method: "POST",
         headers: {
           "Content-Type": "application/json",
@@ -108,23 +166,56 @@ const App: React.FC = () => {
         body: JSON.stringify({ query: userInput, session_id: sessionId }),
       });
 
-      if (!response.ok) {
+      if (!response.ok || !response.body) {
         throw new Error(`HTTP error! status: ${response.status}`);
       }
 
-      const data = await response.json();
+      // Read server-sent events: "event: <name>\ndata: <json>\n\n"
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = "";
+      let answer = "";
 
-      const botMessage: Message = {
-        id: (Date.now() + 1).toString(),
-        text: data.answer || "Sorry, I couldn't get a response.",
-        sender: "bot",
-        diagram: data.diagram,
-      };
-      setMessages((prevMessages) => [...prevMessages, botMessage]);
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        let boundary;
+        while ((boundary = buffer.indexOf("\n\n")) !== -1) {
+          const rawEvent = buffer.slice(0, boundary);
+          buffer = buffer.slice(boundary + 2);
+
+          let eventName = "message";
+          let data = "";
+          for (const line of rawEvent.split("\n")) {
+            if (line.startsWith("event: ")) eventName = line.slice(7);
+            else if (line.startsWith("data: ")) data += line.slice(6);
+          }
+          const payload = data ? JSON.parse(data) : {};
+
+          if (eventName === "token") {
+            answer += payload.text;
+            updateBotMessage({ text: answer });
+          } else if (eventName === "result") {
+            updateBotMessage({
+              text: payload.answer || "Sorry, I couldn't get a response.",
+              messageId: payload.message_id,
+              diagramSuggested: payload.diagram_suggested,
+            });
+          } else if (eventName === "error") {
+            throw new Error(payload.detail);
+          }
+        }
+      }
+
+      if (!botStarted) {
+        updateBotMessage({ text: "Sorry, I couldn't get a response." });
+      }
     } catch (error) {
       console.error("Failed to fetch chat response:", error);
       const errorMessage: Message = {
-        id: (Date.now() + 1).toString(),
+        id: (Date.now() + 2).toString(),
         text: "Sorry, something went wrong. Please try again later.",
         sender: "error",
       };
@@ -134,6 +225,35 @@ const App: React.FC = () => {
     }
   };
 
+  // Diagrams are drawn only when asked for; the server keeps them per answer
+  const handleRequestDiagram = async (message: Message) => {
+    if (message.messageId == null) return;
+    const setDiagramState = (update: Partial<Message>) =>
+      setMessages((prev) =>
+        prev.map((m) => (m.id === message.id ? { ...m, ...update } : m))
+      );
+
+    setDiagramState({ diagramLoading: true });
+    try {
+      const res = await fetch(
+        `${API_URL}/diagram/${sessionId}/${message.messageId}`
+      );
+      if (!res.ok) {
+        throw new Error(`HTTP error! status: ${res.status}`);
+      }
+      const data = await res.json();
+      setDiagramState({
+        diagram: data.diagram,
+        diagramLoading: false,
+        // Nothing worth drawing: hide the button instead of offering it again
+        diagramSuggested: Boolean(data.diagram),
+      });
+    } catch (e) {
+      console.error("Failed to load diagram", e);
+      setDiagramState({ diagramLoading: false });
+    }
+  };
+
   const handleNewChat = () => {
     const newId = crypto.randomUUID();
     const newSession: ChatSession = {
@@ -144,6 +264,7 @@ const App: React.FC = () => {
     setSessions(prev => [newSession, ...prev]);
     setSessionId(newId);
     setMessages([]);
+    setHistoryCursor(null);
   };
 
   const handleDeleteSession = (id: string, e: React.MouseEvent) => {
@@ -182,6 +303,9 @@ const App: React.FC = () => {
           messages={messages}
           isLoading={isLoading}
           onSendMessage={handleSendMessage}
+          onRequestDiagram={handleRequestDiagram}
+          hasEarlierMessages={historyCursor !== null}
+          onLoadEarlier={handleLoadEarlier}
         />
       </div>
     </div>
@@ -14,6 +14,9 @@ interface ChatWindowProps {
   messages: MessageType[];
   isLoading: boolean;
   onSendMessage: (input: string) => void;
+  onRequestDiagram: (message: MessageType) => void;
+  hasEarlierMessages: boolean;
+  onLoadEarlier: () => void;
 }
 
 const WelcomeScreen: React.FC<{ onPromptClick: (prompt: string) => void }> = ({
@@ -115,24 +118,41 @@ const ChatWindow: React.FC<ChatWindowProps> = ({
   messages,
   isLoading,
   onSendMessage,
+  onRequestDiagram,
+  hasEarlierMessages,
+  onLoadEarlier,
 }) => {
   const messagesEndRef = useRef<HTMLDivElement>(null);
+  const lastMessage = messages[messages.length - 1];
 
   const scrollToBottom = () => {
     messagesEndRef.current?.scrollIntoView({ behavior: "smooth" });
   };
 
+  // Follow new and streaming messages, but stay put when earlier ones are prepended
   useEffect(() => {
     scrollToBottom();
-  }, [messages, isLoading]);
+  }, [lastMessage?.id, lastMessage?.text, isLoading]);
 
   return (
     <div className="flex-1 flex flex-col no-scrollbar relative text-gray-800 dark:text-gray-200">
       <div className="flex-1 overflow-y-auto no-scrollbar p-4 md:p-6 space-y-4 pb-32 max-h-[90vh]">
+        {hasEarlierMessages && (
+          <div className="flex justify-center">
+            <button
+              onClick={onLoadEarlier}
+              className="px-3 py-1.5 text-xs rounded-lg text-gray-600 dark:text-gray-400 hover:bg-gray-100 dark:hover:bg-[#2c2e42] transition-colors"
+            >
+              Load earlier messages
+            </button>
+          </div>
+        )}
         {messages.length === 0 ? (
           <WelcomeScreen onPromptClick={onSendMessage} />
         ) : (
-          messages.map((msg) => <Message key={msg.id} message={msg} />)
+          messages.map((msg) => (
+            <Message key={msg.id} message={msg} onRequestDiagram={onRequestDiagram} />
+          ))
         )}
         {isLoading && (
           <Message
@@ -8,6 +8,7 @@ import { GraphvizDiagram } from "./GraphvizDiagram";
 interface MessageProps {
   message: MessageType;
   isLoading?: boolean;
+  onRequestDiagram?: (message: MessageType) => void;
 }
 
 const PulsingLoader: React.FC = () => (
@@ -27,7 +28,11 @@ const PulsingLoader: React.FC = () => (
   </div>
 );
 
-const Message: React.FC<MessageProps> = ({ message, isLoading = false }) => {
+const Message: React.FC<MessageProps> = ({
+  message,
+  isLoading = false,
+  onRequestDiagram,
+}) => {
   const isUser = message.sender === "user";
   const isBot = message.sender === "bot";
   const isError = message.sender === "error";
@@ -76,6 +81,15 @@ const Message: React.FC<MessageProps> = ({ message, isLoading = false }) => {
         {message.diagram && !isLoading && (
           <GraphvizDiagram code={message.diagram} />
         )}
+        {isBot && message.diagramSuggested && !message.diagram && !isLoading && onRequestDiagram && (
+          <button
+            onClick={() => onRequestDiagram(message)}
+            disabled={message.diagramLoading}
+            className="mt-3 px-3 py-1.5 text-xs font-medium rounded-lg border border-blue-500/40 text-blue-600 dark:text-blue-400 hover:bg-blue-500/10 transition-colors disabled:opacity-60 disabled:cursor-wait"
+          >
+            {message.diagramLoading ? "Drawing diagram..." : "Show diagram"}
+          </button>
+        )}
       </div>
 
       {isUser && (
@@ -4,6 +4,10 @@ export interface Message {
   text: string;
   sender: 'user' | 'bot' | 'error';
   diagram?: string;
+  // Set on answers: the stored message id, and whether a diagram can be requested for it
+  messageId?: number;
+  diagramSuggested?: boolean;
+  diagramLoading?: boolean;
 }
 
 export interface ChatSession {
@@ -25,9 +25,9 @@ with patch("src.core.chat_manager.get_session_history", return_value=mock_histor
     print("\nResponse:")
     print(f"Category: {response['category']}")
     print(f"Answer: {response['answer']}")
-    print(f"Diagram (DOT): {response['diagram']}")
-    
-    if "digraph" in response['diagram'] or "graph" in response['diagram']:
-        print("SUCCESS: Graphviz DOT code detected.")
+    print(f"Diagram Suggested: {response['diagram_suggested']}")
+
+    if response['diagram_suggested']:
+        print("SUCCESS: diagram suggested (drawn on demand via GET /diagram/{session_id}/{message_id}).")
     else:
-        print("FAILURE: Graphviz DOT code NOT detected.")
+        print("FAILURE: diagram NOT suggested.")
@@ -1,12 +1,38 @@
-from fastapi import FastAPI, HTTPException
+import asyncio
+import hashlib
+import json
+import time
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from fastapi import BackgroundTasks, FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-from uuid import uuid4
+from starlette.background import BackgroundTask
 
-from ..core import chat_manager, retriver
+from ..core import admission, chat_manager, diagrams, intent_router, metrics, retriver, warmup
+from ..core.coalesce import get_coalescing_stats
 from ..core.config import get_config, get_vectorstore
+from ..core.context_packer import get_context_packing_stats
+from ..core.embedding_cache import get_embedding_cache_stats
+from ..core.query_batcher import get_query_batching_stats
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Build the shared clients and chain once per worker, before serving traffic."""
+    status = await warmup.awarm_up()
+    for name, dependency in status.items():
+        if dependency.warm:
+            print(f"✓ {name} warm ({dependency.latency_ms} ms)")
+        else:
+            print(f"⚠ {name} failed to warm up: {dependency.error}")
+    yield
+    await chat_manager.aclose_history_engines()
 
-app = FastAPI()
+
+app = FastAPI(lifespan=lifespan)
 
 # Configure CORS with settings from config
 config = get_config()
@@ -18,12 +44,46 @@ app.add_middleware(
     allow_headers=config.cors_allow_headers,
 )
 
+
+@app.middleware("http")
+async def record_request_timing(request: Request, call_next):
+    """Observe request latency and, if enabled, report the stage breakdown as Server-Timing.
+
+    For streaming responses this covers the time until headers are sent; the
+    stages that run while the body streams still reach /metrics.
+    """
+    if not config.metrics_enabled:
+        return await call_next(request)
+    started = time.perf_counter()
+    breakdown = metrics.start_request()
+    response = await call_next(request)
+    elapsed = time.perf_counter() - started
+    # Label by route template so per-session paths do not create new series
+    route = request.scope.get("route")
+    metrics.REQUEST_SECONDS.observe(
+        elapsed,
+        method=request.method,
+        path=getattr(route, "path", "unmatched"),
+        status=response.status_code,
+    )
+    if config.timing_header_enabled:
+        response.headers["Server-Timing"] = metrics.server_timing(breakdown, elapsed)
+    return response
+
+
 @app.get("/")
 async def read_root():
     return {"message": "FastAPI is running!"}
 
 
 
+@app.get("/ready")
+async def ready():
+    """Readiness probe: 200 once every dependency is warm, 503 otherwise."""
+    report = await warmup.readiness()
+    return JSONResponse(report, status_code=200 if report["ready"] else 503)
+
+
 class ChatRequest(BaseModel):
     query: str
     session_id: str
@@ -33,45 +93,402 @@ class ChatResponse(BaseModel):
     answer: str
 
 
+async def _route_intent(query: str, session_id: str, vectorstore):
+    """Small-talk route for `query`, or None when it needs retrieval."""
+    if not config.intent_router_enabled:
+        return None
+    try:
+        with metrics.stage("route"):
+            return await intent_router.get_intent_router(vectorstore.embeddings).aroute(
+                query, lambda: chat_manager.aget_last_reply(session_id)
+            )
+    except Exception as exc:
+        # Routing only saves work; if it fails, answer through the full RAG path
+        print(f"⚠ Intent routing failed, using RAG: {exc}")
+        return None
+
+
+async def _admit(session_id: str):
+    """Admission ticket for a chat turn, or None when admission control is off.
+
+    Raises a 503 with Retry-After when the turn is shed, before any work is done.
+    """
+    if not config.admission_enabled:
+        return None
+    try:
+        return await admission.get_admission_controller().acquire(session_id)
+    except admission.AdmissionRejected as exc:
+        raise HTTPException(
+            status_code=503, detail=str(exc), headers={"Retry-After": str(exc.retry_after)}
+        )
+
+
 @app.post("/chat_response")
-async def rag_chat(body: ChatRequest):
+async def rag_chat(body: ChatRequest, background_tasks: BackgroundTasks):
     try:
-        vectorstore = get_vectorstore()
+        # First call builds the embeddings + Qdrant clients; keep it off the loop
+        vectorstore = await asyncio.to_thread(get_vectorstore)
     except RuntimeError as exc:
         raise HTTPException(status_code=500, detail=str(exc))
 
+    ticket = await _admit(body.session_id)
+    started = time.perf_counter()
     try:
-        relevant_docs = retriver.get_relevant_docs(vectorstore, body.query)
         llm = chat_manager.get_llm()
-        result = chat_manager.generate_response(
-            llm, relevant_docs, body.query, body.session_id
-        )
+        route = await _route_intent(body.query, body.session_id, vectorstore)
+        if route is not None:
+            result = await chat_manager.asmalltalk_response(
+                llm, route.category, body.query, body.session_id
+            )
+        else:
+            # History load and vector search are independent, so run them together
+            relevant_docs, history_messages = await asyncio.gather(
+                retriver.aget_relevant_docs(vectorstore, body.query),
+                chat_manager.aget_prompt_history(body.session_id),
+            )
+            result = await chat_manager.agenerate_response(
+                llm,
+                relevant_docs,
+                body.query,
+                body.session_id,
+                history_messages=history_messages,
+            )
+        intent_router.record_request(route, time.perf_counter() - started)
+        # Summarize turns that left the history window after the reply is sent
+        background_tasks.add_task(chat_manager.arefresh_summary, llm, body.session_id)
         return result
     except Exception as exc:
         raise HTTPException(
             status_code=500, detail=f"Failed to generate response: {exc}"
         )
+    finally:
+        if ticket is not None:
+            ticket.release()
+
+
+def _sse(event: str, data) -> str:
+    """Format one server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.post("/chat_response/stream")
+async def rag_chat_stream(body: ChatRequest):
+    """Server-sent events version of /chat_response.
+
+    Emits `token` events carrying answer text as it is generated, `field` events
+    for `category`, `diagram_suggested` and `context_used` once each is known,
+    and a final `result` event with the complete validated response and its
+    `message_id`.
+    """
+    try:
+        vectorstore = await asyncio.to_thread(get_vectorstore)
+    except RuntimeError as exc:
+        raise HTTPException(status_code=500, detail=str(exc))
+    llm = chat_manager.get_llm()
+    # Admit before the 200 is sent, so a shed turn still gets a proper 503
+    ticket = await _admit(body.session_id)
+
+    def release():
+        if ticket is not None:
+            ticket.release()
+
+    async def after_stream():
+        release()
+        await chat_manager.arefresh_summary(llm, body.session_id)
+
+    async def event_stream():
+        started = time.perf_counter()
+        try:
+            route = await _route_intent(body.query, body.session_id, vectorstore)
+            if route is not None:
+                result = await chat_manager.asmalltalk_response(
+                    llm, route.category, body.query, body.session_id
+                )
+                yield _sse("token", {"text": result["answer"]})
+                yield _sse("result", result)
+                intent_router.record_request(route, time.perf_counter() - started)
+                return
+
+            relevant_docs, history_messages = await asyncio.gather(
+                retriver.aget_relevant_docs(vectorstore, body.query),
+                chat_manager.aget_prompt_history(body.session_id),
+            )
+            async for event, data in chat_manager.astream_response(
+                llm,
+                relevant_docs,
+                body.query,
+                body.session_id,
+                history_messages=history_messages,
+            ):
+                yield _sse(event, data)
+            intent_router.record_request(None, time.perf_counter() - started)
+        except Exception as exc:
+            # Headers are already sent, so report failures in-band
+            yield _sse("error", {"detail": f"Failed to generate response: {exc}"})
+        finally:
+            release()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        # Release the turn if the stream never ran, then summarize turns that left the window
+        background=BackgroundTask(after_stream),
+    )
+
+
+@app.get("/diagram/{session_id}/{message_id}")
+async def get_diagram(session_id: str, message_id: int):
+    """Graphviz DOT for one answer, drawn on the first request and stored for later ones.
+
+    `message_id` is the id returned with the answer. The diagram is empty when
+    the model found nothing worth drawing.
+    """
+    try:
+        diagram = await diagrams.aget_cached_diagram(session_id, message_id)
+    except Exception as exc:
+        raise HTTPException(status_code=500, detail=f"Failed to fetch diagram: {exc}")
+    if diagram is not None:
+        return {"message_id": message_id, "diagram": diagram}
+
+    try:
+        vectorstore = await asyncio.to_thread(get_vectorstore)
+    except RuntimeError as exc:
+        raise HTTPException(status_code=500, detail=str(exc))
+    # Drawing is an LLM call, so it takes a turn like a chat message does
+    ticket = await _admit(session_id)
+    try:
+        diagram = await diagrams.agenerate_diagram(
+            chat_manager.get_llm(), vectorstore, session_id, message_id
+        )
+    except Exception as exc:
+        raise HTTPException(status_code=500, detail=f"Failed to generate diagram: {exc}")
+    finally:
+        if ticket is not None:
+            ticket.release()
+    if diagram is None:
+        raise HTTPException(status_code=404, detail="No such answer in this session")
+    return {"message_id": message_id, "diagram": diagram}
+
+
+# Largest page a client may ask /chat_history for
+HISTORY_MAX_PAGE_SIZE = 200
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header names `etag` (weak comparison, as for GET)."""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or any(tag.removeprefix("W/") == etag for tag in candidates)
 
 
 @app.get("/chat_history/{session_id}")
-async def get_history(session_id: str):
+async def get_history(
+    session_id: str,
+    request: Request,
+    before: Optional[int] = Query(None, description="Cursor: return messages older than this id"),
+    limit: Optional[int] = Query(None, ge=1, le=HISTORY_MAX_PAGE_SIZE),
+):
+    """One page of a session's messages, most recent first.
+
+    Message ids are the stored row ids, so they stay the same across calls;
+    pass `next_cursor` as `before` to get the next, older page. The response
+    carries an ETag, and a request whose If-None-Match still matches gets a
+    304 without a body.
+    """
     try:
-        messages = chat_manager.get_chat_history_messages(session_id)
-        # Convert to simple format for frontend
-        formatted_messages = []
-        for msg in messages:
-            sender = "user" if msg.type == "human" else "bot"
-            formatted_messages.append({
-                "id": str(uuid4()), # Generate a temp ID as it's not stored in DB
-                "text": msg.content,
-                "sender": sender
-            })
-        return {"messages": formatted_messages}
+        page, next_cursor = await chat_manager.aget_chat_history_page(session_id, before, limit)
     except Exception as exc:
         raise HTTPException(
             status_code=500, detail=f"Failed to fetch history: {exc}"
         )
 
+    formatted_messages = []
+    for message_id, msg in page:
+        item = {
+            "id": str(message_id),
+            "text": msg.content,
+            "sender": "user" if msg.type == "human" else "bot",
+        }
+        if msg.type == "ai":
+            item["diagram_suggested"] = bool(msg.additional_kwargs.get("diagram_suggested"))
+        formatted_messages.append(item)
+    body = json.dumps({"messages": formatted_messages, "next_cursor": next_cursor}).encode("utf-8")
+
+    etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+    # Clients may reuse the page only after checking with us
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@app.get("/embedding_cache/stats")
+async def embedding_cache_stats():
+    """Hit/miss counters for the embedding cache in this worker."""
+    return get_embedding_cache_stats()
+
+
+@app.get("/context_packing/stats")
+async def context_packing_stats():
+    """Chunks merged/dropped and prompt tokens saved by context packing in this worker."""
+    return get_context_packing_stats()
+
+
+@app.get("/retrieval/stats")
+async def retrieval_stats():
+    """Queries answered by dense, hybrid and lexical-only retrieval in this worker."""
+    return retriver.get_retrieval_stats()
+
+
+@app.get("/intent_router/stats")
+async def intent_router_stats():
+    """How often greetings/small talk skipped retrieval and the latency that saved."""
+    return intent_router.get_intent_router_stats()
+
+
+@app.get("/structured_output/stats")
+async def structured_output_stats():
+    """RAG responses, parse failure rate and average prompt tokens per output mode."""
+    return chat_manager.get_structured_output_stats()
+
+
+@app.get("/diagram/stats")
+async def diagram_stats():
+    """How often answers suggest a diagram, and diagrams drawn on demand or served from the store."""
+    return diagrams.get_diagram_stats()
+
+
+@app.get("/admission/stats")
+async def admission_stats():
+    """Chat turns admitted, shed (queue full or deadline) and currently running or waiting."""
+    return admission.get_admission_stats()
+
+
+@app.get("/query_batching/stats")
+async def query_batching_stats():
+    """Query embeddings merged into shared upstream requests in this worker."""
+    return get_query_batching_stats()
+
+
+@app.get("/coalescing/stats")
+async def coalescing_stats():
+    """Upstream embedding, retrieval and LLM calls made and saved by coalescing in this worker."""
+    return get_coalescing_stats()
+
+
+# Counters the /…/stats endpoints already keep, exposed to Prometheus as well
+metrics.register(metrics.Gauge(
+    "rag_embedding_cache_lookups_total",
+    "Embedding cache lookups by result.",
+    lambda: {
+        result: get_embedding_cache_stats().get(key, 0)
+        for result, key in (("memory_hit", "memory_hits"), ("disk_hit", "disk_hits"), ("miss", "misses"))
+    },
+    labelname="result",
+    kind="counter",
+))
+metrics.register(metrics.Gauge(
+    "rag_embedding_cache_hit_rate",
+    "Share of embedding lookups served from the cache.",
+    lambda: get_embedding_cache_stats().get("hit_rate"),
+))
+metrics.register(metrics.Gauge(
+    "rag_retrieval_queries_total",
+    "Retrieval queries by route (dense, hybrid or lexical fast path).",
+    lambda: {
+        route: count
+        for route, count in retriver.get_retrieval_stats().items()
+        if route not in ("mode", "queries")
+    },
+    labelname="route",
+    kind="counter",
+))
+metrics.register(metrics.Gauge(
+    "rag_intent_router_fast_path_rate",
+    "Share of chat requests answered without retrieval.",
+    lambda: intent_router.get_intent_router_stats()["fast_path_rate"],
+))
+metrics.register(metrics.Gauge(
+    "rag_query_embedding_requests_total",
+    "Query embeddings batched and the upstream requests that carried them.",
+    lambda: {
+        kind: get_query_batching_stats()[key]
+        for kind, key in (("texts", "texts"), ("upstream", "batches"))
+    },
+    labelname="kind",
+    kind="counter",
+))
+metrics.register(metrics.Gauge(
+    "rag_admission_turns",
+    "Chat turns currently running or waiting for admission.",
+    lambda: {
+        state: admission.get_admission_stats()[state] for state in ("active", "waiting")
+    },
+    labelname="state",
+))
+metrics.register(metrics.Gauge(
+    "rag_admission_rejected_total",
+    "Chat turns shed with a 503, by reason.",
+    lambda: {
+        reason: admission.get_admission_stats()[f"rejected_{reason}"] for reason in ("queue_full", "timeout")
+    },
+    labelname="reason",
+    kind="counter",
+))
+metrics.register(metrics.Gauge(
+    "rag_parse_failures_total",
+    "RAG responses that failed QueryResponse validation, by output mode.",
+    lambda: {
+        mode: stats["parse_failures"]
+        for mode, stats in chat_manager.get_structured_output_stats().items()
+        if isinstance(stats, dict)
+    },
+    labelname="mode",
+    kind="counter",
+))
+metrics.register(metrics.Gauge(
+    "rag_diagram_requests_total",
+    "Diagram requests by whether the diagram was drawn or already stored.",
+    lambda: {
+        source: diagrams.get_diagram_stats()[key]
+        for source, key in (("generated", "generated"), ("stored", "cache_hits"))
+    },
+    labelname="source",
+    kind="counter",
+))
+metrics.register(metrics.Gauge(
+    "rag_diagram_suggestion_rate",
+    "Share of RAG answers that suggested a diagram.",
+    lambda: diagrams.get_diagram_stats()["suggestion_rate"],
+))
+metrics.register(metrics.Gauge(
+    "rag_coalesced_calls_total",
+    "Upstream calls saved by sharing them between identical in-flight queries.",
+    lambda: {
+        stage: counts["coalesced"]
+        for stage, counts in get_coalescing_stats().items()
+        if isinstance(counts, dict)
+    },
+    labelname="stage",
+    kind="counter",
+))
+metrics.register(metrics.Gauge(
+    "rag_context_tokens_saved_total",
+    "Prompt tokens removed by context packing.",
+    lambda: get_context_packing_stats()["tokens_saved"],
+    kind="counter",
+))
+
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Stage latency histograms, token counts and cache counters in Prometheus text format."""
+    if not config.metrics_enabled:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 
 if __name__ == "__main__":
     import uvicorn
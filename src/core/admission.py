@@ -0,0 +1,225 @@
+import asyncio
+import math
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Deque, Dict, Optional
+
+from .config import get_config
+from .metrics import ADMISSION_WAIT_SECONDS
+
+# Weight of the latest turn in the moving average of slot hold time
+HOLD_TIME_SMOOTHING = 0.2
+MAX_RETRY_AFTER_SECONDS = 60
+
+_stats_lock = threading.Lock()
+_stats = {"admitted": 0, "rejected_queue_full": 0, "rejected_timeout": 0, "queue_wait_seconds": 0.0}
+
+
+def _count(key: str, amount: float = 1) -> None:
+    with _stats_lock:
+        _stats[key] += amount
+
+
+class AdmissionRejected(Exception):
+    """A chat turn was shed because the queue was full or its wait exceeded the deadline."""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(f"Server busy ({reason}), retry in {retry_after}s")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class _Ticket:
+    """An admitted turn; releases its session lock and LLM slot exactly once."""
+
+    def __init__(self, controller: "AdmissionController", session_id: str, lock: asyncio.Lock):
+        self.controller = controller
+        self.session_id = session_id
+        self.lock = lock
+        self.admitted_at = time.monotonic()
+        self.released = False
+
+    def release(self) -> None:
+        if self.released:
+            return
+        self.released = True
+        self.controller._release(self)
+
+
+class AdmissionController:
+    """Admission in front of the LLM: a global slot limit, per-session turns and load shedding.
+
+    At most `max_concurrency` chat turns run at once; the rest wait for a
+    slot in FIFO order, so none is overtaken. Turns of the same session run one at a
+    time, which keeps two quick messages from interleaving their history
+    writes and stops one session from holding several slots. A turn that
+    cannot start within `queue_timeout` seconds, or that arrives when
+    `max_queue` turns are already waiting, raises `AdmissionRejected` with a
+    Retry-After estimate instead of queueing behind a backlog it cannot clear.
+
+    Limits are per worker process.
+
+    Args:
+        max_concurrency: Turns running at once (defaults to config.llm_max_concurrency)
+        max_queue: Turns allowed to wait (defaults to config.admission_max_queue)
+        queue_timeout: Seconds a turn may wait (defaults to config.admission_queue_timeout_seconds)
+    """
+
+    def __init__(
+        self,
+        max_concurrency: Optional[int] = None,
+        max_queue: Optional[int] = None,
+        queue_timeout: Optional[float] = None,
+    ):
+        config = get_config()
+        if max_concurrency is None:
+            max_concurrency = config.llm_max_concurrency
+        if max_queue is None:
+            max_queue = config.admission_max_queue
+        if queue_timeout is None:
+            queue_timeout = config.admission_queue_timeout_seconds
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.waiting = 0
+        self._slot_waiters: Deque[asyncio.Future] = deque()
+        # session_id -> [lock, turns holding or waiting for it]
+        self._sessions: Dict[str, list] = {}
+        self._avg_hold_seconds: Optional[float] = None
+
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely free, from the average turn time and the queue."""
+        if self._avg_hold_seconds is None:
+            return 1
+        seconds = self._avg_hold_seconds * (self.waiting + 1) / self.max_concurrency
+        return max(1, min(MAX_RETRY_AFTER_SECONDS, math.ceil(seconds)))
+
+    def _reject(self, reason: str, key: str) -> AdmissionRejected:
+        _count(key)
+        return AdmissionRejected(reason, self.retry_after())
+
+    async def acquire(self, session_id: str) -> _Ticket:
+        """Wait for the session's turn and a free slot; raise `AdmissionRejected` if shed."""
+        must_wait = self.active >= self.max_concurrency or session_id in self._sessions
+        if must_wait and self.waiting >= self.max_queue:
+            raise self._reject("queue full", "rejected_queue_full")
+
+        started = time.monotonic()
+        deadline = started + self.queue_timeout
+        entry = self._sessions.setdefault(session_id, [asyncio.Lock(), 0])
+        entry[1] += 1
+        self.waiting += 1
+        try:
+            if entry[0].locked():
+                await asyncio.wait_for(entry[0].acquire(), max(0.0, deadline - time.monotonic()))
+            else:
+                # Uncontended: take it without suspending, so `active`/`waiting` stay exact in a burst
+                await entry[0].acquire()
+            try:
+                await self._acquire_slot(deadline)
+            except BaseException:
+                entry[0].release()
+                raise
+        except asyncio.TimeoutError:
+            self._leave_session(session_id)
+            raise self._reject("queue timeout", "rejected_timeout") from None
+        except BaseException:
+            self._leave_session(session_id)
+            raise
+        finally:
+            self.waiting -= 1
+
+        waited = time.monotonic() - started
+        _count("admitted")
+        _count("queue_wait_seconds", waited)
+        if get_config().metrics_enabled:
+            ADMISSION_WAIT_SECONDS.observe(waited)
+        return _Ticket(self, session_id, entry[0])
+
+    @asynccontextmanager
+    async def admit(self, session_id: str):
+        """``async with`` form of `acquire`."""
+        ticket = await self.acquire(session_id)
+        try:
+            yield ticket
+        finally:
+            ticket.release()
+
+    async def _acquire_slot(self, deadline: float) -> None:
+        if self.active < self.max_concurrency and not self._slot_waiters:
+            self.active += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._slot_waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, max(0.0, deadline - time.monotonic()))
+        except BaseException:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as we gave up; pass it on
+                self._release_slot()
+            else:
+                try:
+                    self._slot_waiters.remove(waiter)
+                except ValueError:
+                    pass
+            raise
+
+    def _release_slot(self) -> None:
+        while self._slot_waiters:
+            waiter = self._slot_waiters.popleft()
+            if not waiter.done():
+                # Hand the slot straight to the oldest waiter; `active` is unchanged
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def _leave_session(self, session_id: str) -> None:
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            return
+        entry[1] -= 1
+        if entry[1] == 0:
+            del self._sessions[session_id]
+
+    def _release(self, ticket: _Ticket) -> None:
+        held = time.monotonic() - ticket.admitted_at
+        if self._avg_hold_seconds is None:
+            self._avg_hold_seconds = held
+        else:
+            self._avg_hold_seconds += HOLD_TIME_SMOOTHING * (held - self._avg_hold_seconds)
+        self._release_slot()
+        ticket.lock.release()
+        self._leave_session(ticket.session_id)
+
+
+_controller: Optional[AdmissionController] = None
+
+
+def get_admission_controller() -> AdmissionController:
+    """Get or create this worker's admission controller."""
+    global _controller
+    if _controller is None:
+        _controller = AdmissionController()
+    return _controller
+
+
+def get_admission_stats() -> dict:
+    """Turns admitted and shed, and the current load, in this worker."""
+    config = get_config()
+    controller = _controller
+    with _stats_lock:
+        stats = dict(_stats)
+    admitted = stats.pop("admitted")
+    wait_seconds = stats.pop("queue_wait_seconds")
+    return {
+        "enabled": config.admission_enabled,
+        "max_concurrency": controller.max_concurrency if controller else config.llm_max_concurrency,
+        "active": controller.active if controller else 0,
+        "waiting": controller.waiting if controller else 0,
+        "admitted": admitted,
+        **stats,
+        "avg_queue_wait_ms": round(1000 * wait_seconds / admitted, 1) if admitted else 0.0,
+    }
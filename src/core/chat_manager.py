@@ -1,19 +1,28 @@
-import os
+import threading
+import time
 from datetime import datetime
-from typing import Literal, Union
+from functools import lru_cache
+from typing import Literal, Optional, Union
 from uuid import uuid4
 
 from dotenv import load_dotenv
 from langchain_core.chat_history import BaseChatMessageHistory
 from langchain_core.messages import AIMessage, HumanMessage
-from langchain_core.output_parsers import PydanticOutputParser
+from langchain_core.exceptions import OutputParserException
+from langchain_core.output_parsers import PydanticOutputParser, StrOutputParser
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_google_genai import ChatGoogleGenerativeAI
 from pydantic import BaseModel, Field
 
+from .coalesce import SingleFlight, normalize_query
 from .config import get_config, get_vectorstore
-from .prompt import prompt_template
+from .context_packer import build_context_text
+from .diagrams import record_response
+from .memory import aget_prompt_history, arefresh_summary, format_chat_history
+from .metrics import record_llm_usage, record_stage, stage
+from .prompt import native_format_instructions, prompt_template, smalltalk_prompt_template
 from .retriver import get_relevant_docs
+from .stream_parser import IncrementalJSONFieldParser
 
 load_dotenv()
 
@@ -27,7 +36,7 @@ class QueryResponse(BaseModel):
         "greeting", "document_query", "general_info", "goodbye", "chitchat"
     ] = Field(description="The classified category of the user's query")
     answer: str = Field(description="Response text")
-    diagram: str = Field(description="Graphviz DOT code ONLY. Do not include this in the answer field. If no diagram is needed, use an empty string.", default=None)
+    diagram_suggested: bool = Field(description="Whether a diagram would help explain the answer; it is drawn separately on request", default=False)
     context_used: bool = Field(description="Whether RAG context was used")
 
 
@@ -37,20 +46,35 @@ parser = PydanticOutputParser(pydantic_object=QueryResponse)
 #  Chat History (Updated)
 # ---------------------
 
-from langchain_community.chat_message_histories import SQLChatMessageHistory
+from .history_store import (
+    CHAT_HISTORY_DB,
+    CHAT_HISTORY_DIR,
+    WindowedChatMessageHistory,
+    aclose_history_store,
+    get_history_store,
+)
+
 
 def get_session_history(session_id: str) -> BaseChatMessageHistory:
     """
     Get chat history from SQLite database.
+
+    Reads return only the recent window used for prompts (see
+    config.history_max_messages and config.history_max_tokens).
     """
-    # Ensure the directory exists
-    db_path = "sqlite:///data/chat_history/chat_history.db"
-    os.makedirs("data/chat_history", exist_ok=True)
-    
-    return SQLChatMessageHistory(
-        session_id=session_id,
-        connection_string=db_path
-    )
+    return WindowedChatMessageHistory(get_history_store(), session_id)
+
+
+def get_async_session_history(session_id: str) -> WindowedChatMessageHistory:
+    """
+    Get chat history for use on the event loop; its ``a*`` methods use aiosqlite.
+    """
+    return WindowedChatMessageHistory(get_history_store(), session_id)
+
+
+async def aclose_history_engines() -> None:
+    """Dispose the pooled history engines (called on application shutdown)."""
+    await aclose_history_store()
 
 
 # ---------------------
@@ -58,15 +82,22 @@ def get_session_history(session_id: str) -> BaseChatMessageHistory:
 # ---------------------
 
 
+_llms = {}
+_llms_lock = threading.Lock()
+
+
 def get_llm(model_name=None):
-    """Get LLM instance.
-    
+    """Get the shared LLM instance for a model, creating it on first use.
+
     Args:
         model_name: Name of the model to use (defaults to config.model_name)
     """
     if model_name is None:
         model_name = get_config().model_name
-    return ChatGoogleGenerativeAI(model=model_name)
+    with _llms_lock:
+        if model_name not in _llms:
+            _llms[model_name] = ChatGoogleGenerativeAI(model=model_name)
+        return _llms[model_name]
 
 
 # ---------------------
@@ -74,49 +105,367 @@ def get_llm(model_name=None):
 # ---------------------
 
 
-def generate_response(llm, context, query, session_id: str):
-    context_text = "\n".join([doc.page_content for doc in context])
+@lru_cache(maxsize=2)
+def _build_prompt(mode: str = "instructions"):
+    """Build the chat prompt with the output format instructions filled in.
 
-    # Build prompt from string template
+    In ``native`` mode the model enforces the `QueryResponse` schema itself, so
+    the prompt carries a one-line description instead of the parser's
+    JSON-schema dump. Prompts are immutable, so each is built once and shared.
+    """
     chat_prompt_template = ChatPromptTemplate.from_template(prompt_template)
+    if mode == "native":
+        return chat_prompt_template.partial(format_instructions=native_format_instructions)
+    return chat_prompt_template.partial(
+        format_instructions=parser.get_format_instructions()
+    )
+
+
+def _bind_output(llm, mode: str):
+    """`llm`, constrained to JSON matching `QueryResponse` in ``native`` mode."""
+    if mode != "native":
+        return llm
+    return llm.bind(
+        response_mime_type="application/json",
+        response_json_schema=QueryResponse.model_json_schema(),
+    )
+
+
+_chains = {}
+
+_output_stats_lock = threading.Lock()
+_output_stats = {
+    mode: {"responses": 0, "parse_failures": 0, "prompt_tokens": 0, "completion_tokens": 0}
+    for mode in ("instructions", "native")
+}
+
+
+def _record_output(mode: str, prompt_tokens: int, completion_tokens: int, parsed: bool) -> None:
+    with _output_stats_lock:
+        stats = _output_stats[mode]
+        stats["responses"] += 1
+        stats["parse_failures"] += int(not parsed)
+        stats["prompt_tokens"] += prompt_tokens
+        stats["completion_tokens"] += completion_tokens
+
+
+def get_structured_output_stats() -> dict:
+    """Per output mode: RAG responses, parse failure rate and average prompt and completion tokens."""
+    with _output_stats_lock:
+        modes = {
+            mode: {
+                "responses": stats["responses"],
+                "parse_failures": stats["parse_failures"],
+                "parse_failure_rate": round(stats["parse_failures"] / stats["responses"], 4)
+                if stats["responses"]
+                else 0.0,
+                "avg_prompt_tokens": round(stats["prompt_tokens"] / stats["responses"], 1)
+                if stats["responses"]
+                else None,
+                "avg_completion_tokens": round(stats["completion_tokens"] / stats["responses"], 1)
+                if stats["responses"]
+                else None,
+            }
+            for mode, stats in _output_stats.items()
+        }
+    return {"mode": get_config().structured_output_mode, **modes}
+
+
+@lru_cache(maxsize=1)
+def _build_smalltalk_prompt():
+    return ChatPromptTemplate.from_template(smalltalk_prompt_template)
+
+
+# Sessions without history asking the same question at once share one answer
+_llm_flight = SingleFlight("llm")
+
+
+def _compiled(llm):
+    """(mode, prompt, bound model, prompt | model | parser) for `llm`, compiled once.
+
+    Compiled per LLM and per config.structured_output_mode.
+    """
+    mode = get_config().structured_output_mode
+    key = (id(llm), mode)
+    if key not in _chains:
+        prompt, model = _build_prompt(mode), _bind_output(llm, mode)
+        # Keep a reference to the LLM so its id cannot be reused by another object
+        _chains[key] = (llm, mode, prompt, model, prompt | model | parser)
+    return _chains[key][1:]
+
+
+def get_chain(llm):
+    """Return the prompt | llm | parser chain for `llm`, compiling it once per LLM."""
+    return _compiled(llm)[3]
+
+
+def _parse(mode: str, prompt_value, message, text=None) -> QueryResponse:
+    """Parse a RAG response, recording its token counts and whether parsing failed."""
+    tokens = record_llm_usage("rag", prompt_value, message)
+    with stage("parse"):
+        try:
+            response = parser.parse(text) if text is not None else parser.invoke(message)
+        except OutputParserException:
+            _record_output(mode, *tokens, parsed=False)
+            raise
+    _record_output(mode, *tokens, parsed=True)
+    record_response(response.diagram_suggested)
+    return response
+
+
+def _invoke_rag(llm, inputs: dict) -> QueryResponse:
+    """Run the RAG prompt through `llm` and parse it, timing the call and the parse."""
+    mode, prompt, model, _ = _compiled(llm)
+    prompt_value = prompt.invoke(inputs)
+    with stage("llm"):
+        message = model.invoke(prompt_value)
+    return _parse(mode, prompt_value, message)
+
+
+async def _ainvoke_rag(llm, inputs: dict) -> QueryResponse:
+    """Async variant of `_invoke_rag`."""
+    mode, prompt, model, _ = _compiled(llm)
+    prompt_value = await prompt.ainvoke(inputs)
+    with stage("llm"):
+        message = await model.ainvoke(prompt_value)
+    return _parse(mode, prompt_value, message)
+
+
+def _chunk_text(chunk) -> str:
+    """Extract plain text from a streamed message chunk."""
+    content = chunk.content
+    if isinstance(content, str):
+        return content
+    return "".join(
+        part.get("text", "") if isinstance(part, dict) else str(part)
+        for part in content
+    )
+
+
+def _turn_messages(query: str, response: QueryResponse):
+    """The user and AI messages a turn adds to history."""
+    return [
+        HumanMessage(content=query),
+        AIMessage(
+            content=response.answer,
+            additional_kwargs={"diagram_suggested": response.diagram_suggested},
+        ),
+    ]
+
+
+def _result(response: QueryResponse, message_ids) -> dict:
+    """Response dict for the API, with the stored AI message's id for follow-up requests."""
+    # Histories other than the SQLite store do not report ids
+    return {**response.dict(), "message_id": message_ids[-1] if message_ids else None}
+
+
+def generate_response(llm, context, query, session_id: str):
+    context_text = build_context_text(context)
 
     # Load existing chat history
     history = get_session_history(session_id)
 
     # Convert history into plain text
-    chat_history_str = "\n".join(
-        f"{msg.type.capitalize()}: {msg.content}" for msg in history.messages
+    with stage("history_load"):
+        chat_history_str = format_chat_history(history.messages)
+
+    # Run LLM
+    response: QueryResponse = _invoke_rag(
+        llm,
+        {
+            "context_text": context_text,
+            "query": query,
+            "chat_history": chat_history_str,
+        },
     )
 
-    # Build chain
-    chain = (
-        chat_prompt_template.partial(
-            format_instructions=parser.get_format_instructions()
-        )
-        | llm
-        | parser
+    # Update history manually
+    with stage("history_write"):
+        message_ids = history.add_messages(_turn_messages(query, response))
+
+    return _result(response, message_ids)
+
+
+async def agenerate_response(llm, context, query, session_id: str, history_messages=None):
+    """Async counterpart of `generate_response`.
+
+    When the session has no history the answer depends only on the query and
+    its context, so concurrent identical questions share one LLM call (see
+    `SingleFlight`); each session still records the turn in its own history.
+
+    Args:
+        llm: Chat model to invoke
+        context: Retrieved documents
+        query: The user query
+        session_id: Chat session identifier
+        history_messages: Already-loaded history; fetched here when omitted so
+            callers can load it concurrently with retrieval
+    """
+    context_text = build_context_text(context)
+
+    history = get_async_session_history(session_id)
+    if history_messages is None:
+        with stage("history_load"):
+            history_messages = await history.aget_messages()
+
+    inputs = {
+        "context_text": context_text,
+        "query": query,
+        "chat_history": format_chat_history(history_messages),
+    }
+    if history_messages:
+        response: QueryResponse = await _ainvoke_rag(llm, inputs)
+    else:
+        key = (id(llm), normalize_query(query), context_text)
+        response = await _llm_flight.do(key, lambda: _ainvoke_rag(llm, inputs))
+
+    with stage("history_write"):
+        message_ids = await history.aadd_messages(_turn_messages(query, response))
+
+    return _result(response, message_ids)
+
+
+_SMALLTALK_DESCRIPTIONS = {
+    "greeting": "a greeting",
+    "goodbye": "a goodbye",
+    "chitchat": "small talk",
+}
+
+
+async def asmalltalk_response(llm, category: str, query: str, session_id: str):
+    """Answer a greeting, goodbye or small-talk turn without retrieval.
+
+    Uses a prompt of a few dozen tokens instead of the full RAG prompt and
+    returns the same `QueryResponse` shape, with `context_used` False.
+
+    Args:
+        llm: Chat model to invoke
+        category: Category picked by the intent router
+        query: The user query
+        session_id: Chat session identifier
+    """
+    prompt_value = await _build_smalltalk_prompt().ainvoke(
+        {"category": _SMALLTALK_DESCRIPTIONS[category], "query": query}
+    )
+    with stage("llm"):
+        message = await llm.ainvoke(prompt_value)
+    record_llm_usage("smalltalk", prompt_value, message)
+    answer = StrOutputParser().invoke(message)
+    response = QueryResponse(
+        category=category, answer=answer.strip(), diagram_suggested=False, context_used=False
     )
 
-    # Run LLM
-    response: QueryResponse = chain.invoke(
+    with stage("history_write"):
+        message_ids = await get_async_session_history(session_id).aadd_messages(
+            _turn_messages(query, response)
+        )
+
+    return _result(response, message_ids)
+
+
+async def astream_response(llm, context, query, session_id: str, history_messages=None):
+    """Stream a response as events while the LLM is still generating.
+
+    Yields ``(event, data)`` tuples: ``("token", {"text": ...})`` for each new
+    piece of the answer, ``("field", {name: value})`` as soon as another
+    top-level field of `QueryResponse` is complete, and finally
+    ``("result", QueryResponse dict)`` with the stored AI message's
+    ``message_id`` once the full output has been validated and saved to history.
+
+    Args:
+        llm: Chat model to stream from
+        context: Retrieved documents
+        query: The user query
+        session_id: Chat session identifier
+        history_messages: Already-loaded history; fetched here when omitted
+    """
+    context_text = build_context_text(context)
+
+    history = get_async_session_history(session_id)
+    if history_messages is None:
+        with stage("history_load"):
+            history_messages = await history.aget_messages()
+
+    mode, prompt, model, _ = _compiled(llm)
+    prompt_value = await prompt.ainvoke(
         {
             "context_text": context_text,
             "query": query,
-            "chat_history": chat_history_str,
+            "chat_history": format_chat_history(history_messages),
         }
     )
+    field_parser = IncrementalJSONFieldParser(field="answer")
+    emitted_fields = set()
+    raw_chunks = []
+    message = None
+    started = time.perf_counter()
+
+    async for chunk in model.astream(prompt_value):
+        if message is None:
+            record_stage("llm_first_token", time.perf_counter() - started)
+        # Chunks add up to the full message, including the provider's usage metadata
+        message = chunk if message is None else message + chunk
+        text = _chunk_text(chunk)
+        if not text:
+            continue
+        raw_chunks.append(text)
+        delta = field_parser.feed(text)
+        if delta:
+            yield "token", {"text": delta}
+        for name, value in field_parser.fields.items():
+            if name != "answer" and name not in emitted_fields:
+                emitted_fields.add(name)
+                yield "field", {name: value}
+
+    record_stage("llm", time.perf_counter() - started)
+
+    # Validate the complete output exactly as the non-streaming path does
+    response: QueryResponse = _parse(
+        mode, prompt_value, message or AIMessage(content=""), text="".join(raw_chunks)
+    )
 
-    # Update history manually
-    history.add_user_message(query)
-    history.add_ai_message(response.answer)
+    with stage("history_write"):
+        message_ids = await history.aadd_messages(_turn_messages(query, response))
 
-    return response.dict()
+    yield "result", _result(response, message_ids)
 
 
 def get_chat_history_messages(session_id: str):
-    """Retrieve raw messages for a session."""
-    history = get_session_history(session_id)
-    return history.messages
+    """Retrieve every message of a session."""
+    return get_history_store().get_messages(session_id)
+
+
+async def aget_chat_history_messages(session_id: str):
+    """Retrieve every message of a session without blocking the event loop."""
+    return await get_history_store().aget_messages(session_id)
+
+
+async def aget_last_reply(session_id: str) -> Optional[str]:
+    """Text of the session's latest message if the assistant sent it, else None."""
+    rows = await get_history_store().aget_page(session_id, None, 1)
+    if rows and rows[0][1].type == "ai":
+        return rows[0][1].content
+    return None
+
+
+async def aget_chat_history_page(session_id: str, before: Optional[int] = None, limit: Optional[int] = None):
+    """One page of a session's messages, newest first, and the cursor of the next page.
+
+    Args:
+        session_id: Chat session identifier
+        before: Only return messages older than this message id (the previous
+            page's cursor); the newest messages when omitted
+        limit: Messages per page (defaults to config.history_page_size)
+
+    Returns:
+        ``([(message id, message), ...], next cursor or None on the last page)``
+    """
+    if limit is None:
+        limit = get_config().history_page_size
+    # One extra row tells whether an older page exists
+    rows = await get_history_store().aget_page(session_id, before, limit + 1)
+    page = rows[:limit]
+    return page, (page[-1][0] if len(rows) > limit else None)
 
 
 # ---------------------
@@ -137,3 +486,4 @@ if __name__ == "__main__":
     print(f"Category: {response['category']}")
     print(f"Answer: {response['answer']}")
     print(f"Context Used: {response['context_used']}")
+    print(f"Diagram Suggested: {response['diagram_suggested']}")
@@ -0,0 +1,71 @@
+import asyncio
+import re
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from .config import get_config
+
+# Stages whose upstream calls can be shared between identical in-flight requests
+STAGES = ("embedding", "retrieval", "llm", "diagram")
+
+_stats_lock = threading.Lock()
+_stats = {name: {"upstream_calls": 0, "coalesced": 0} for name in STAGES}
+
+
+def normalize_query(query: str) -> str:
+    """Coalescing key for a query: case, spacing and trailing punctuation ignored."""
+    return re.sub(r"\s+", " ", query.lower()).strip().rstrip("?!. ")
+
+
+def _count(stage: str, key: str) -> None:
+    with _stats_lock:
+        _stats[stage][key] += 1
+
+
+class SingleFlight:
+    """Share one upstream call between concurrent callers asking for the same key.
+
+    The first caller for a key starts the call as a task; callers arriving
+    while it runs await the same task instead of starting their own. The task
+    is shielded, so a caller that disconnects does not cancel the call for the
+    others, and an exception reaches every waiting caller. Nothing is cached:
+    the key is forgotten as soon as the call finishes.
+
+    Args:
+        stage: Name the calls are counted under (see `get_coalescing_stats`)
+    """
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+
+    async def do(self, key: Hashable, call: Callable[[], Awaitable[Any]]) -> Any:
+        if not get_config().coalescing_enabled:
+            return await call()
+        task = self._inflight.get(key)
+        if task is None:
+            _count(self.stage, "upstream_calls")
+            task = asyncio.ensure_future(call())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            _count(self.stage, "coalesced")
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the exception as retrieved in case every waiter went away
+        if not task.cancelled():
+            task.exception()
+
+
+def get_coalescing_stats() -> dict:
+    """Upstream calls made and saved per stage by coalescing in this worker."""
+    with _stats_lock:
+        stages = {name: dict(counts) for name, counts in _stats.items()}
+    return {
+        "enabled": get_config().coalescing_enabled,
+        **stages,
+        "upstream_calls_saved": sum(counts["coalesced"] for counts in stages.values()),
+    }
@@ -18,6 +18,14 @@ logger = logging.getLogger(__name__)
 # Load environment variables from a .env if present
 load_dotenv()
 
+# Accepted values of the enumerated settings, checked at load and by the setters
+STRUCTURED_OUTPUT_MODES = ("instructions", "native")
+VECTOR_BACKENDS = ("qdrant", "numpy")
+NUMPY_VECTOR_DTYPES = ("float32", "float16")
+QDRANT_QUANTIZATIONS = ("none", "scalar", "binary")
+RETRIEVAL_MODES = ("dense", "hybrid", "hybrid_fast")
+HISTORY_MEMORY_MODES = ("window", "summary")
+
 
 class Config:
     """
@@ -29,9 +37,22 @@ class Config:
         # LLM / Model
         self.model_name = os.getenv("MODEL_NAME", "gemini-2.0-flash")
         self.google_api_key = os.getenv("GOOGLE_API_KEY", "")
+        # "instructions" (JSON schema described in the prompt) or "native" (Gemini's
+        # JSON mode enforces the schema, the prompt only names the fields)
+        self.structured_output_mode = self._choice(
+            os.getenv("STRUCTURED_OUTPUT_MODE", "instructions"), STRUCTURED_OUTPUT_MODES, "STRUCTURED_OUTPUT_MODE"
+        )
         self.ocr_model_name = os.getenv("OCR_MODEL_NAME", "Llama-4-Maverick-17B-128E-Instruct")
         self.azure_vision_endpoint = os.getenv("AZURE_VISION_ENDPOINT")
         self.azure_vision_key = os.getenv("AZURE_VISION_KEY")
+        self.ocr_max_workers = int(os.getenv("OCR_MAX_WORKERS", "4"))
+        self.ocr_max_retries = int(os.getenv("OCR_MAX_RETRIES", "5"))
+        self.ocr_backoff_seconds = float(os.getenv("OCR_BACKOFF_SECONDS", "1.0"))
+        self.ocr_cache_enabled = self._parse_bool(os.getenv("OCR_CACHE_ENABLED", "true"))
+        self.ocr_cache_path = Path(os.getenv("OCR_CACHE_PATH", "data/vector_store/ocr_cache.db"))
+        self.ocr_visual_features = self._visual_features(
+            self._parse_list(os.getenv("OCR_VISUAL_FEATURES", "read")), "OCR_VISUAL_FEATURES"
+        )
 
         # Qdrant connection
         self.qdrant_host = os.getenv("QDRANT_HOST", "localhost")
@@ -40,6 +61,31 @@ class Config:
         self.qdrant_chat_history_collection = os.getenv("QDRANT_CHAT_HISTORY_COLLECTION", "chatbot_chat_history")
         self.qdrant_url = os.getenv('QDRANT_URL')
 
+        # Vector backend: "qdrant", or "numpy" for an embedded memory-mapped index
+        # (brute-force search, suited to collections of a few thousand chunks)
+        self.vector_backend = self._choice(os.getenv("VECTOR_BACKEND", "qdrant"), VECTOR_BACKENDS, "VECTOR_BACKEND")
+        self.numpy_vector_dtype = self._choice(
+            os.getenv("NUMPY_VECTOR_DTYPE", "float32"), NUMPY_VECTOR_DTYPES, "NUMPY_VECTOR_DTYPE"
+        )
+
+        # Qdrant collection schema (applied by ensure_collection) and search parameters
+        self.qdrant_hnsw_m = self._positive(int(os.getenv("QDRANT_HNSW_M", "16")), "QDRANT_HNSW_M")
+        self.qdrant_hnsw_ef_construct = self._positive(
+            int(os.getenv("QDRANT_HNSW_EF_CONSTRUCT", "100")), "QDRANT_HNSW_EF_CONSTRUCT"
+        )
+        self.qdrant_hnsw_ef = self._positive(int(os.getenv("QDRANT_HNSW_EF", "128")), "QDRANT_HNSW_EF")
+        # "none", "scalar" (int8, 4x smaller) or "binary" (1 bit per dimension, 32x smaller)
+        self.qdrant_quantization = self._choice(
+            os.getenv("QDRANT_QUANTIZATION", "none"), QDRANT_QUANTIZATIONS, "QDRANT_QUANTIZATION"
+        )
+        self.qdrant_quantization_rescore = self._parse_bool(os.getenv("QDRANT_QUANTIZATION_RESCORE", "true"))
+        self.qdrant_quantization_oversampling = self._oversampling(
+            float(os.getenv("QDRANT_QUANTIZATION_OVERSAMPLING", "2.0")), "QDRANT_QUANTIZATION_OVERSAMPLING"
+        )
+        self.qdrant_on_disk = self._parse_bool(os.getenv("QDRANT_ON_DISK", "false"))
+        # Existing collections whose schema differs are only updated (and re-indexed) when set
+        self.qdrant_schema_migrate = self._parse_bool(os.getenv("QDRANT_SCHEMA_MIGRATE", "false"))
+
         # SambaNova embeddings configuration
         self.sambanova_api_key = os.getenv("SAMBANOVA_API_KEY", "")
         self.sambanova_embeddings_model = os.getenv("SAMBANOVA_EMBEDDINGS_MODEL", "SambaNova-Text-Embedding-3-small")
@@ -47,9 +93,31 @@ class Config:
         # Embeddings (legacy - kept for backward compatibility)
         self.embedding_model = os.getenv("EMBEDDING_MODEL", self.sambanova_embeddings_model)
 
+        # Embedding cache (in-process LRU + SQLite file)
+        self.embedding_cache_enabled = self._parse_bool(os.getenv("EMBEDDING_CACHE_ENABLED", "true"))
+        self.embedding_cache_path = Path(os.getenv("EMBEDDING_CACHE_PATH", "data/vector_store/embedding_cache.db"))
+        self.embedding_cache_memory_items = int(os.getenv("EMBEDDING_CACHE_MEMORY_ITEMS", "4096"))
+        self.embedding_cache_max_mb = int(os.getenv("EMBEDDING_CACHE_MAX_MB", "512"))
+
+        # Embedding request batching (ingestion)
+        self.embed_batch_max_tokens = int(os.getenv("EMBED_BATCH_MAX_TOKENS", "32000"))
+        self.embed_batch_max_items = int(os.getenv("EMBED_BATCH_MAX_ITEMS", "2048"))
+        self.embed_max_concurrency = int(os.getenv("EMBED_MAX_CONCURRENCY", "4"))
+        self.embed_max_retries = int(os.getenv("EMBED_MAX_RETRIES", "6"))
+        self.embed_backoff_seconds = float(os.getenv("EMBED_BACKOFF_SECONDS", "1.0"))
+
+        # Query embedding micro-batching (serving): concurrent queries share one request
+        self.query_batch_enabled = self._parse_bool(os.getenv("QUERY_BATCH_ENABLED", "true"))
+        self.query_batch_max_size = int(os.getenv("QUERY_BATCH_MAX_SIZE", "16"))
+        self.query_batch_wait_ms = float(os.getenv("QUERY_BATCH_WAIT_MS", "5"))
+
         # Knowledge base paths
         self.kb_path = Path(os.getenv("KB_PATH", "data/knowledge_base"))
         self.image_output_dir = Path(os.getenv("IMAGE_OUTPUT_DIR", "output"))
+        self.ingest_manifest_dir = Path(os.getenv("INGEST_MANIFEST_DIR", "data/vector_store"))
+        self.loader_max_workers = int(os.getenv("LOADER_MAX_WORKERS", str(os.cpu_count() or 1)))
+        self.ingest_batch_size = int(os.getenv("INGEST_BATCH_SIZE", "512"))
+        self.ingest_queue_size = int(os.getenv("INGEST_QUEUE_SIZE", "8"))
 
         # CORS
         self.cors_allow_origins = self._parse_list(os.getenv("CORS_ALLOW_ORIGINS", "*"))
@@ -65,9 +133,49 @@ class Config:
         # Retrieval and chunking
         self.retriever_top_k = int(os.getenv("RETRIEVER_TOP_K", "10"))
         self.retriever_score_threshold = self._parse_optional_float(os.getenv("RETRIEVER_SCORE_THRESHOLD"))
+        # "dense", "hybrid" (dense + BM25 fused by reciprocal rank) or "hybrid_fast"
+        # (hybrid, but a confident BM25 match is returned without embedding the query)
+        self.retrieval_mode = self._choice(os.getenv("RETRIEVAL_MODE", "hybrid"), RETRIEVAL_MODES, "RETRIEVAL_MODE")
+        self.rrf_k = int(os.getenv("RRF_K", "60"))
+        self.lexical_confidence_margin = float(os.getenv("LEXICAL_CONFIDENCE_MARGIN", "1.5"))
+        # BM25 hits scoring below this are discarded before fusion and the fast path
+        self.lexical_min_score = self._parse_optional_float(os.getenv("LEXICAL_MIN_SCORE"))
         self.chunk_size = int(os.getenv("CHUNK_SIZE", "800"))
         self.chunk_overlap = int(os.getenv("CHUNK_OVERLAP", "150"))
         self.return_context = self._parse_bool(os.getenv("RETURN_CONTEXT", "true"))
+        self.context_max_tokens = int(os.getenv("CONTEXT_MAX_TOKENS", "3000"))
+        self.context_dedup_threshold = float(os.getenv("CONTEXT_DEDUP_THRESHOLD", "0.9"))
+
+        # Intent routing: answer greetings/small talk without retrieval
+        self.intent_router_enabled = self._parse_bool(os.getenv("INTENT_ROUTER_ENABLED", "true"))
+        self.intent_centroid_threshold = float(os.getenv("INTENT_CENTROID_THRESHOLD", "0.85"))
+        self.intent_centroid_margin = float(os.getenv("INTENT_CENTROID_MARGIN", "0.05"))
+
+        # Admission control for chat turns: LLM concurrency, per-worker queue and queue deadline
+        self.admission_enabled = self._parse_bool(os.getenv("ADMISSION_ENABLED", "true"))
+        self.llm_max_concurrency = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+        self.admission_max_queue = int(os.getenv("ADMISSION_MAX_QUEUE", "64"))
+        self.admission_queue_timeout_seconds = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_SECONDS", "10"))
+
+        # Share query embedding, retrieval and (history-free) LLM calls between identical in-flight queries
+        self.coalescing_enabled = self._parse_bool(os.getenv("COALESCING_ENABLED", "true"))
+
+        # Chat history window sent to the LLM
+        self.history_max_messages = int(os.getenv("HISTORY_MAX_MESSAGES", "20"))
+        self.history_max_tokens = int(os.getenv("HISTORY_MAX_TOKENS", "2000"))
+        # "window" keeps only recent turns; "summary" also keeps a rolling summary of older ones
+        self.history_memory_mode = self._choice(
+            os.getenv("HISTORY_MEMORY_MODE", "window"), HISTORY_MEMORY_MODES, "HISTORY_MEMORY_MODE"
+        )
+        self.history_summary_max_tokens = self._positive(
+            int(os.getenv("HISTORY_SUMMARY_MAX_TOKENS", "400")), "HISTORY_SUMMARY_MAX_TOKENS"
+        )
+        # Messages per page of GET /chat_history when the client does not ask for a size
+        self.history_page_size = self._positive(int(os.getenv("HISTORY_PAGE_SIZE", "50")), "HISTORY_PAGE_SIZE")
+
+        # Observability: Prometheus /metrics and an optional per-request Server-Timing header
+        self.metrics_enabled = self._parse_bool(os.getenv("METRICS_ENABLED", "true"))
+        self.timing_header_enabled = self._parse_bool(os.getenv("TIMING_HEADER_ENABLED", "false"))
 
         # FastAPI server
         self.fastapi_host = os.getenv("FASTAPI_HOST", "0.0.0.0")
@@ -91,11 +199,44 @@ class Config:
         """Parse optional string to float."""
         return float(value) if value else None
 
+    @staticmethod
+    def _choice(value: str, choices: tuple, setting: str) -> str:
+        """Return `value` if it is one of `choices`, else raise a ValueError naming `setting`."""
+        if value not in choices:
+            raise ValueError(f"Unknown {setting}: {value!r} (expected one of {', '.join(choices)})")
+        return value
+
+    @staticmethod
+    def _positive(value: int, setting: str) -> int:
+        """Return `value` if it is at least 1, else raise a ValueError naming `setting`."""
+        if value < 1:
+            raise ValueError(f"{setting} must be positive: {value}")
+        return value
+
+    @staticmethod
+    def _oversampling(value: float, setting: str) -> float:
+        """Return `value` if it is at least 1.0 (no oversampling), else raise a ValueError."""
+        if value < 1.0:
+            raise ValueError(f"{setting} must be at least 1.0: {value}")
+        return value
+
+    @staticmethod
+    def _visual_features(features: list[str], setting: str) -> list[str]:
+        """Normalize OCR feature names; "read" is required since only its text is used."""
+        features = [feature.strip().lower() for feature in features if feature.strip()]
+        if "read" not in features:
+            raise ValueError(f"{setting} must include 'read': {features}")
+        return features
+
     # Setter methods for easy configuration changes
     def set_model(self, model_name: str) -> None:
         """Set the LLM model name."""
         self.model_name = model_name
 
+    def set_structured_output(self, mode: str) -> None:
+        """Set how the RAG answer's JSON shape is requested ("instructions" or "native")."""
+        self.structured_output_mode = self._choice(mode, STRUCTURED_OUTPUT_MODES, "structured output mode")
+
     def set_google_api_key(self, api_key: str) -> None:
         """Set the Google API key."""
         self.google_api_key = api_key
@@ -109,6 +250,28 @@ class Config:
         self.azure_vision_endpoint = endpoint
         self.azure_vision_key = key
 
+    def set_ocr_concurrency(
+        self, max_workers: int = None, max_retries: int = None, backoff_seconds: float = None
+    ) -> None:
+        """Set OCR parallelism and retry/backoff parameters."""
+        if max_workers is not None:
+            self.ocr_max_workers = max_workers
+        if max_retries is not None:
+            self.ocr_max_retries = max_retries
+        if backoff_seconds is not None:
+            self.ocr_backoff_seconds = backoff_seconds
+
+    def set_ocr_cache(self, enabled: bool = None, path: str = None) -> None:
+        """Set OCR result cache parameters."""
+        if enabled is not None:
+            self.ocr_cache_enabled = enabled
+        if path is not None:
+            self.ocr_cache_path = Path(path)
+
+    def set_ocr_visual_features(self, features: list[str]) -> None:
+        """Set the Azure Vision features requested per image (must include "read")."""
+        self.ocr_visual_features = self._visual_features(features, "OCR visual features")
+
     def set_qdrant_connection(self, host: str = "localhost", port: int = 6333, url: Optional[str] = None) -> None:
         """Set Qdrant connection parameters."""
         self.qdrant_host = host
@@ -116,6 +279,45 @@ class Config:
         if url:
             self.qdrant_url = url
 
+    def set_vector_backend(self, backend: str = None, dtype: str = None) -> None:
+        """Set the vector backend ("qdrant" or "numpy") and the numpy index dtype."""
+        if backend is not None:
+            self.vector_backend = self._choice(backend, VECTOR_BACKENDS, "vector backend")
+        if dtype is not None:
+            self.numpy_vector_dtype = self._choice(dtype, NUMPY_VECTOR_DTYPES, "numpy vector dtype")
+
+    def set_qdrant_schema(
+        self,
+        hnsw_m: int = None,
+        hnsw_ef_construct: int = None,
+        hnsw_ef: int = None,
+        quantization: str = None,
+        rescore: bool = None,
+        oversampling: float = None,
+        on_disk: bool = None,
+        migrate: bool = None,
+    ) -> None:
+        """Set the HNSW, quantization and storage settings of the Qdrant collection.
+
+        `migrate` lets ingestion apply changed settings to an existing collection.
+        """
+        if hnsw_m is not None:
+            self.qdrant_hnsw_m = self._positive(hnsw_m, "HNSW m")
+        if hnsw_ef_construct is not None:
+            self.qdrant_hnsw_ef_construct = self._positive(hnsw_ef_construct, "HNSW ef_construct")
+        if hnsw_ef is not None:
+            self.qdrant_hnsw_ef = self._positive(hnsw_ef, "HNSW ef")
+        if quantization is not None:
+            self.qdrant_quantization = self._choice(quantization, QDRANT_QUANTIZATIONS, "quantization")
+        if rescore is not None:
+            self.qdrant_quantization_rescore = rescore
+        if oversampling is not None:
+            self.qdrant_quantization_oversampling = self._oversampling(oversampling, "Quantization oversampling")
+        if on_disk is not None:
+            self.qdrant_on_disk = on_disk
+        if migrate is not None:
+            self.qdrant_schema_migrate = migrate
+
     def set_qdrant_collections(self, collection: str, chat_history_collection: str) -> None:
         """Set Qdrant collection names."""
         self.qdrant_collection = collection
@@ -125,10 +327,69 @@ class Config:
         """Set the embedding model name."""
         self.embedding_model = model_name
 
-    def set_paths(self, kb_path: str, image_output_dir: str) -> None:
-        """Set knowledge base and image output paths."""
+    def set_embedding_cache(
+        self,
+        enabled: bool = None,
+        path: str = None,
+        memory_items: int = None,
+        max_mb: int = None,
+    ) -> None:
+        """Set embedding cache parameters."""
+        if enabled is not None:
+            self.embedding_cache_enabled = enabled
+        if path is not None:
+            self.embedding_cache_path = Path(path)
+        if memory_items is not None:
+            self.embedding_cache_memory_items = memory_items
+        if max_mb is not None:
+            self.embedding_cache_max_mb = max_mb
+
+    def set_embedding_batching(
+        self,
+        max_batch_tokens: int = None,
+        max_batch_items: int = None,
+        max_concurrency: int = None,
+        max_retries: int = None,
+        backoff_seconds: float = None,
+    ) -> None:
+        """Set embedding request packing, concurrency and retry/backoff parameters."""
+        if max_batch_tokens is not None:
+            self.embed_batch_max_tokens = max_batch_tokens
+        if max_batch_items is not None:
+            self.embed_batch_max_items = max_batch_items
+        if max_concurrency is not None:
+            self.embed_max_concurrency = max_concurrency
+        if max_retries is not None:
+            self.embed_max_retries = max_retries
+        if backoff_seconds is not None:
+            self.embed_backoff_seconds = backoff_seconds
+
+    def set_query_batching(self, enabled: bool = None, max_size: int = None, wait_ms: float = None) -> None:
+        """Set micro-batching of concurrent query embeddings (batch size and wait window)."""
+        if enabled is not None:
+            self.query_batch_enabled = enabled
+        if max_size is not None:
+            self.query_batch_max_size = max_size
+        if wait_ms is not None:
+            self.query_batch_wait_ms = wait_ms
+
+    def set_paths(self, kb_path: str, image_output_dir: str, ingest_manifest_dir: str = None) -> None:
+        """Set knowledge base, image output and ingest manifest paths."""
         self.kb_path = Path(kb_path)
         self.image_output_dir = Path(image_output_dir)
+        if ingest_manifest_dir is not None:
+            self.ingest_manifest_dir = Path(ingest_manifest_dir)
+
+    def set_loader_workers(self, max_workers: int) -> None:
+        """Set the number of processes used to parse knowledge base files."""
+        self.loader_max_workers = max_workers
+
+    def set_ingest_pipeline(self, batch_size: int = None, queue_size: int = None) -> None:
+        """Set ingestion batch size (chunks per embed/upsert) and stage queue capacity."""
+        if batch_size is not None:
+            self.ingest_batch_size = batch_size
+        if queue_size is not None:
+            self.ingest_queue_size = queue_size
 
     def set_cors(self, origins: list[str], methods: list[str], headers: list[str], credentials: bool) -> None:
         """Set CORS configuration."""
@@ -152,6 +413,23 @@ class Config:
         if score_threshold is not None:
             self.retriever_score_threshold = score_threshold
 
+    def set_retrieval_mode(
+        self,
+        mode: str = None,
+        rrf_k: int = None,
+        lexical_confidence_margin: float = None,
+        lexical_min_score: Optional[float] = None,
+    ) -> None:
+        """Set dense/hybrid retrieval and the lexical fast-path parameters."""
+        if mode is not None:
+            self.retrieval_mode = self._choice(mode, RETRIEVAL_MODES, "retrieval mode")
+        if rrf_k is not None:
+            self.rrf_k = rrf_k
+        if lexical_confidence_margin is not None:
+            self.lexical_confidence_margin = lexical_confidence_margin
+        if lexical_min_score is not None:
+            self.lexical_min_score = lexical_min_score
+
     def set_chunking(self, chunk_size: int = None, chunk_overlap: int = None, return_context: bool = None) -> None:
         """Set chunking parameters."""
         if chunk_size is not None:
@@ -161,6 +439,75 @@ class Config:
         if return_context is not None:
             self.return_context = return_context
 
+    def set_context_packing(self, max_tokens: int = None, dedup_threshold: float = None) -> None:
+        """Set the retrieved-context token budget and near-duplicate threshold."""
+        if max_tokens is not None:
+            self.context_max_tokens = max_tokens
+        if dedup_threshold is not None:
+            self.context_dedup_threshold = dedup_threshold
+
+    def set_intent_router(
+        self, enabled: bool = None, centroid_threshold: float = None, centroid_margin: float = None
+    ) -> None:
+        """Set the pre-retrieval intent router parameters."""
+        if enabled is not None:
+            self.intent_router_enabled = enabled
+        if centroid_threshold is not None:
+            self.intent_centroid_threshold = centroid_threshold
+        if centroid_margin is not None:
+            self.intent_centroid_margin = centroid_margin
+
+    def set_admission(
+        self,
+        enabled: bool = None,
+        max_concurrency: int = None,
+        max_queue: int = None,
+        queue_timeout_seconds: float = None,
+    ) -> None:
+        """Set the chat-turn concurrency limit, queue length and queue deadline.
+
+        Takes effect for the admission controller created after the change
+        (it is created on the first chat request).
+        """
+        if enabled is not None:
+            self.admission_enabled = enabled
+        if max_concurrency is not None:
+            self.llm_max_concurrency = max_concurrency
+        if max_queue is not None:
+            self.admission_max_queue = max_queue
+        if queue_timeout_seconds is not None:
+            self.admission_queue_timeout_seconds = queue_timeout_seconds
+
+    def set_coalescing(self, enabled: bool = None) -> None:
+        """Enable or disable single-flight coalescing of identical in-flight queries."""
+        if enabled is not None:
+            self.coalescing_enabled = enabled
+
+    def set_history_window(self, max_messages: int = None, max_tokens: int = None) -> None:
+        """Set how many recent messages / tokens of history go into the prompt."""
+        if max_messages is not None:
+            self.history_max_messages = max_messages
+        if max_tokens is not None:
+            self.history_max_tokens = max_tokens
+
+    def set_history_memory(self, mode: str = None, summary_max_tokens: int = None) -> None:
+        """Set the history memory mode ("window" or "summary") and summary size."""
+        if mode is not None:
+            self.history_memory_mode = self._choice(mode, HISTORY_MEMORY_MODES, "history memory mode")
+        if summary_max_tokens is not None:
+            self.history_summary_max_tokens = self._positive(summary_max_tokens, "History summary max tokens")
+
+    def set_history_page_size(self, page_size: int) -> None:
+        """Set the default number of messages per page of GET /chat_history."""
+        self.history_page_size = self._positive(page_size, "History page size")
+
+    def set_metrics(self, enabled: bool = None, timing_header: bool = None) -> None:
+        """Enable stage/latency metrics and the per-request Server-Timing header."""
+        if enabled is not None:
+            self.metrics_enabled = enabled
+        if timing_header is not None:
+            self.timing_header_enabled = timing_header
+
     def set_fastapi_server(self, host: str = "0.0.0.0", port: int = 8000) -> None:
         """Set FastAPI server configuration."""
         self.fastapi_host = host
@@ -172,18 +519,51 @@ class Config:
             "model_name": self.model_name,
             "ocr_model_name": self.ocr_model_name,
             "google_api_key": "***" if self.google_api_key else "",
+            "structured_output_mode": self.structured_output_mode,
             "azure_vision_endpoint": self.azure_vision_endpoint,
             "azure_vision_key": "***" if self.azure_vision_key else "",
+            "ocr_max_workers": self.ocr_max_workers,
+            "ocr_max_retries": self.ocr_max_retries,
+            "ocr_backoff_seconds": self.ocr_backoff_seconds,
+            "ocr_cache_enabled": self.ocr_cache_enabled,
+            "ocr_cache_path": str(self.ocr_cache_path),
+            "ocr_visual_features": self.ocr_visual_features,
             "qdrant_host": self.qdrant_host,
             "qdrant_port": self.qdrant_port,
             "qdrant_collection": self.qdrant_collection,
             "qdrant_chat_history_collection": self.qdrant_chat_history_collection,
             "qdrant_url": self.qdrant_url,
+            "vector_backend": self.vector_backend,
+            "numpy_vector_dtype": self.numpy_vector_dtype,
+            "qdrant_hnsw_m": self.qdrant_hnsw_m,
+            "qdrant_hnsw_ef_construct": self.qdrant_hnsw_ef_construct,
+            "qdrant_hnsw_ef": self.qdrant_hnsw_ef,
+            "qdrant_quantization": self.qdrant_quantization,
+            "qdrant_quantization_rescore": self.qdrant_quantization_rescore,
+            "qdrant_quantization_oversampling": self.qdrant_quantization_oversampling,
+            "qdrant_on_disk": self.qdrant_on_disk,
+            "qdrant_schema_migrate": self.qdrant_schema_migrate,
             "embedding_model": self.embedding_model,
             "sambanova_api_key": "***" if self.sambanova_api_key else "",
             "sambanova_embeddings_model": self.sambanova_embeddings_model,
+            "embedding_cache_enabled": self.embedding_cache_enabled,
+            "embedding_cache_path": str(self.embedding_cache_path),
+            "embedding_cache_memory_items": self.embedding_cache_memory_items,
+            "embedding_cache_max_mb": self.embedding_cache_max_mb,
+            "embed_batch_max_tokens": self.embed_batch_max_tokens,
+            "embed_batch_max_items": self.embed_batch_max_items,
+            "embed_max_concurrency": self.embed_max_concurrency,
+            "embed_max_retries": self.embed_max_retries,
+            "embed_backoff_seconds": self.embed_backoff_seconds,
+            "query_batch_enabled": self.query_batch_enabled,
+            "query_batch_max_size": self.query_batch_max_size,
+            "query_batch_wait_ms": self.query_batch_wait_ms,
             "kb_path": str(self.kb_path),
             "image_output_dir": str(self.image_output_dir),
+            "ingest_manifest_dir": str(self.ingest_manifest_dir),
+            "loader_max_workers": self.loader_max_workers,
+            "ingest_batch_size": self.ingest_batch_size,
+            "ingest_queue_size": self.ingest_queue_size,
             "cors_allow_origins": self.cors_allow_origins,
             "cors_allow_methods": self.cors_allow_methods,
             "cors_allow_headers": self.cors_allow_headers,
@@ -193,9 +573,30 @@ class Config:
             "openai_compat_enabled": self.openai_compat_enabled,
             "retriever_top_k": self.retriever_top_k,
             "retriever_score_threshold": self.retriever_score_threshold,
+            "retrieval_mode": self.retrieval_mode,
+            "rrf_k": self.rrf_k,
+            "lexical_confidence_margin": self.lexical_confidence_margin,
+            "lexical_min_score": self.lexical_min_score,
             "chunk_size": self.chunk_size,
             "chunk_overlap": self.chunk_overlap,
             "return_context": self.return_context,
+            "context_max_tokens": self.context_max_tokens,
+            "context_dedup_threshold": self.context_dedup_threshold,
+            "intent_router_enabled": self.intent_router_enabled,
+            "intent_centroid_threshold": self.intent_centroid_threshold,
+            "intent_centroid_margin": self.intent_centroid_margin,
+            "admission_enabled": self.admission_enabled,
+            "llm_max_concurrency": self.llm_max_concurrency,
+            "admission_max_queue": self.admission_max_queue,
+            "admission_queue_timeout_seconds": self.admission_queue_timeout_seconds,
+            "coalescing_enabled": self.coalescing_enabled,
+            "history_max_messages": self.history_max_messages,
+            "history_max_tokens": self.history_max_tokens,
+            "history_memory_mode": self.history_memory_mode,
+            "history_summary_max_tokens": self.history_summary_max_tokens,
+            "history_page_size": self.history_page_size,
+            "metrics_enabled": self.metrics_enabled,
+            "timing_header_enabled": self.timing_header_enabled,
             "fastapi_host": self.fastapi_host,
             "fastapi_port": self.fastapi_port,
         }
@@ -0,0 +1,202 @@
+import logging
+import re
+import threading
+from dataclasses import asdict, dataclass
+from typing import List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+from .config import get_config
+from .metrics import stage
+from .tokens import count_tokens, truncate_to_tokens
+
+logger = logging.getLogger(__name__)
+
+# Shortest suffix/prefix match accepted as chunk overlap when start offsets are unknown
+MIN_OVERLAP_CHARS = 20
+SHINGLE_WORDS = 5
+PASSAGE_SEPARATOR = "\n\n"
+
+
+@dataclass
+class PackingStats:
+    chunks_in: int = 0
+    passages_out: int = 0
+    duplicates_dropped: int = 0
+    chunks_merged: int = 0
+    chunks_skipped: int = 0
+    tokens_in: int = 0
+    tokens_out: int = 0
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.tokens_in - self.tokens_out
+
+
+@dataclass
+class _Passage:
+    rank: int
+    key: Tuple
+    text: str
+    metadata: dict
+    start: Optional[int]
+    end: Optional[int]
+
+
+def _location(metadata: dict) -> Tuple:
+    """The loaded document a chunk came from; start_index is relative to it."""
+    return tuple(metadata.get(name) for name in ("source", "page", "page_number", "row"))
+
+
+def _shingles(text: str) -> set:
+    words = re.findall(r"\w+", text.lower())
+    if len(words) < SHINGLE_WORDS:
+        return {tuple(words)}
+    return {tuple(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+
+
+def _text_overlap(left: str, right: str) -> int:
+    """Length of the longest suffix of `left` that is a prefix of `right`."""
+    for size in range(min(len(left), len(right)), MIN_OVERLAP_CHARS - 1, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+def _join(left: _Passage, right: _Passage) -> Optional[str]:
+    """Text of `left` followed by `right` if they are adjacent, else None."""
+    if left.start is not None and right.start is not None:
+        if not left.start <= right.start <= left.end:
+            return None
+        return left.text + right.text[left.end - right.start:]
+    overlap = _text_overlap(left.text, right.text)
+    return left.text + right.text[overlap:] if overlap else None
+
+
+def _merge_adjacent(passages: List[_Passage], stats: PackingStats) -> List[_Passage]:
+    """Merge passages from the same source document and page whose text runs on."""
+    merged = True
+    while merged:
+        merged = False
+        for i, left in enumerate(passages):
+            for j, right in enumerate(passages):
+                if i == j or left.key != right.key:
+                    continue
+                text = _join(left, right)
+                if text is None:
+                    continue
+                left.text = text
+                left.rank = min(left.rank, right.rank)
+                if left.end is not None and right.end is not None:
+                    left.end = max(left.end, right.end)
+                del passages[j]
+                stats.chunks_merged += 1
+                merged = True
+                break
+            if merged:
+                break
+    return sorted(passages, key=lambda passage: passage.rank)
+
+
+def pack_context(
+    docs: List[Document],
+    max_tokens: Optional[int] = None,
+    dedup_threshold: Optional[float] = None,
+) -> Tuple[List[Document], PackingStats]:
+    """Turn retrieved chunks into a deduplicated, token-budgeted context.
+
+    Chunks whose word shingles are almost entirely contained in a more relevant
+    chunk are dropped, chunks from the same source and page that overlap are
+    merged into one passage, and passages are added in relevance order until
+    the budget is full (a passage that does not fit is skipped so smaller ones
+    can still be used).
+
+    Args:
+        docs: Retrieved chunks, most relevant first
+        max_tokens: Token budget for the context (defaults to config.context_max_tokens)
+        dedup_threshold: Shingle containment at or above which a chunk counts as a
+            duplicate (defaults to config.context_dedup_threshold)
+    """
+    config = get_config()
+    if max_tokens is None:
+        max_tokens = config.context_max_tokens
+    if dedup_threshold is None:
+        dedup_threshold = config.context_dedup_threshold
+
+    stats = PackingStats(chunks_in=len(docs))
+    stats.tokens_in = sum(count_tokens(doc.page_content) for doc in docs)
+
+    kept: List[_Passage] = []
+    kept_shingles: List[set] = []
+    for rank, doc in enumerate(docs):
+        shingles = _shingles(doc.page_content)
+        if any(len(shingles & seen) >= dedup_threshold * len(shingles) for seen in kept_shingles):
+            stats.duplicates_dropped += 1
+            continue
+        metadata = doc.metadata or {}
+        start = metadata.get("start_index")
+        kept.append(
+            _Passage(
+                rank=rank,
+                key=_location(metadata),
+                text=doc.page_content,
+                metadata=metadata,
+                start=start,
+                end=start + len(doc.page_content) if start is not None else None,
+            )
+        )
+        kept_shingles.append(shingles)
+
+    packed: List[Document] = []
+    used = 0
+    for passage in _merge_adjacent(kept, stats):
+        tokens = count_tokens(passage.text)
+        separator = count_tokens(PASSAGE_SEPARATOR) if packed else 0
+        if used + separator + tokens > max_tokens:
+            if packed:
+                stats.chunks_skipped += 1
+                continue
+            # Never return an empty context because the best passage is too long
+            passage.text = truncate_to_tokens(passage.text, max_tokens)
+            tokens = count_tokens(passage.text)
+        packed.append(Document(page_content=passage.text, metadata=passage.metadata))
+        used += separator + tokens
+
+    stats.passages_out = len(packed)
+    stats.tokens_out = used
+    _record(stats)
+    return packed, stats
+
+
+def build_context_text(docs: List[Document]) -> str:
+    """Pack `docs` and join the passages into the prompt's context block."""
+    with stage("context_packing"):
+        packed, stats = pack_context(docs)
+    logger.info(
+        "Context packed: %d chunks -> %d passages, %d -> %d tokens (%d saved)",
+        stats.chunks_in,
+        stats.passages_out,
+        stats.tokens_in,
+        stats.tokens_out,
+        stats.tokens_saved,
+    )
+    return PASSAGE_SEPARATOR.join(doc.page_content for doc in packed)
+
+
+_totals = PackingStats()
+_requests = 0
+_totals_lock = threading.Lock()
+
+
+def _record(stats: PackingStats) -> None:
+    global _requests
+    with _totals_lock:
+        _requests += 1
+        for name, value in asdict(stats).items():
+            setattr(_totals, name, getattr(_totals, name) + value)
+
+
+def get_context_packing_stats() -> dict:
+    """Totals across requests packed by this worker, including tokens saved."""
+    with _totals_lock:
+        return {"requests": _requests, **asdict(_totals), "tokens_saved": _totals.tokens_saved}
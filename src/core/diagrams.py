@@ -0,0 +1,122 @@
+import re
+import threading
+import time
+from functools import lru_cache
+from typing import Optional
+
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+
+from .coalesce import SingleFlight
+from .context_packer import build_context_text
+from .history_store import get_history_store
+from .metrics import record_llm_usage, stage
+from .prompt import diagram_prompt_template
+from .retriver import aget_relevant_docs
+
+_FENCE = re.compile(r"^```[a-z]*\s*|\s*```$", re.IGNORECASE)
+
+_stats_lock = threading.Lock()
+_stats = {
+    "responses": 0,
+    "suggested": 0,
+    "requests": 0,
+    "cache_hits": 0,
+    "generated": 0,
+    "generation_seconds": 0.0,
+}
+
+# Opening the same diagram twice before it is stored makes one LLM call
+_diagram_flight = SingleFlight("diagram")
+
+
+def _count(key: str, amount: float = 1) -> None:
+    with _stats_lock:
+        _stats[key] += amount
+
+
+def record_response(diagram_suggested: bool) -> None:
+    """Count a RAG answer and whether it suggested a diagram."""
+    with _stats_lock:
+        _stats["responses"] += 1
+        _stats["suggested"] += int(diagram_suggested)
+
+
+def get_diagram_stats() -> dict:
+    """How often answers suggest a diagram, and diagrams generated or served from the store."""
+    with _stats_lock:
+        stats = dict(_stats)
+    generated = stats["generated"]
+    seconds = stats.pop("generation_seconds")
+    return {
+        **stats,
+        "suggestion_rate": round(stats["suggested"] / stats["responses"], 4) if stats["responses"] else 0.0,
+        "avg_generation_ms": round(1000 * seconds / generated, 1) if generated else 0.0,
+    }
+
+
+@lru_cache(maxsize=1)
+def _diagram_prompt() -> ChatPromptTemplate:
+    return ChatPromptTemplate.from_template(diagram_prompt_template)
+
+
+async def aget_cached_diagram(session_id: str, message_id: int) -> Optional[str]:
+    """The stored diagram of an answer, counting the request; None if not generated yet."""
+    _count("requests")
+    diagram = await get_history_store().aget_diagram(session_id, message_id)
+    if diagram is not None:
+        _count("cache_hits")
+    return diagram
+
+
+async def agenerate_diagram(llm, vectorstore, session_id: str, message_id: int) -> Optional[str]:
+    """Draw the Graphviz DOT diagram of one answer and store it.
+
+    The question is the message before the answer; its context is retrieved
+    again (usually from the embedding cache). Returns None when `message_id` is
+    not an AI message of the session, and an empty string when the model
+    finds nothing worth drawing. Concurrent requests for the same answer share
+    one LLM call, and the first diagram stored for an answer is the one every
+    caller gets, including a worker that drew its own in the meantime.
+
+    Args:
+        llm: Chat model to draw with
+        vectorstore: Store to retrieve the answer's context from
+        session_id: Chat session identifier
+        message_id: Row id of the AI message (``message_id`` in chat responses)
+    """
+    return await _diagram_flight.do(
+        (session_id, message_id),
+        lambda: _agenerate(llm, vectorstore, session_id, message_id),
+    )
+
+
+async def _agenerate(llm, vectorstore, session_id: str, message_id: int) -> Optional[str]:
+    store = get_history_store()
+    # Requests for the same answer queue behind each other per session; only the first draws
+    diagram = await store.aget_diagram(session_id, message_id)
+    if diagram is not None:
+        _count("cache_hits")
+        return diagram
+    turn = await store.aget_turn(session_id, message_id)
+    if turn is None or turn[1].type != "ai":
+        return None
+    question, answer = turn
+    query = question.content if question is not None and question.type == "human" else ""
+
+    started = time.perf_counter()
+    context = await aget_relevant_docs(vectorstore, query) if query else []
+    prompt_value = await _diagram_prompt().ainvoke(
+        {"context_text": build_context_text(context), "query": query, "answer": answer.content}
+    )
+    with stage("diagram"):
+        message = await llm.ainvoke(prompt_value)
+    record_llm_usage("diagram", prompt_value, message)
+    diagram = _FENCE.sub("", StrOutputParser().invoke(message).strip())
+    _count("generated")
+    _count("generation_seconds", time.perf_counter() - started)
+
+    await store.aput_diagram(session_id, message_id, diagram)
+    # Another worker may have stored its diagram first; every caller gets that one
+    stored = await store.aget_diagram(session_id, message_id)
+    return stored if stored is not None else diagram
@@ -0,0 +1,266 @@
+import asyncio
+import hashlib
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+from .config import get_config
+
+
+class EmbeddingCache:
+    """Two-tier embedding cache: an in-process LRU in front of a SQLite file.
+
+    Entries are keyed by the SHA-256 of ``namespace + text`` where the namespace
+    identifies the embedding deployment and output dimensions, so vectors from
+    different models never mix. The disk tier is trimmed back under `max_bytes`
+    by evicting the least recently used rows.
+    """
+
+    def __init__(self, path: str | Path, memory_items: int = 4096, max_bytes: int = 512 * 1024 * 1024):
+        self.path = Path(path)
+        self.memory_items = memory_items
+        self.max_bytes = max_bytes
+        self._memory: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key TEXT PRIMARY KEY,"
+            " vector BLOB NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS ix_embeddings_last_access ON embeddings (last_access)"
+        )
+        self._conn.commit()
+        self._disk_bytes = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM embeddings"
+        ).fetchone()[0]
+
+    @staticmethod
+    def make_key(namespace: str, text: str) -> str:
+        return hashlib.sha256(f"{namespace}\x00{text}".encode("utf-8")).hexdigest()
+
+    def get_many(self, keys: List[str]) -> List[Optional[List[float]]]:
+        """Look up keys, memory first and then disk; misses come back as None."""
+        results: List[Optional[List[float]]] = [None] * len(keys)
+        disk_lookup: Dict[str, List[int]] = {}
+
+        with self._lock:
+            for i, key in enumerate(keys):
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    self._counters["memory_hits"] += 1
+                    results[i] = vector
+                else:
+                    disk_lookup.setdefault(key, []).append(i)
+
+            if disk_lookup:
+                found = self._read_disk(list(disk_lookup))
+                for key, positions in disk_lookup.items():
+                    vector = found.get(key)
+                    if vector is None:
+                        self._counters["misses"] += len(positions)
+                        continue
+                    self._counters["disk_hits"] += len(positions)
+                    self._remember(key, vector)
+                    for i in positions:
+                        results[i] = vector
+
+        return results
+
+    def put_many(self, keys: List[str], vectors: List[List[float]]) -> None:
+        """Store freshly computed vectors in both tiers."""
+        now = time.time()
+        rows = {}
+        for key, vector in zip(keys, vectors):
+            blob = array("f", vector).tobytes()
+            rows[key] = (key, blob, len(blob), now)
+        rows = list(rows.values())
+
+        with self._lock:
+            for key, vector in zip(keys, vectors):
+                self._remember(key, list(vector))
+            existing = self._existing_sizes([row[0] for row in rows])
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, size, last_access) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            self._disk_bytes += sum(row[2] for row in rows) - sum(existing.values())
+            self._conn.commit()
+            if self._disk_bytes > self.max_bytes:
+                self._evict()
+
+    def stats(self) -> dict:
+        """Hit/miss counters and current tier sizes."""
+        with self._lock:
+            lookups = sum(self._counters[k] for k in ("memory_hits", "disk_hits", "misses"))
+            hits = self._counters["memory_hits"] + self._counters["disk_hits"]
+            return {
+                **self._counters,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "memory_items": len(self._memory),
+                "disk_bytes": self._disk_bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            self._conn.execute("DELETE FROM embeddings")
+            self._conn.commit()
+            self._disk_bytes = 0
+
+    def _remember(self, key: str, vector: List[float]) -> None:
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def _read_disk(self, keys: List[str]) -> Dict[str, List[float]]:
+        found: Dict[str, List[float]] = {}
+        # Stay well under SQLite's bound-parameter limit
+        for start in range(0, len(keys), 500):
+            batch = keys[start : start + 500]
+            placeholders = ",".join("?" * len(batch))
+            rows = self._conn.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+            ).fetchall()
+            for key, blob in rows:
+                found[key] = array("f", blob).tolist()
+        if found:
+            now = time.time()
+            self._conn.executemany(
+                "UPDATE embeddings SET last_access = ? WHERE key = ?",
+                [(now, key) for key in found],
+            )
+            self._conn.commit()
+        return found
+
+    def _existing_sizes(self, keys: List[str]) -> Dict[str, int]:
+        sizes: Dict[str, int] = {}
+        for start in range(0, len(keys), 500):
+            batch = keys[start : start + 500]
+            placeholders = ",".join("?" * len(batch))
+            sizes.update(
+                self._conn.execute(
+                    f"SELECT key, size FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+            )
+        return sizes
+
+    def _evict(self) -> None:
+        """Drop least recently used rows until the file is back under 90% of the cap."""
+        target = int(self.max_bytes * 0.9)
+        while self._disk_bytes > target:
+            rows = self._conn.execute(
+                "SELECT key, size FROM embeddings ORDER BY last_access ASC LIMIT 256"
+            ).fetchall()
+            if not rows:
+                self._disk_bytes = 0
+                break
+            victims = []
+            for key, size in rows:
+                if self._disk_bytes <= target:
+                    break
+                victims.append((key,))
+                self._disk_bytes -= size
+            self._conn.executemany("DELETE FROM embeddings WHERE key = ?", victims)
+            self._counters["evictions"] += len(victims)
+        self._conn.commit()
+
+
+class CachedEmbeddings(Embeddings):
+    """`Embeddings` wrapper that serves repeated texts from an `EmbeddingCache`.
+
+    Only cache misses are forwarded to the underlying model, in a single batch,
+    so ingestion and query embedding both benefit without code changes. The
+    async methods do their SQLite reads and writes in a worker thread so the
+    event loop never waits on a commit or an eviction.
+    """
+
+    def __init__(self, underlying: Embeddings, cache: EmbeddingCache, namespace: str):
+        self.underlying = underlying
+        self.cache = cache
+        self.namespace = namespace
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [EmbeddingCache.make_key(self.namespace, text) for text in texts]
+        vectors = self.cache.get_many(keys)
+        missing = self._missing(keys, vectors)
+        if missing:
+            fresh = self.underlying.embed_documents([texts[positions[0]] for positions in missing.values()])
+            self._fill(vectors, missing, fresh)
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [EmbeddingCache.make_key(self.namespace, text) for text in texts]
+        vectors = await asyncio.to_thread(self.cache.get_many, keys)
+        missing = self._missing(keys, vectors)
+        if missing:
+            fresh = await self.underlying.aembed_documents(
+                [texts[positions[0]] for positions in missing.values()]
+            )
+            await asyncio.to_thread(self.cache.put_many, list(missing), fresh)
+            self._assign(vectors, missing, fresh)
+        return vectors
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
+
+    @staticmethod
+    def _missing(keys: List[str], vectors: List[Optional[List[float]]]) -> Dict[str, List[int]]:
+        """Group cache misses by key so duplicate texts are embedded once."""
+        missing: Dict[str, List[int]] = {}
+        for i, vector in enumerate(vectors):
+            if vector is None:
+                missing.setdefault(keys[i], []).append(i)
+        return missing
+
+    def _fill(self, vectors, missing: Dict[str, List[int]], fresh) -> None:
+        self.cache.put_many(list(missing), fresh)
+        self._assign(vectors, missing, fresh)
+
+    @staticmethod
+    def _assign(vectors, missing: Dict[str, List[int]], fresh) -> None:
+        for positions, vector in zip(missing.values(), fresh):
+            for i in positions:
+                vectors[i] = vector
+
+
+_CACHE: Optional[EmbeddingCache] = None
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """Get or create the process-wide embedding cache."""
+    global _CACHE
+    if _CACHE is None:
+        config = get_config()
+        _CACHE = EmbeddingCache(
+            path=config.embedding_cache_path,
+            memory_items=config.embedding_cache_memory_items,
+            max_bytes=config.embedding_cache_max_mb * 1024 * 1024,
+        )
+    return _CACHE
+
+
+def get_embedding_cache_stats() -> dict:
+    """Counters for the shared cache, or ``{"enabled": False}`` when it is off."""
+    if not get_config().embedding_cache_enabled:
+        return {"enabled": False}
+    return {"enabled": True, **get_embedding_cache().stats()}
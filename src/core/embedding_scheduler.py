@@ -0,0 +1,186 @@
+import random
+import threading
+import time
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from typing import List, Optional, Sequence
+
+import openai
+
+from .config import get_config
+from .tokens import count_tokens
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+MAX_BACKOFF_SECONDS = 60.0
+
+
+def _retry_after_seconds(exc: Exception) -> Optional[float]:
+    """Delay requested by the service, from ``retry-after-ms`` or ``Retry-After``."""
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        value = headers.get("retry-after-ms")
+        if value is not None:
+            return float(value) / 1000
+        value = headers.get("retry-after") or headers.get("Retry-After")
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _is_retryable(exc: Exception) -> bool:
+    if isinstance(exc, (openai.APITimeoutError, openai.APIConnectionError)):
+        return True
+    return getattr(exc, "status_code", None) in RETRYABLE_STATUS_CODES
+
+
+class EmbeddingScheduler:
+    """Token-aware, concurrent batching in front of an embeddings client.
+
+    Texts are packed into batches that stay under the deployment's per-request
+    token limit, and several batches are sent at once. Concurrency adapts
+    AIMD-style: every throttled (429) or transient 5xx response halves the
+    number of batches in flight and the failed batch is retried after a backoff
+    (honouring ``retry-after-ms``/``Retry-After``); each success raises the limit
+    again up to `max_concurrency`. Only the failed batch is retried, and when the
+    underlying client is a `CachedEmbeddings`, batches that completed before a
+    hard failure are served from the cache on the next run.
+
+    Args:
+        embeddings: Object with an ``embed_documents(texts)`` method
+        max_batch_tokens: Token budget per request (defaults to config.embed_batch_max_tokens)
+        max_batch_items: Texts per request (defaults to config.embed_batch_max_items)
+        max_concurrency: Upper bound on requests in flight (defaults to config.embed_max_concurrency)
+        max_retries: Retries per batch (defaults to config.embed_max_retries)
+        backoff_seconds: Base backoff delay (defaults to config.embed_backoff_seconds)
+    """
+
+    def __init__(
+        self,
+        embeddings,
+        max_batch_tokens: Optional[int] = None,
+        max_batch_items: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+        max_retries: Optional[int] = None,
+        backoff_seconds: Optional[float] = None,
+    ):
+        config = get_config()
+        self.embeddings = embeddings
+        self.max_batch_tokens = max_batch_tokens or config.embed_batch_max_tokens
+        self.max_batch_items = max_batch_items or config.embed_batch_max_items
+        self.max_concurrency = max(1, max_concurrency or config.embed_max_concurrency)
+        self.max_retries = max_retries if max_retries is not None else config.embed_max_retries
+        self.backoff_seconds = (
+            backoff_seconds if backoff_seconds is not None else config.embed_backoff_seconds
+        )
+
+        self._limit = float(self.max_concurrency)
+        self._in_flight = 0
+        self._slots = threading.Condition()
+        self._counters = {"embeddings": 0, "batches": 0, "retries": 0, "throttled": 0}
+        self._busy_seconds = 0.0
+
+    def pack(self, texts: Sequence[str]) -> List[List[int]]:
+        """Group text indices into batches under the token and item limits.
+
+        A single text larger than the token budget gets a batch of its own.
+        """
+        batches: List[List[int]] = []
+        current: List[int] = []
+        current_tokens = 0
+        for index, text in enumerate(texts):
+            tokens = count_tokens(text)
+            if current and (
+                current_tokens + tokens > self.max_batch_tokens
+                or len(current) >= self.max_batch_items
+            ):
+                batches.append(current)
+                current, current_tokens = [], 0
+            current.append(index)
+            current_tokens += tokens
+        if current:
+            batches.append(current)
+        return batches
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed `texts`, returning vectors in input order."""
+        if not texts:
+            return []
+        started = time.perf_counter()
+        batches = self.pack(texts)
+        vectors: List[Optional[List[float]]] = [None] * len(texts)
+
+        def run(batch: List[int]) -> None:
+            result = self._embed_batch([texts[i] for i in batch])
+            for i, vector in zip(batch, result):
+                vectors[i] = vector
+
+        try:
+            if len(batches) == 1 or self.max_concurrency == 1:
+                for batch in batches:
+                    run(batch)
+            else:
+                workers = min(self.max_concurrency, len(batches))
+                with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="embed") as pool:
+                    futures = [pool.submit(run, batch) for batch in batches]
+                    done, pending = wait(futures, return_when=FIRST_EXCEPTION)
+                    for future in pending:
+                        future.cancel()
+                    for future in done:
+                        future.result()
+        finally:
+            with self._slots:
+                self._busy_seconds += time.perf_counter() - started
+        return vectors
+
+    def stats(self) -> dict:
+        """Texts and batches embedded, retries, throttles and throughput so far."""
+        with self._slots:
+            rate = self._counters["embeddings"] / self._busy_seconds if self._busy_seconds else 0.0
+            return {
+                **self._counters,
+                "concurrency_limit": int(self._limit),
+                "seconds": round(self._busy_seconds, 3),
+                "embeddings_per_second": round(rate, 1),
+            }
+
+    def _acquire(self) -> None:
+        with self._slots:
+            while self._in_flight >= int(self._limit):
+                self._slots.wait()
+            self._in_flight += 1
+
+    def _release(self, throttled: bool) -> None:
+        with self._slots:
+            self._in_flight -= 1
+            if throttled:
+                self._limit = max(1.0, self._limit / 2)
+            else:
+                self._limit = min(float(self.max_concurrency), self._limit + 1 / self._limit)
+            self._slots.notify_all()
+
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        attempt = 0
+        while True:
+            self._acquire()
+            try:
+                vectors = self.embeddings.embed_documents(texts)
+            except Exception as exc:
+                retryable = _is_retryable(exc)
+                self._release(throttled=retryable)
+                if attempt >= self.max_retries or not retryable:
+                    raise
+                delay = _retry_after_seconds(exc)
+                if delay is None:
+                    delay = self.backoff_seconds * (2 ** attempt) * random.uniform(0.5, 1.5)
+                with self._slots:
+                    self._counters["retries"] += 1
+                    if getattr(exc, "status_code", None) == 429:
+                        self._counters["throttled"] += 1
+                time.sleep(min(delay, MAX_BACKOFF_SECONDS))
+                attempt += 1
+                continue
+            self._release(throttled=False)
+            with self._slots:
+                self._counters["embeddings"] += len(texts)
+                self._counters["batches"] += 1
+            return vectors
@@ -1,8 +1,13 @@
 from langchain_qdrant import QdrantVectorStore
-from qdrant_client import QdrantClient
+from qdrant_client import QdrantClient, models
 from .config import get_config
+from .embedding_cache import CachedEmbeddings, get_embedding_cache
+from .numpy_store import NumpyVectorStore, get_numpy_index
+from .query_batcher import QueryEmbeddingBatcher
 from langchain_openai import AzureOpenAIEmbeddings
+import argparse
 import os
+from typing import Optional
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -16,31 +21,60 @@ if 'OPENAI_API_KEY' in os.environ and 'AZURE_OPENAI_API_KEY' in os.environ:
     _original_openai_key = os.environ.pop('OPENAI_API_KEY', None)
 
 
-def create_qdrant_vectorstore(
-    docs,
-    collection_name=None,
-    qdrant_url=None,
-):
-    """Create a Qdrant vectorstore from documents using Azure OpenAI embeddings.
-    
+def build_embeddings(max_retries: Optional[int] = None):
+    """Build the Azure OpenAI embeddings client, wrapped in the embedding cache when enabled.
+
+    The cache namespace is the deployment name plus output dimensions, so switching
+    either never serves stale vectors.
+
     Args:
-        docs: List of documents to add to vectorstore
-        collection_name: Name of the collection (defaults to config.qdrant_collection)
-        qdrant_url: URL of Qdrant instance (defaults to config.qdrant_url)
+        max_retries: Retries made by the OpenAI client itself (defaults to the
+            client's own); pass 0 when an `EmbeddingScheduler` handles retries
+    """
+    azure_endpoint = os.getenv("AZURE_OPENAI_ENDPOINT")
+    azure_api_key = os.getenv("AZURE_OPENAI_API_KEY")
+    api_version = os.getenv("AZURE_OPENAI_API_VERSION", "2024-02-01")
+    deployment = os.getenv("AZURE_OPENAI_EMBEDDING_DEPLOYMENT", "text-embedding-3-large")
+    dimensions = os.getenv("AZURE_OPENAI_EMBEDDING_DIMENSIONS")
+
+    embeddings = AzureOpenAIEmbeddings(
+        azure_deployment=deployment,  # This is the deployment name in Azure
+        azure_endpoint=azure_endpoint,
+        api_key=azure_api_key,
+        api_version=api_version,
+        # Optional: reduced dimensions for text-embedding-3 models
+        dimensions=int(dimensions) if dimensions else None,
+        **({"max_retries": max_retries} if max_retries is not None else {}),
+    )
+
+    return wrap_embeddings(embeddings, namespace=f"{deployment}:{dimensions or 'default'}")
+
+
+def wrap_embeddings(embeddings, namespace: str):
+    """Put the query micro-batcher and the embedding cache in front of `embeddings`.
+
+    The cache sits outermost, so cache hits return at once and only misses
+    wait in the batcher for other concurrent queries.
+
+    Args:
+        embeddings: Embeddings model making the upstream requests
+        namespace: Cache namespace identifying the model and its settings
     """
     config = get_config()
-    
-    if collection_name is None:
-        collection_name = config.qdrant_collection
-    if qdrant_url is None:
-        qdrant_url = config.qdrant_url
-    
-    # Validate Azure OpenAI configuration
+    if config.query_batch_enabled:
+        embeddings = QueryEmbeddingBatcher(embeddings)
+    if not config.embedding_cache_enabled:
+        return embeddings
+    return CachedEmbeddings(embeddings, cache=get_embedding_cache(), namespace=namespace)
+
+
+def require_azure_openai_config() -> None:
+    """Raise a RuntimeError explaining which Azure OpenAI variables are missing."""
     required_env_vars = {
         "AZURE_OPENAI_API_KEY": os.getenv("AZURE_OPENAI_API_KEY"),
         "AZURE_OPENAI_ENDPOINT": os.getenv("AZURE_OPENAI_ENDPOINT"),
     }
-    
+
     missing_vars = [var for var, value in required_env_vars.items() if not value]
     if missing_vars:
         raise RuntimeError(
@@ -53,82 +87,219 @@ def create_qdrant_vectorstore(
             f"AZURE_OPENAI_EMBEDDING_DEPLOYMENT=your-embedding-deployment-name"
         )
 
-    # Initialize Azure OpenAI embeddings
-    try:
-        # Get Azure configuration
-        azure_endpoint = os.getenv("AZURE_OPENAI_ENDPOINT")
-        azure_api_key = os.getenv("AZURE_OPENAI_API_KEY")
-        api_version = os.getenv("AZURE_OPENAI_API_VERSION", "2024-02-01")
-        deployment = os.getenv("AZURE_OPENAI_EMBEDDING_DEPLOYMENT", "text-embedding-3-large")
-        
-        embeddings = AzureOpenAIEmbeddings(
-            azure_deployment=deployment,  # This is the deployment name in Azure
-            azure_endpoint=azure_endpoint,
-            api_key=azure_api_key,
-            api_version=api_version,
-            # Optional: specify dimensions for text-embedding-3 models
-            # dimensions=1536,
+
+def get_qdrant_client(qdrant_url=None):
+    """Create a Qdrant client.
+
+    Args:
+        qdrant_url: URL of Qdrant instance (defaults to config.qdrant_url)
+    """
+    if qdrant_url is None:
+        qdrant_url = get_config().qdrant_url
+    return QdrantClient(url=qdrant_url, api_key=os.getenv('QDRANT_API_KEY'), timeout=60)
+
+
+def collection_exists(collection_name=None, qdrant_url=None) -> bool:
+    """Check whether a Qdrant collection exists."""
+    if collection_name is None:
+        collection_name = get_config().qdrant_collection
+    client = get_qdrant_client(qdrant_url)
+    return collection_name in [col.name for col in client.get_collections().collections]
+
+
+def delete_points(ids, collection_name=None, qdrant_url=None) -> None:
+    """Delete points by ID from a Qdrant collection.
+
+    Args:
+        ids: Point IDs to delete
+        collection_name: Name of the collection (defaults to config.qdrant_collection)
+        qdrant_url: URL of Qdrant instance (defaults to config.qdrant_url)
+    """
+    if not ids:
+        return
+    if collection_name is None:
+        collection_name = get_config().qdrant_collection
+    client = get_qdrant_client(qdrant_url)
+    client.delete(
+        collection_name=collection_name,
+        points_selector=models.PointIdsList(points=list(ids)),
+        wait=True,
+    )
+
+
+# Metadata fields that get a keyword payload index, so filtered searches stay fast
+PAYLOAD_INDEX_FIELDS = ("metadata.source", "metadata.doc_type", "metadata.note_group")
+
+
+def _quantization_config(quantization: str):
+    """Qdrant quantization config for "scalar", "binary" or "none".
+
+    Quantized vectors are kept in RAM so the HNSW traversal never touches disk,
+    while the original vectors (optionally on disk) are only read for rescoring.
+    """
+    if quantization == "scalar":
+        return models.ScalarQuantization(
+            scalar=models.ScalarQuantizationConfig(type=models.ScalarType.INT8, always_ram=True)
         )
-        
-        # Test the embeddings with a simple query
-        test_embedding = embeddings.embed_query("test")
-        print(f"✓ Azure OpenAI embeddings initialized successfully (dimension: {len(test_embedding)})")
-        
-    except Exception as e:
-        raise RuntimeError(
-            f"Failed to initialize Azure OpenAI embeddings. "
-            f"Please verify:\n"
-            f"1. AZURE_OPENAI_API_KEY is set and valid\n"
-            f"2. AZURE_OPENAI_ENDPOINT is correct (format: https://your-endpoint.openai.azure.com/)\n"
-            f"3. AZURE_OPENAI_EMBEDDING_DEPLOYMENT is set to your deployment name\n"
-            f"4. API version is supported: {api_version}\n"
-            f"5. You have access to embedding models in your Azure deployment\n"
-            f"6. No conflicting OPENAI_API_BASE environment variable is set\n"
-            f"Original error: {e}"
-        ) from e
-    
-    # Create Qdrant client
-    try:
-        client = QdrantClient(url=qdrant_url, api_key=None, timeout=60)
-        print(f"✓ Connected to Qdrant at {qdrant_url}")
-    except Exception as e:
-        raise RuntimeError(
-            f"Failed to connect to Qdrant at {qdrant_url}. "
-            f"Please verify the Qdrant instance is running.\n"
-            f"Original error: {e}"
-        ) from e
-    
-    # Check if collection exists (optional cleanup)
-    try:
-        collections = client.get_collections()
-        if collection_name in [col.name for col in collections.collections]:
-            print(f"ℹ Collection '{collection_name}' already exists. Will add to existing collection.")
+    if quantization == "binary":
+        return models.BinaryQuantization(binary=models.BinaryQuantizationConfig(always_ram=True))
+    if quantization == "none":
+        return None
+    raise ValueError(f"Unknown quantization: {quantization}")
+
+
+def _quantization_name(quantization_config) -> str:
+    if isinstance(quantization_config, models.ScalarQuantization):
+        return "scalar"
+    if isinstance(quantization_config, models.BinaryQuantization):
+        return "binary"
+    return "none"
+
+
+def schema_differences(info) -> dict:
+    """Where an existing collection's HNSW, quantization and storage settings differ from the config.
+
+    Returns ``{update_collection argument: (description, update)}``; empty when
+    the collection matches.
+
+    Args:
+        info: The collection's ``client.get_collection`` result
+    """
+    config = get_config()
+    vectors = info.config.params.vectors
+    differences = {}
+    hnsw = info.config.hnsw_config
+    if (hnsw.m, hnsw.ef_construct) != (config.qdrant_hnsw_m, config.qdrant_hnsw_ef_construct):
+        differences["hnsw_config"] = (
+            f"HNSW m={hnsw.m}, ef_construct={hnsw.ef_construct} -> "
+            f"m={config.qdrant_hnsw_m}, ef_construct={config.qdrant_hnsw_ef_construct}",
+            models.HnswConfigDiff(m=config.qdrant_hnsw_m, ef_construct=config.qdrant_hnsw_ef_construct),
+        )
+    quantization = _quantization_name(info.config.quantization_config)
+    if quantization != config.qdrant_quantization:
+        differences["quantization_config"] = (
+            f"quantization {quantization} -> {config.qdrant_quantization}",
+            _quantization_config(config.qdrant_quantization) or models.Disabled.DISABLED,
+        )
+    # Named-vector collections are left alone; ingestion only creates unnamed ones
+    if isinstance(vectors, models.VectorParams) and bool(vectors.on_disk) != config.qdrant_on_disk:
+        differences["vectors_config"] = (
+            f"on_disk {bool(vectors.on_disk)} -> {config.qdrant_on_disk}",
+            {"": models.VectorParamsDiff(on_disk=config.qdrant_on_disk)},
+        )
+    return differences
+
+
+def _update_schema(client, collection_name, migrate: Optional[bool] = None) -> None:
+    """Check an existing collection against the configured schema.
+
+    Differences are only applied when `migrate` is set (defaults to
+    config.qdrant_schema_migrate), since Qdrant then rebuilds the index of the
+    whole collection; otherwise they are reported and the collection is left as
+    it is. Missing keyword payload indexes are always added.
+    """
+    if migrate is None:
+        migrate = get_config().qdrant_schema_migrate
+    info = client.get_collection(collection_name)
+    differences = schema_differences(info)
+    if differences:
+        summary = "; ".join(description for description, _ in differences.values())
+        if migrate:
+            client.update_collection(
+                collection_name=collection_name,
+                **{name: update for name, (_, update) in differences.items()},
+            )
+            print(f"ℹ Updated collection '{collection_name}' schema ({summary}); Qdrant re-indexes it in the background")
         else:
-            print(f"✓ Creating new collection '{collection_name}'")
-    except Exception as e:
-        print(f"⚠ Could not check existing collections: {e}")
-    
-    # Create Qdrant vectorstore from documents
-    try:
-        print(f"Processing {len(docs)} documents...")
-        vectorstore = QdrantVectorStore.from_documents(
-            documents=docs,
-            embedding=embeddings,
-            url=qdrant_url,
+            print(
+                f"⚠ Collection '{collection_name}' differs from the configured schema ({summary}). "
+                f"Left unchanged; set QDRANT_SCHEMA_MIGRATE=true or run "
+                f"`python -m src.core.embeddings migrate-schema` to apply it (triggers a re-index)."
+            )
+    _create_payload_indexes(client, collection_name, info.payload_schema or {})
+
+
+def _create_payload_indexes(client, collection_name, existing=()) -> None:
+    for field in PAYLOAD_INDEX_FIELDS:
+        if field in existing:
+            continue
+        client.create_payload_index(
             collection_name=collection_name,
-            api_key=None,
+            field_name=field,
+            field_schema=models.PayloadSchemaType.KEYWORD,
+            wait=True,
         )
-        print(f"✓ Successfully created vectorstore with {len(docs)} documents")
-        return vectorstore
-    except Exception as e:
-        raise RuntimeError(
-            f"Failed to create Qdrant vectorstore. "
-            f"This could be due to:\n"
-            f"1. Document formatting issues\n"
-            f"2. Embedding generation failures\n"
-            f"3. Qdrant connection problems\n"
-            f"Original error: {e}"
-        ) from e
+
+
+def ensure_collection(
+    client, collection_name, vector_size: int, migrate_schema: Optional[bool] = None
+) -> None:
+    """Create the collection if needed and check the configured schema.
+
+    New collections use cosine distance with the HNSW, quantization and on-disk
+    settings from the config (see `Config.set_qdrant_schema`). For existing ones
+    a mismatch is only reported unless `migrate_schema` (defaults to
+    config.qdrant_schema_migrate) is set, in which case the collection is
+    updated in place and Qdrant re-indexes it in the background. Keyword
+    payload indexes are created on `PAYLOAD_INDEX_FIELDS`.
+    """
+    config = get_config()
+    if not client.collection_exists(collection_name):
+        client.create_collection(
+            collection_name=collection_name,
+            vectors_config=models.VectorParams(
+                size=vector_size,
+                distance=models.Distance.COSINE,
+                on_disk=config.qdrant_on_disk,
+            ),
+            hnsw_config=models.HnswConfigDiff(
+                m=config.qdrant_hnsw_m, ef_construct=config.qdrant_hnsw_ef_construct
+            ),
+            quantization_config=_quantization_config(config.qdrant_quantization),
+        )
+        print(
+            f"✓ Created collection '{collection_name}' (dimension: {vector_size}, "
+            f"quantization: {config.qdrant_quantization}, on_disk: {config.qdrant_on_disk})"
+        )
+        _create_payload_indexes(client, collection_name)
+    else:
+        _update_schema(client, collection_name, migrate=migrate_schema)
+
+
+def get_search_kwargs() -> dict:
+    """Keyword arguments for `similarity_search` applying the configured search parameters.
+
+    Sets the HNSW ``ef``, rescoring of quantized candidates with the original
+    vectors (over-fetching by the oversampling factor) and
+    config.retriever_score_threshold.
+    """
+    config = get_config()
+    quantization = None
+    if config.qdrant_quantization != "none":
+        quantization = models.QuantizationSearchParams(
+            rescore=config.qdrant_quantization_rescore,
+            oversampling=config.qdrant_quantization_oversampling,
+        )
+    return {
+        "search_params": models.SearchParams(hnsw_ef=config.qdrant_hnsw_ef, quantization=quantization),
+        "score_threshold": config.retriever_score_threshold,
+    }
+
+
+def upsert_chunks(client, collection_name, chunks, vectors, ids) -> None:
+    """Upsert pre-embedded chunks using the payload layout QdrantVectorStore reads."""
+    client.upsert(
+        collection_name=collection_name,
+        points=[
+            models.PointStruct(
+                id=point_id,
+                vector=list(vector),
+                payload={"page_content": chunk.page_content, "metadata": chunk.metadata},
+            )
+            for chunk, vector, point_id in zip(chunks, vectors, ids)
+        ],
+        wait=True,
+    )
 
 
 def get_existing_vectorstore(
@@ -136,13 +307,16 @@ def get_existing_vectorstore(
     qdrant_url=None,
 ):
     """Retrieve an existing Qdrant vectorstore.
+
+    With config.vector_backend set to ``numpy`` the collection's embedded numpy
+    index is returned instead (`qdrant_url` is then unused).
     
     Args:
         collection_name: Name of the collection (defaults to config.qdrant_collection)
         qdrant_url: URL of Qdrant instance (defaults to config.qdrant_url)
     
     Returns:
-        QdrantVectorStore: Existing vectorstore instance
+        QdrantVectorStore: Existing vectorstore instance (NumpyVectorStore for the numpy backend)
     """
     config = get_config()
     
@@ -152,20 +326,12 @@ def get_existing_vectorstore(
         qdrant_url = config.qdrant_url
     
     # Initialize embeddings (same as creation)
-    azure_endpoint = os.getenv("AZURE_OPENAI_ENDPOINT")
-    azure_api_key = os.getenv("AZURE_OPENAI_API_KEY")
-    api_version = os.getenv("AZURE_OPENAI_API_VERSION", "2024-02-01")
-    deployment = os.getenv("AZURE_OPENAI_EMBEDDING_DEPLOYMENT", "text-embedding-3-large")
-    
-    embeddings = AzureOpenAIEmbeddings(
-        azure_deployment=deployment,
-        azure_endpoint=azure_endpoint,
-        api_key=azure_api_key,
-        api_version=api_version,
-    )
+    embeddings = build_embeddings()
+    if config.vector_backend == "numpy":
+        return NumpyVectorStore(get_numpy_index(collection_name), embeddings)
     
     # Create Qdrant client
-    client = QdrantClient(url=os.getenv('QDRANT_URL'), api_key=os.getenv('QDRANT_API_KEY'), timeout=60)
+    client = get_qdrant_client(qdrant_url)
     
     # Return existing vectorstore
     vectorstore = QdrantVectorStore(
@@ -174,4 +340,35 @@ def get_existing_vectorstore(
         embedding=embeddings,
     )
     
-    return vectorstore
\ No newline at end of file
+    return vectorstore
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Check or migrate the Qdrant collection schema.")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    for name, help_text in (
+        ("check-schema", "Show where the collection differs from the configured schema"),
+        ("migrate-schema", "Apply the configured schema to the collection (Qdrant re-indexes it)"),
+    ):
+        subcommand = subcommands.add_parser(name, help=help_text)
+        subcommand.add_argument(
+            "--collection", default=None, help="Collection name (defaults to QDRANT_COLLECTION)"
+        )
+    args = parser.parse_args()
+
+    collection_name = args.collection or get_config().qdrant_collection
+    client = get_qdrant_client()
+    if not client.collection_exists(collection_name):
+        raise SystemExit(f"Collection '{collection_name}' does not exist")
+    differences = schema_differences(client.get_collection(collection_name))
+    if not differences:
+        print(f"✓ Collection '{collection_name}' matches the configured schema")
+    elif args.command == "check-schema":
+        for description, _ in differences.values():
+            print(f"⚠ {description}")
+    else:
+        _update_schema(client, collection_name, migrate=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,404 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from typing import List, Optional, Sequence, Tuple
+
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import BaseMessage, message_to_dict, messages_from_dict
+from sqlalchemy import (
+    Column,
+    Float,
+    Index,
+    Integer,
+    MetaData,
+    Table,
+    Text,
+    create_engine,
+    event,
+    select,
+)
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from .config import get_config
+from .tokens import count_tokens
+
+CHAT_HISTORY_DIR = "data/chat_history"
+CHAT_HISTORY_DB = f"{CHAT_HISTORY_DIR}/chat_history.db"
+
+# Same layout SQLChatMessageHistory uses, so existing history databases keep working
+metadata = MetaData()
+message_store = Table(
+    "message_store",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("session_id", Text),
+    Column("message", Text),
+)
+session_index = Index("ix_message_store_session_id_id", message_store.c.session_id, message_store.c.id)
+
+# Rolling summary of the messages up to and including last_message_id
+session_summaries = Table(
+    "session_summaries",
+    metadata,
+    Column("session_id", Text, primary_key=True),
+    Column("summary", Text, nullable=False),
+    Column("last_message_id", Integer, nullable=False),
+    Column("updated_at", Float, nullable=False),
+)
+
+# Diagrams generated on demand for an AI message, so opening one again is free
+message_diagrams = Table(
+    "message_diagrams",
+    metadata,
+    Column("message_id", Integer, primary_key=True),
+    Column("session_id", Text, nullable=False),
+    Column("diagram", Text, nullable=False),
+    Column("created_at", Float, nullable=False),
+)
+
+
+def _enable_wal(dbapi_connection, _record) -> None:
+    """Let readers proceed while a turn is being written."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.close()
+
+
+def _decode(rows) -> List[BaseMessage]:
+    return messages_from_dict([json.loads(row.message) for row in rows])
+
+
+def _window(rows, max_messages: Optional[int], max_tokens: Optional[int]) -> list:
+    """Trim newest-first rows to the token budget and return them oldest first.
+
+    The budget is a hard cap: a message that does not fit ends the window.
+    """
+    if max_tokens is None:
+        return list(reversed(rows))
+    kept, used = [], 0
+    for row in rows:
+        tokens = count_tokens(json.loads(row.message)["data"]["content"])
+        if used + tokens > max_tokens:
+            break
+        kept.append(row)
+        used += tokens
+    return list(reversed(kept))
+
+
+class ChatHistoryStore:
+    """Chat history in SQLite with one pooled sync and one async engine per process.
+
+    Messages are read through an index on ``(session_id, id)``, and the prompt
+    path asks only for the last N messages / T tokens of a session, so per-turn
+    cost stays flat however long a session grows.
+
+    Args:
+        db_path: SQLite database file (defaults to CHAT_HISTORY_DB)
+    """
+
+    def __init__(self, db_path: str = CHAT_HISTORY_DB):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self.engine = create_engine(f"sqlite:///{db_path}")
+        self.async_engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+        event.listen(self.engine, "connect", _enable_wal)
+        event.listen(self.async_engine.sync_engine, "connect", _enable_wal)
+        self._schema_ready = False
+        self._schema_lock = threading.Lock()
+        self._aschema_lock = asyncio.Lock()
+
+    def _create_schema(self, connection) -> None:
+        # create_all skips indexes of tables that already exist, so add it explicitly
+        metadata.create_all(connection, checkfirst=True)
+        session_index.create(connection, checkfirst=True)
+
+    def _ensure_schema(self) -> None:
+        with self._schema_lock:
+            if not self._schema_ready:
+                with self.engine.begin() as connection:
+                    self._create_schema(connection)
+                self._schema_ready = True
+
+    async def _aensure_schema(self) -> None:
+        if self._schema_ready:
+            return
+        # The first requests of a fresh worker arrive together; only one creates the schema
+        async with self._aschema_lock:
+            if not self._schema_ready:
+                async with self.async_engine.begin() as connection:
+                    await connection.run_sync(self._create_schema)
+                self._schema_ready = True
+
+    @staticmethod
+    def _recent_query(session_id: str, max_messages: Optional[int]):
+        query = (
+            select(message_store.c.id, message_store.c.message)
+            .where(message_store.c.session_id == session_id)
+            .order_by(message_store.c.id.desc())
+        )
+        return query.limit(max_messages) if max_messages is not None else query
+
+    @staticmethod
+    def _rows(messages: Sequence[BaseMessage], session_id: str) -> list:
+        return [
+            {"session_id": session_id, "message": json.dumps(message_to_dict(message))}
+            for message in messages
+        ]
+
+    def get_messages(self, session_id: str) -> List[BaseMessage]:
+        """Every message of a session, oldest first."""
+        return self.get_recent_messages(session_id, max_messages=None, max_tokens=None)
+
+    def get_recent_messages(
+        self, session_id: str, max_messages: Optional[int], max_tokens: Optional[int]
+    ) -> List[BaseMessage]:
+        """The last `max_messages` messages of a session that fit in `max_tokens`, oldest first."""
+        self._ensure_schema()
+        with self.engine.connect() as connection:
+            rows = connection.execute(self._recent_query(session_id, max_messages)).all()
+        return _decode(_window(rows, max_messages, max_tokens))
+
+    def add_messages(self, session_id: str, messages: Sequence[BaseMessage]) -> List[int]:
+        """Append messages to a session; returns their row ids."""
+        self._ensure_schema()
+        with self.engine.begin() as connection:
+            return [
+                connection.execute(message_store.insert(), row).inserted_primary_key[0]
+                for row in self._rows(messages, session_id)
+            ]
+
+    def clear(self, session_id: str) -> None:
+        self._ensure_schema()
+        with self.engine.begin() as connection:
+            connection.execute(
+                message_store.delete().where(message_store.c.session_id == session_id)
+            )
+            connection.execute(
+                session_summaries.delete().where(session_summaries.c.session_id == session_id)
+            )
+            connection.execute(
+                message_diagrams.delete().where(message_diagrams.c.session_id == session_id)
+            )
+
+    async def aget_messages(self, session_id: str) -> List[BaseMessage]:
+        return await self.aget_recent_messages(session_id, max_messages=None, max_tokens=None)
+
+    async def aget_recent_messages(
+        self, session_id: str, max_messages: Optional[int], max_tokens: Optional[int]
+    ) -> List[BaseMessage]:
+        return [
+            message
+            for _, message in await self.aget_recent_rows(session_id, max_messages, max_tokens)
+        ]
+
+    async def aget_recent_rows(
+        self,
+        session_id: str,
+        max_messages: Optional[int],
+        max_tokens: Optional[int],
+        after_id: Optional[int] = None,
+    ) -> List[Tuple[int, BaseMessage]]:
+        """Like `aget_recent_messages`, but as ``(row id, message)`` pairs.
+
+        With `after_id`, only messages with a larger id are considered.
+        """
+        await self._aensure_schema()
+        query = self._recent_query(session_id, max_messages)
+        if after_id is not None:
+            query = query.where(message_store.c.id > after_id)
+        async with self.async_engine.connect() as connection:
+            result = await connection.execute(query)
+            rows = _window(result.all(), max_messages, max_tokens)
+        return list(zip([row.id for row in rows], _decode(rows)))
+
+    async def aget_page(
+        self, session_id: str, before_id: Optional[int], limit: int
+    ) -> List[Tuple[int, BaseMessage]]:
+        """Up to `limit` messages with ``id < before_id`` (all if None), newest first."""
+        await self._aensure_schema()
+        query = self._recent_query(session_id, limit)
+        if before_id is not None:
+            query = query.where(message_store.c.id < before_id)
+        async with self.async_engine.connect() as connection:
+            rows = (await connection.execute(query)).all()
+        return list(zip([row.id for row in rows], _decode(rows)))
+
+    async def aget_rows_between(
+        self, session_id: str, after_id: int, before_id: Optional[int], limit: int
+    ) -> List[Tuple[int, BaseMessage]]:
+        """Up to `limit` messages with ``after_id < id < before_id``, oldest first."""
+        await self._aensure_schema()
+        query = select(message_store.c.id, message_store.c.message).where(
+            message_store.c.session_id == session_id, message_store.c.id > after_id
+        )
+        if before_id is not None:
+            query = query.where(message_store.c.id < before_id)
+        query = query.order_by(message_store.c.id).limit(limit)
+        async with self.async_engine.connect() as connection:
+            rows = (await connection.execute(query)).all()
+        return list(zip([row.id for row in rows], _decode(rows)))
+
+    async def aget_summary(self, session_id: str) -> Optional[Tuple[str, int]]:
+        """The stored rolling summary and the last message id it covers, if any."""
+        await self._aensure_schema()
+        query = select(session_summaries.c.summary, session_summaries.c.last_message_id).where(
+            session_summaries.c.session_id == session_id
+        )
+        async with self.async_engine.connect() as connection:
+            row = (await connection.execute(query)).first()
+        return (row.summary, row.last_message_id) if row is not None else None
+
+    async def aput_summary(self, session_id: str, summary: str, last_message_id: int) -> None:
+        """Store a summary unless a newer one (covering more messages) is already saved."""
+        await self._aensure_schema()
+        statement = sqlite_insert(session_summaries).values(
+            session_id=session_id,
+            summary=summary,
+            last_message_id=last_message_id,
+            updated_at=time.time(),
+        )
+        statement = statement.on_conflict_do_update(
+            index_elements=[session_summaries.c.session_id],
+            set_={
+                "summary": statement.excluded.summary,
+                "last_message_id": statement.excluded.last_message_id,
+                "updated_at": statement.excluded.updated_at,
+            },
+            where=session_summaries.c.last_message_id < statement.excluded.last_message_id,
+        )
+        async with self.async_engine.begin() as connection:
+            await connection.execute(statement)
+
+    async def aget_turn(
+        self, session_id: str, message_id: int
+    ) -> Optional[Tuple[Optional[BaseMessage], BaseMessage]]:
+        """Message `message_id` of a session and the message just before it, if it exists."""
+        await self._aensure_schema()
+        query = (
+            select(message_store.c.id, message_store.c.message)
+            .where(message_store.c.session_id == session_id, message_store.c.id <= message_id)
+            .order_by(message_store.c.id.desc())
+            .limit(2)
+        )
+        async with self.async_engine.connect() as connection:
+            rows = (await connection.execute(query)).all()
+        if not rows or rows[0].id != message_id:
+            return None
+        messages = _decode(rows)
+        return (messages[1] if len(messages) > 1 else None), messages[0]
+
+    async def aget_diagram(self, session_id: str, message_id: int) -> Optional[str]:
+        """The diagram stored for an AI message, if one was generated."""
+        await self._aensure_schema()
+        query = select(message_diagrams.c.diagram).where(
+            message_diagrams.c.message_id == message_id,
+            message_diagrams.c.session_id == session_id,
+        )
+        async with self.async_engine.connect() as connection:
+            row = (await connection.execute(query)).first()
+        return row.diagram if row is not None else None
+
+    async def aput_diagram(self, session_id: str, message_id: int, diagram: str) -> None:
+        """Store the diagram of an AI message, keeping the first one if two were generated."""
+        await self._aensure_schema()
+        statement = sqlite_insert(message_diagrams).values(
+            message_id=message_id, session_id=session_id, diagram=diagram, created_at=time.time()
+        )
+        async with self.async_engine.begin() as connection:
+            await connection.execute(statement.on_conflict_do_nothing())
+
+    async def aadd_messages(self, session_id: str, messages: Sequence[BaseMessage]) -> List[int]:
+        """Append messages to a session; returns their row ids."""
+        await self._aensure_schema()
+        async with self.async_engine.begin() as connection:
+            return [
+                (await connection.execute(message_store.insert(), row)).inserted_primary_key[0]
+                for row in self._rows(messages, session_id)
+            ]
+
+    async def aclear(self, session_id: str) -> None:
+        await self._aensure_schema()
+        async with self.async_engine.begin() as connection:
+            await connection.execute(
+                message_store.delete().where(message_store.c.session_id == session_id)
+            )
+            await connection.execute(
+                session_summaries.delete().where(session_summaries.c.session_id == session_id)
+            )
+            await connection.execute(
+                message_diagrams.delete().where(message_diagrams.c.session_id == session_id)
+            )
+
+    async def aclose(self) -> None:
+        """Dispose both engines and their pooled connections."""
+        await self.async_engine.dispose()
+        self.engine.dispose()
+
+
+class WindowedChatMessageHistory(BaseChatMessageHistory):
+    """LangChain chat history for one session whose reads return only a recent window.
+
+    Args:
+        store: Backing history store
+        session_id: Chat session identifier
+        max_messages: Messages to read (defaults to config.history_max_messages)
+        max_tokens: Token budget for the messages read (defaults to config.history_max_tokens)
+    """
+
+    def __init__(
+        self,
+        store: ChatHistoryStore,
+        session_id: str,
+        max_messages: Optional[int] = None,
+        max_tokens: Optional[int] = None,
+    ):
+        config = get_config()
+        self.store = store
+        self.session_id = session_id
+        self.max_messages = max_messages if max_messages is not None else config.history_max_messages
+        self.max_tokens = max_tokens if max_tokens is not None else config.history_max_tokens
+
+    @property
+    def messages(self) -> List[BaseMessage]:
+        return self.store.get_recent_messages(self.session_id, self.max_messages, self.max_tokens)
+
+    async def aget_messages(self) -> List[BaseMessage]:
+        return await self.store.aget_recent_messages(
+            self.session_id, self.max_messages, self.max_tokens
+        )
+
+    def add_messages(self, messages: Sequence[BaseMessage]) -> List[int]:
+        return self.store.add_messages(self.session_id, messages)
+
+    async def aadd_messages(self, messages: Sequence[BaseMessage]) -> List[int]:
+        return await self.store.aadd_messages(self.session_id, messages)
+
+    def clear(self) -> None:
+        self.store.clear(self.session_id)
+
+    async def aclear(self) -> None:
+        await self.store.aclear(self.session_id)
+
+
+_store: Optional[ChatHistoryStore] = None
+_store_lock = threading.Lock()
+
+
+def get_history_store() -> ChatHistoryStore:
+    """Get or create the process-wide history store."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ChatHistoryStore()
+        return _store
+
+
+async def aclose_history_store() -> None:
+    """Dispose the shared store's engines (called on application shutdown)."""
+    global _store
+    if _store is not None:
+        await _store.aclose()
+        _store = None
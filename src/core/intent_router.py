@@ -0,0 +1,229 @@
+import math
+import re
+import threading
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from .config import get_config
+
+# Categories that can be answered without retrieval
+SMALLTALK_CATEGORIES = ("greeting", "goodbye", "chitchat")
+# Longer messages are almost always real questions, so they skip routing entirely
+MAX_ROUTED_WORDS = 8
+
+RULES = {
+    "greeting": re.compile(
+        r"^(hi+|hello|hey+|hiya|howdy|greetings|yo|good (morning|afternoon|evening))"
+        r"( there| codi| everyone)?$"
+    ),
+    "goodbye": re.compile(
+        r"^((ok |okay )?(thanks? ?(you)? )?(bye|bye bye|goodbye|good night|take care|"
+        r"see (you|ya)( later| soon)?|talk (to you )?later|thats all( for now)?))$"
+    ),
+    "chitchat": re.compile(
+        r"^(how are you( doing)?( today)?|hows it going|whats your name|what is your name|"
+        r"who are you|are you (a )?(bot|robot|human|an ai)|nice to meet you|what can you do)$"
+    ),
+}
+# A bare acknowledgement is small talk only when it does not answer a question
+# the assistant just asked ("Want the steps for Windows too?" - "ok")
+ACKNOWLEDGEMENT = re.compile(
+    r"^(ok|okay|k|cool|great|nice|perfect|alright|got it|sounds good|"
+    r"thanks|thank you|thank you so much|thanks a lot)( thanks| thank you)?$"
+)
+
+# Example utterances whose embeddings form the nearest-centroid classifier
+EXAMPLES = {
+    "greeting": [
+        "hi", "hello there", "hey codi", "good morning", "hello, hope you're doing well",
+    ],
+    "goodbye": [
+        "bye", "goodbye", "see you later", "thanks, that's all for now", "have a nice day",
+    ],
+    "chitchat": [
+        "how are you", "what is your name", "who made you", "thank you so much",
+        "you're really helpful", "are you a robot",
+    ],
+    "document_query": [
+        "what does the report say about the budget",
+        "summarize the interview transcript",
+        "who is on the roster",
+        "explain the safety procedure",
+        "list the training requirements",
+        "what are the findings of the audit",
+    ],
+}
+
+
+@dataclass
+class Route:
+    category: str
+    # "rules" or "centroid"
+    method: str
+    score: float = 1.0
+
+
+def _normalize(query: str) -> str:
+    text = re.sub(r"[^\w\s]", "", query.lower())
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def _unit(vector: List[float]) -> List[float]:
+    norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+    return [value / norm for value in vector]
+
+
+def _dot(left: List[float], right: List[float]) -> float:
+    return sum(a * b for a, b in zip(left, right))
+
+
+class IntentRouter:
+    """Cheap pre-retrieval classifier for greetings, goodbyes and small talk.
+
+    Short messages are first matched against rules. A bare acknowledgement
+    ("ok", "thanks") counts as chitchat unless the assistant's previous reply
+    asked a question, in which case it is the user's answer and needs the
+    conversation, so it goes to retrieval. Messages the rules miss are
+    embedded and compared with per-category centroids of `EXAMPLES`; the
+    embedding goes through the embedding cache, so when the turn does need
+    retrieval the vector search reuses it for free. The centroid stage only
+    runs when that holds (see `centroids_are_free`); otherwise it would add an
+    embedding request to turns that need none (``hybrid_fast``) or one more
+    per turn (embedding cache off), and rules alone decide.
+
+    Args:
+        embeddings: Embeddings for the centroid stage (None for rules only)
+        threshold: Minimum cosine similarity to a small-talk centroid
+            (defaults to config.intent_centroid_threshold)
+        margin: Required lead over the document-query centroid
+            (defaults to config.intent_centroid_margin)
+    """
+
+    def __init__(self, embeddings=None, threshold: Optional[float] = None, margin: Optional[float] = None):
+        config = get_config()
+        self.embeddings = embeddings
+        self.threshold = threshold if threshold is not None else config.intent_centroid_threshold
+        self.margin = margin if margin is not None else config.intent_centroid_margin
+        self._centroids: Optional[Dict[str, List[float]]] = None
+
+    def match_rules(self, query: str) -> Optional[Route]:
+        text = _normalize(query)
+        if not text or len(text.split()) > MAX_ROUTED_WORDS:
+            return None
+        for category, pattern in RULES.items():
+            if pattern.match(text):
+                return Route(category=category, method="rules")
+        return None
+
+    @staticmethod
+    def centroids_are_free() -> bool:
+        """Whether retrieval reuses the centroid stage's query embedding from the cache."""
+        config = get_config()
+        return config.embedding_cache_enabled and config.retrieval_mode in ("dense", "hybrid")
+
+    @staticmethod
+    def is_acknowledgement(query: str) -> bool:
+        return bool(ACKNOWLEDGEMENT.match(_normalize(query)))
+
+    async def _acentroids(self) -> Dict[str, List[float]]:
+        if self._centroids is None:
+            centroids = {}
+            for category, examples in EXAMPLES.items():
+                vectors = [_unit(v) for v in await self.embeddings.aembed_documents(examples)]
+                centroids[category] = _unit([sum(column) / len(vectors) for column in zip(*vectors)])
+            self._centroids = centroids
+        return self._centroids
+
+    async def awarm(self) -> None:
+        """Embed the examples and build the centroids ahead of the first request."""
+        if self.embeddings is not None and self.centroids_are_free():
+            await self._acentroids()
+
+    async def aroute(
+        self, query: str, alast_reply: Optional[Callable[[], Awaitable[Optional[str]]]] = None
+    ) -> Optional[Route]:
+        """The small-talk route for `query`, or None when it needs retrieval.
+
+        Args:
+            query: The user's message
+            alast_reply: Returns the assistant's previous message (None if there
+                is none); only called for bare acknowledgements
+        """
+        route = self.match_rules(query)
+        if route is not None:
+            return route
+        if self.is_acknowledgement(query):
+            last_reply = await alast_reply() if alast_reply is not None else None
+            if last_reply is not None and last_reply.rstrip().endswith("?"):
+                return None
+            return Route(category="chitchat", method="rules")
+        if self.embeddings is None or not self.centroids_are_free():
+            return None
+        if len(_normalize(query).split()) > MAX_ROUTED_WORDS:
+            return None
+
+        centroids = await self._acentroids()
+        vector = _unit(await self.embeddings.aembed_query(query))
+        scores = {category: _dot(vector, centroid) for category, centroid in centroids.items()}
+        best = max(SMALLTALK_CATEGORIES, key=scores.get)
+        if scores[best] >= self.threshold and scores[best] - scores["document_query"] >= self.margin:
+            return Route(category=best, method="centroid", score=round(scores[best], 4))
+        return None
+
+
+_routers: Dict[int, IntentRouter] = {}
+_stats_lock = threading.Lock()
+_stats = {
+    "requests": 0,
+    "fast_path": 0,
+    "by_method": {"rules": 0, "centroid": 0},
+    "by_category": {category: 0 for category in SMALLTALK_CATEGORIES},
+    "fast_path_seconds": 0.0,
+    "full_path_seconds": 0.0,
+}
+
+
+def get_intent_router(embeddings=None) -> IntentRouter:
+    """Shared router for an embeddings client (centroids are computed once per client)."""
+    key = id(embeddings)
+    if key not in _routers:
+        _routers[key] = IntentRouter(embeddings)
+    return _routers[key]
+
+
+def record_request(route: Optional[Route], seconds: float) -> None:
+    """Count a request and how long it took on the fast or full path."""
+    with _stats_lock:
+        _stats["requests"] += 1
+        if route is None:
+            _stats["full_path_seconds"] += seconds
+            return
+        _stats["fast_path"] += 1
+        _stats["by_method"][route.method] += 1
+        _stats["by_category"][route.category] += 1
+        _stats["fast_path_seconds"] += seconds
+
+
+def get_intent_router_stats() -> dict:
+    """How often the fast path fired and the latency it saved versus the full RAG path."""
+    with _stats_lock:
+        fast, total = _stats["fast_path"], _stats["requests"]
+        full = total - fast
+        avg_fast_ms = 1000 * _stats["fast_path_seconds"] / fast if fast else None
+        avg_full_ms = 1000 * _stats["full_path_seconds"] / full if full else None
+        saved_ms = (
+            (avg_full_ms - avg_fast_ms) * fast
+            if avg_fast_ms is not None and avg_full_ms is not None
+            else None
+        )
+        return {
+            "enabled": get_config().intent_router_enabled,
+            "requests": total,
+            "fast_path": fast,
+            "fast_path_rate": round(fast / total, 4) if total else 0.0,
+            "by_method": dict(_stats["by_method"]),
+            "by_category": dict(_stats["by_category"]),
+            "avg_fast_path_ms": round(avg_fast_ms, 1) if avg_fast_ms is not None else None,
+            "avg_full_path_ms": round(avg_full_ms, 1) if avg_full_ms is not None else None,
+            "estimated_ms_saved": round(saved_ms, 1) if saved_ms is not None else None,
+        }
@@ -0,0 +1,310 @@
+import json
+import math
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from langchain_core.documents import Document
+
+from .config import get_config
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+# How often a reader checks whether an ingest run changed the index on disk
+RELOAD_CHECK_SECONDS = 5.0
+
+STOPWORDS = frozenset(
+    "a an and are as at be by can could do does for from had has have how i in is it its "
+    "me my of on or our should so that the their them there these they this to was we "
+    "were what when where which who why will with would you your".split()
+)
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens without stopwords; IDs like ``CRE-1042`` give ``cre``, ``1042``."""
+    return [token for token in _TOKEN_RE.findall(text.lower()) if token not in STOPWORDS]
+
+
+@dataclass
+class LexicalHit:
+    point_id: str
+    score: float
+    # Fraction of the distinct query terms that occur in the chunk
+    coverage: float
+    document: Document
+
+
+class LexicalIndex:
+    """BM25 index over the chunks of one collection, persisted in SQLite.
+
+    Each chunk is stored with its term frequencies, written by ingestion in the
+    same batches that are upserted to Qdrant. Readers keep only the inverted
+    postings and document lengths in memory and fetch text and metadata for the
+    top hits from disk, so the in-process footprint stays small. A version
+    counter lets API workers pick up changes made by a separate ingest process.
+
+    Args:
+        path: SQLite file holding the index
+        collection_name: Collection the chunks belong to (set on returned documents)
+    """
+
+    def __init__(self, path: str | Path, collection_name: str):
+        self.path = Path(path)
+        self.collection_name = collection_name
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            " id INTEGER PRIMARY KEY,"
+            " point_id TEXT NOT NULL UNIQUE,"
+            " text TEXT NOT NULL,"
+            " metadata TEXT NOT NULL,"
+            " terms TEXT NOT NULL,"
+            " length INTEGER NOT NULL)"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER)")
+        self._conn.commit()
+
+        self._loaded_version: Optional[int] = None
+        self._checked_at = 0.0
+        self._postings: Dict[str, List[tuple]] = {}
+        self._lengths: Dict[int, int] = {}
+        self._avg_length = 0.0
+
+    # -- writing (ingestion) --
+
+    def _bump_version(self) -> None:
+        self._conn.execute(
+            "INSERT INTO meta (key, value) VALUES ('version', 1) "
+            "ON CONFLICT(key) DO UPDATE SET value = value + 1"
+        )
+
+    def add(self, point_ids: Sequence[str], chunks: Sequence[Document]) -> None:
+        """Index chunks under their Qdrant point IDs, replacing existing entries."""
+        rows = []
+        for point_id, chunk in zip(point_ids, chunks):
+            terms = Counter(tokenize(chunk.page_content))
+            rows.append(
+                (
+                    str(point_id),
+                    chunk.page_content,
+                    json.dumps(chunk.metadata, default=str),
+                    json.dumps(terms),
+                    sum(terms.values()),
+                )
+            )
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO chunks (point_id, text, metadata, terms, length) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._bump_version()
+            self._conn.commit()
+
+    def delete(self, point_ids: Iterable[str]) -> None:
+        ids = [(str(point_id),) for point_id in point_ids]
+        if not ids:
+            return
+        with self._lock:
+            self._conn.executemany("DELETE FROM chunks WHERE point_id = ?", ids)
+            self._bump_version()
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM chunks")
+            self._bump_version()
+            self._conn.commit()
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+    def rebuild(self, batches: Iterable[Tuple[Sequence[str], Sequence[Document]]]) -> int:
+        """Replace the index with (point IDs, chunks) batches; returns the number indexed."""
+        self.clear()
+        indexed = 0
+        for point_ids, chunks in batches:
+            self.add(point_ids, chunks)
+            indexed += len(point_ids)
+        return indexed
+
+    def rebuild_from_qdrant(self, client, collection_name: str, batch_size: int = 256) -> int:
+        """Index every point already in a Qdrant collection; returns the number indexed."""
+
+        def scroll():
+            offset = None
+            while True:
+                points, offset = client.scroll(
+                    collection_name=collection_name,
+                    limit=batch_size,
+                    offset=offset,
+                    with_payload=True,
+                    with_vectors=False,
+                )
+                yield (
+                    [point.id for point in points],
+                    [
+                        Document(
+                            page_content=(point.payload or {}).get("page_content", ""),
+                            metadata=(point.payload or {}).get("metadata") or {},
+                        )
+                        for point in points
+                    ],
+                )
+                if offset is None:
+                    return
+
+        return self.rebuild(scroll())
+
+    # -- reading (queries) --
+
+    def _version(self) -> int:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        return row[0] if row else 0
+
+    def load(self) -> None:
+        """Build the in-memory postings, reloading only if the index changed on disk."""
+        with self._lock:
+            version = self._version()
+            self._checked_at = time.monotonic()
+            if version == self._loaded_version:
+                return
+            postings: Dict[str, List[tuple]] = defaultdict(list)
+            lengths: Dict[int, int] = {}
+            for row_id, terms, length in self._conn.execute("SELECT id, terms, length FROM chunks"):
+                lengths[row_id] = length
+                for term, frequency in json.loads(terms).items():
+                    postings[term].append((row_id, frequency))
+            self._postings = dict(postings)
+            self._lengths = lengths
+            self._avg_length = sum(lengths.values()) / len(lengths) if lengths else 0.0
+            self._loaded_version = version
+
+    def _ensure_loaded(self) -> None:
+        if (
+            self._loaded_version is None
+            or time.monotonic() - self._checked_at >= RELOAD_CHECK_SECONDS
+        ):
+            self.load()
+
+    def search(self, query: str, k: int) -> List[LexicalHit]:
+        """Top `k` chunks by BM25 score, best first."""
+        self._ensure_loaded()
+        terms = set(tokenize(query))
+        postings, lengths, avg_length = self._postings, self._lengths, self._avg_length
+        total = len(lengths)
+        if not terms or not total:
+            return []
+
+        scores: Dict[int, float] = defaultdict(float)
+        matched: Dict[int, int] = defaultdict(int)
+        for term in terms:
+            entries = postings.get(term)
+            if not entries:
+                continue
+            idf = math.log((total - len(entries) + 0.5) / (len(entries) + 0.5) + 1)
+            for row_id, frequency in entries:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[row_id] / avg_length)
+                scores[row_id] += idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+                matched[row_id] += 1
+
+        top = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        if not top:
+            return []
+        with self._lock:
+            placeholders = ",".join("?" * len(top))
+            rows = {
+                row_id: (point_id, text, metadata)
+                for row_id, point_id, text, metadata in self._conn.execute(
+                    f"SELECT id, point_id, text, metadata FROM chunks WHERE id IN ({placeholders})",
+                    [row_id for row_id, _ in top],
+                )
+            }
+        hits = []
+        for row_id, score in top:
+            if row_id not in rows:  # deleted since the postings were loaded
+                continue
+            point_id, text, metadata = rows[row_id]
+            metadata = {
+                **json.loads(metadata),
+                "_id": point_id,
+                "_collection_name": self.collection_name,
+            }
+            hits.append(
+                LexicalHit(
+                    point_id=point_id,
+                    score=score,
+                    coverage=matched[row_id] / len(terms),
+                    document=Document(page_content=text, metadata=metadata),
+                )
+            )
+        return hits
+
+
+def is_confident(hits: List[LexicalHit], margin: Optional[float] = None) -> bool:
+    """Whether the lexical result alone is trustworthy.
+
+    The best chunk must contain every query term and outscore the runner-up by
+    `margin` (defaults to config.lexical_confidence_margin), which is typical of
+    exact lookups such as names and IDs.
+    """
+    if margin is None:
+        margin = get_config().lexical_confidence_margin
+    if not hits or hits[0].coverage < 1.0:
+        return False
+    return len(hits) == 1 or hits[0].score >= margin * hits[1].score
+
+
+def reciprocal_rank_fusion(
+    result_lists: Sequence[Sequence[Document]], k: int, rrf_k: Optional[int] = None
+) -> List[Document]:
+    """Fuse ranked document lists by reciprocal rank, identifying documents by point ID.
+
+    Args:
+        result_lists: Ranked results from each retriever, best first
+        k: Number of documents to return
+        rrf_k: Rank offset damping the weight of top ranks (defaults to config.rrf_k)
+    """
+    if rrf_k is None:
+        rrf_k = get_config().rrf_k
+    scores: Dict[str, float] = defaultdict(float)
+    documents: Dict[str, Document] = {}
+    for results in result_lists:
+        for rank, document in enumerate(results):
+            key = str(document.metadata.get("_id") or document.page_content)
+            scores[key] += 1.0 / (rrf_k + rank + 1)
+            documents.setdefault(key, document)
+    ranked = sorted(scores, key=scores.get, reverse=True)[:k]
+    return [documents[key] for key in ranked]
+
+
+def get_lexical_index_path(collection_name: str) -> Path:
+    """Location of the lexical index for a collection, next to its ingest manifest."""
+    return get_config().ingest_manifest_dir / f"{collection_name}.lexical.db"
+
+
+_indexes: Dict[str, LexicalIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_lexical_index(collection_name: Optional[str] = None) -> LexicalIndex:
+    """Get or open the shared lexical index for a collection."""
+    if collection_name is None:
+        collection_name = get_config().qdrant_collection
+    with _indexes_lock:
+        if collection_name not in _indexes:
+            _indexes[collection_name] = LexicalIndex(
+                get_lexical_index_path(collection_name), collection_name
+            )
+        return _indexes[collection_name]
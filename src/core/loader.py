@@ -1,56 +1,71 @@
+import multiprocessing
 import os
 import shutil
 import tempfile
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from contextlib import ExitStack
 from pathlib import Path
-from typing import List
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
 
-from azure.ai.vision.imageanalysis import ImageAnalysisClient
-from azure.ai.vision.imageanalysis.models import VisualFeatures
-from azure.core.credentials import AzureKeyCredential
+from pdf2image import convert_from_path
 from langchain_community.document_loaders import (
     CSVLoader,
-    DirectoryLoader,
     Docx2txtLoader,
     PyMuPDFLoader,
     TextLoader,
 )
 
 from .config import get_config
+from .ocr import get_img_content, get_ocr_executor
 from langchain_core.documents import Document
 from dotenv import load_dotenv
-import base64
 
 load_dotenv()
 
 HANDWRITTEN_FOLDER = "handwritten_notes"
 IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png"}
+FILE_LOADERS = {
+    ".pdf": PyMuPDFLoader,
+    ".txt": TextLoader,
+    ".md": TextLoader,
+    ".docx": Docx2txtLoader,
+    ".doc": Docx2txtLoader,
+    ".csv": CSVLoader,
+}
+# Below this many files a process pool costs more than it saves
+PARALLEL_PARSE_MIN_FILES = 8
+PARSE_BATCH_SIZE = 16
 
 
-def get_img_content(img_path: str) -> str:
-    """Send an image to Azure and return the extracted text."""
-    # if not all([config.azure_vision_endpoint, config.azure_vision_key]):
-    #     raise ValueError(
-    #         "Azure Vision endpoint and key must be configured in environment variables."
-    #     )
+def _is_hidden(name: str) -> bool:
+    """Dotfiles and dot-directories (.DS_Store, .git, ...) are never ingested."""
+    return name.startswith(".")
 
-    client = ImageAnalysisClient(
-        endpoint=os.getenv('VISION_ENDPOINT'),
-        credential=AzureKeyCredential(os.getenv('VISION_KEY')),
-    )
 
-    with open(img_path, "rb") as f:
-        image_data = f.read()
+def _walk(root: Path) -> Iterator[Tuple[Path, List[str]]]:
+    """``(folder, sorted visible file names)`` for every visible folder under `root`."""
+    for current_root, dirs, names in os.walk(root):
+        dirs[:] = [name for name in dirs if not _is_hidden(name)]
+        yield Path(current_root), sorted(name for name in names if not _is_hidden(name))
 
-    result = client.analyze(
-        image_data=image_data, visual_features=[VisualFeatures.READ]
-    )
 
-    if result.read and result.read.blocks:
-        return "\n".join(
-            [line.text for block in result.read.blocks for line in block.lines]
-        )
+def _process_context():
+    """Start method for parser processes.
+
+    The pool is created from the ingest pipeline's load thread while other
+    threads (OCR, split, embedding) may hold locks, so forking the whole process
+    could copy a held lock into the child and deadlock it.
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    return multiprocessing.get_context("spawn")
 
-    return "No textual content could be extracted from this image."
 
 def convert_pdf_to_images(
     pdf_path: str, output_folder: Path, dpi: int = 300
@@ -100,73 +115,296 @@ def _create_handwritten_document(
     return Document(page_content=content, metadata=metadata)
 
 
+def _handwritten_page_numbers(image_paths: Sequence[Path]) -> Dict[Path, int]:
+    """1-based position of each image among the sorted images of its folder.
+
+    Each folder is listed once, however many of its images are asked for.
+    """
+    positions: Dict[Path, Dict[str, int]] = {}
+    numbers: Dict[Path, int] = {}
+    for image_path in image_paths:
+        folder = image_path.parent
+        if folder not in positions:
+            siblings = sorted(
+                p.name
+                for p in folder.iterdir()
+                if p.is_file() and p.suffix.lower() in IMAGE_EXTENSIONS and not _is_hidden(p.name)
+            )
+            positions[folder] = {name: index for index, name in enumerate(siblings, start=1)}
+        numbers[image_path] = positions[folder][image_path.name]
+    return numbers
+
+
+class _HandwrittenOcr:
+    """Page-level OCR of handwritten images and PDFs on a bounded window.
+
+    PDFs are rendered to page images only when their turn comes, and at most
+    `window` pages are in flight on `pool`. `collect` returns each file as soon
+    as all of its pages are transcribed, with the same page numbering as a
+    sequential pass. A file with a page that could not be transcribed is not
+    returned at all, so it stays out of the ingest manifest and is retried on
+    the next run instead of being indexed with missing pages.
+    """
+
+    def __init__(
+        self,
+        paths: Sequence[Path],
+        handwritten_root: Path,
+        pool: ThreadPoolExecutor,
+        window: int,
+    ):
+        self.handwritten_root = handwritten_root
+        # future -> (owner file, image to OCR, slot in owner, page number, doc type)
+        self.pending: Dict[Future, Tuple[Path, Path, int, int, str]] = {}
+        self._pool = pool
+        self._window = window
+        self._pages: Dict[Path, List[Optional[Document]]] = {}
+        self._remaining: Dict[Path, int] = {}
+        self._errors: Dict[Path, Exception] = {}
+        self._temp_dirs: Dict[Path, Path] = {}
+        self._ready: List[Tuple[Path, List[Document]]] = []
+        self._jobs = self._iter_jobs([Path(path) for path in paths])
+
+    def _iter_jobs(self, paths: List[Path]) -> Iterator[Tuple[Path, Path, int, int, str]]:
+        image_output_dir = get_config().image_output_dir
+        page_numbers = _handwritten_page_numbers(
+            [path for path in paths if path.suffix.lower() in IMAGE_EXTENSIONS]
+        )
+        for path in paths:
+            if path.suffix.lower() in IMAGE_EXTENSIONS:
+                pages = [(path, page_numbers[path], "handwritten_image")]
+            else:
+                image_output_dir.mkdir(parents=True, exist_ok=True)
+                temp_dir = Path(tempfile.mkdtemp(prefix="pdf_images_", dir=image_output_dir))
+                self._temp_dirs[path] = temp_dir
+                image_paths = convert_pdf_to_images(str(path), temp_dir)
+                pages = [
+                    (Path(image_path), index, "handwritten_pdf_page")
+                    for index, image_path in enumerate(sorted(image_paths), start=1)
+                ]
+            self._pages[path] = [None] * len(pages)
+            self._remaining[path] = len(pages)
+            if not pages:
+                self._finish(path)
+            for slot, (image_path, page_number, source_type) in enumerate(pages):
+                yield path, image_path, slot, page_number, source_type
+
+    def top_up(self) -> None:
+        """Submit pages until the window is full or every page is submitted."""
+        while len(self.pending) < self._window:
+            job = next(self._jobs, None)
+            if job is None:
+                return
+            future = self._pool.submit(get_ocr_executor().extract_text, str(job[1]))
+            self.pending[future] = job
+
+    def collect(self, futures) -> List[Tuple[Path, List[Document]]]:
+        """Record finished pages; returns the files that are now complete."""
+        for future in futures:
+            owner, image_path, slot, page_number, source_type = self.pending.pop(future)
+            try:
+                self._pages[owner][slot] = _create_handwritten_document(
+                    image_path=image_path,
+                    handwritten_root=self.handwritten_root,
+                    relative_root=owner.parent.relative_to(self.handwritten_root),
+                    page_number=page_number,
+                    content=future.result(),
+                    source_type=source_type,
+                    original_source=owner,
+                )
+            except Exception as exc:
+                self._errors.setdefault(owner, exc)
+            self._remaining[owner] -= 1
+            if not self._remaining[owner]:
+                self._finish(owner)
+        ready, self._ready = self._ready, []
+        return ready
+
+    def _finish(self, path: Path) -> None:
+        del self._remaining[path]
+        pages = self._pages.pop(path)
+        error = self._errors.pop(path, None)
+        if error is None:
+            self._ready.append((path, pages))
+        else:
+            print(f"⚠ Skipping {path}: OCR failed ({error}); it will be retried on the next ingest")
+        temp_dir = self._temp_dirs.pop(path, None)
+        if temp_dir is not None:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    def close(self) -> None:
+        """Drop queued pages and remove page images of PDFs that did not finish."""
+        self._pool.shutdown(wait=True, cancel_futures=True)
+        self._jobs.close()
+        for temp_dir in self._temp_dirs.values():
+            shutil.rmtree(temp_dir, ignore_errors=True)
+        self._temp_dirs.clear()
+
+
 def _load_handwritten_notes(base_dir: Path) -> List[Document]:
-    config = get_config()
-    image_output_dir = config.image_output_dir
-    image_output_dir.mkdir(parents=True, exist_ok=True)
-    
     handwritten_root = base_dir / HANDWRITTEN_FOLDER
     if not handwritten_root.exists() or not handwritten_root.is_dir():
         return []
 
-    handwritten_docs: List[Document] = []
+    # Per folder: standalone images first, then PDFs converted to page images
+    ordered: List[Path] = []
+    for current_path, files in _walk(handwritten_root):
+        ordered.extend(
+            current_path / f for f in files if Path(f).suffix.lower() in IMAGE_EXTENSIONS
+        )
+        ordered.extend(current_path / f for f in files if Path(f).suffix.lower() == ".pdf")
 
-    for current_root, _, files in os.walk(handwritten_root):
-        current_path = Path(current_root)
-        relative = current_path.relative_to(handwritten_root)
+    loaded = dict(iter_loaded_files(ordered, base_dir))
+    return [doc for path in ordered for doc in loaded.get(path, [])]
 
-        image_files = sorted(
-            f for f in files if Path(f).suffix.lower() in IMAGE_EXTENSIONS
-        )
-        pdf_files = sorted(f for f in files if Path(f).suffix.lower() == ".pdf")
 
-        # Process standalone handwritten images
-        for index, image_name in enumerate(image_files, start=1):
-            image_path = current_path / image_name
-            try:
-                text = get_img_content(str(image_path))
-            except Exception as exc:  # pragma: no cover - best effort logging
-                text = f"Failed to transcribe image: {exc}"
-            handwritten_docs.append(
-                _create_handwritten_document(
-                    image_path=image_path,
-                    handwritten_root=handwritten_root,
-                    relative_root=relative,
-                    page_number=index,
-                    content=text,
-                    source_type="handwritten_image",
-                    original_source=image_path,
-                )
-            )
+def _is_handwritten(path: Path, base_dir: Path) -> bool:
+    try:
+        return path.relative_to(base_dir).parts[0] == HANDWRITTEN_FOLDER
+    except (ValueError, IndexError):
+        return False
+
+
+def _uses_ocr(path: Path, base_dir: Path) -> bool:
+    """Handwritten images and PDFs are OCR'd; everything else uses FILE_LOADERS."""
+    suffix = path.suffix.lower()
+    return _is_handwritten(path, base_dir) and (suffix in IMAGE_EXTENSIONS or suffix == ".pdf")
+
+
+def iter_knowledge_base_files(base_dir: Path) -> List[Path]:
+    """List every file under `base_dir` that `load_docs` would ingest, sorted.
+
+    Hidden files and folders are skipped, as DirectoryLoader did.
+    """
+    files: List[Path] = []
+    for current_path, names in _walk(Path(base_dir)):
+        for name in names:
+            path = current_path / name
+            if path.suffix.lower() in FILE_LOADERS or _uses_ocr(path, base_dir):
+                files.append(path)
+    return sorted(files)
 
-        # Process PDFs inside handwritten notes by converting them to images first
-        for pdf_name in pdf_files:
-            pdf_path = current_path / pdf_name
-            temp_dir = Path(
-                tempfile.mkdtemp(prefix="pdf_images_", dir=image_output_dir)
+
+def _parse_files(paths: List[str]) -> List[Tuple[str, List[Document]]]:
+    """Parse a batch of non-OCR files; runs inside a worker process."""
+    return [
+        (path, FILE_LOADERS[Path(path).suffix.lower()](path).load()) for path in paths
+    ]
+
+
+def _parse_batches(paths: List[str], max_workers: int) -> Iterator[List[str]]:
+    # Small batches keep per-task overhead low on corpora with thousands of small files
+    batch_size = max(1, min(PARSE_BATCH_SIZE, len(paths) // (max_workers * 4) or 1))
+    for i in range(0, len(paths), batch_size):
+        yield paths[i : i + batch_size]
+
+
+def iter_loaded_files(
+    paths: Sequence[Path], base_dir: Path, max_workers: Optional[int] = None
+) -> Iterator[Tuple[Path, List[Document]]]:
+    """Yield ``(path, documents)`` for each file as soon as it has been loaded.
+
+    Every file goes to exactly one parser: handwritten images and PDFs are OCR'd
+    page by page through the concurrent OCR executor, while all other files are
+    parsed in batches in a process pool (inline for tiny inputs) at the same
+    time. Both sides keep only a bounded window of work in flight, so loaded
+    documents never pile up faster than the caller consumes them. Files whose
+    OCR failed are skipped with a warning rather than yielded.
+
+    Args:
+        paths: Knowledge-base files to load
+        base_dir: Knowledge-base root the paths live under
+        max_workers: Parser processes (defaults to config.loader_max_workers)
+    """
+    if max_workers is None:
+        max_workers = get_config().loader_max_workers
+    base_dir = Path(base_dir)
+    paths = [Path(path) for path in paths]
+    ocr_paths = [path for path in paths if _uses_ocr(path, base_dir)]
+    parse_paths = [str(path) for path in paths if not _uses_ocr(path, base_dir)]
+
+    parallel = max_workers > 1 and len(parse_paths) >= PARALLEL_PARSE_MIN_FILES
+    inline = iter(() if parallel else parse_paths)
+    batches = _parse_batches(parse_paths, max_workers) if parallel else iter(())
+    ocr_workers = max(1, get_ocr_executor().max_workers) if ocr_paths else 1
+
+    with ExitStack() as stack:
+        parse_pool = (
+            stack.enter_context(
+                ProcessPoolExecutor(max_workers=max_workers, mp_context=_process_context())
             )
-            try:
-                image_paths = convert_pdf_to_images(str(pdf_path), temp_dir)
-                for index, image_path in enumerate(sorted(image_paths), start=1):
-                    try:
-                        text = get_img_content(image_path)
-                    except Exception as exc:  # pragma: no cover - best effort logging
-                        text = f"Failed to transcribe PDF page image: {exc}"
-                    handwritten_docs.append(
-                        _create_handwritten_document(
-                            image_path=Path(image_path),
-                            handwritten_root=handwritten_root,
-                            relative_root=relative,
-                            page_number=index,
-                            content=text,
-                            source_type="handwritten_pdf_page",
-                            original_source=pdf_path,
-                        )
-                    )
-            finally:
-                shutil.rmtree(temp_dir, ignore_errors=True)
-
-    return handwritten_docs
+            if parallel
+            else None
+        )
+        ocr_pool = stack.enter_context(
+            ThreadPoolExecutor(max_workers=ocr_workers, thread_name_prefix="ocr")
+        )
+        ocr = _HandwrittenOcr(
+            ocr_paths, base_dir / HANDWRITTEN_FOLDER, ocr_pool, window=ocr_workers * 2
+        )
+        stack.callback(ocr.close)
+
+        parsing = set()
+        while True:
+            while parse_pool is not None and len(parsing) < max_workers * 2:
+                batch = next(batches, None)
+                if batch is None:
+                    break
+                parsing.add(parse_pool.submit(_parse_files, batch))
+            ocr.top_up()
+
+            path = next(inline, None)
+            if path is not None:
+                for parsed, docs in _parse_files([path]):
+                    yield Path(parsed), docs
+                yield from ocr.collect([future for future in ocr.pending if future.done()])
+                continue
+
+            if not parsing and not ocr.pending:
+                break
+            done, _ = wait(parsing | set(ocr.pending), return_when=FIRST_COMPLETED)
+            for future in done & parsing:
+                parsing.discard(future)
+                for parsed, docs in future.result():
+                    yield Path(parsed), docs
+            yield from ocr.collect([future for future in done if future in ocr.pending])
+        # PDFs without pages finish without ever reaching the pool
+        yield from ocr.collect(())
+
+
+def load_files(paths: Sequence[Path], base_dir: Path) -> List[Tuple[Path, List[Document]]]:
+    """Load the documents for a set of knowledge-base files, in input order.
+
+    Produces the same documents `load_docs` would for these files, so ingestion
+    can process only the files that changed. Files whose OCR failed are left out.
+    """
+    paths = [Path(path) for path in paths]
+    docs: Dict[Path, List[Document]] = dict(iter_loaded_files(paths, base_dir))
+    return [(path, docs[path]) for path in paths if path in docs]
+
+
+def load_file(path: Path, base_dir: Path) -> List[Document]:
+    """Load the documents for a single knowledge-base file (none if its OCR failed)."""
+    loaded = load_files([path], base_dir)
+    return loaded[0][1] if loaded else []
+
+
+def iter_docs(base_dir: str = None, max_workers: Optional[int] = None) -> Iterator[Document]:
+    """Yield documents from the knowledge base as files finish loading.
+
+    The tree is walked once and each file is dispatched to exactly one parser.
+
+    Args:
+        base_dir: Path to knowledge base directory (defaults to config.kb_path)
+        max_workers: Parser processes (defaults to config.loader_max_workers)
+    """
+    if base_dir is None:
+        base_dir = get_config().kb_path
+    base_path = Path(base_dir)
+
+    files = iter_knowledge_base_files(base_path)
+    for _, docs in iter_loaded_files(files, base_path, max_workers=max_workers):
+        yield from docs
 
 
 def load_docs(
@@ -177,66 +415,7 @@ def load_docs(
     Args:
         base_dir: Path to knowledge base directory (defaults to config.kb_path)
     """
-    if base_dir is None:
-        base_dir = get_config().kb_path
-    
-    base_path = Path(base_dir)
-    docs: List[Document] = []
-
-    # PDFs
-    loader = DirectoryLoader(
-        path=str(base_path),
-        glob="**/*.pdf",
-        loader_cls=PyMuPDFLoader,
-        show_progress=True,
-    )
-    docs.extend(loader.load())
-
-    # Text and Markdown
-    loader = DirectoryLoader(
-        path=str(base_path),
-        glob="**/*.txt",
-        loader_cls=TextLoader,
-        show_progress=True,
-    )
-    docs.extend(loader.load())
-    loader = DirectoryLoader(
-        path=str(base_path),
-        glob="**/*.md",
-        loader_cls=TextLoader,
-        show_progress=True,
-    )
-    docs.extend(loader.load())
-
-    # Word documents
-    loader = DirectoryLoader(
-        path=str(base_path),
-        glob="**/*.docx",
-        loader_cls=Docx2txtLoader,
-        show_progress=True,
-    )
-    docs.extend(loader.load())
-    loader = DirectoryLoader(
-        path=str(base_path),
-        glob="**/*.doc",
-        loader_cls=Docx2txtLoader,
-        show_progress=True,
-    )
-    docs.extend(loader.load())
-
-    # CSV files
-    loader = DirectoryLoader(
-        path=str(base_path),
-        glob="**/*.csv",
-        loader_cls=CSVLoader,
-        show_progress=True,
-    )
-    docs.extend(loader.load())
-
-    # Handwritten notes (images + embedded PDFs)
-    docs.extend(_load_handwritten_notes(base_path))
-
-    return docs
+    return list(iter_docs(base_dir))
 
 
 if __name__ == "__main__":
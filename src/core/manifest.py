@@ -0,0 +1,129 @@
+import hashlib
+import json
+import os
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Fixed namespace so the same chunk always maps to the same Qdrant point ID
+POINT_ID_NAMESPACE = uuid.UUID("6f1c3f0e-9a4b-5d52-8c1e-2b7f4e0a9d31")
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def chunk_point_id(relative_path: str, file_hash: str, chunk_index: int) -> str:
+    """Deterministic point ID for the `chunk_index`-th chunk of a file version."""
+    return str(uuid.uuid5(POINT_ID_NAMESPACE, f"{relative_path}:{file_hash}:{chunk_index}"))
+
+
+@dataclass
+class FileEntry:
+    sha256: str
+    size: int
+    mtime_ns: int
+    point_ids: List[str] = field(default_factory=list)
+
+
+@dataclass
+class IngestPlan:
+    added: List[str]
+    changed: List[str]
+    removed: List[str]
+    unchanged: List[str]
+    current: Dict[str, FileEntry]
+
+    @property
+    def to_load(self) -> List[str]:
+        return sorted(self.added + self.changed)
+
+
+class IngestManifest:
+    """Record of which file versions are in a collection and the points they produced.
+
+    Stored as JSON next to the vector store. A file whose size and mtime match its
+    entry is treated as unchanged without being re-hashed, so re-ingesting an
+    unchanged corpus is a directory scan.
+    """
+
+    VERSION = 1
+
+    def __init__(self, path: Path, files: Optional[Dict[str, FileEntry]] = None):
+        self.path = Path(path)
+        self.files: Dict[str, FileEntry] = files or {}
+
+    @classmethod
+    def load(cls, path: str | Path) -> "IngestManifest":
+        path = Path(path)
+        if not path.exists():
+            return cls(path)
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != cls.VERSION:
+            return cls(path)
+        files = {rel: FileEntry(**entry) for rel, entry in data.get("files", {}).items()}
+        return cls(path, files)
+
+    def save(self) -> None:
+        """Write atomically so an interrupted run never leaves a corrupt manifest."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "version": self.VERSION,
+                    "files": {rel: vars(entry) for rel, entry in sorted(self.files.items())},
+                },
+                f,
+                indent=1,
+            )
+        os.replace(tmp_path, self.path)
+
+    def plan(self, base_dir: Path, paths: List[Path], full_refresh: bool = False) -> IngestPlan:
+        """Compare files on disk with the manifest.
+
+        Args:
+            base_dir: Knowledge base root; manifest keys are relative to it
+            paths: Files currently on disk
+            full_refresh: Treat every file as changed
+        """
+        current: Dict[str, FileEntry] = {}
+        added, changed, unchanged = [], [], []
+
+        for path in paths:
+            rel = path.relative_to(base_dir).as_posix()
+            stat = path.stat()
+            known = self.files.get(rel)
+            if (
+                known is not None
+                and known.size == stat.st_size
+                and known.mtime_ns == stat.st_mtime_ns
+            ):
+                sha = known.sha256
+            else:
+                sha = file_sha256(path)
+            current[rel] = FileEntry(sha256=sha, size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+
+            if known is None:
+                added.append(rel)
+            elif full_refresh or known.sha256 != sha:
+                changed.append(rel)
+            else:
+                current[rel].point_ids = known.point_ids
+                unchanged.append(rel)
+
+        removed = sorted(set(self.files) - set(current))
+        return IngestPlan(added, changed, removed, unchanged, current)
+
+    def stale_point_ids(self, plan: IngestPlan) -> List[str]:
+        """Points belonging to file versions that were changed or removed."""
+        ids: List[str] = []
+        for rel in plan.changed + plan.removed:
+            ids.extend(self.files[rel].point_ids)
+        return ids
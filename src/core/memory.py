@@ -0,0 +1,130 @@
+from functools import lru_cache
+from typing import List
+
+from langchain_core.messages import BaseMessage, SystemMessage
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+
+from .admission import AdmissionRejected, get_admission_controller
+from .config import get_config
+from .history_store import get_history_store
+from .metrics import record_llm_usage, stage
+from .prompt import summary_prompt_template
+from .tokens import count_tokens, truncate_to_tokens
+
+SUMMARY_PREFIX = "Summary of the earlier conversation: "
+# Older messages folded into the summary per refresh, so one call stays small
+SUMMARY_MAX_BATCH_MESSAGES = 100
+
+_refreshing = set()
+
+
+def _recent_token_budget() -> int:
+    """Tokens left for verbatim messages once the summary's share is reserved.
+
+    The reservation is fixed rather than the current summary's size, so the
+    verbatim window does not shift when the summary grows.
+    """
+    config = get_config()
+    reserved = config.history_summary_max_tokens + count_tokens(SUMMARY_PREFIX)
+    return max(0, config.history_max_tokens - reserved)
+
+
+def format_chat_history(messages: List[BaseMessage]) -> str:
+    """Convert history messages into the plain-text block used by the prompts."""
+    return "\n".join(f"{msg.type.capitalize()}: {msg.content}" for msg in messages)
+
+
+@lru_cache(maxsize=1)
+def _summary_prompt() -> ChatPromptTemplate:
+    return ChatPromptTemplate.from_template(summary_prompt_template)
+
+
+async def aget_prompt_history(session_id: str) -> List[BaseMessage]:
+    """History to put in the prompt, never more than config.history_max_tokens.
+
+    In ``window`` mode this is the most recent messages that fit the budget. In
+    ``summary`` mode the stored rolling summary comes first, as a system
+    message, followed by every message it does not cover yet that fits the
+    budget. That includes messages which have left the verbatim window but
+    are still waiting for `arefresh_summary`, so no turn drops out of the
+    prompt between leaving the window and being summarized.
+    """
+    with stage("history_load"):
+        return await _aload_prompt_history(session_id)
+
+
+async def _aload_prompt_history(session_id: str) -> List[BaseMessage]:
+    config = get_config()
+    store = get_history_store()
+    if config.history_memory_mode != "summary":
+        return await store.aget_recent_messages(
+            session_id, config.history_max_messages, config.history_max_tokens
+        )
+
+    summary = await store.aget_summary(session_id)
+    budget = _recent_token_budget()
+    # No message count cap: unsummarized messages stay until the token budget is used up
+    rows = await store.aget_recent_rows(
+        session_id, budget + 1, budget, after_id=summary[1] if summary else None
+    )
+    messages = [message for _, message in rows]
+    if summary:
+        messages.insert(0, SystemMessage(content=SUMMARY_PREFIX + summary[0]))
+    return messages
+
+
+async def arefresh_summary(llm, session_id: str) -> None:
+    """Fold messages that have left the verbatim window into the rolling summary.
+
+    Meant to run as a background task after the response has been sent. Does
+    nothing outside ``summary`` mode, when nothing new has left the window, or
+    while another refresh for the session is running in this worker. The LLM
+    call takes an admission slot like a chat turn; if admission sheds it, the
+    messages are folded by a later refresh. Failures are logged and leave the
+    previous summary in place.
+    """
+    config = get_config()
+    if config.history_memory_mode != "summary" or session_id in _refreshing:
+        return
+    _refreshing.add(session_id)
+    try:
+        store = get_history_store()
+        summary = await store.aget_summary(session_id)
+        summary_text, summarized_up_to = summary if summary else ("", 0)
+        window = await store.aget_recent_rows(
+            session_id, config.history_max_messages, _recent_token_budget()
+        )
+        older = await store.aget_rows_between(
+            session_id,
+            after_id=summarized_up_to,
+            before_id=window[0][0] if window else None,
+            limit=SUMMARY_MAX_BATCH_MESSAGES,
+        )
+        if not older:
+            return
+
+        prompt_value = await _summary_prompt().ainvoke(
+            {
+                "summary": summary_text or "(none yet)",
+                "new_messages": format_chat_history([message for _, message in older]),
+                "max_words": config.history_summary_max_tokens * 3 // 4,
+            }
+        )
+        ticket = await get_admission_controller().acquire(session_id) if config.admission_enabled else None
+        try:
+            with stage("summary_refresh"):
+                message = await llm.ainvoke(prompt_value)
+        finally:
+            if ticket is not None:
+                ticket.release()
+        record_llm_usage("summary", prompt_value, message)
+        updated = StrOutputParser().invoke(message)
+        updated = truncate_to_tokens(updated.strip(), config.history_summary_max_tokens)
+        await store.aput_summary(session_id, updated, older[-1][0])
+    except AdmissionRejected as exc:
+        print(f"ℹ Conversation summary for session {session_id} deferred: {exc}")
+    except Exception as exc:
+        print(f"⚠ Failed to refresh conversation summary for session {session_id}: {exc}")
+    finally:
+        _refreshing.discard(session_id)
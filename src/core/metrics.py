@@ -0,0 +1,252 @@
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .config import get_config
+from .tokens import count_tokens
+
+# Seconds; spans cache hits (sub-millisecond) up to slow LLM calls
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+TOKEN_BUCKETS = (16, 64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    """Monotonic counter with optional labels, rendered in Prometheus text format."""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels, rendered in Prometheus text format."""
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: per-bucket counts (last slot is +Inf), sum
+        self._series: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._series.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[index] += 1
+            total[0] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, counts):
+                    cumulative += count
+                    le = _labels(self.labelnames, key, f'le="{bound}"')
+                    lines.append(f"{self.name}_bucket{le} {cumulative}")
+                cumulative += counts[-1]
+                le = _labels(self.labelnames, key, 'le="+Inf"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {total[0]}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class Gauge:
+    """Value read from a callback at scrape time, e.g. a cache hit rate.
+
+    The callback returns a number, or a dict mapping label values to numbers
+    when `labelname` is set. Failing callbacks are skipped. Totals that another
+    module already counts (such as the /…/stats counters) can be exposed with
+    ``kind="counter"``.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        callback: Callable[[], object],
+        labelname: Optional[str] = None,
+        kind: str = "gauge",
+    ):
+        self.name = name
+        self.help = help
+        self.callback = callback
+        self.labelname = labelname
+        self.kind = kind
+
+    def render(self) -> List[str]:
+        try:
+            value = self.callback()
+        except Exception:
+            return []
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        if isinstance(value, dict):
+            for label, number in sorted(value.items()):
+                lines.append(f"{self.name}{_labels((self.labelname,), (label,))} {float(number)}")
+        elif value is not None:
+            lines.append(f"{self.name} {float(value)}")
+        return lines
+
+
+_registry: List[object] = []
+_registry_lock = threading.Lock()
+
+
+def register(metric):
+    """Add a metric to the set rendered by `render`; returns it for assignment."""
+    with _registry_lock:
+        _registry.append(metric)
+    return metric
+
+
+def render() -> str:
+    """Every registered metric in the Prometheus text exposition format."""
+    with _registry_lock:
+        metrics = list(_registry)
+    lines: List[str] = []
+    for metric in metrics:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+REQUEST_SECONDS = register(
+    Histogram("rag_request_seconds", "End-to-end HTTP request latency.", ("method", "path", "status"))
+)
+STAGE_SECONDS = register(
+    Histogram("rag_stage_seconds", "Latency of each stage of a chat turn.", ("stage",))
+)
+INGEST_STAGE_SECONDS = register(
+    Histogram("rag_ingest_stage_seconds", "Latency of each ingestion stage per batch or file.", ("stage",))
+)
+ADMISSION_WAIT_SECONDS = register(
+    Histogram("rag_admission_wait_seconds", "Time admitted chat turns waited for their session and an LLM slot.")
+)
+LLM_TOKENS = register(
+    Histogram(
+        "rag_llm_tokens",
+        "Prompt and completion tokens per LLM call.",
+        ("call", "kind"),
+        buckets=TOKEN_BUCKETS,
+    )
+)
+LLM_TOKENS_TOTAL = register(
+    Counter("rag_llm_tokens_total", "Prompt and completion tokens sent to and received from the LLM.", ("call", "kind"))
+)
+
+# Per-request breakdown: stage -> seconds, shared by the tasks and threads of one request
+_breakdown: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar(
+    "rag_stage_breakdown", default=None
+)
+
+
+def start_request() -> Dict[str, float]:
+    """Begin collecting a stage breakdown for the current request; returns it."""
+    breakdown: Dict[str, float] = {}
+    _breakdown.set(breakdown)
+    return breakdown
+
+
+def record_stage(stage: str, seconds: float) -> None:
+    """Observe a chat-turn stage and add it to the current request's breakdown."""
+    if not get_config().metrics_enabled:
+        return
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    breakdown = _breakdown.get()
+    if breakdown is not None:
+        breakdown[stage] = breakdown.get(stage, 0.0) + seconds
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time the enclosed block as chat-turn stage `name` (works in sync and async code)."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - started)
+
+
+@contextmanager
+def ingest_stage(name: str, totals: Optional[Dict[str, float]] = None) -> Iterator[None]:
+    """Time the enclosed block as ingestion stage `name`, also adding it to `totals`."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - started
+        if totals is not None:
+            totals[name] = totals.get(name, 0.0) + seconds
+        if get_config().metrics_enabled:
+            INGEST_STAGE_SECONDS.observe(seconds, stage=name)
+
+
+def record_llm_tokens(call: str, prompt_tokens: int, completion_tokens: int) -> None:
+    """Count the tokens of one LLM call (`call` is e.g. "rag", "smalltalk" or "summary")."""
+    if not get_config().metrics_enabled:
+        return
+    for kind, tokens in (("prompt", prompt_tokens), ("completion", completion_tokens)):
+        LLM_TOKENS.observe(tokens, call=call, kind=kind)
+        LLM_TOKENS_TOTAL.inc(tokens, call=call, kind=kind)
+
+
+def record_llm_usage(call: str, prompt_value, message) -> Tuple[int, int]:
+    """Count the tokens of an LLM call from its prompt value and response message.
+
+    Uses the provider's ``usage_metadata`` when the response carries it and
+    falls back to counting the prompt and response text locally. Returns
+    ``(prompt_tokens, completion_tokens)``.
+    """
+    usage = getattr(message, "usage_metadata", None)
+    if usage:
+        tokens = (usage.get("input_tokens", 0), usage.get("output_tokens", 0))
+    else:
+        content = message.content if isinstance(message.content, str) else str(message.content)
+        tokens = (count_tokens(prompt_value.to_string()), count_tokens(content))
+    record_llm_tokens(call, *tokens)
+    return tokens
+
+
+def server_timing(breakdown: Dict[str, float], total_seconds: float) -> str:
+    """A ``Server-Timing`` header value with each stage and the total in milliseconds."""
+    entries = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in breakdown.items()]
+    entries.append(f"total;dur={total_seconds * 1000:.1f}")
+    return ", ".join(entries)
@@ -0,0 +1,439 @@
+import heapq
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from uuid import uuid4
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+
+from .config import get_config
+
+# How often a reader checks whether an ingest run changed the index on disk
+RELOAD_CHECK_SECONDS = 5.0
+# Rows scored per matrix product, so float16 vectors are upcast a block at a time
+SCORE_BLOCK_ROWS = 65536
+MIN_CAPACITY = 1024
+# Stay below SQLite's host-parameter limit in IN (...) queries
+_SQL_BATCH = 500
+
+
+def _batched(items: Sequence, size: int = _SQL_BATCH) -> Iterator[Sequence]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class NumpyVectorIndex:
+    """Normalized vectors in a memory-mapped ``.npy`` file, payloads in SQLite.
+
+    Each point occupies one row ("slot") of the vector file; the SQLite table
+    maps point IDs to slots and holds the chunk text and metadata. Search is a
+    brute-force dot product over the memory-mapped matrix, so only the pages
+    actually touched stay resident and there is no index to build. Slots of
+    deleted points are reused by later upserts. Like the lexical index, a
+    version counter lets API workers pick up changes made by an ingest process.
+
+    Args:
+        path: Directory holding ``vectors.npy`` and ``payloads.db``
+        collection_name: Collection the points belong to (set on returned documents)
+        dtype: "float32" or "float16" for newly created vector files
+            (defaults to config.numpy_vector_dtype)
+    """
+
+    def __init__(self, path: str | Path, collection_name: str, dtype: Optional[str] = None):
+        self.path = Path(path)
+        self.collection_name = collection_name
+        self.dtype = np.dtype(dtype or get_config().numpy_vector_dtype)
+        self._vectors_path = self.path / "vectors.npy"
+        self._lock = threading.Lock()
+
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path / "payloads.db"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS points ("
+            " slot INTEGER PRIMARY KEY,"
+            " point_id TEXT NOT NULL UNIQUE,"
+            " text TEXT NOT NULL,"
+            " metadata TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER)")
+        self._conn.commit()
+
+        self._loaded_version: Optional[int] = None
+        self._checked_at = 0.0
+        self._vectors: Optional[np.ndarray] = None
+        self._alive = np.zeros(0, dtype=bool)
+        # Writer-side point ID -> slot map and free slots, so upserts need not scan the table
+        self._slots_by_id: Optional[Dict[str, int]] = None
+        self._free_slots: List[int] = []
+        self._next_slot = 0
+        self._slots_version: Optional[int] = None
+
+    # -- writing (ingestion) --
+
+    def _slot_map(self) -> Dict[str, int]:
+        """Point ID -> slot, read from SQLite once and again only if another process wrote.
+
+        Call with the lock held.
+        """
+        version = self._version()
+        if self._slots_by_id is None or version != self._slots_version:
+            self._slots_by_id = dict(self._conn.execute("SELECT point_id, slot FROM points"))
+            used = set(self._slots_by_id.values())
+            self._next_slot = max(used, default=-1) + 1
+            self._free_slots = sorted(set(range(self._next_slot)) - used)
+            self._slots_version = version
+        return self._slots_by_id
+
+    def _commit_write(self) -> None:
+        self._bump_version()
+        self._conn.commit()
+        self._slots_version = self._version()
+
+    def _bump_version(self) -> None:
+        self._conn.execute(
+            "INSERT INTO meta (key, value) VALUES ('version', 1) "
+            "ON CONFLICT(key) DO UPDATE SET value = value + 1"
+        )
+
+    def _writable(self, rows: int, dim: int) -> np.ndarray:
+        """The vector file opened for writing, created or grown to hold `rows` rows."""
+        if not self._vectors_path.exists():
+            return np.lib.format.open_memmap(
+                self._vectors_path, mode="w+", dtype=self.dtype, shape=(max(rows, MIN_CAPACITY), dim)
+            )
+        vectors = np.load(self._vectors_path, mmap_mode="r+")
+        if vectors.shape[1] != dim:
+            raise ValueError(
+                f"Vector dimension {dim} does not match the index ({vectors.shape[1]}); "
+                f"re-ingest with full_refresh=True"
+            )
+        if vectors.shape[0] >= rows:
+            return vectors
+        # Grow into a new file and swap it in; readers keep their old mapping until they reload
+        grown_path = self._vectors_path.with_suffix(".grow.npy")
+        grown = np.lib.format.open_memmap(
+            grown_path, mode="w+", dtype=vectors.dtype, shape=(max(rows, 2 * vectors.shape[0]), dim)
+        )
+        grown[: vectors.shape[0]] = vectors
+        grown.flush()
+        del vectors
+        os.replace(grown_path, self._vectors_path)
+        return grown
+
+    def upsert(self, point_ids: Sequence[str], vectors: Sequence[Sequence[float]], chunks: Sequence[Document]) -> None:
+        """Store chunks and their vectors under point IDs, replacing existing entries."""
+        if not point_ids:
+            return
+        point_ids = [str(point_id) for point_id in point_ids]
+        matrix = np.asarray(vectors, dtype=np.float32)
+        matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+
+        with self._lock:
+            slots_by_id = self._slot_map()
+            free, next_slot = list(self._free_slots), self._next_slot
+            assigned: Dict[str, int] = {}
+            slots = []
+            for point_id in point_ids:
+                slot = slots_by_id.get(point_id, assigned.get(point_id))
+                if slot is None:
+                    if free:
+                        slot = heapq.heappop(free)
+                    else:
+                        slot, next_slot = next_slot, next_slot + 1
+                    assigned[point_id] = slot
+                slots.append(slot)
+
+            target = self._writable(max(slots) + 1, matrix.shape[1])
+            target[slots] = matrix.astype(target.dtype)
+            target.flush()
+            del target
+
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO points (slot, point_id, text, metadata) VALUES (?, ?, ?, ?)",
+                [
+                    (slot, point_id, chunk.page_content, json.dumps(chunk.metadata, default=str))
+                    for slot, point_id, chunk in zip(slots, point_ids, chunks)
+                ],
+            )
+            self._commit_write()
+            slots_by_id.update(assigned)
+            self._free_slots, self._next_slot = free, next_slot
+
+    def delete(self, point_ids: Iterable[str]) -> None:
+        ids = [(str(point_id),) for point_id in point_ids]
+        if not ids:
+            return
+        with self._lock:
+            slots_by_id = self._slot_map()
+            self._conn.executemany("DELETE FROM points WHERE point_id = ?", ids)
+            self._commit_write()
+            for (point_id,) in ids:
+                slot = slots_by_id.pop(point_id, None)
+                if slot is not None:
+                    heapq.heappush(self._free_slots, slot)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM points")
+            self._vectors = None
+            self._vectors_path.unlink(missing_ok=True)
+            self._commit_write()
+            self._slots_by_id, self._free_slots, self._next_slot = {}, [], 0
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM points").fetchone()[0]
+
+    def iter_batches(self, batch_size: int = 256) -> Iterator[Tuple[List[str], List[Document]]]:
+        """Stored (point IDs, chunks) in batches, e.g. to rebuild the lexical index."""
+        last_slot = -1
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT slot, point_id, text, metadata FROM points WHERE slot > ? ORDER BY slot LIMIT ?",
+                    (last_slot, batch_size),
+                ).fetchall()
+            if not rows:
+                return
+            last_slot = rows[-1][0]
+            yield (
+                [point_id for _, point_id, _, _ in rows],
+                [Document(page_content=text, metadata=json.loads(metadata)) for _, _, text, metadata in rows],
+            )
+
+    # -- reading (queries) --
+
+    def _version(self) -> int:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        return row[0] if row else 0
+
+    def load(self) -> None:
+        """Map the vector file and the live slots, reloading only if the index changed on disk."""
+        with self._lock:
+            version = self._version()
+            self._checked_at = time.monotonic()
+            if version == self._loaded_version:
+                return
+            slots = np.fromiter(
+                (slot for (slot,) in self._conn.execute("SELECT slot FROM points")), dtype=np.int64
+            )
+            if slots.size and self._vectors_path.exists():
+                self._vectors = np.load(self._vectors_path, mmap_mode="r")
+                self._alive = np.zeros(int(slots.max()) + 1, dtype=bool)
+                self._alive[slots] = True
+            else:
+                self._vectors = None
+                self._alive = np.zeros(0, dtype=bool)
+            self._loaded_version = version
+
+    def _ensure_loaded(self) -> None:
+        if (
+            self._loaded_version is None
+            or time.monotonic() - self._checked_at >= RELOAD_CHECK_SECONDS
+        ):
+            self.load()
+
+    def _filter_mask(self, filter: Dict[str, Any], rows: int) -> np.ndarray:
+        """Slots whose metadata matches every field of `filter` (a value or a list of values)."""
+        clauses, params = [], []
+        for field, values in filter.items():
+            values = list(values) if isinstance(values, (list, tuple, set)) else [values]
+            clauses.append(f"json_extract(metadata, ?) IN ({','.join('?' * len(values))})")
+            params.extend([f'$."{field}"', *values])
+        with self._lock:
+            slots = [
+                slot
+                for (slot,) in self._conn.execute(
+                    f"SELECT slot FROM points WHERE {' AND '.join(clauses)}", params
+                )
+                if slot < rows
+            ]
+        mask = np.zeros(rows, dtype=bool)
+        mask[slots] = True
+        return mask
+
+    def search(
+        self,
+        vector: Sequence[float],
+        k: int,
+        filter: Optional[Dict[str, Any]] = None,
+        score_threshold: Optional[float] = None,
+    ) -> List[Tuple[Document, float]]:
+        """Top `k` chunks by cosine similarity to `vector`, best first.
+
+        Args:
+            vector: Query embedding
+            k: Number of results to return
+            filter: Metadata values to match, e.g. ``{"doc_type": ["pdf", "docx"]}``
+            score_threshold: Minimum cosine similarity of returned chunks
+        """
+        self._ensure_loaded()
+        vectors, alive = self._vectors, self._alive
+        if vectors is None:
+            return []
+        # A mapping older than the slot list may be shorter; never score rows it lacks
+        rows = min(alive.size, vectors.shape[0])
+        alive = alive[:rows]
+        if not rows:
+            return []
+
+        query = np.asarray(vector, dtype=np.float32)
+        query /= max(float(np.linalg.norm(query)), 1e-12)
+        scores = np.empty(rows, dtype=np.float32)
+        for start in range(0, rows, SCORE_BLOCK_ROWS):
+            block = vectors[start:min(start + SCORE_BLOCK_ROWS, rows)]
+            scores[start:start + len(block)] = block.astype(np.float32, copy=False) @ query
+
+        mask = alive if filter is None else alive & self._filter_mask(filter, rows)
+        if score_threshold is not None:
+            mask = mask & (scores >= score_threshold)
+        candidates = np.flatnonzero(mask)
+        if not candidates.size or k <= 0:
+            return []
+        if candidates.size > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        top = candidates[np.argsort(-scores[candidates])]
+
+        with self._lock:
+            payloads = {
+                slot: (point_id, text, metadata)
+                for slot, point_id, text, metadata in self._conn.execute(
+                    f"SELECT slot, point_id, text, metadata FROM points WHERE slot IN ({','.join('?' * len(top))})",
+                    [int(slot) for slot in top],
+                )
+            }
+        results = []
+        for slot in top:
+            if int(slot) not in payloads:  # deleted since the slots were loaded
+                continue
+            point_id, text, metadata = payloads[int(slot)]
+            metadata = {
+                **json.loads(metadata),
+                "_id": point_id,
+                "_collection_name": self.collection_name,
+            }
+            results.append((Document(page_content=text, metadata=metadata), float(scores[slot])))
+        return results
+
+
+class NumpyVectorStore(VectorStore):
+    """LangChain vectorstore over a `NumpyVectorIndex`, usable wherever the Qdrant one is.
+
+    Extra search keyword arguments meant for Qdrant (such as ``search_params``)
+    are accepted and ignored.
+
+    Args:
+        index: Index holding the vectors and payloads
+        embedding: Embeddings used for queries and added texts
+    """
+
+    def __init__(self, index: NumpyVectorIndex, embedding):
+        self.index = index
+        self._embeddings = embedding
+
+    @property
+    def embeddings(self):
+        return self._embeddings
+
+    @property
+    def collection_name(self) -> str:
+        return self.index.collection_name
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[Sequence[str]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        texts = list(texts)
+        metadatas = metadatas or [{} for _ in texts]
+        ids = [str(point_id) for point_id in ids] if ids else [str(uuid4()) for _ in texts]
+        self.index.upsert(
+            ids,
+            self._embeddings.embed_documents(texts),
+            [Document(page_content=text, metadata=metadata) for text, metadata in zip(texts, metadatas)],
+        )
+        return ids
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        self.index.delete(ids or [])
+        return True
+
+    def similarity_search_with_score(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None,
+        score_threshold: Optional[float] = None,
+        **kwargs: Any,
+    ) -> List[Tuple[Document, float]]:
+        return self.index.search(self._embeddings.embed_query(query), k, filter, score_threshold)
+
+    def similarity_search(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None,
+        score_threshold: Optional[float] = None,
+        **kwargs: Any,
+    ) -> List[Document]:
+        return [
+            doc for doc, _ in self.similarity_search_with_score(query, k, filter, score_threshold)
+        ]
+
+    def similarity_search_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None,
+        score_threshold: Optional[float] = None,
+        **kwargs: Any,
+    ) -> List[Document]:
+        return [doc for doc, _ in self.index.search(embedding, k, filter, score_threshold)]
+
+    def _select_relevance_score_fn(self):
+        # Scores are cosine similarities of normalized vectors
+        return lambda score: score
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding,
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[Sequence[str]] = None,
+        collection_name: Optional[str] = None,
+        **kwargs: Any,
+    ) -> "NumpyVectorStore":
+        store = cls(get_numpy_index(collection_name), embedding)
+        store.add_texts(texts, metadatas, ids)
+        return store
+
+
+def get_numpy_index_path(collection_name: str) -> Path:
+    """Location of the numpy vector index for a collection, next to its ingest manifest."""
+    return get_config().ingest_manifest_dir / f"{collection_name}.vectors"
+
+
+_indexes: Dict[str, NumpyVectorIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_numpy_index(collection_name: Optional[str] = None) -> NumpyVectorIndex:
+    """Get or open the shared numpy vector index for a collection."""
+    if collection_name is None:
+        collection_name = get_config().qdrant_collection
+    with _indexes_lock:
+        if collection_name not in _indexes:
+            _indexes[collection_name] = NumpyVectorIndex(
+                get_numpy_index_path(collection_name), collection_name
+            )
+        return _indexes[collection_name]
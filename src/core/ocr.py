@@ -0,0 +1,182 @@
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Sequence, Union
+
+from azure.ai.vision.imageanalysis import ImageAnalysisClient
+from azure.ai.vision.imageanalysis.models import VisualFeatures
+from azure.core.credentials import AzureKeyCredential
+from azure.core.exceptions import HttpResponseError, ServiceRequestError
+from dotenv import load_dotenv
+
+from .config import get_config
+from .ocr_cache import OcrCache, get_ocr_cache
+
+load_dotenv()
+
+NO_TEXT_MESSAGE = "No textual content could be extracted from this image."
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+MAX_BACKOFF_SECONDS = 60.0
+
+_client: Optional[ImageAnalysisClient] = None
+_client_lock = threading.Lock()
+
+
+def get_ocr_client() -> ImageAnalysisClient:
+    """Return the process-wide Azure Vision client, creating it on first use."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            config = get_config()
+            _client = ImageAnalysisClient(
+                endpoint=os.getenv('VISION_ENDPOINT') or config.azure_vision_endpoint,
+                credential=AzureKeyCredential(os.getenv('VISION_KEY') or config.azure_vision_key),
+            )
+        return _client
+
+
+def _retry_after_seconds(exc: Exception) -> Optional[float]:
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    value = headers.get("Retry-After") or headers.get("retry-after")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _is_retryable(exc: Exception) -> bool:
+    if isinstance(exc, ServiceRequestError):
+        return True
+    return isinstance(exc, HttpResponseError) and exc.status_code in RETRYABLE_STATUS_CODES
+
+
+class OcrExecutor:
+    """Runs OCR over many images with bounded concurrency and one shared client.
+
+    Throttled (429) and transient 5xx responses are retried with exponential
+    backoff and jitter, honouring ``Retry-After`` when the service sends it.
+    `map` returns results in input order so page numbering is unaffected by
+    completion order. Results are looked up in the content-addressed OCR cache
+    before the service is called.
+
+    Args:
+        client: Object with an ``analyze(image_data=..., visual_features=...)``
+            method (defaults to the shared Azure Vision client)
+        max_workers: Parallel OCR requests (defaults to config.ocr_max_workers)
+        max_retries: Retries per image (defaults to config.ocr_max_retries)
+        backoff_seconds: Base backoff delay (defaults to config.ocr_backoff_seconds)
+        cache: OCR result cache (defaults to the shared cache when
+            config.ocr_cache_enabled is set)
+    """
+
+    def __init__(
+        self,
+        client=None,
+        max_workers: Optional[int] = None,
+        max_retries: Optional[int] = None,
+        backoff_seconds: Optional[float] = None,
+        cache: Optional[OcrCache] = None,
+    ):
+        config = get_config()
+        self._client = client
+        self.cache = cache if cache is not None else get_ocr_cache()
+        self._counters = {"service_calls": 0, "retries": 0}
+        self._counters_lock = threading.Lock()
+        self.max_workers = max_workers if max_workers is not None else config.ocr_max_workers
+        self.max_retries = max_retries if max_retries is not None else config.ocr_max_retries
+        self.backoff_seconds = (
+            backoff_seconds if backoff_seconds is not None else config.ocr_backoff_seconds
+        )
+        self.visual_features = [VisualFeatures(name) for name in config.ocr_visual_features]
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = get_ocr_client()
+        return self._client
+
+    def extract_text(self, image_path: str) -> str:
+        """OCR a single image, retrying throttled and transient failures."""
+        with open(image_path, "rb") as f:
+            image_data = f.read()
+        return self.extract_text_from_bytes(image_data)
+
+    def stats(self) -> dict:
+        """Service calls and retries made by this executor."""
+        with self._counters_lock:
+            return dict(self._counters)
+
+    def extract_text_from_bytes(self, image_data: bytes) -> str:
+        key = self.cache.make_key(image_data) if self.cache is not None else None
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        text = self._analyze(image_data)
+        if key is not None:
+            self.cache.put(key, text)
+        return text
+
+    def _analyze(self, image_data: bytes) -> str:
+        attempt = 0
+        while True:
+            try:
+                with self._counters_lock:
+                    self._counters["service_calls"] += 1
+                result = self.client.analyze(
+                    image_data=image_data, visual_features=self.visual_features
+                )
+                break
+            except Exception as exc:
+                if attempt >= self.max_retries or not _is_retryable(exc):
+                    raise
+                delay = _retry_after_seconds(exc)
+                if delay is None:
+                    delay = self.backoff_seconds * (2 ** attempt) * random.uniform(0.5, 1.5)
+                time.sleep(min(delay, MAX_BACKOFF_SECONDS))
+                attempt += 1
+                with self._counters_lock:
+                    self._counters["retries"] += 1
+
+        if result.read and result.read.blocks:
+            return "\n".join(
+                [line.text for block in result.read.blocks for line in block.lines]
+            )
+        return NO_TEXT_MESSAGE
+
+    def map(self, image_paths: Sequence[str]) -> List[Union[str, Exception]]:
+        """OCR images concurrently; each slot holds the text or the raised exception."""
+        if not image_paths:
+            return []
+
+        def run(path: str) -> Union[str, Exception]:
+            try:
+                return self.extract_text(str(path))
+            except Exception as exc:  # pragma: no cover - reported per image by callers
+                return exc
+
+        workers = max(1, min(self.max_workers, len(image_paths)))
+        if workers == 1:
+            return [run(path) for path in image_paths]
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ocr") as pool:
+            return list(pool.map(run, image_paths))
+
+
+_executor: Optional[OcrExecutor] = None
+
+
+def get_ocr_executor() -> OcrExecutor:
+    """Get or create the shared OCR executor."""
+    global _executor
+    if _executor is None:
+        _executor = OcrExecutor()
+    return _executor
+
+
+def get_img_content(img_path: str) -> str:
+    """Send an image to Azure and return the extracted text."""
+    return get_ocr_executor().extract_text(img_path)
@@ -0,0 +1,146 @@
+import argparse
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from .config import get_config
+
+# Bump when the text post-processing changes so old results are ignored
+OCR_SETTINGS_VERSION = "azure-vision:v1"
+
+
+def ocr_settings(config) -> str:
+    """Describe the configured OCR model and features for the cache key."""
+    features = ",".join(sorted(config.ocr_visual_features))
+    return f"{OCR_SETTINGS_VERSION}|model={config.ocr_model_name}|features={features}"
+
+
+class OcrCache:
+    """Content-addressed store of OCR results.
+
+    Keys are the SHA-256 of the image bytes plus the OCR model/feature settings,
+    so a renamed or re-rendered but identical image is a hit while a settings
+    change never serves stale text.
+    """
+
+    def __init__(self, path: str | Path, settings: Optional[str] = None):
+        self.path = Path(path)
+        self.settings = settings if settings is not None else ocr_settings(get_config())
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "writes": 0}
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS ocr_results ("
+            " key TEXT PRIMARY KEY,"
+            " text TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def make_key(self, image_data: bytes) -> str:
+        digest = hashlib.sha256(image_data)
+        digest.update(b"\x00" + self.settings.encode("utf-8"))
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT text FROM ocr_results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self._counters["misses"] += 1
+                return None
+            self._counters["hits"] += 1
+            self._conn.execute(
+                "UPDATE ocr_results SET last_access = ? WHERE key = ?", (time.time(), key)
+            )
+            self._conn.commit()
+            return row[0]
+
+    def put(self, key: str, text: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO ocr_results (key, text, created_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, text, now, now),
+            )
+            self._conn.commit()
+            self._counters["writes"] += 1
+
+    def stats(self) -> dict:
+        """Session hit/miss counters plus entry count and stored text size."""
+        with self._lock:
+            entries, text_bytes = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(CAST(text AS BLOB))), 0) FROM ocr_results"
+            ).fetchone()
+            return {
+                **self._counters,
+                "entries": entries,
+                "text_bytes": text_bytes,
+                "path": str(self.path),
+            }
+
+    def purge(self, older_than_days: Optional[float] = None) -> int:
+        """Delete cached results, optionally only those not used for `older_than_days`."""
+        with self._lock:
+            if older_than_days is None:
+                cursor = self._conn.execute("DELETE FROM ocr_results")
+            else:
+                cutoff = time.time() - older_than_days * 86400
+                cursor = self._conn.execute(
+                    "DELETE FROM ocr_results WHERE last_access < ?", (cutoff,)
+                )
+            self._conn.commit()
+            self._conn.execute("VACUUM")
+            return cursor.rowcount
+
+
+_CACHE: Optional[OcrCache] = None
+
+
+def get_ocr_cache() -> Optional[OcrCache]:
+    """Get the shared OCR cache, or None when caching is disabled."""
+    global _CACHE
+    config = get_config()
+    if not config.ocr_cache_enabled:
+        return None
+    settings = ocr_settings(config)
+    if _CACHE is None:
+        _CACHE = OcrCache(config.ocr_cache_path, settings=settings)
+    else:
+        # Follow runtime changes to the OCR model or features
+        _CACHE.settings = settings
+    return _CACHE
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Inspect or purge the OCR result cache.")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    subcommands.add_parser("stats", help="Show entry count and size")
+    purge = subcommands.add_parser("purge", help="Delete cached OCR results")
+    purge.add_argument(
+        "--older-than-days",
+        type=float,
+        default=None,
+        help="Only delete entries not used in this many days",
+    )
+    args = parser.parse_args()
+
+    cache = OcrCache(get_config().ocr_cache_path)
+    if args.command == "stats":
+        print(json.dumps(cache.stats(), indent=2))
+    else:
+        removed = cache.purge(older_than_days=args.older_than_days)
+        print(f"✓ Removed {removed} cached OCR results from {cache.path}")
+
+
+if __name__ == "__main__":
+    main()
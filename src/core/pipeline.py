@@ -0,0 +1,262 @@
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from .config import get_config
+from .embedding_scheduler import EmbeddingScheduler
+from .embeddings import ensure_collection, upsert_chunks
+from .lexical_index import LexicalIndex
+from .loader import iter_loaded_files
+from .manifest import IngestPlan, chunk_point_id
+from .metrics import ingest_stage
+from .numpy_store import NumpyVectorIndex
+from .splitter import split_documents
+
+_DONE = object()
+_PUT_TIMEOUT_SECONDS = 0.5
+
+
+@dataclass
+class PipelineStats:
+    files: int = 0
+    # Files left out because they could not be loaded (e.g. OCR failed); retried next run
+    files_skipped: int = 0
+    documents: int = 0
+    chunks: int = 0
+    batches: int = 0
+    embedding_requests: int = 0
+    embedding_retries: int = 0
+    embeddings_per_second: float = 0.0
+    first_upsert_seconds: Optional[float] = None
+    elapsed_seconds: float = 0.0
+    # Busy time per stage (load, split, embed, upsert, lexical), summed over files/batches
+    stage_seconds: Dict[str, float] = field(default_factory=dict)
+
+
+class IngestPipeline:
+    """Streaming load → split → embed → upsert ingestion.
+
+    Loading and splitting run in their own threads and hand work to the next
+    stage through bounded queues, so a slow embedding stage applies
+    backpressure instead of letting parsed documents accumulate. Chunks are
+    embedded and upserted in fixed-size batches, which makes them searchable
+    while the rest of the corpus is still being processed. Memory use depends on
+    the queue and batch sizes, not on corpus size. Each batch is handed to an
+    `EmbeddingScheduler`, which splits it into token-bounded requests and sends
+    them concurrently.
+
+    Args:
+        base_dir: Knowledge base root
+        collection_name: Target Qdrant collection
+        client: Qdrant client (unused when `vector_index` is given)
+        embeddings: Embeddings used for the chunks
+        chunk_size: Size of document chunks
+        chunk_overlap: Overlap between chunks
+        batch_size: Chunks per embed/upsert batch (defaults to config.ingest_batch_size)
+        queue_size: Capacity of each inter-stage queue (defaults to config.ingest_queue_size)
+        lexical_index: BM25 index that receives every upserted batch (optional)
+        vector_index: Numpy index to write vectors to instead of Qdrant (optional)
+    """
+
+    def __init__(
+        self,
+        base_dir: Path,
+        collection_name: str,
+        client,
+        embeddings,
+        chunk_size: int,
+        chunk_overlap: int,
+        batch_size: Optional[int] = None,
+        queue_size: Optional[int] = None,
+        lexical_index: Optional[LexicalIndex] = None,
+        vector_index: Optional[NumpyVectorIndex] = None,
+    ):
+        config = get_config()
+        self.base_dir = Path(base_dir)
+        self.collection_name = collection_name
+        self.client = client
+        self.embeddings = embeddings
+        self.scheduler = EmbeddingScheduler(embeddings)
+        self.lexical_index = lexical_index
+        self.vector_index = vector_index
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.batch_size = batch_size or config.ingest_batch_size
+        self.queue_size = queue_size or config.ingest_queue_size
+        self._stop = threading.Event()
+        self._errors: List[BaseException] = []
+        self._collection_ready = False
+
+    def run(self, plan: IngestPlan, on_file_done: Callable[[str], None]) -> PipelineStats:
+        """Ingest the files the plan marks as new or changed.
+
+        Point IDs are written into ``plan.current[rel].point_ids`` and
+        `on_file_done` is called once every chunk of a file has been upserted,
+        so callers can checkpoint progress.
+        """
+        stats = PipelineStats(files=len(plan.to_load))
+        started = time.perf_counter()
+        loaded_q: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        split_q: queue.Queue = queue.Queue(maxsize=self.queue_size)
+
+        workers = [
+            threading.Thread(
+                target=self._guard,
+                args=(self._load_stage, loaded_q, plan, stats),
+                name="ingest-load",
+                daemon=True,
+            ),
+            threading.Thread(
+                target=self._guard,
+                args=(self._split_stage, split_q, plan, loaded_q, stats),
+                name="ingest-split",
+                daemon=True,
+            ),
+        ]
+        for worker in workers:
+            worker.start()
+
+        try:
+            self._upsert_stage(split_q, on_file_done, stats, started)
+        except BaseException as exc:
+            self._errors.append(exc)
+        finally:
+            self._stop.set()
+            for worker in workers:
+                worker.join()
+
+        embed_stats = self.scheduler.stats()
+        stats.embedding_requests = embed_stats["batches"]
+        stats.embedding_retries = embed_stats["retries"]
+        stats.embeddings_per_second = embed_stats["embeddings_per_second"]
+        if self._errors:
+            raise self._errors[0]
+        stats.elapsed_seconds = time.perf_counter() - started
+        return stats
+
+    def _guard(self, stage, out_q: queue.Queue, *args) -> None:
+        """Run a stage thread, recording its failure and stopping the pipeline.
+
+        The end-of-stream marker is always sent to `out_q` so the next stage exits.
+        """
+        try:
+            stage(*args, out_q)
+        except BaseException as exc:
+            self._errors.append(exc)
+            self._stop.set()
+        finally:
+            self._put(out_q, _DONE, force=True)
+
+    def _put(self, out_q: queue.Queue, item, force: bool = False) -> bool:
+        """Blocking put that gives up once the pipeline is stopping."""
+        while force or not self._stop.is_set():
+            try:
+                out_q.put(item, timeout=_PUT_TIMEOUT_SECONDS)
+                return True
+            except queue.Full:
+                if force and self._stop.is_set():
+                    return False
+        return False
+
+    def _get(self, in_q: queue.Queue):
+        while True:
+            try:
+                return in_q.get(timeout=_PUT_TIMEOUT_SECONDS)
+            except queue.Empty:
+                if self._stop.is_set():
+                    return _DONE
+
+    def _load_stage(self, plan: IngestPlan, stats: PipelineStats, out_q: queue.Queue) -> None:
+        paths = [self.base_dir / rel for rel in plan.to_load]
+        loaded = iter_loaded_files(paths, self.base_dir)
+        yielded = 0
+        while True:
+            with ingest_stage("load", stats.stage_seconds):
+                item = next(loaded, None)
+            if item is None:
+                stats.files_skipped = len(paths) - yielded
+                return
+            yielded += 1
+            path, docs = item
+            rel = path.relative_to(self.base_dir).as_posix()
+            if not self._put(out_q, (rel, docs)):
+                return
+
+    def _split_stage(
+        self, plan: IngestPlan, in_q: queue.Queue, stats: PipelineStats, out_q: queue.Queue
+    ) -> None:
+        while True:
+            item = self._get(in_q)
+            if item is _DONE:
+                return
+            rel, docs = item
+            with ingest_stage("split", stats.stage_seconds):
+                chunks = split_documents(
+                    docs, chunk_size=self.chunk_size, chunk_overlap=self.chunk_overlap
+                )
+            entry = plan.current[rel]
+            entry.point_ids = [
+                chunk_point_id(rel, entry.sha256, index) for index in range(len(chunks))
+            ]
+            stats.documents += len(docs)
+            if not self._put(out_q, (rel, chunks, entry.point_ids)):
+                return
+
+    def _upsert_stage(
+        self,
+        in_q: queue.Queue,
+        on_file_done: Callable[[str], None],
+        stats: PipelineStats,
+        started: float,
+    ) -> None:
+        batch: List[tuple] = []  # (rel, chunk, point_id)
+        remaining: Dict[str, int] = {}
+
+        def flush() -> None:
+            if not batch:
+                return
+            chunks = [chunk for _, chunk, _ in batch]
+            with ingest_stage("embed", stats.stage_seconds):
+                vectors = self.scheduler.embed_documents([chunk.page_content for chunk in chunks])
+            point_ids = [pid for _, _, pid in batch]
+            with ingest_stage("upsert", stats.stage_seconds):
+                if self.vector_index is not None:
+                    self.vector_index.upsert(point_ids, vectors, chunks)
+                else:
+                    if not self._collection_ready:
+                        ensure_collection(self.client, self.collection_name, len(vectors[0]))
+                        self._collection_ready = True
+                    upsert_chunks(self.client, self.collection_name, chunks, vectors, point_ids)
+            if self.lexical_index is not None:
+                with ingest_stage("lexical", stats.stage_seconds):
+                    self.lexical_index.add(point_ids, chunks)
+            if stats.first_upsert_seconds is None:
+                stats.first_upsert_seconds = time.perf_counter() - started
+            stats.chunks += len(batch)
+            stats.batches += 1
+            for rel, _, _ in batch:
+                remaining[rel] -= 1
+                if remaining[rel] == 0:
+                    del remaining[rel]
+                    on_file_done(rel)
+            batch.clear()
+
+        while True:
+            item = self._get(in_q)
+            if item is _DONE:
+                break
+            rel, chunks, ids = item
+            if not chunks:
+                on_file_done(rel)
+                continue
+            remaining[rel] = len(chunks)
+            for chunk, point_id in zip(chunks, ids):
+                batch.append((rel, chunk, point_id))
+                if len(batch) >= self.batch_size:
+                    flush()
+
+        if not self._errors:
+            flush()
@@ -1,10 +1,35 @@
+import time
 from pathlib import Path
 from typing import Any, Dict, Tuple, Optional
 
 from .config import get_config
-from .embeddings import create_qdrant_vectorstore
-from .loader import load_docs
-from .splitter import split_documents
+from .embeddings import (
+    build_embeddings,
+    collection_exists,
+    delete_points,
+    get_existing_vectorstore,
+    get_qdrant_client,
+    require_azure_openai_config,
+)
+from .lexical_index import get_lexical_index
+from .loader import iter_knowledge_base_files
+from .manifest import IngestManifest
+from .numpy_store import NumpyVectorIndex, get_numpy_index
+from .pipeline import IngestPipeline, PipelineStats
+
+# How often the manifest is rewritten while a long ingestion is running
+MANIFEST_CHECKPOINT_SECONDS = 5.0
+
+
+def get_manifest_path(collection_name: str) -> Path:
+    """Location of the ingest manifest for a collection."""
+    return get_config().ingest_manifest_dir / f"{collection_name}.manifest.json"
+
+
+def _has_points(collection_name: str, qdrant_url, vector_index: Optional[NumpyVectorIndex]) -> bool:
+    if vector_index is not None:
+        return vector_index.count() > 0
+    return collection_exists(collection_name, qdrant_url)
 
 
 def ingest_knowledge_base(
@@ -14,8 +39,23 @@ def ingest_knowledge_base(
     chunk_size: Optional[int] = None,
     chunk_overlap: Optional[int] = None,
     qdrant_url: Optional[str] = None,
-) -> Tuple[Any, Dict[str, int]]:
-    """Load knowledge base documents, chunk them, and upload to Qdrant.
+    full_refresh: bool = False,
+) -> Tuple[Any, Dict[str, Any]]:
+    """Incrementally sync knowledge base documents into Qdrant.
+
+    Only new or changed files are loaded, chunked and embedded. Each chunk gets a
+    deterministic point ID derived from its file path, file hash and position, so
+    re-running never duplicates points, and the points of changed or deleted
+    files are removed. Per-file hashes and point IDs are kept in a manifest
+    (see `get_manifest_path`).
+
+    Files stream through `IngestPipeline`, so memory stays flat regardless of
+    corpus size and chunks become searchable batch by batch. The manifest is
+    checkpointed as files complete, so an interrupted run resumes where it
+    stopped. Every upserted chunk is also added to the collection's BM25 index
+    (see `get_lexical_index_path`), which hybrid retrieval reads. With
+    config.vector_backend set to ``numpy`` the vectors go to the collection's
+    embedded numpy index (see `get_numpy_index_path`) instead of Qdrant.
     
     Args:
         base_dir: Path to knowledge base directory (defaults to config.kb_path)
@@ -23,10 +63,12 @@ def ingest_knowledge_base(
         chunk_size: Size of document chunks (defaults to config.chunk_size)
         chunk_overlap: Overlap between chunks (defaults to config.chunk_overlap)
         qdrant_url: URL of Qdrant instance (defaults to config.qdrant_url)
+        full_refresh: Re-ingest every file even if it is unchanged
     
-    Note: Embeddings are now configured via SambaNova environment variables:
-        - SAMBANOVA_API_KEY
-        - SAMBANOVA_EMBEDDINGS_MODEL (optional, has a default)
+    Note: Embeddings are configured via the Azure OpenAI environment variables:
+        - AZURE_OPENAI_API_KEY
+        - AZURE_OPENAI_ENDPOINT
+        - AZURE_OPENAI_EMBEDDING_DEPLOYMENT (optional, has a default)
     """
     config = get_config()
     
@@ -45,23 +87,96 @@ def ingest_knowledge_base(
     if not base_path.exists():
         raise FileNotFoundError(f"Knowledge base directory not found: {base_path}")
 
-    documents = load_docs(str(base_path))
-    if not documents:
+    files = iter_knowledge_base_files(base_path)
+    if not files:
         raise ValueError("No documents found to ingest.")
 
-    chunks = split_documents(
-        documents, chunk_size=chunk_size, chunk_overlap=chunk_overlap
-    )
-    if not chunks:
-        raise ValueError("Document splitting produced no chunks. Check input data.")
+    manifest = IngestManifest.load(get_manifest_path(collection_name))
+    lexical_index = get_lexical_index(collection_name)
+    vector_index = get_numpy_index(collection_name) if config.vector_backend == "numpy" else None
+    # A manifest is only trustworthy if the collection it describes still exists
+    if manifest.files and not _has_points(collection_name, qdrant_url, vector_index):
+        manifest.files = {}
+        lexical_index.clear()
+    plan = manifest.plan(base_path, files, full_refresh=full_refresh)
+    if vector_index is not None and full_refresh:
+        # Every file is re-embedded anyway, so start a compact file in the configured dtype
+        vector_index.clear()
+
+    stale_ids = manifest.stale_point_ids(plan)
+    if vector_index is not None:
+        vector_index.delete(stale_ids)
+    else:
+        delete_points(stale_ids, collection_name=collection_name, qdrant_url=qdrant_url)
+    lexical_index.delete(stale_ids)
+
+    # Collections ingested before the lexical index existed are indexed from their points once
+    kept_points = sum(len(plan.current[rel].point_ids) for rel in plan.unchanged)
+    if kept_points and lexical_index.count() < kept_points:
+        if vector_index is not None:
+            indexed = lexical_index.rebuild(vector_index.iter_batches())
+        else:
+            indexed = lexical_index.rebuild_from_qdrant(get_qdrant_client(qdrant_url), collection_name)
+        print(f"✓ Built lexical index from {indexed} existing points")
+
+    # Record deletions right away; files still to load are added back as they finish
+    manifest.files = {rel: plan.current[rel] for rel in plan.unchanged}
+    manifest.save()
 
-    vectorstore = create_qdrant_vectorstore(
-        chunks,
-        collection_name=collection_name,
-        qdrant_url=qdrant_url,
+    stats = PipelineStats()
+    if plan.to_load:
+        require_azure_openai_config()
+        last_save = time.monotonic()
+
+        def on_file_done(rel: str) -> None:
+            nonlocal last_save
+            manifest.files[rel] = plan.current[rel]
+            if time.monotonic() - last_save >= MANIFEST_CHECKPOINT_SECONDS:
+                manifest.save()
+                last_save = time.monotonic()
+
+        pipeline = IngestPipeline(
+            base_path,
+            collection_name,
+            client=get_qdrant_client(qdrant_url) if vector_index is None else None,
+            # The pipeline's EmbeddingScheduler retries throttled batches itself
+            embeddings=build_embeddings(max_retries=0),
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            lexical_index=lexical_index,
+            vector_index=vector_index,
+        )
+        try:
+            stats = pipeline.run(plan, on_file_done)
+        finally:
+            # Persist whatever completed, even if the run failed part-way
+            manifest.save()
+        print(
+            f"✓ Embedded {stats.chunks} chunks in {stats.embedding_requests} requests "
+            f"({stats.embeddings_per_second} embeddings/sec, {stats.embedding_retries} retries)"
+        )
+
+    if not _has_points(collection_name, qdrant_url, vector_index):
+        raise ValueError("Document splitting produced no chunks. Check input data.")
+    vectorstore = get_existing_vectorstore(
+        collection_name=collection_name, qdrant_url=qdrant_url
     )
 
-    summary = {"documents": len(documents), "chunks": len(chunks)}
+    summary = {
+        "documents": stats.documents,
+        "chunks": stats.chunks,
+        "files_added": len(plan.added),
+        "files_changed": len(plan.changed),
+        "files_removed": len(plan.removed),
+        "files_unchanged": len(plan.unchanged),
+        "files_skipped": stats.files_skipped,
+        "points_deleted": len(stale_ids),
+        "batches": stats.batches,
+        "embedding_requests": stats.embedding_requests,
+        "embedding_retries": stats.embedding_retries,
+        "embeddings_per_second": stats.embeddings_per_second,
+        "stage_seconds": {name: round(seconds, 3) for name, seconds in stats.stage_seconds.items()},
+    }
     return vectorstore, summary
 
 
@@ -0,0 +1,122 @@
+import asyncio
+import threading
+from typing import List, Optional, Tuple
+
+from langchain_core.embeddings import Embeddings
+
+from .config import get_config
+
+_stats_lock = threading.Lock()
+_stats = {"texts": 0, "batches": 0, "largest_batch": 0, "full_batches": 0}
+
+
+def _record(batch_size: int, full: bool) -> None:
+    with _stats_lock:
+        _stats["texts"] += batch_size
+        _stats["batches"] += 1
+        _stats["largest_batch"] = max(_stats["largest_batch"], batch_size)
+        _stats["full_batches"] += int(full)
+
+
+def get_query_batching_stats() -> dict:
+    """Query texts embedded, upstream batches sent and requests saved in this worker."""
+    config = get_config()
+    with _stats_lock:
+        texts, batches = _stats["texts"], _stats["batches"]
+        return {
+            "enabled": config.query_batch_enabled,
+            "max_size": config.query_batch_max_size,
+            "wait_ms": config.query_batch_wait_ms,
+            **_stats,
+            "avg_batch_size": round(texts / batches, 2) if batches else 0.0,
+            "requests_saved": texts - batches,
+        }
+
+
+class QueryEmbeddingBatcher(Embeddings):
+    """`Embeddings` wrapper that merges concurrent async query embeddings into one request.
+
+    Small ``aembed_documents``/``aembed_query`` calls are queued; the queue is
+    sent as a single ``aembed_documents`` call to the underlying model once
+    `wait_ms` has passed since its first text, or as soon as it holds
+    `max_size` texts, and each caller gets its own vectors back. Identical
+    texts in a batch are embedded once. Larger calls and the sync methods
+    (used by ingestion, which batches on its own) go straight through.
+
+    Args:
+        underlying: Embeddings that receive the merged batches
+        max_size: Texts per upstream request (defaults to config.query_batch_max_size)
+        wait_ms: How long the first queued text waits for company
+            (defaults to config.query_batch_wait_ms)
+    """
+
+    def __init__(self, underlying: Embeddings, max_size: Optional[int] = None, wait_ms: Optional[float] = None):
+        self.underlying = underlying
+        self.max_size = max_size
+        self.wait_ms = wait_ms
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._timer: Optional[asyncio.Handle] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # The loop keeps only weak references to tasks
+        self._sending = set()
+
+    def _max_size(self) -> int:
+        return self.max_size if self.max_size is not None else get_config().query_batch_max_size
+
+    def _wait_seconds(self) -> float:
+        wait_ms = self.wait_ms if self.wait_ms is not None else get_config().query_batch_wait_ms
+        return wait_ms / 1000
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.underlying.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.underlying.embed_query(text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not get_config().query_batch_enabled or not texts or len(texts) > self._max_size():
+            return await self.underlying.aembed_documents(texts)
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Futures belong to one event loop; start afresh if a new loop is used
+            self._loop, self._pending, self._timer = loop, [], None
+        futures = []
+        for text in texts:
+            future = loop.create_future()
+            self._pending.append((text, future))
+            futures.append(future)
+        if len(self._pending) >= self._max_size():
+            self._flush(full=True)
+        elif self._timer is None:
+            self._timer = loop.call_later(self._wait_seconds(), self._flush)
+        return list(await asyncio.gather(*futures))
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
+
+    def _flush(self, full: bool = False) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending[: self._max_size()], self._pending[self._max_size():]
+        if self._pending:
+            self._timer = self._loop.call_soon(self._flush)
+        if batch:
+            task = self._loop.create_task(self._send(batch, full))
+            self._sending.add(task)
+            task.add_done_callback(self._sending.discard)
+
+    async def _send(self, batch: List[Tuple[str, asyncio.Future]], full: bool) -> None:
+        unique = list(dict.fromkeys(text for text, _ in batch))
+        _record(len(batch), full)
+        try:
+            vectors = dict(zip(unique, await self.underlying.aembed_documents(unique)))
+        except Exception as exc:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        for text, future in batch:
+            # Callers that gave up (e.g. a disconnected client) have cancelled futures
+            if not future.done():
+                future.set_result(vectors[text])
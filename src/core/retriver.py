@@ -1,9 +1,99 @@
+import asyncio
+import threading
+
+from .coalesce import SingleFlight, normalize_query
 from .config import get_config
+from .embeddings import get_search_kwargs
+from .lexical_index import get_lexical_index, is_confident, reciprocal_rank_fusion
+from .metrics import stage
+
+_counters = {"queries": 0, "dense": 0, "hybrid": 0, "lexical_fast_path": 0}
+_counters_lock = threading.Lock()
+
+# Concurrent identical queries share one query embedding and one retrieval
+_embedding_flight = SingleFlight("embedding")
+_retrieval_flight = SingleFlight("retrieval")
+
+
+def _count(route: str) -> None:
+    with _counters_lock:
+        _counters["queries"] += 1
+        _counters[route] += 1
+
+
+def get_retrieval_stats() -> dict:
+    """How queries were answered; each lexical fast-path hit skipped an embedding call."""
+    with _counters_lock:
+        return {"mode": get_config().retrieval_mode, **_counters}
+
+
+def _lexical_search(vectorstore, query, k):
+    """Lexical hits for `query`, or None when the retrieval mode is dense-only.
+
+    Hits scoring below config.lexical_min_score are dropped.
+    """
+    config = get_config()
+    if config.retrieval_mode == "dense":
+        return None
+    with stage("lexical_search"):
+        hits = get_lexical_index(vectorstore.collection_name).search(query, k)
+    if config.lexical_min_score is not None:
+        hits = [hit for hit in hits if hit.score >= config.lexical_min_score]
+    return hits
+
+
+def _dense_search(vectorstore, query, k):
+    """Embed `query` and search the vectorstore, timing the two stages separately."""
+    with stage("embed_query"):
+        vector = vectorstore.embeddings.embed_query(query)
+    with stage("vector_search"):
+        return vectorstore.similarity_search_by_vector(vector, k=k, **get_search_kwargs())
+
+
+async def _adense_search(vectorstore, query, k):
+    """Async variant of `_dense_search`."""
+    embeddings = vectorstore.embeddings
+    with stage("embed_query"):
+        vector = await _embedding_flight.do(
+            (id(embeddings), normalize_query(query)), lambda: embeddings.aembed_query(query)
+        )
+    with stage("vector_search"):
+        return await vectorstore.asimilarity_search_by_vector(vector, k=k, **get_search_kwargs())
+
+
+def _fuse(dense, hits, k):
+    """Fuse dense results with lexical `hits` by reciprocal rank.
+
+    The dense side has already been filtered by config.retriever_score_threshold.
+    When nothing cleared it, the query is off-topic for the knowledge base and
+    no lexical-only hits are returned either, so BM25 matches on incidental
+    words cannot bypass the threshold.
+    """
+    if not dense and get_config().retriever_score_threshold is not None:
+        return []
+    return reciprocal_rank_fusion([dense, [hit.document for hit in hits]], k)
+
+
+def _route(hits):
+    """Pick the retrieval route for lexical `hits`: dense, hybrid or lexical only."""
+    if hits is None:
+        return "dense"
+    if get_config().retrieval_mode == "hybrid_fast" and is_confident(hits):
+        return "lexical_fast_path"
+    return "hybrid"
 
 
 def get_relevant_docs(vectorstore, query, k=None):
     """Retrieve relevant documents from vectorstore.
-    
+
+    Depending on config.retrieval_mode, dense results are fused with the BM25
+    index by reciprocal rank (``hybrid``), and a confident lexical match is
+    returned without embedding the query at all (``hybrid_fast``). The dense
+    search uses the configured HNSW ``ef``, quantization rescoring and
+    config.retriever_score_threshold (see `get_search_kwargs`). BM25 hits below
+    config.lexical_min_score are ignored, and lexical hits are only fused when
+    at least one dense result cleared the score threshold (see `_fuse`).
+
     Args:
         vectorstore: The vectorstore to search
         query: The query string
@@ -11,4 +101,61 @@ def get_relevant_docs(vectorstore, query, k=None):
     """
     if k is None:
         k = get_config().retriever_top_k
-    return vectorstore.similarity_search(query, k=k)
+    hits = _lexical_search(vectorstore, query, k)
+    route = _route(hits)
+    _count(route)
+    if route == "lexical_fast_path":
+        return [hit.document for hit in hits]
+    dense = _dense_search(vectorstore, query, k)
+    if route == "dense":
+        return dense
+    return _fuse(dense, hits, k)
+
+
+async def aget_relevant_docs(vectorstore, query, k=None):
+    """Async variant of `get_relevant_docs`.
+
+    Concurrent calls for the same normalized query share one retrieval (and
+    one query embedding) when config.coalescing_enabled is set; each caller
+    gets its own copy of the result list.
+
+    Lexical results obey the same limits as in the sync path: BM25 hits below
+    config.lexical_min_score are dropped, and when
+    config.retriever_score_threshold is set and no dense result clears it,
+    nothing is returned rather than lexical-only matches.
+
+    Args:
+        vectorstore: The vectorstore to search
+        query: The query string
+        k: Number of results to return (defaults to config.retriever_top_k)
+    """
+    if k is None:
+        k = get_config().retriever_top_k
+    key = (vectorstore.collection_name, get_config().retrieval_mode, k, normalize_query(query))
+    docs = await _retrieval_flight.do(key, lambda: _aretrieve(vectorstore, query, k))
+    return list(docs)
+
+
+async def _aretrieve(vectorstore, query, k):
+    mode = get_config().retrieval_mode
+    if mode == "dense":
+        _count("dense")
+        return await _adense_search(vectorstore, query, k)
+
+    # BM25 scoring is CPU work and may (re)load the index, so keep it off the loop
+    lexical = asyncio.to_thread(_lexical_search, vectorstore, query, k)
+    if mode == "hybrid":
+        # Nothing depends on the lexical result first, so search both at once
+        hits, dense = await asyncio.gather(
+            lexical, _adense_search(vectorstore, query, k)
+        )
+        _count("hybrid")
+        return _fuse(dense, hits, k)
+
+    hits = await lexical
+    route = _route(hits)
+    _count(route)
+    if route == "lexical_fast_path":
+        return [hit.document for hit in hits]
+    dense = await _adense_search(vectorstore, query, k)
+    return _fuse(dense, hits, k)
@@ -16,7 +16,8 @@ def split_documents(documents, chunk_size=None, chunk_overlap=None):
     if chunk_overlap is None:
         chunk_overlap = config.chunk_overlap
     
+    # start_index lets context packing merge neighbouring chunks exactly
     splitter = RecursiveCharacterTextSplitter(
-        chunk_size=chunk_size, chunk_overlap=chunk_overlap
+        chunk_size=chunk_size, chunk_overlap=chunk_overlap, add_start_index=True
     )
     return splitter.split_documents(documents)
@@ -0,0 +1,160 @@
+import json
+from typing import Any, Dict, Optional
+
+_ESCAPES = {
+    '"': '"',
+    "\\": "\\",
+    "/": "/",
+    "b": "\b",
+    "f": "\f",
+    "n": "\n",
+    "r": "\r",
+    "t": "\t",
+}
+
+
+class IncrementalJSONFieldParser:
+    """Pull one string field out of a JSON object while it is still being generated.
+
+    Model output is fed in arbitrary chunks. Every call to `feed` returns the newly
+    decoded characters of the streamed field (``answer`` by default), and
+    top-level scalar fields are collected in `fields` as soon as each value is
+    complete. Text before the opening ``{`` (e.g. a markdown code fence) is
+    ignored, and an escape sequence split across chunks is held back until the
+    rest of it arrives.
+    """
+
+    def __init__(self, field: str = "answer"):
+        self.field = field
+        self.fields: Dict[str, Any] = {}
+        self._buffer = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._string_is_key = False
+        self._string_chars: list[str] = []
+        self._last_token = ""
+        self._current_key: Optional[str] = None
+        self._value_key: Optional[str] = None
+        self._scalar_chars: list[str] = []
+        self._streamed: list[str] = []
+
+    @property
+    def value(self) -> str:
+        """Everything decoded so far for the streamed field."""
+        return "".join(self._streamed)
+
+    def feed(self, chunk: str) -> str:
+        """Consume the next piece of model output and return the new field text."""
+        # Only an unfinished escape sequence is carried over, so each chunk is scanned once
+        buf = self._buffer + chunk
+        out: list[str] = []
+
+        while self._pos < len(buf):
+            char = buf[self._pos]
+
+            if self._in_string:
+                if char == "\\":
+                    decoded, consumed = self._decode_escape(buf, self._pos)
+                    if decoded is None:
+                        break  # wait for the rest of the escape sequence
+                    self._pos += consumed
+                    self._string_chars.append(decoded)
+                    if self._is_streaming():
+                        out.append(decoded)
+                    continue
+                if char == '"':
+                    self._pos += 1
+                    self._close_string()
+                    continue
+                self._pos += 1
+                self._string_chars.append(char)
+                if self._is_streaming():
+                    out.append(char)
+                continue
+
+            self._pos += 1
+            if self._depth == 0:
+                if char == "{":
+                    self._depth = 1
+                    self._last_token = "{"
+                continue
+
+            if char.isspace():
+                continue
+            if char == '"':
+                self._in_string = True
+                self._string_is_key = self._depth == 1 and self._last_token in ("{", ",")
+                self._string_chars = []
+                continue
+            if char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                self._finish_scalar()
+                self._depth -= 1
+            elif char == ",":
+                self._finish_scalar()
+            elif char == ":":
+                if self._depth == 1:
+                    self._value_key = self._current_key
+            elif self._depth == 1 and self._value_key is not None:
+                self._scalar_chars.append(char)
+            self._last_token = char
+
+        self._buffer = buf[self._pos:]
+        self._pos = 0
+        self._streamed.extend(out)
+        return "".join(out)
+
+    def _is_streaming(self) -> bool:
+        return not self._string_is_key and self._depth == 1 and self._value_key == self.field
+
+    def _close_string(self) -> None:
+        self._in_string = False
+        text = "".join(self._string_chars)
+        if self._string_is_key:
+            self._current_key = text
+        elif self._depth == 1 and self._value_key is not None:
+            self.fields[self._value_key] = text
+            self._value_key = None
+        self._last_token = '"'
+
+    def _finish_scalar(self) -> None:
+        if self._depth != 1 or self._value_key is None:
+            return
+        raw = "".join(self._scalar_chars).strip()
+        self._scalar_chars = []
+        if raw:
+            try:
+                self.fields[self._value_key] = json.loads(raw)
+            except ValueError:
+                self.fields[self._value_key] = raw
+        self._value_key = None
+
+    @staticmethod
+    def _decode_escape(buf: str, pos: int) -> tuple[Optional[str], int]:
+        """Decode the escape at `pos`; returns (None, 0) when it is incomplete."""
+        if pos + 1 >= len(buf):
+            return None, 0
+        code = buf[pos + 1]
+        if code != "u":
+            return _ESCAPES.get(code, code), 2
+        if pos + 6 > len(buf):
+            return None, 0
+        try:
+            codepoint = int(buf[pos + 2 : pos + 6], 16)
+        except ValueError:
+            return buf[pos : pos + 6], 6
+        # Surrogate pairs arrive as two consecutive \uXXXX escapes
+        if 0xD800 <= codepoint < 0xDC00:
+            if pos + 12 > len(buf):
+                return None, 0
+            if buf[pos + 6 : pos + 8] == "\\u":
+                try:
+                    low = int(buf[pos + 8 : pos + 12], 16)
+                except ValueError:
+                    low = 0
+                if 0xDC00 <= low < 0xE000:
+                    combined = 0x10000 + ((codepoint - 0xD800) << 10) + (low - 0xDC00)
+                    return chr(combined), 12
+        return chr(codepoint), 6
@@ -0,0 +1,135 @@
+import asyncio
+import time
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, Optional
+
+from . import chat_manager, intent_router
+from .config import get_config, get_vectorstore
+from .lexical_index import get_lexical_index
+from .numpy_store import NumpyVectorStore
+
+# Session used to open history connections; it never holds messages
+WARMUP_SESSION_ID = "__warmup__"
+
+
+@dataclass
+class DependencyStatus:
+    warm: bool = False
+    latency_ms: Optional[float] = None
+    error: Optional[str] = None
+
+
+_status: Dict[str, DependencyStatus] = {
+    name: DependencyStatus() for name in ("vectorstore", "embeddings", "llm", "chain", "history")
+}
+
+
+def _record(name: str, probe: Callable[[], object]) -> DependencyStatus:
+    """Run `probe`, storing whether it succeeded and how long it took."""
+    started = time.perf_counter()
+    try:
+        probe()
+        status = DependencyStatus(warm=True)
+    except Exception as exc:
+        status = DependencyStatus(error=str(exc))
+    status.latency_ms = round((time.perf_counter() - started) * 1000, 1)
+    _status[name] = status
+    return status
+
+
+async def _arecord(name: str, probe) -> DependencyStatus:
+    started = time.perf_counter()
+    try:
+        await probe()
+        status = DependencyStatus(warm=True)
+    except Exception as exc:
+        status = DependencyStatus(error=str(exc))
+    status.latency_ms = round((time.perf_counter() - started) * 1000, 1)
+    _status[name] = status
+    return status
+
+
+def _probe_vectorstore() -> None:
+    vectorstore = get_vectorstore()
+    if isinstance(vectorstore, NumpyVectorStore):
+        # Maps the vector file; cheap on later calls unless ingestion changed it
+        vectorstore.index.load()
+    else:
+        vectorstore.client.get_collection(vectorstore.collection_name)
+
+
+def _probe_embeddings() -> None:
+    embeddings = get_vectorstore().embeddings
+    # Bypass the embedding cache so the HTTP connection is actually opened
+    getattr(embeddings, "underlying", embeddings).embed_query("warmup")
+
+
+def _probe_chain() -> None:
+    chat_manager.get_chain(chat_manager.get_llm())
+
+
+async def _aprobe_history() -> None:
+    await chat_manager.aget_chat_history_messages(WARMUP_SESSION_ID)
+
+
+def warm_up() -> Dict[str, DependencyStatus]:
+    """Build and reuse every client a chat request needs.
+
+    Creates the vectorstore (Qdrant + Azure embeddings clients), the shared LLM,
+    the compiled prompt/parser chain, the sync history engine and, for hybrid
+    retrieval, the in-memory BM25 postings, touching each
+    so connections are established before traffic arrives. Failures are
+    recorded rather than raised, so the worker starts and reports itself as not
+    ready. Blocking; run it in a thread from async code.
+    """
+    _record("vectorstore", _probe_vectorstore)
+    _record("embeddings", _probe_embeddings)
+    _record("llm", chat_manager.get_llm)
+    _record("chain", _probe_chain)
+    _record(
+        "history", lambda: chat_manager.get_session_history(WARMUP_SESSION_ID).messages
+    )
+    if get_config().retrieval_mode != "dense":
+        _record("lexical_index", lambda: get_lexical_index().load())
+    return dict(_status)
+
+
+async def awarm_up() -> Dict[str, DependencyStatus]:
+    """Run `warm_up` off the event loop, then open the async history engine on it
+    and build the intent router's centroids."""
+    await asyncio.to_thread(warm_up)
+    await _arecord("history", _aprobe_history)
+    if get_config().intent_router_enabled and _status["embeddings"].warm:
+        # Best effort: the router falls back to rules/RAG until its centroids exist
+        try:
+            await intent_router.get_intent_router(get_vectorstore().embeddings).awarm()
+        except Exception as exc:
+            print(f"⚠ Intent router centroids not built: {exc}")
+    return dict(_status)
+
+
+async def readiness() -> dict:
+    """Re-probe Qdrant and the history store and report every dependency.
+
+    The embeddings, LLM and chain are only re-probed while they are cold, since
+    probing a warm embeddings client would cost a model call per health check.
+    """
+    probes = [
+        asyncio.to_thread(_record, "vectorstore", _probe_vectorstore),
+        _arecord("history", _aprobe_history),
+    ]
+    cold = {
+        "embeddings": _probe_embeddings,
+        "llm": chat_manager.get_llm,
+        "chain": _probe_chain,
+    }
+    probes += [
+        asyncio.to_thread(_record, name, probe)
+        for name, probe in cold.items()
+        if not _status[name].warm
+    ]
+    await asyncio.gather(*probes)
+    return {
+        "ready": all(status.warm for status in _status.values()),
+        "dependencies": {name: asdict(status) for name, status in _status.items()},
+    }
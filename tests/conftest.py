@@ -0,0 +1,19 @@
+import copy
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.core.config import get_config  # noqa: E402
+
+
+@pytest.fixture
+def config():
+    """The shared config, restored to its previous values after the test."""
+    config = get_config()
+    saved = copy.deepcopy(vars(config))
+    yield config
+    vars(config).clear()
+    vars(config).update(saved)
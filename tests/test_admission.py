@@ -0,0 +1,159 @@
+import asyncio
+
+import pytest
+
+from src.core import admission
+from src.core.admission import AdmissionController, AdmissionRejected, get_admission_stats
+
+
+@pytest.fixture(autouse=True)
+def no_metrics(config):
+    config.metrics_enabled = False
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_turns_beyond_the_limit_wait_and_start_in_fifo_order():
+    controller = AdmissionController(max_concurrency=2, max_queue=10, queue_timeout=5)
+    started = []
+
+    async def turn(session_id, release):
+        async with controller.admit(session_id):
+            started.append(session_id)
+            await release.wait()
+
+    async def run():
+        releases = {name: asyncio.Event() for name in "abcd"}
+        tasks = [asyncio.ensure_future(turn(name, releases[name])) for name in "abcd"]
+        await settle()
+        assert started == ["a", "b"]
+        assert (controller.active, controller.waiting) == (2, 2)
+
+        releases["b"].set()
+        await settle()
+        assert started == ["a", "b", "c"]
+        for release in releases.values():
+            release.set()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+
+    assert started == ["a", "b", "c", "d"]
+    assert (controller.active, controller.waiting) == (0, 0)
+    assert controller._sessions == {}
+
+
+def test_turns_of_one_session_run_one_at_a_time():
+    controller = AdmissionController(max_concurrency=4, max_queue=10, queue_timeout=5)
+
+    async def run():
+        first = await controller.acquire("s")
+        second = asyncio.ensure_future(controller.acquire("s"))
+        other = await controller.acquire("t")
+        await settle()
+        assert not second.done()
+        assert controller.active == 2
+
+        first.release()
+        (await second).release()
+        other.release()
+
+    asyncio.run(run())
+
+    assert controller.active == 0
+    assert controller._sessions == {}
+
+
+def test_a_full_queue_sheds_new_turns():
+    controller = AdmissionController(max_concurrency=1, max_queue=1, queue_timeout=5)
+    before = get_admission_stats()
+
+    async def run():
+        ticket = await controller.acquire("a")
+        waiter = asyncio.ensure_future(controller.acquire("b"))
+        await settle()
+        with pytest.raises(AdmissionRejected, match="queue full") as rejected:
+            await controller.acquire("c")
+        ticket.release()
+        (await waiter).release()
+        return rejected.value
+
+    rejected = asyncio.run(run())
+
+    assert rejected.reason == "queue full"
+    assert rejected.retry_after >= 1
+    assert get_admission_stats()["rejected_queue_full"] == before["rejected_queue_full"] + 1
+
+
+def test_a_turn_that_waits_past_the_deadline_is_shed():
+    controller = AdmissionController(max_concurrency=1, max_queue=10, queue_timeout=0.05)
+    before = get_admission_stats()
+
+    async def run():
+        ticket = await controller.acquire("a")
+        with pytest.raises(AdmissionRejected, match="queue timeout"):
+            await controller.acquire("b")
+        # The timed-out turn left no trace; the next one gets the freed slot
+        assert (controller.waiting, list(controller._slot_waiters)) == (0, [])
+        ticket.release()
+        (await controller.acquire("b")).release()
+
+    asyncio.run(run())
+
+    assert get_admission_stats()["rejected_timeout"] == before["rejected_timeout"] + 1
+    assert controller._sessions == {}
+
+
+def test_a_cancelled_waiter_frees_its_place():
+    controller = AdmissionController(max_concurrency=1, max_queue=10, queue_timeout=5)
+
+    async def run():
+        ticket = await controller.acquire("a")
+        waiter = asyncio.ensure_future(controller.acquire("b"))
+        await settle()
+        waiter.cancel()
+        await settle()
+        ticket.release()
+
+    asyncio.run(run())
+
+    assert (controller.active, controller.waiting) == (0, 0)
+    assert controller._sessions == {}
+
+
+def test_release_is_idempotent():
+    controller = AdmissionController(max_concurrency=1, max_queue=10, queue_timeout=5)
+
+    async def run():
+        ticket = await controller.acquire("a")
+        ticket.release()
+        ticket.release()
+        return await controller.acquire("b")
+
+    asyncio.run(run())
+
+    assert controller.active == 1
+
+
+def test_retry_after_grows_with_the_queue():
+    controller = AdmissionController(max_concurrency=2, max_queue=10, queue_timeout=5)
+    assert controller.retry_after() == 1
+
+    controller._avg_hold_seconds = 3.0
+    controller.waiting = 3
+    assert controller.retry_after() == 6
+
+    controller.waiting = 1000
+    assert controller.retry_after() == admission.MAX_RETRY_AFTER_SECONDS
+
+
+def test_defaults_come_from_the_config(config):
+    config.set_admission(max_queue=7, queue_timeout_seconds=2.5)
+
+    controller = AdmissionController()
+
+    assert (controller.max_queue, controller.queue_timeout) == (7, 2.5)
+    assert controller.max_concurrency == config.llm_max_concurrency
@@ -0,0 +1,123 @@
+import asyncio
+
+import httpx
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+
+from src.chatbot_backend import rag_api
+from src.core import history_store
+from src.core.history_store import ChatHistoryStore
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch, config):
+    config.set_history_page_size(4)
+    store = ChatHistoryStore(str(tmp_path / "history" / "chat.db"))
+    monkeypatch.setattr(history_store, "_store", store)
+    for i in range(5):
+        answer = AIMessage(content=f"answer {i}", additional_kwargs={"diagram_suggested": i == 4})
+        store.add_messages("s1", [HumanMessage(content=f"question {i}"), answer])
+    return store
+
+
+def run(store, scenario):
+    """Run `scenario(client)` against the app, closing the store on the same event loop."""
+
+    async def main():
+        transport = httpx.ASGITransport(app=rag_api.app)
+        try:
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await scenario(client)
+        finally:
+            await store.aclose()
+
+    return asyncio.run(main())
+
+
+def texts(response):
+    return [message["text"] for message in response.json()["messages"]]
+
+
+def test_pages_walk_back_through_the_history(store):
+    async def scenario(client):
+        pages = [await client.get("/chat_history/s1")]
+        while pages[-1].json()["next_cursor"] is not None:
+            pages.append(await client.get("/chat_history/s1", params={"before": pages[-1].json()["next_cursor"]}))
+        return pages
+
+    pages = run(store, scenario)
+
+    assert [texts(page) for page in pages] == [
+        ["answer 4", "question 4", "answer 3", "question 3"],
+        ["answer 2", "question 2", "answer 1", "question 1"],
+        ["answer 0", "question 0"],
+    ]
+    first = pages[0].json()["messages"]
+    assert [message["sender"] for message in first[:2]] == ["bot", "user"]
+    assert first[0]["diagram_suggested"] is True
+    assert "diagram_suggested" not in first[1]
+    assert pages[0].json()["next_cursor"] == int(first[-1]["id"])
+    ids = [int(message["id"]) for page in pages for message in page.json()["messages"]]
+    assert ids == sorted(ids, reverse=True)
+
+
+def test_limit_overrides_the_page_size_within_bounds(store):
+    async def scenario(client):
+        return [
+            await client.get("/chat_history/s1", params={"limit": limit})
+            for limit in (100, 2, 0, rag_api.HISTORY_MAX_PAGE_SIZE + 1)
+        ]
+
+    everything, two, zero, too_many = run(store, scenario)
+
+    assert len(texts(everything)) == 10
+    assert everything.json()["next_cursor"] is None
+    assert texts(two) == ["answer 4", "question 4"]
+    assert (zero.status_code, too_many.status_code) == (422, 422)
+
+
+def test_unknown_session_is_an_empty_page(store):
+    async def scenario(client):
+        return await client.get("/chat_history/nobody")
+
+    assert run(store, scenario).json() == {"messages": [], "next_cursor": None}
+
+
+def test_matching_etag_gets_a_304(store):
+    async def scenario(client):
+        first = await client.get("/chat_history/s1")
+        etag = first.headers["etag"]
+        replies = [
+            await client.get("/chat_history/s1", headers={"If-None-Match": header})
+            for header in (etag, f'"other", W/{etag}', "*", '"other"')
+        ]
+        return first, replies
+
+    first, (exact, weak_in_list, star, other) = run(store, scenario)
+
+    assert first.headers["cache-control"] == "no-cache"
+    assert [reply.status_code for reply in (exact, weak_in_list, star)] == [304] * 3
+    assert exact.content == b""
+    assert exact.headers["etag"] == first.headers["etag"]
+    assert other.status_code == 200
+
+
+def test_etag_changes_when_the_session_gets_new_messages(store):
+    async def scenario(client):
+        before = await client.get("/chat_history/s1")
+        older = await client.get("/chat_history/s1", params={"before": before.json()["next_cursor"]})
+        await store.aadd_messages("s1", [HumanMessage(content="question 5"), AIMessage(content="answer 5")])
+        after = await client.get("/chat_history/s1", headers={"If-None-Match": before.headers["etag"]})
+        older_again = await client.get(
+            "/chat_history/s1",
+            params={"before": before.json()["next_cursor"]},
+            headers={"If-None-Match": older.headers["etag"]},
+        )
+        return after, older_again
+
+    after, older_again = run(store, scenario)
+
+    assert after.status_code == 200
+    assert texts(after)[:2] == ["answer 5", "question 5"]
+    # Older pages keep their cursor and content, so clients can keep their cached copies
+    assert older_again.status_code == 304
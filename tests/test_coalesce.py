@@ -0,0 +1,119 @@
+import asyncio
+
+import pytest
+
+from src.core import coalesce
+from src.core.coalesce import SingleFlight, get_coalescing_stats, normalize_query
+
+
+@pytest.fixture
+def coalescing(config):
+    config.coalescing_enabled = True
+    return config
+
+
+class Upstream:
+    """Counts calls and blocks each one until `release` is set."""
+
+    def __init__(self, result="answer", error=None):
+        self.result = result
+        self.error = error
+        self.calls = 0
+        self.release = None
+
+    async def __call__(self):
+        self.calls += 1
+        await self.release.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+async def gather_waiters(flight, upstream, keys):
+    upstream.release = asyncio.Event()
+    waiters = [asyncio.ensure_future(flight.do(key, upstream)) for key in keys]
+    await asyncio.sleep(0)
+    upstream.release.set()
+    return await asyncio.gather(*waiters, return_exceptions=True)
+
+
+def test_concurrent_callers_share_one_upstream_call(coalescing):
+    flight = SingleFlight("embedding")
+    upstream = Upstream()
+    before = get_coalescing_stats()
+
+    results = asyncio.run(gather_waiters(flight, upstream, ["q", "q", "q"]))
+
+    assert results == ["answer"] * 3
+    assert upstream.calls == 1
+    after = get_coalescing_stats()
+    assert after["embedding"]["upstream_calls"] == before["embedding"]["upstream_calls"] + 1
+    assert after["embedding"]["coalesced"] == before["embedding"]["coalesced"] + 2
+    assert after["upstream_calls_saved"] == before["upstream_calls_saved"] + 2
+
+
+def test_different_keys_are_not_coalesced(coalescing):
+    upstream = Upstream()
+
+    asyncio.run(gather_waiters(SingleFlight("retrieval"), upstream, ["a", "b"]))
+
+    assert upstream.calls == 2
+
+
+def test_an_exception_reaches_every_waiter(coalescing):
+    upstream = Upstream(error=RuntimeError("quota exceeded"))
+
+    results = asyncio.run(gather_waiters(SingleFlight("llm"), upstream, ["q", "q"]))
+
+    assert upstream.calls == 1
+    assert [str(result) for result in results] == ["quota exceeded"] * 2
+
+
+def test_the_key_is_forgotten_once_the_call_finishes(coalescing):
+    flight = SingleFlight("llm")
+    upstream = Upstream()
+
+    async def twice():
+        await gather_waiters(flight, upstream, ["q"])
+        await asyncio.sleep(0)
+        assert flight._inflight == {}
+        await gather_waiters(flight, upstream, ["q"])
+
+    asyncio.run(twice())
+
+    assert upstream.calls == 2
+
+
+def test_a_cancelled_caller_does_not_cancel_the_others(coalescing):
+    flight = SingleFlight("diagram")
+    upstream = Upstream()
+
+    async def run():
+        upstream.release = asyncio.Event()
+        first = asyncio.ensure_future(flight.do("q", upstream))
+        second = asyncio.ensure_future(flight.do("q", upstream))
+        await asyncio.sleep(0)
+        first.cancel()
+        upstream.release.set()
+        return await second
+
+    assert asyncio.run(run()) == "answer"
+    assert upstream.calls == 1
+
+
+def test_disabled_coalescing_calls_upstream_every_time(config):
+    config.coalescing_enabled = False
+    upstream = Upstream()
+    before = get_coalescing_stats()
+
+    asyncio.run(gather_waiters(SingleFlight("embedding"), upstream, ["q", "q"]))
+
+    assert upstream.calls == 2
+    assert get_coalescing_stats()["embedding"] == before["embedding"]
+    assert get_coalescing_stats()["enabled"] is False
+
+
+def test_normalize_query_ignores_case_spacing_and_trailing_punctuation():
+    assert normalize_query("  What IS  the\tstatus?! ") == "what is the status"
+    assert normalize_query("what is the status") == normalize_query("What is the status.")
+    assert set(coalesce.STAGES) <= set(get_coalescing_stats())
@@ -0,0 +1,65 @@
+import pytest
+
+from src.core.config import Config
+
+
+@pytest.mark.parametrize(
+    "env, value",
+    [
+        ("STRUCTURED_OUTPUT_MODE", "json"),
+        ("VECTOR_BACKEND", "faiss"),
+        ("NUMPY_VECTOR_DTYPE", "int8"),
+        ("QDRANT_QUANTIZATION", "product"),
+        ("RETRIEVAL_MODE", "Hybrid"),
+        ("HISTORY_MEMORY_MODE", "summarize"),
+    ],
+)
+def test_unknown_enum_values_are_rejected_at_load(monkeypatch, env, value):
+    monkeypatch.setenv(env, value)
+
+    with pytest.raises(ValueError, match=env):
+        Config()
+
+
+@pytest.mark.parametrize(
+    "env, value",
+    [
+        ("QDRANT_HNSW_M", "0"),
+        ("QDRANT_HNSW_EF", "-1"),
+        ("QDRANT_QUANTIZATION_OVERSAMPLING", "0.5"),
+        ("HISTORY_SUMMARY_MAX_TOKENS", "0"),
+        ("HISTORY_PAGE_SIZE", "0"),
+        ("OCR_VISUAL_FEATURES", "caption"),
+    ],
+)
+def test_out_of_range_values_are_rejected_at_load(monkeypatch, env, value):
+    monkeypatch.setenv(env, value)
+
+    with pytest.raises(ValueError, match=env):
+        Config()
+
+
+def test_valid_values_load(monkeypatch):
+    monkeypatch.setenv("RETRIEVAL_MODE", "hybrid_fast")
+    monkeypatch.setenv("QDRANT_QUANTIZATION", "binary")
+    monkeypatch.setenv("OCR_VISUAL_FEATURES", "Read, caption")
+
+    config = Config()
+
+    assert (config.retrieval_mode, config.qdrant_quantization) == ("hybrid_fast", "binary")
+    assert config.ocr_visual_features == ["read", "caption"]
+
+
+def test_setters_apply_the_same_checks():
+    config = Config()
+    mode = config.retrieval_mode
+
+    with pytest.raises(ValueError, match="expected one of dense, hybrid, hybrid_fast"):
+        config.set_retrieval_mode(mode="sparse")
+    with pytest.raises(ValueError, match="expected one of none, scalar, binary"):
+        config.set_qdrant_schema(quantization="pq")
+    with pytest.raises(ValueError):
+        config.set_qdrant_schema(hnsw_ef=0)
+    with pytest.raises(ValueError):
+        config.set_history_memory(summary_max_tokens=0)
+    assert config.retrieval_mode == mode
@@ -0,0 +1,110 @@
+import pytest
+from langchain_core.documents import Document
+
+from src.core import context_packer
+from src.core.context_packer import PASSAGE_SEPARATOR, build_context_text, pack_context
+
+TEXT = (
+    "Qdrant stores vectors in segments. Each segment has its own HNSW graph. "
+    "Segments are merged by the optimizer in the background. "
+    "Payload indexes speed up filtered search on keyword fields."
+)
+
+
+@pytest.fixture(autouse=True)
+def word_tokens(monkeypatch):
+    """One token per word keeps budgets independent of tiktoken."""
+    monkeypatch.setattr(context_packer, "count_tokens", lambda text: len(text.split()))
+    monkeypatch.setattr(
+        context_packer,
+        "truncate_to_tokens",
+        lambda text, max_tokens: " ".join(text.split()[:max_tokens]),
+    )
+
+
+def chunk(start, end, source="guide.md", indexed=True, **metadata):
+    metadata = {"source": source, **metadata}
+    if indexed:
+        metadata["start_index"] = start
+    return Document(page_content=TEXT[start:end], metadata=metadata)
+
+
+def test_near_duplicates_of_a_better_chunk_are_dropped():
+    best = Document(page_content="the optimizer merges small segments into larger ones at night")
+    copy = Document(page_content="The optimizer merges small segments into larger ones at night!")
+    other = Document(page_content="payload indexes make filtered search on keyword fields fast")
+
+    packed, stats = pack_context([best, copy, other], max_tokens=1000, dedup_threshold=0.8)
+
+    assert [doc.page_content for doc in packed] == [best.page_content, other.page_content]
+    assert stats.duplicates_dropped == 1
+
+
+def test_overlapping_chunks_of_one_source_merge_by_start_index():
+    # Second and first chunk overlap by 20 characters; the merged passage keeps the better rank
+    second = chunk(60, 140)
+    first = chunk(0, 80)
+    unrelated = chunk(0, 40, source="other.md")
+
+    packed, stats = pack_context([second, unrelated, first], max_tokens=1000, dedup_threshold=1.1)
+
+    assert [doc.page_content for doc in packed] == [TEXT[0:140], TEXT[0:40]]
+    assert stats.chunks_merged == 1
+
+
+def test_overlapping_chunks_merge_by_text_without_start_index():
+    first = chunk(0, 90, indexed=False)
+    second = chunk(60, 160, indexed=False)
+
+    packed, stats = pack_context([first, second], max_tokens=1000, dedup_threshold=1.1)
+
+    assert [doc.page_content for doc in packed] == [TEXT[0:160]]
+    assert stats.chunks_merged == 1
+
+
+def test_chunks_of_different_pages_are_not_merged():
+    first = chunk(0, 80, page=1)
+    second = chunk(60, 140, page=2)
+
+    packed, stats = pack_context([first, second], max_tokens=1000, dedup_threshold=1.1)
+
+    assert len(packed) == 2
+    assert stats.chunks_merged == 0
+
+
+def test_passages_that_do_not_fit_are_skipped_for_smaller_ones():
+    docs = [
+        Document(page_content="alpha " * 6),
+        Document(page_content="beta " * 10),
+        Document(page_content="gamma " * 3),
+    ]
+
+    packed, stats = pack_context(docs, max_tokens=10, dedup_threshold=1.1)
+
+    assert [doc.page_content.split()[0] for doc in packed] == ["alpha", "gamma"]
+    assert stats.chunks_skipped == 1
+    assert stats.tokens_out <= 10
+    assert stats.tokens_saved == stats.tokens_in - stats.tokens_out
+
+
+def test_an_oversized_best_passage_is_truncated_rather_than_dropped():
+    packed, stats = pack_context(
+        [Document(page_content="word " * 50)], max_tokens=8, dedup_threshold=1.1
+    )
+
+    assert packed[0].page_content == " ".join(["word"] * 8)
+    assert stats.tokens_out == 8
+
+
+def test_build_context_text_joins_passages_and_counts_requests(config):
+    config.context_max_tokens = 1000
+    config.context_dedup_threshold = 0.8
+    before = context_packer.get_context_packing_stats()
+
+    text = build_context_text([chunk(0, 40), chunk(0, 40, source="b.md", indexed=False)])
+
+    assert text == TEXT[0:40]
+    after = context_packer.get_context_packing_stats()
+    assert after["requests"] == before["requests"] + 1
+    assert after["duplicates_dropped"] == before["duplicates_dropped"] + 1
+    assert PASSAGE_SEPARATOR not in text
@@ -0,0 +1,159 @@
+import asyncio
+
+import httpx
+import pytest
+from langchain_core.documents import Document
+from langchain_core.messages import AIMessage, HumanMessage
+
+from src.chatbot_backend import rag_api
+from src.core import chat_manager, diagrams, history_store
+from src.core.history_store import ChatHistoryStore
+
+
+class FakeLLM:
+    """Draws a fenced DOT diagram; `before_reply` runs while the call is in flight."""
+
+    def __init__(self, before_reply=None):
+        self.before_reply = before_reply
+        self.prompts = []
+
+    async def ainvoke(self, prompt_value):
+        self.prompts.append(prompt_value.to_string())
+        await asyncio.sleep(0.01)
+        if self.before_reply is not None:
+            await self.before_reply()
+        return AIMessage(content="```dot\ndigraph { restore -> verify }\n```")
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch, config):
+    config.metrics_enabled = False
+    config.admission_enabled = False
+    store = ChatHistoryStore(str(tmp_path / "history" / "chat.db"))
+    monkeypatch.setattr(history_store, "_store", store)
+    monkeypatch.setattr(diagrams, "get_history_store", lambda: store)
+
+    async def retrieve(vectorstore, query, k=None):
+        return [Document(page_content=f"context for {query}")]
+
+    monkeypatch.setattr(diagrams, "aget_relevant_docs", retrieve)
+    return store
+
+
+def run(store, scenario):
+    async def main():
+        try:
+            return await scenario()
+        finally:
+            await store.aclose()
+
+    return asyncio.run(main())
+
+
+async def add_turn(store):
+    """Store one question and answer; returns (question id, answer id)."""
+    return tuple(
+        await store.aadd_messages(
+            "s1", [HumanMessage(content="how do I restore?"), AIMessage(content="Restore the snapshot.")]
+        )
+    )
+
+
+def test_diagram_is_drawn_from_the_turn_and_stored(store):
+    llm = FakeLLM()
+
+    async def scenario():
+        _, answer_id = await add_turn(store)
+        diagram = await diagrams.agenerate_diagram(llm, None, "s1", answer_id)
+        return diagram, await store.aget_diagram("s1", answer_id)
+
+    diagram, stored = run(store, scenario)
+
+    assert diagram == stored == "digraph { restore -> verify }"
+    assert "context for how do I restore?" in llm.prompts[0]
+    assert "Restore the snapshot." in llm.prompts[0]
+
+
+def test_first_stored_diagram_wins(store):
+    async def scenario():
+        _, answer_id = await add_turn(store)
+
+        async def other_worker_stores_first():
+            await store.aput_diagram("s1", answer_id, "digraph { other }")
+
+        diagram = await diagrams.agenerate_diagram(FakeLLM(other_worker_stores_first), None, "s1", answer_id)
+        return diagram, await store.aget_diagram("s1", answer_id)
+
+    assert run(store, scenario) == ("digraph { other }", "digraph { other }")
+
+
+def test_concurrent_callers_share_one_llm_call(store, config):
+    config.coalescing_enabled = True
+    llm = FakeLLM()
+
+    async def scenario():
+        _, answer_id = await add_turn(store)
+        return await asyncio.gather(*(diagrams.agenerate_diagram(llm, None, "s1", answer_id) for _ in range(3)))
+
+    assert run(store, scenario) == ["digraph { restore -> verify }"] * 3
+    assert len(llm.prompts) == 1
+
+
+def test_only_answers_of_the_session_have_diagrams(store):
+    llm = FakeLLM()
+
+    async def scenario():
+        question_id, answer_id = await add_turn(store)
+        return [
+            await diagrams.agenerate_diagram(llm, None, "s1", question_id),
+            await diagrams.agenerate_diagram(llm, None, "s1", answer_id + 100),
+            await diagrams.agenerate_diagram(llm, None, "other", answer_id),
+        ]
+
+    assert run(store, scenario) == [None, None, None]
+    assert llm.prompts == []
+
+
+@pytest.fixture
+def api(store, monkeypatch):
+    llm = FakeLLM()
+    monkeypatch.setattr(chat_manager, "get_llm", lambda: llm)
+    monkeypatch.setattr(rag_api, "get_vectorstore", lambda: None)
+
+    def call(scenario):
+        async def with_client():
+            transport = httpx.ASGITransport(app=rag_api.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await scenario(client)
+
+        return run(store, with_client)
+
+    return llm, call
+
+
+def test_diagram_route_draws_once_then_serves_the_stored_diagram(store, api):
+    llm, call = api
+    before = diagrams.get_diagram_stats()
+
+    async def scenario(client):
+        _, answer_id = await add_turn(store)
+        return [await client.get(f"/diagram/s1/{answer_id}") for _ in range(2)], answer_id
+
+    (first, second), answer_id = call(scenario)
+
+    assert first.json() == second.json() == {"message_id": answer_id, "diagram": "digraph { restore -> verify }"}
+    assert len(llm.prompts) == 1
+    after = diagrams.get_diagram_stats()
+    assert after["generated"] == before["generated"] + 1
+    assert after["cache_hits"] == before["cache_hits"] + 1
+
+
+def test_diagram_route_returns_404_for_an_unknown_message(store, api):
+    llm, call = api
+
+    async def scenario(client):
+        question_id, _ = await add_turn(store)
+        return [await client.get(f"/diagram/s1/{message_id}") for message_id in (question_id, 9999)]
+
+    assert [response.status_code for response in call(scenario)] == [404, 404]
+    assert llm.prompts == []
@@ -0,0 +1,141 @@
+import asyncio
+import itertools
+import threading
+from typing import List
+
+import pytest
+from langchain_core.embeddings import Embeddings
+
+from src.core import embedding_cache
+from src.core.embedding_cache import CachedEmbeddings, EmbeddingCache
+
+DIM = 4
+ROW_BYTES = DIM * 4  # float32 blob per vector
+
+
+class CountingEmbeddings(Embeddings):
+    def __init__(self):
+        self.calls: List[List[str]] = []
+
+    def _vector(self, text: str) -> List[float]:
+        return [float(len(text)), float(ord(text[0])), 0.5, 1.0]
+
+    def embed_documents(self, texts):
+        self.calls.append(list(texts))
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts):
+        return self.embed_documents(texts)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Strictly increasing time.time() so LRU order never ties."""
+    ticks = itertools.count(1000)
+    monkeypatch.setattr(embedding_cache.time, "time", lambda: float(next(ticks)))
+
+
+def keys(*texts):
+    return [EmbeddingCache.make_key("ns", text) for text in texts]
+
+
+def test_disk_tier_survives_a_new_instance(tmp_path):
+    cache = EmbeddingCache(tmp_path / "e.db", memory_items=0)
+    cache.put_many(keys("a"), [[1.0, 2.0, 3.0, 4.0]])
+
+    reopened = EmbeddingCache(tmp_path / "e.db")
+
+    assert reopened.get_many(keys("a", "b")) == [[1.0, 2.0, 3.0, 4.0], None]
+    assert reopened.stats()["disk_bytes"] == ROW_BYTES
+    assert reopened.stats()["disk_hits"] == 1
+    assert reopened.stats()["misses"] == 1
+
+
+def test_memory_tier_is_bounded_lru(tmp_path):
+    cache = EmbeddingCache(tmp_path / "e.db", memory_items=2)
+    cache.put_many(keys("a", "b"), [[1.0] * DIM, [2.0] * DIM])
+    cache.get_many(keys("a"))
+    cache.put_many(keys("c"), [[3.0] * DIM])
+
+    cache.get_many(keys("a", "b", "c"))
+
+    stats = cache.stats()
+    assert stats["memory_items"] == 2
+    # "b" was least recently used, so it came from disk
+    assert (stats["memory_hits"], stats["disk_hits"]) == (3, 1)
+
+
+def test_evicts_least_recently_used_rows_under_the_cap(tmp_path, clock):
+    cache = EmbeddingCache(tmp_path / "e.db", memory_items=0, max_bytes=10 * ROW_BYTES)
+    texts = [f"t{i}" for i in range(10)]
+    for text in texts:
+        cache.put_many(keys(text), [[1.0] * DIM])
+    # Touch the oldest entry so it is no longer the eviction candidate
+    cache.get_many(keys("t0"))
+
+    cache.put_many(keys("new"), [[2.0] * DIM])
+
+    stats = cache.stats()
+    # Trimmed back to 90% of the cap: 9 rows
+    assert stats["disk_bytes"] == 9 * ROW_BYTES
+    assert stats["evictions"] == 2
+    found = cache.get_many(keys(*texts, "new"))
+    assert [text for text, vector in zip(texts + ["new"], found) if vector is None] == ["t1", "t2"]
+
+
+def test_replacing_a_key_does_not_double_count_bytes(tmp_path):
+    cache = EmbeddingCache(tmp_path / "e.db")
+    cache.put_many(keys("a"), [[1.0] * DIM])
+    cache.put_many(keys("a", "a"), [[2.0] * DIM, [2.0] * DIM])
+
+    assert cache.stats()["disk_bytes"] == ROW_BYTES
+
+
+def test_cached_embeddings_forward_only_distinct_misses(tmp_path):
+    underlying = CountingEmbeddings()
+    cached = CachedEmbeddings(underlying, EmbeddingCache(tmp_path / "e.db"), "ns")
+
+    first = cached.embed_documents(["x", "yy", "x"])
+    second = cached.embed_documents(["yy", "zzz"])
+
+    assert underlying.calls == [["x", "yy"], ["zzz"]]
+    assert first[0] == first[2] == underlying._vector("x")
+    assert second[0] == first[1]
+
+
+def test_namespaces_do_not_share_vectors(tmp_path):
+    underlying = CountingEmbeddings()
+    cache = EmbeddingCache(tmp_path / "e.db")
+    CachedEmbeddings(underlying, cache, "model-a").embed_documents(["x"])
+    CachedEmbeddings(underlying, cache, "model-b").embed_documents(["x"])
+
+    assert underlying.calls == [["x"], ["x"]]
+
+
+def test_async_path_keeps_sqlite_off_the_event_loop(tmp_path):
+    cache = EmbeddingCache(tmp_path / "e.db")
+    threads = []
+
+    def record(method):
+        def wrapper(*args):
+            threads.append(threading.current_thread())
+            return method(*args)
+        return wrapper
+
+    cache.get_many = record(cache.get_many)
+    cache.put_many = record(cache.put_many)
+    cached = CachedEmbeddings(CountingEmbeddings(), cache, "ns")
+
+    async def main():
+        miss = await cached.aembed_query("hello")
+        hit = await cached.aembed_query("hello")
+        return miss, hit
+
+    miss, hit = asyncio.run(main())
+
+    assert miss == hit
+    assert len(threads) == 3  # lookup, store, lookup
+    assert threading.main_thread() not in threads
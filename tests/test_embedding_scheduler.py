@@ -0,0 +1,150 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from src.core import embedding_scheduler, embeddings
+from src.core.embedding_scheduler import EmbeddingScheduler
+
+real_sleep = time.sleep
+
+
+def status_error(status, headers=None):
+    exc = RuntimeError(f"HTTP {status}")
+    exc.status_code = status
+    exc.response = SimpleNamespace(headers=headers or {})
+    return exc
+
+
+class FakeEmbeddings:
+    """Embeds a text as ``[len(text)]``; `failures` are raised by the first calls."""
+
+    def __init__(self, failures=(), delay=0.0):
+        self.failures = list(failures)
+        self.delay = delay
+        self.requests = []
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def embed_documents(self, texts):
+        with self._lock:
+            self.requests.append(list(texts))
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            failure = self.failures.pop(0) if self.failures else None
+        try:
+            real_sleep(self.delay)
+            if failure is not None:
+                raise failure
+            return [[float(len(text))] for text in texts]
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+@pytest.fixture(autouse=True)
+def word_tokens(monkeypatch):
+    """One token per word keeps batch boundaries independent of tiktoken."""
+    monkeypatch.setattr(embedding_scheduler, "count_tokens", lambda text: len(text.split()))
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    delays = []
+    monkeypatch.setattr(embedding_scheduler.time, "sleep", delays.append)
+    return delays
+
+
+def scheduler(embeddings, **kwargs):
+    kwargs.setdefault("max_batch_tokens", 10)
+    kwargs.setdefault("max_batch_items", 100)
+    kwargs.setdefault("max_concurrency", 4)
+    kwargs.setdefault("max_retries", 3)
+    kwargs.setdefault("backoff_seconds", 0.5)
+    return EmbeddingScheduler(embeddings, **kwargs)
+
+
+def test_pack_respects_token_and_item_limits():
+    texts = ["a b c d", "e f g h", "i j", "k", "l m n o p q r s t u v w", "x"]
+
+    assert scheduler(FakeEmbeddings()).pack(texts) == [[0, 1, 2], [3], [4], [5]]
+    assert scheduler(FakeEmbeddings(), max_batch_items=2).pack(texts) == [[0, 1], [2, 3], [4], [5]]
+
+
+def test_vectors_come_back_in_input_order_under_concurrency():
+    texts = [" ".join("w" * (i % 7 + 1) for _ in range(3)) + f" {i}" for i in range(40)]
+    embeddings = FakeEmbeddings(delay=0.01)
+    sched = scheduler(embeddings, max_batch_tokens=8, max_concurrency=3)
+
+    vectors = sched.embed_documents(texts)
+
+    assert vectors == [[float(len(text))] for text in texts]
+    assert len(embeddings.requests) == 20
+    assert 1 < embeddings.max_active <= 3
+    assert sched.stats()["embeddings"] == 40
+    assert sched.stats()["batches"] == 20
+
+
+def test_throttled_batch_is_retried_after_retry_after_and_halves_concurrency(sleeps):
+    embeddings = FakeEmbeddings(failures=[status_error(429, {"retry-after-ms": "1500"})])
+    sched = scheduler(embeddings, max_concurrency=4)
+
+    assert sched.embed_documents(["one two"]) == [[7.0]]
+
+    assert sleeps == [1.5]
+    assert embeddings.requests == [["one two"], ["one two"]]
+    stats = sched.stats()
+    assert (stats["retries"], stats["throttled"]) == (1, 1)
+    assert stats["concurrency_limit"] == 2
+
+
+def test_retry_after_header_in_seconds_is_honoured(sleeps):
+    embeddings = FakeEmbeddings(failures=[status_error(503, {"Retry-After": "3"})])
+
+    scheduler(embeddings).embed_documents(["x"])
+
+    assert sleeps == [3.0]
+
+
+def test_gives_up_after_max_retries(sleeps):
+    embeddings = FakeEmbeddings(failures=[status_error(500)] * 3)
+
+    with pytest.raises(RuntimeError, match="HTTP 500"):
+        scheduler(embeddings, max_retries=2).embed_documents(["x"])
+
+    assert len(embeddings.requests) == 3
+    assert len(sleeps) == 2
+
+
+def test_client_errors_are_not_retried(sleeps):
+    embeddings = FakeEmbeddings(failures=[status_error(400)])
+
+    with pytest.raises(RuntimeError, match="HTTP 400"):
+        scheduler(embeddings).embed_documents(["x"])
+
+    assert sleeps == []
+    assert len(embeddings.requests) == 1
+
+
+def test_concurrency_recovers_after_successes(sleeps):
+    embeddings = FakeEmbeddings(failures=[status_error(429)] * 2)
+    sched = scheduler(embeddings, max_concurrency=4, max_batch_tokens=1)
+
+    sched.embed_documents(["x"])
+    # 4 -> 2 -> 1 on the two throttles, then +1 for the success
+    assert sched.stats()["concurrency_limit"] == 2
+
+    sched.embed_documents([f"w{i}" for i in range(12)])
+    assert sched.stats()["concurrency_limit"] == 4
+
+
+@pytest.mark.parametrize("max_retries, expected", [(None, 2), (0, 0)])
+def test_client_retries_are_left_to_the_scheduler_when_asked(config, monkeypatch, max_retries, expected):
+    monkeypatch.setenv("AZURE_OPENAI_ENDPOINT", "https://example.openai.azure.com/")
+    monkeypatch.setenv("AZURE_OPENAI_API_KEY", "key")
+    config.embedding_cache_enabled = False
+    config.query_batch_enabled = False
+
+    assert embeddings.build_embeddings(max_retries=max_retries).max_retries == expected
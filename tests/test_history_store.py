@@ -0,0 +1,132 @@
+import asyncio
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+
+from src.core import history_store
+from src.core.history_store import ChatHistoryStore, WindowedChatMessageHistory
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ChatHistoryStore(str(tmp_path / "history" / "chat.db"))
+    yield store
+    asyncio.run(store.aclose())
+
+
+def turns(count):
+    messages = []
+    for i in range(count):
+        messages += [HumanMessage(content=f"question {i}"), AIMessage(content=f"answer {i}")]
+    return messages
+
+
+def test_sync_and_async_paths_share_one_history(store):
+    ids = store.add_messages("s1", turns(1))
+
+    async def scenario():
+        ids.extend(await store.aadd_messages("s1", turns(2)[2:]))
+        return await store.aget_messages("s1")
+
+    messages = asyncio.run(scenario())
+
+    assert ids == sorted(ids) and len(set(ids)) == 4
+    assert [m.content for m in messages] == ["question 0", "answer 0", "question 1", "answer 1"]
+    assert [m.type for m in store.get_messages("s1")] == ["human", "ai", "human", "ai"]
+    assert store.get_messages("other") == []
+
+
+def test_recent_window_is_bounded_by_messages_and_tokens(store, monkeypatch):
+    monkeypatch.setattr(history_store, "count_tokens", lambda text: len(text.split()))
+    store.add_messages("s1", [HumanMessage(content="one two three")] + turns(3))
+
+    recent = store.get_recent_messages("s1", max_messages=4, max_tokens=None)
+    assert [m.content for m in recent] == ["question 1", "answer 1", "question 2", "answer 2"]
+
+    # The budget is a hard cap: the window ends at the first message that does not fit
+    recent = store.get_recent_messages("s1", max_messages=None, max_tokens=5)
+    assert [m.content for m in recent] == ["question 2", "answer 2"]
+
+
+def test_windowed_history_uses_configured_window(store, config):
+    config.history_max_messages = 2
+    config.history_max_tokens = None
+    history = WindowedChatMessageHistory(store, "s1")
+    history.add_messages(turns(3))
+
+    assert [m.content for m in history.messages] == ["question 2", "answer 2"]
+    assert [m.content for m in asyncio.run(history.aget_messages())] == ["question 2", "answer 2"]
+
+    history.clear()
+    assert store.get_messages("s1") == []
+
+
+def test_concurrent_first_use_creates_the_schema_once(store, monkeypatch):
+    created = []
+    create_schema = store._create_schema
+
+    def counting(connection):
+        created.append(connection)
+        create_schema(connection)
+
+    monkeypatch.setattr(store, "_create_schema", counting)
+
+    async def scenario():
+        await asyncio.gather(
+            *(store.aadd_messages(f"s{i}", turns(1)) for i in range(10))
+        )
+
+    asyncio.run(scenario())
+
+    assert len(created) == 1
+    assert all(len(store.get_messages(f"s{i}")) == 2 for i in range(10))
+
+
+def test_pages_walk_back_from_the_newest_message(store):
+    ids = store.add_messages("s1", turns(3))
+    store.add_messages("s2", turns(1))
+
+    async def scenario():
+        first = await store.aget_page("s1", before_id=None, limit=4)
+        rest = await store.aget_page("s1", before_id=first[-1][0], limit=4)
+        return first, rest
+
+    first, rest = asyncio.run(scenario())
+
+    assert [row_id for row_id, _ in first] == ids[:1:-1]
+    assert [row_id for row_id, _ in rest] == ids[1::-1]
+
+
+def test_summary_never_moves_backwards(store):
+    async def scenario():
+        await store.aput_summary("s1", "up to 4", 4)
+        await store.aput_summary("s1", "up to 2", 2)
+        return await store.aget_summary("s1")
+
+    assert asyncio.run(scenario()) == ("up to 4", 4)
+
+
+def test_first_diagram_wins_and_clear_removes_everything(store):
+    _, answer_id = store.add_messages("s1", turns(1))
+
+    async def scenario():
+        await store.aput_diagram("s1", answer_id, "digraph { a }")
+        await store.aput_diagram("s1", answer_id, "digraph { b }")
+        stored = await store.aget_diagram("s1", answer_id)
+        other_session = await store.aget_diagram("s2", answer_id)
+        turn = await store.aget_turn("s1", answer_id)
+        await store.aput_summary("s1", "summary", answer_id)
+        await store.aclear("s1")
+        cleared = (
+            await store.aget_messages("s1"),
+            await store.aget_diagram("s1", answer_id),
+            await store.aget_summary("s1"),
+        )
+        return stored, other_session, turn, cleared
+
+    stored, other_session, turn, cleared = asyncio.run(scenario())
+
+    assert stored == "digraph { a }"
+    assert other_session is None
+    assert [m.content for m in turn] == ["question 0", "answer 0"]
+    assert cleared == ([], None, None)
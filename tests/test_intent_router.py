@@ -0,0 +1,159 @@
+import asyncio
+
+import pytest
+
+from src.core import intent_router
+from src.core.intent_router import IntentRouter
+
+
+def route(router, query, last_reply=None):
+    async def alast_reply():
+        return last_reply
+
+    return asyncio.run(router.aroute(query, alast_reply))
+
+
+@pytest.fixture
+def router():
+    return IntentRouter(threshold=0.8, margin=0.05)
+
+
+@pytest.mark.parametrize(
+    "query, category",
+    [
+        ("Hi!", "greeting"),
+        ("good morning there", "greeting"),
+        ("thanks, bye", "goodbye"),
+        ("ok see you later", "goodbye"),
+        ("Who are you?", "chitchat"),
+        ("are you a bot", "chitchat"),
+    ],
+)
+def test_rules_match_small_talk(router, query, category):
+    assert router.match_rules(query).category == category
+    assert route(router, query, last_reply="Anything else?").method == "rules"
+
+
+def test_rules_leave_questions_for_retrieval(router):
+    assert router.match_rules("what is the refund policy") is None
+    assert route(router, "what is the refund policy") is None
+
+
+@pytest.mark.parametrize("query", ["ok", "Thanks!", "got it, thank you", "cool"])
+def test_acknowledgement_is_small_talk_after_a_statement(router, query):
+    assert route(router, query, last_reply="The backup runs at 2am.").category == "chitchat"
+    assert route(router, query, last_reply=None).category == "chitchat"
+
+
+@pytest.mark.parametrize("query", ["ok", "okay", "sounds good"])
+def test_acknowledgement_answering_a_question_goes_to_retrieval(router, query):
+    assert route(router, query, last_reply="Should I list the Windows steps too? ") is None
+
+
+def test_last_reply_is_only_looked_up_for_acknowledgements(router):
+    lookups = []
+
+    async def alast_reply():
+        lookups.append(1)
+        return "Anything else?"
+
+    asyncio.run(router.aroute("hello", alast_reply))
+    asyncio.run(router.aroute("what is the refund policy", alast_reply))
+    assert lookups == []
+
+    asyncio.run(router.aroute("ok", alast_reply))
+    assert lookups == [1]
+
+
+class FakeEmbeddings:
+    """Maps a text to the axis of the first keyword it contains, or to `overrides[text]`."""
+
+    AXES = {"hello": 0, "bye": 1, "robot": 2, "report": 3}
+
+    def __init__(self, overrides=None):
+        self.overrides = overrides or {}
+        self.queries = []
+
+    def vector(self, text):
+        if text in self.overrides:
+            return self.overrides[text]
+        vector = [0.0, 0.0, 0.0, 0.0, 0.05]
+        for word, axis in self.AXES.items():
+            if word in text.lower():
+                vector[axis] = 1.0
+                break
+        return vector
+
+    async def aembed_documents(self, texts):
+        return [self.vector(text) for text in texts]
+
+    async def aembed_query(self, text):
+        self.queries.append(text)
+        return self.vector(text)
+
+
+@pytest.fixture
+def examples(monkeypatch):
+    monkeypatch.setattr(
+        intent_router,
+        "EXAMPLES",
+        {
+            "greeting": ["hello", "hello friend"],
+            "goodbye": ["bye"],
+            "chitchat": ["robot"],
+            "document_query": ["report", "the report"],
+        },
+    )
+
+
+@pytest.fixture
+def cached(config, examples):
+    config.embedding_cache_enabled = True
+    config.retrieval_mode = "hybrid"
+    return config
+
+
+def test_centroid_stage_routes_messages_the_rules_miss(cached):
+    embeddings = FakeEmbeddings()
+    router = IntentRouter(embeddings, threshold=0.8, margin=0.05)
+
+    found = route(router, "hello hello my dear friend")
+
+    assert (found.category, found.method) == ("greeting", "centroid")
+    assert found.score >= 0.8
+    assert route(router, "the quarterly report numbers") is None
+    assert embeddings.queries == ["hello hello my dear friend", "the quarterly report numbers"]
+
+
+def test_centroid_threshold_and_margin(cached):
+    # Halfway between the greeting and document-query centroids (similarity ~0.71 to each)
+    mixed = "hello about the report"
+    embeddings = FakeEmbeddings(overrides={mixed: [1.0, 0.0, 0.0, 1.0, 0.0]})
+
+    assert route(IntentRouter(embeddings, threshold=0.5, margin=0.0), mixed).category == "greeting"
+    assert route(IntentRouter(embeddings, threshold=0.5, margin=0.05), mixed) is None
+    assert route(IntentRouter(embeddings, threshold=0.99, margin=0.0), mixed) is None
+
+
+def test_long_messages_are_not_embedded(cached):
+    embeddings = FakeEmbeddings()
+    router = IntentRouter(embeddings, threshold=0.8, margin=0.05)
+
+    assert route(router, "hello " * intent_router.MAX_ROUTED_WORDS) is not None
+    assert route(router, "hello " * (intent_router.MAX_ROUTED_WORDS + 1)) is None
+    assert len(embeddings.queries) == 1
+
+
+@pytest.mark.parametrize("cache, mode", [(False, "hybrid"), (True, "hybrid_fast")])
+def test_centroids_are_skipped_when_retrieval_would_not_reuse_the_embedding(config, examples, cache, mode):
+    config.embedding_cache_enabled = cache
+    config.retrieval_mode = mode
+    embeddings = FakeEmbeddings()
+    router = IntentRouter(embeddings, threshold=0.8, margin=0.05)
+
+    asyncio.run(router.awarm())
+
+    assert route(router, "hello hello my dear friend") is None
+    assert route(router, "hi").category == "greeting"
+    assert embeddings.queries == []
+    assert router._centroids is None
@@ -0,0 +1,103 @@
+import pytest
+from langchain_core.documents import Document
+
+from src.core import lexical_index
+from src.core.lexical_index import (
+    LexicalHit,
+    LexicalIndex,
+    is_confident,
+    reciprocal_rank_fusion,
+    tokenize,
+)
+
+CHUNKS = {
+    "p1": "Ticket CRE-1042 tracks the Qdrant snapshot restore failure.",
+    "p2": "Qdrant collections store vectors and payloads in segments.",
+    "p3": "The embedding cache keeps vectors for repeated chunks.",
+    "p4": "Snapshots of a collection can be restored on another node.",
+}
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = LexicalIndex(tmp_path / "kb.lexical.db", "kb")
+    index.add(
+        list(CHUNKS),
+        [Document(page_content=text, metadata={"source": f"{pid}.md"}) for pid, text in CHUNKS.items()],
+    )
+    return index
+
+
+def doc(point_id):
+    return Document(page_content=point_id, metadata={"_id": point_id})
+
+
+def hit(score, coverage=1.0):
+    return LexicalHit(point_id="x", score=score, coverage=coverage, document=doc("x"))
+
+
+def test_tokenize_drops_stopwords_and_splits_ids():
+    assert tokenize("What is the status of CRE-1042?") == ["status", "cre", "1042"]
+
+
+def test_search_ranks_by_bm25_and_reports_coverage(index):
+    hits = index.search("CRE-1042 snapshot", k=3)
+
+    assert hits[0].point_id == "p1"
+    assert hits[0].coverage == 1.0
+    assert hits[0].document.metadata == {"source": "p1.md", "_id": "p1", "_collection_name": "kb"}
+    assert all(a.score >= b.score for a, b in zip(hits, hits[1:]))
+    # Matching only the rarer terms scores higher than matching a common one
+    assert index.search("cre 1042", k=1)[0].score > index.search("qdrant", k=1)[0].score
+
+
+def test_search_without_matches_or_terms_is_empty(index):
+    assert index.search("kubernetes", k=5) == []
+    assert index.search("what is the", k=5) == []
+
+
+def test_other_readers_pick_up_deletes_and_additions(index, monkeypatch):
+    reader = LexicalIndex(index.path, "kb")
+    assert [hit.point_id for hit in reader.search("segments", k=5)] == ["p2"]
+
+    index.delete(["p2"])
+    index.add(["p5"], [Document(page_content="Segments are merged by the optimizer.")])
+    monkeypatch.setattr(lexical_index, "RELOAD_CHECK_SECONDS", 0.0)
+
+    assert [hit.point_id for hit in reader.search("segments", k=5)] == ["p5"]
+    assert reader.count() == 4
+
+
+def test_rebuild_replaces_the_index(index):
+    indexed = index.rebuild([(["a", "b"], [Document(page_content="alpha"), Document(page_content="beta")])])
+
+    assert indexed == 2
+    assert index.count() == 2
+    assert index.search("qdrant", k=5) == []
+
+
+def test_confidence_needs_full_coverage_and_a_margin():
+    assert is_confident([hit(9.0), hit(3.0)], margin=1.5)
+    assert is_confident([hit(1.0)], margin=1.5)
+    assert not is_confident([hit(4.0), hit(3.0)], margin=1.5)
+    assert not is_confident([hit(9.0, coverage=0.5), hit(1.0)], margin=1.5)
+    assert not is_confident([], margin=1.5)
+
+
+def test_rrf_rewards_agreement_between_lists():
+    dense = [doc("a"), doc("b"), doc("c")]
+    lexical = [doc("c"), doc("d")]
+
+    fused = reciprocal_rank_fusion([dense, lexical], k=2, rrf_k=60)
+
+    assert [d.metadata["_id"] for d in fused] == ["c", "a"]
+
+
+def test_rrf_identifies_documents_without_ids_by_content():
+    fused = reciprocal_rank_fusion(
+        [[Document(page_content="same"), Document(page_content="one")], [Document(page_content="same")]],
+        k=5,
+        rrf_k=60,
+    )
+
+    assert [d.page_content for d in fused] == ["same", "one"]
@@ -0,0 +1,209 @@
+import threading
+from pathlib import Path
+
+import pytest
+
+from src.core import loader
+from src.core.loader import (
+    HANDWRITTEN_FOLDER,
+    _handwritten_page_numbers,
+    iter_knowledge_base_files,
+    iter_loaded_files,
+)
+
+
+def write(path: Path, text: str = "x") -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+    return path
+
+
+def test_hidden_files_and_folders_are_skipped(tmp_path):
+    write(tmp_path / "notes.md")
+    write(tmp_path / ".DS_Store")
+    write(tmp_path / ".hidden.txt")
+    write(tmp_path / ".git" / "readme.md")
+    write(tmp_path / "sub" / "._resource.txt")
+    write(tmp_path / "sub" / "data.csv", "a,b\n1,2\n")
+    write(tmp_path / HANDWRITTEN_FOLDER / ".thumbs" / "page.png")
+    write(tmp_path / HANDWRITTEN_FOLDER / "page.png")
+
+    files = iter_knowledge_base_files(tmp_path)
+
+    assert [path.relative_to(tmp_path).as_posix() for path in files] == [
+        f"{HANDWRITTEN_FOLDER}/page.png",
+        "notes.md",
+        "sub/data.csv",
+    ]
+
+
+def test_page_numbers_are_per_folder_and_ignore_other_files(tmp_path, monkeypatch):
+    a = [write(tmp_path / "a" / name) for name in ("3.png", "1.jpg", "2.JPEG")]
+    write(tmp_path / "a" / "scan.pdf")
+    write(tmp_path / "a" / ".0.png")
+    b = write(tmp_path / "b" / "only.png")
+
+    listed = []
+    iterdir = Path.iterdir
+    monkeypatch.setattr(Path, "iterdir", lambda self: listed.append(self) or iterdir(self))
+
+    numbers = _handwritten_page_numbers([*a, b])
+
+    assert numbers == {a[0]: 3, a[1]: 1, a[2]: 2, b: 1}
+    assert sorted(listed) == [tmp_path / "a", tmp_path / "b"]
+
+
+def test_parallel_parse_yields_every_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(loader, "PARSE_BATCH_SIZE", 3)
+    paths = [write(tmp_path / f"{i:02}.txt", f"file {i}") for i in range(loader.PARALLEL_PARSE_MIN_FILES + 2)]
+
+    parsed = dict(iter_loaded_files(paths, tmp_path, max_workers=2))
+
+    assert sorted(parsed) == paths
+    assert all(docs[0].page_content == f"file {i}" for i, docs in enumerate(parsed[p] for p in paths))
+
+
+def test_parser_processes_are_not_forked():
+    assert loader._process_context().get_start_method() in {"forkserver", "spawn"}
+
+
+class FakeOcrExecutor:
+    """Returns "text of <file name>"; images listed in `gates` wait for their event."""
+
+    def __init__(self, max_workers=2, gates=None, fail=()):
+        self.max_workers = max_workers
+        self.gates = gates or {}
+        self.fail = set(fail)
+        self.calls = []
+        self.in_flight = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def extract_text(self, image_path):
+        name = Path(image_path).name
+        with self.lock:
+            self.calls.append(name)
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        try:
+            if name in self.gates:
+                assert self.gates[name].wait(5)
+            if name in self.fail:
+                raise RuntimeError("service unavailable")
+            return f"text of {name}"
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+@pytest.fixture
+def fake_ocr(monkeypatch):
+    def install(executor):
+        monkeypatch.setattr(loader, "get_ocr_executor", lambda: executor)
+        return executor
+
+    return install
+
+
+@pytest.fixture
+def fake_pdfs(monkeypatch):
+    """PDFs "render" to one page per line of their text."""
+
+    def convert(pdf_path, output_folder, dpi=300):
+        pages = []
+        for index, _ in enumerate(Path(pdf_path).read_text().splitlines(), start=1):
+            page = output_folder / f"page_{index:03d}.jpg"
+            page.write_text(pdf_path)
+            pages.append(str(page))
+        return pages
+
+    monkeypatch.setattr(loader, "convert_pdf_to_images", convert)
+
+
+@pytest.fixture
+def kb(tmp_path, config):
+    config.image_output_dir = tmp_path / "images"
+    return tmp_path / "kb"
+
+
+def test_ocr_files_are_yielded_as_they_finish(kb, fake_ocr):
+    slow = write(kb / HANDWRITTEN_FOLDER / "a" / "slow.png")
+    fast = write(kb / HANDWRITTEN_FOLDER / "a" / "fast.png")
+    notes = write(kb / "notes.md", "notes")
+    gate = threading.Event()
+    fake_ocr(FakeOcrExecutor(gates={"slow.png": gate}))
+
+    loaded = iter_loaded_files([slow, fast, notes], kb, max_workers=1)
+    first = [next(loaded), next(loaded)]
+    gate.set()
+    rest = list(loaded)
+
+    assert sorted(path for path, _ in first) == [fast, notes]
+    assert [path for path, _ in rest] == [slow]
+    assert rest[0][1][0].page_content == "text of slow.png"
+
+
+def test_pdf_pages_keep_their_order_and_images_are_removed(kb, config, fake_ocr, fake_pdfs):
+    pdf = write(kb / HANDWRITTEN_FOLDER / "course" / "lecture.pdf", "p1\np2\np3\np4\np5")
+    image = write(kb / HANDWRITTEN_FOLDER / "course" / "b.jpg")
+    write(kb / HANDWRITTEN_FOLDER / "course" / "a.jpg")
+    executor = fake_ocr(FakeOcrExecutor(max_workers=2))
+
+    loaded = dict(iter_loaded_files([pdf, image], kb))
+
+    pages = loaded[pdf]
+    assert [doc.metadata["page_number"] for doc in pages] == [1, 2, 3, 4, 5]
+    assert {doc.metadata["doc_type"] for doc in pages} == {"handwritten_pdf_page"}
+    assert all(doc.metadata["source"] == str(pdf) for doc in pages)
+    assert loaded[image][0].metadata["page_number"] == 2
+    assert executor.peak <= 2
+    assert list(config.image_output_dir.iterdir()) == []
+
+
+def test_file_with_a_failed_page_is_skipped(kb, config, fake_ocr, fake_pdfs, capsys):
+    pdf = write(kb / HANDWRITTEN_FOLDER / "scan.pdf", "p1\np2")
+    image = write(kb / HANDWRITTEN_FOLDER / "ok.png")
+    fake_ocr(FakeOcrExecutor(fail={"page_002.jpg"}))
+
+    loaded = list(iter_loaded_files([pdf, image], kb))
+
+    assert [(path, [doc.page_content for doc in docs]) for path, docs in loaded] == [
+        (image, ["text of ok.png"])
+    ]
+    assert "Skipping" in capsys.readouterr().out
+    assert list(config.image_output_dir.iterdir()) == []
+    assert loader.load_file(pdf, kb) == []
+
+
+def test_empty_pdf_yields_no_documents(kb, fake_ocr, fake_pdfs):
+    pdf = write(kb / HANDWRITTEN_FOLDER / "blank.pdf", "")
+    fake_ocr(FakeOcrExecutor())
+
+    assert list(iter_loaded_files([pdf], kb)) == [(pdf, [])]
+
+
+class FakeEmbeddings:
+    def embed_documents(self, texts):
+        return [[1.0, float(len(text))] for text in texts]
+
+
+def test_failed_ocr_file_stays_out_of_the_manifest(kb, tmp_path, fake_ocr):
+    from src.core.manifest import IngestManifest
+    from src.core.numpy_store import NumpyVectorIndex
+    from src.core.pipeline import IngestPipeline
+
+    good = write(kb / HANDWRITTEN_FOLDER / "good.png")
+    bad = write(kb / HANDWRITTEN_FOLDER / "bad.png")
+    notes = write(kb / "notes.md", "notes")
+    fake_ocr(FakeOcrExecutor(fail={"bad.png"}))
+    plan = IngestManifest(tmp_path / "manifest.json").plan(kb, [bad, good, notes])
+    index = NumpyVectorIndex(tmp_path / "kb.vectors", "kb")
+    done = []
+
+    stats = IngestPipeline(
+        kb, "kb", None, FakeEmbeddings(), chunk_size=100, chunk_overlap=0, vector_index=index
+    ).run(plan, done.append)
+
+    assert sorted(done) == [f"{HANDWRITTEN_FOLDER}/good.png", "notes.md"]
+    assert (stats.files, stats.files_skipped) == (3, 1)
+    assert index.count() == 2
@@ -0,0 +1,119 @@
+import json
+import os
+
+import pytest
+
+from src.core import manifest as manifest_module
+from src.core.manifest import FileEntry, IngestManifest, chunk_point_id
+
+
+@pytest.fixture
+def kb(tmp_path):
+    base = tmp_path / "kb"
+    (base / "sub").mkdir(parents=True)
+    (base / "a.txt").write_text("alpha")
+    (base / "sub" / "b.md").write_text("beta")
+    return base
+
+
+def files(base):
+    return sorted(path for path in base.rglob("*") if path.is_file())
+
+
+def ingest(manifest, plan, points_per_file=2):
+    """Record the plan as ingested, the way ingest_knowledge_base does."""
+    for rel in plan.to_load:
+        entry = plan.current[rel]
+        entry.point_ids = [chunk_point_id(rel, entry.sha256, i) for i in range(points_per_file)]
+    manifest.files = plan.current
+    manifest.save()
+
+
+def test_first_plan_adds_every_file(kb, tmp_path):
+    plan = IngestManifest.load(tmp_path / "manifest.json").plan(kb, files(kb))
+
+    assert plan.added == ["a.txt", "sub/b.md"]
+    assert plan.to_load == ["a.txt", "sub/b.md"]
+    assert plan.changed == plan.removed == plan.unchanged == []
+
+
+def test_detects_changed_removed_and_unchanged_files(kb, tmp_path):
+    path = tmp_path / "manifest.json"
+    manifest = IngestManifest.load(path)
+    ingest(manifest, manifest.plan(kb, files(kb)))
+    old_b_points = manifest.files["sub/b.md"].point_ids
+
+    (kb / "a.txt").unlink()
+    (kb / "sub" / "b.md").write_text("beta, edited")
+    (kb / "c.csv").write_text("x,y")
+
+    reloaded = IngestManifest.load(path)
+    plan = reloaded.plan(kb, files(kb))
+
+    assert (plan.added, plan.changed, plan.removed, plan.unchanged) == (
+        ["c.csv"], ["sub/b.md"], ["a.txt"], []
+    )
+    assert set(reloaded.stale_point_ids(plan)) == set(
+        old_b_points + manifest.files["a.txt"].point_ids
+    )
+
+
+def test_unchanged_stat_skips_hashing_and_keeps_points(kb, tmp_path, monkeypatch):
+    manifest = IngestManifest.load(tmp_path / "manifest.json")
+    ingest(manifest, manifest.plan(kb, files(kb)))
+
+    def fail(path):
+        raise AssertionError(f"re-hashed {path}")
+
+    monkeypatch.setattr(manifest_module, "file_sha256", fail)
+    plan = IngestManifest.load(manifest.path).plan(kb, files(kb))
+
+    assert plan.to_load == []
+    assert plan.unchanged == ["a.txt", "sub/b.md"]
+    assert plan.current["a.txt"].point_ids == manifest.files["a.txt"].point_ids
+
+
+def test_touched_but_identical_file_is_unchanged(kb, tmp_path):
+    manifest = IngestManifest.load(tmp_path / "manifest.json")
+    ingest(manifest, manifest.plan(kb, files(kb)))
+    stat = (kb / "a.txt").stat()
+    os.utime(kb / "a.txt", ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    plan = manifest.plan(kb, files(kb))
+
+    assert plan.unchanged == ["a.txt", "sub/b.md"]
+    # The new mtime is recorded so the next scan skips hashing again
+    assert plan.current["a.txt"].mtime_ns == stat.st_mtime_ns + 10**9
+
+
+def test_full_refresh_reloads_everything(kb, tmp_path):
+    manifest = IngestManifest.load(tmp_path / "manifest.json")
+    ingest(manifest, manifest.plan(kb, files(kb)))
+
+    plan = manifest.plan(kb, files(kb), full_refresh=True)
+
+    assert plan.changed == ["a.txt", "sub/b.md"]
+    assert len(manifest.stale_point_ids(plan)) == 4
+
+
+def test_point_ids_are_deterministic_per_file_version():
+    assert chunk_point_id("a.txt", "h1", 0) == chunk_point_id("a.txt", "h1", 0)
+    assert len({
+        chunk_point_id("a.txt", "h1", 0),
+        chunk_point_id("a.txt", "h1", 1),
+        chunk_point_id("a.txt", "h2", 0),
+        chunk_point_id("b.txt", "h1", 0),
+    }) == 4
+
+
+def test_save_is_atomic_and_versioned(tmp_path):
+    path = tmp_path / "nested" / "manifest.json"
+    IngestManifest(path, {"a.txt": FileEntry("h", 1, 2, ["p"])}).save()
+
+    assert not path.with_suffix(".json.tmp").exists()
+    assert IngestManifest.load(path).files == {"a.txt": FileEntry("h", 1, 2, ["p"])}
+
+    data = json.loads(path.read_text())
+    data["version"] = 0
+    path.write_text(json.dumps(data))
+    assert IngestManifest.load(path).files == {}
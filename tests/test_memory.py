@@ -0,0 +1,156 @@
+import asyncio
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+from src.core import history_store, memory
+from src.core.admission import AdmissionController
+from src.core.history_store import ChatHistoryStore
+
+
+class FakeLLM:
+    def __init__(self, reply="the user asked about snapshots", during_call=None):
+        self.reply = reply
+        self.during_call = during_call
+        self.prompts = []
+
+    async def ainvoke(self, prompt_value):
+        self.prompts.append(prompt_value.to_string())
+        if self.during_call is not None:
+            self.during_call()
+        return AIMessage(content=self.reply)
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch, config):
+    """Summary mode with a 4-message window; one token per word, so each message is 2 tokens."""
+    for module in (memory, history_store):
+        monkeypatch.setattr(module, "count_tokens", lambda text: len(text.split()))
+    config.metrics_enabled = False
+    config.admission_enabled = False
+    config.history_memory_mode = "summary"
+    config.history_max_messages = 4
+    # 40 tokens minus the summary's 10 and the prefix's 5 leaves 25 for messages
+    config.history_max_tokens = 40
+    config.history_summary_max_tokens = 10
+    store = ChatHistoryStore(str(tmp_path / "history" / "chat.db"))
+    monkeypatch.setattr(memory, "get_history_store", lambda: store)
+    return store
+
+
+def run(store, scenario):
+    async def main():
+        try:
+            return await scenario()
+        finally:
+            await store.aclose()
+
+    return asyncio.run(main())
+
+
+async def add_turns(store, count, session_id="s1"):
+    messages = []
+    for i in range(count):
+        messages += [HumanMessage(content=f"question {i}"), AIMessage(content=f"answer {i}")]
+    return await store.aadd_messages(session_id, messages)
+
+
+def contents(messages):
+    return [message.content for message in messages]
+
+
+def test_without_a_summary_the_prompt_keeps_every_message_within_the_budget(store):
+    async def scenario():
+        await add_turns(store, 10)
+        return await memory.aget_prompt_history("s1")
+
+    messages = run(store, scenario)
+
+    # 12 messages of 2 tokens fill the 25-token budget, beyond the 4-message window
+    assert len(messages) == 12
+    assert contents(messages)[-2:] == ["question 9", "answer 9"]
+
+
+def test_messages_not_yet_summarized_stay_in_the_prompt(store):
+    async def scenario():
+        ids = await add_turns(store, 10)
+        await store.aput_summary("s1", "earlier turns", ids[11])
+        return await memory.aget_prompt_history("s1")
+
+    messages = run(store, scenario)
+
+    assert isinstance(messages[0], SystemMessage)
+    assert messages[0].content == memory.SUMMARY_PREFIX + "earlier turns"
+    # Everything after the summary, not just the last 4 messages
+    assert contents(messages[1:]) == [f"{kind} {i}" for i in range(6, 10) for kind in ("question", "answer")]
+
+
+def test_refresh_folds_messages_that_left_the_window(store):
+    llm = FakeLLM()
+
+    async def scenario():
+        ids = await add_turns(store, 5)
+        await memory.arefresh_summary(llm, "s1")
+        return ids, await store.aget_summary("s1"), await memory.aget_prompt_history("s1")
+
+    ids, summary, messages = run(store, scenario)
+
+    assert summary == ("the user asked about snapshots", ids[5])
+    assert "question 0" in llm.prompts[0] and "answer 2" in llm.prompts[0]
+    assert "question 3" not in llm.prompts[0]
+    assert contents(messages) == [
+        memory.SUMMARY_PREFIX + "the user asked about snapshots",
+        "question 3",
+        "answer 3",
+        "question 4",
+        "answer 4",
+    ]
+
+
+def test_refresh_does_nothing_while_the_window_holds_everything(store):
+    llm = FakeLLM()
+
+    async def scenario():
+        await add_turns(store, 2)
+        await memory.arefresh_summary(llm, "s1")
+        return await store.aget_summary("s1")
+
+    assert run(store, scenario) is None
+    assert llm.prompts == []
+
+
+@pytest.fixture
+def controller(config, monkeypatch):
+    config.admission_enabled = True
+    controller = AdmissionController(max_concurrency=1, max_queue=0, queue_timeout=1)
+    monkeypatch.setattr(memory, "get_admission_controller", lambda: controller)
+    return controller
+
+
+def test_refresh_takes_an_admission_slot(store, controller):
+    active = []
+    llm = FakeLLM(during_call=lambda: active.append(controller.active))
+
+    async def scenario():
+        await add_turns(store, 5)
+        await memory.arefresh_summary(llm, "s1")
+
+    run(store, scenario)
+
+    assert active == [1]
+    assert controller.active == 0
+
+
+def test_refresh_is_deferred_when_admission_sheds_it(store, controller, capsys):
+    llm = FakeLLM()
+
+    async def scenario():
+        await add_turns(store, 5)
+        busy = await controller.acquire("another session")
+        await memory.arefresh_summary(llm, "s1")
+        busy.release()
+        return await store.aget_summary("s1")
+
+    assert run(store, scenario) is None
+    assert llm.prompts == []
+    assert "deferred" in capsys.readouterr().out
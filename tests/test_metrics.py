@@ -0,0 +1,120 @@
+import asyncio
+import re
+
+import httpx
+import pytest
+
+from src.chatbot_backend import rag_api
+from src.core import chat_manager, embedding_cache, metrics
+from src.core.metrics import Counter, Gauge, Histogram, server_timing
+
+
+def test_histogram_renders_cumulative_buckets_sum_and_count():
+    histogram = Histogram("t_seconds", "Test latency.", ("stage",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value, stage="llm")
+
+    assert histogram.render() == [
+        "# HELP t_seconds Test latency.",
+        "# TYPE t_seconds histogram",
+        't_seconds_bucket{stage="llm",le="0.1"} 2',
+        't_seconds_bucket{stage="llm",le="1.0"} 3',
+        't_seconds_bucket{stage="llm",le="+Inf"} 4',
+        't_seconds_sum{stage="llm"} 3.65',
+        't_seconds_count{stage="llm"} 4',
+    ]
+
+
+def test_default_buckets_span_cache_hits_to_slow_llm_calls():
+    assert list(metrics.DEFAULT_BUCKETS) == sorted(metrics.DEFAULT_BUCKETS)
+    assert metrics.DEFAULT_BUCKETS[0] <= 0.001
+    assert metrics.DEFAULT_BUCKETS[-1] >= 30
+    assert Histogram("t", "t", buckets=(1.0, 0.5)).buckets == (0.5, 1.0)
+
+
+def test_counter_and_gauge_render_labels():
+    counter = Counter("t_total", "Tokens.", ("call", "kind"))
+    counter.inc(5, call="rag", kind="prompt")
+    counter.inc(2, call="rag", kind="prompt")
+    gauge = Gauge("t_rate", "Rate.", lambda: {'a"b': 0.5}, labelname="cache")
+
+    assert counter.render()[-1] == 't_total{call="rag",kind="prompt"} 7.0'
+    assert gauge.render() == ["# HELP t_rate Rate.", "# TYPE t_rate gauge", 't_rate{cache="a\\"b"} 0.5']
+    assert Gauge("t_broken", "Broken.", lambda: 1 / 0).render() == []
+
+
+def test_server_timing_lists_stages_and_the_total_in_ms():
+    assert server_timing({"llm": 0.25, "embed_query": 0.0123}, 0.3) == (
+        "llm;dur=250.0, embed_query;dur=12.3, total;dur=300.0"
+    )
+
+
+@pytest.fixture
+def client(config, monkeypatch, tmp_path):
+    config.metrics_enabled = True
+    config.timing_header_enabled = True
+    # The cache hit-rate gauge opens the embedding cache
+    config.embedding_cache_path = tmp_path / "embedding_cache.db"
+    monkeypatch.setattr(embedding_cache, "_CACHE", None)
+
+    async def history_page(session_id, before=None, limit=None):
+        with metrics.stage("history_load"):
+            await asyncio.sleep(0.002)
+        return [], None
+
+    monkeypatch.setattr(chat_manager, "aget_chat_history_page", history_page)
+
+    def get(*paths, **kwargs):
+        async def main():
+            transport = httpx.ASGITransport(app=rag_api.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+                return [await http.get(path, **kwargs) for path in paths]
+
+        return asyncio.run(main())
+
+    return get
+
+
+def test_request_reports_its_stages_in_server_timing(client):
+    (response,) = client("/chat_history/s1")
+
+    entries = dict(
+        re.fullmatch(r"(\w+);dur=([\d.]+)", entry).groups()
+        for entry in response.headers["server-timing"].split(", ")
+    )
+    assert list(entries) == ["history_load", "total"]
+    assert 2.0 <= float(entries["history_load"]) <= float(entries["total"])
+
+
+def test_server_timing_can_be_turned_off(client, config):
+    config.timing_header_enabled = False
+
+    (response,) = client("/chat_history/s1")
+
+    assert "server-timing" not in response.headers
+
+
+def test_metrics_endpoint_exposes_prometheus_text(client):
+    _, response = client("/chat_history/s1", "/metrics")
+
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = response.text
+    assert "# TYPE rag_request_seconds histogram" in text
+    # Series are labelled by route template, not by session id
+    assert re.search(
+        r'rag_request_seconds_count\{method="GET",path="/chat_history/\{session_id\}",status="200"\} \d+', text
+    )
+    assert re.search(r'rag_stage_seconds_bucket\{stage="history_load",le="\+Inf"\} \d+', text)
+    for line in text.splitlines():
+        if not line.startswith("#"):
+            series, value = line.rsplit(" ", 1)
+            assert re.fullmatch(r"[a-z_]+(\{.*\})?", series)
+            float(value)
+
+
+def test_metrics_endpoint_is_hidden_when_disabled(client, config):
+    config.metrics_enabled = False
+
+    (response,) = client("/metrics")
+
+    assert response.status_code == 404
@@ -0,0 +1,160 @@
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+
+from src.core import numpy_store
+from src.core.numpy_store import NumpyVectorIndex, NumpyVectorStore
+
+
+@pytest.fixture
+def index(tmp_path):
+    return NumpyVectorIndex(tmp_path / "kb.vectors", "kb", dtype="float32")
+
+
+@pytest.fixture
+def reload_always(monkeypatch):
+    monkeypatch.setattr(numpy_store, "RELOAD_CHECK_SECONDS", 0.0)
+
+
+def chunks(*names, **metadata):
+    return [Document(page_content=name, metadata={"name": name, **metadata}) for name in names]
+
+
+def hit_names(results):
+    return [doc.page_content for doc, _ in results]
+
+
+def test_search_ranks_by_cosine_similarity(index):
+    index.upsert(["a", "b", "c"], [[1, 0, 0], [1, 1, 0], [0, 0, 5]], chunks("a", "b", "c"))
+
+    results = index.search([2, 0, 0], k=2)
+
+    assert hit_names(results) == ["a", "b"]
+    assert results[0][1] == pytest.approx(1.0)
+    assert results[1][1] == pytest.approx(np.sqrt(0.5))
+    assert results[0][0].metadata == {"name": "a", "_id": "a", "_collection_name": "kb"}
+
+
+def test_score_threshold_and_filters(index):
+    index.upsert(
+        ["p1", "p2", "d1"],
+        [[1, 0], [1, 0.2], [1, 0.1]],
+        chunks("p1", "p2", doc_type="pdf")[:2] + chunks("d1", doc_type="docx"),
+    )
+
+    assert hit_names(index.search([1, 0], k=5, score_threshold=0.99)) == ["p1", "d1"]
+    assert hit_names(index.search([1, 0], k=5, filter={"doc_type": "docx"})) == ["d1"]
+    assert hit_names(index.search([1, 0], k=5, filter={"doc_type": ["pdf", "docx"]})) == ["p1", "d1", "p2"]
+    assert index.search([1, 0], k=5, filter={"doc_type": "csv"}) == []
+
+
+def test_upsert_replaces_and_deleted_slots_are_reused(index, reload_always):
+    index.upsert(["a", "b"], [[1, 0], [0, 1]], chunks("a", "b"))
+    index.upsert(["a"], [[0, 1]], chunks("a2"))
+    assert sorted(hit_names(index.search([0, 1], k=5))) == ["a2", "b"]
+
+    index.delete(["b"])
+    assert hit_names(index.search([0, 1], k=5)) == ["a2"]
+
+    index.upsert(["c"], [[1, 1]], chunks("c"))
+    slots = dict(index._conn.execute("SELECT point_id, slot FROM points"))
+    assert slots == {"a": 0, "c": 1}
+    assert index.count() == 2
+
+
+def test_upserts_keep_slots_in_memory_instead_of_scanning_the_table(index):
+    index.upsert(["a", "b", "c"], [[1, 0], [0, 1], [1, 1]], chunks("a", "b", "c"))
+    statements = []
+    index._conn.set_trace_callback(statements.append)
+
+    index.delete(["a"])
+    index.upsert(["d", "b"], [[1, 0], [0, 1]], chunks("d", "b"))
+
+    assert not [sql for sql in statements if sql.startswith("SELECT") and "FROM points" in sql]
+    assert dict(index._conn.execute("SELECT point_id, slot FROM points")) == {"b": 1, "c": 2, "d": 0}
+
+
+def test_slots_written_by_another_process_are_not_reused(index):
+    index.upsert(["a"], [[1, 0]], chunks("a"))
+    other = NumpyVectorIndex(index.path, "kb")
+    other.upsert(["b"], [[0, 1]], chunks("b"))
+
+    index.upsert(["c"], [[1, 1]], chunks("c"))
+
+    assert dict(index._conn.execute("SELECT point_id, slot FROM points")) == {"a": 0, "b": 1, "c": 2}
+
+
+def test_search_ignores_slots_beyond_the_mapped_vectors(index):
+    index.upsert(["a", "b", "c"], [[1, 0], [0, 1], [1, 1]], chunks("a", "b", "c"))
+    index.load()
+    # As if the file grew after it was mapped but before the slot list was read
+    index._vectors = index._vectors[:2]
+
+    assert sorted(hit_names(index.search([1, 1], k=5))) == ["a", "b"]
+
+
+def test_vector_file_grows_past_its_capacity(index, monkeypatch, reload_always):
+    monkeypatch.setattr(numpy_store, "MIN_CAPACITY", 2)
+    vectors = np.eye(5).tolist()
+    index.upsert([f"p{i}" for i in range(5)], vectors, chunks(*[f"p{i}" for i in range(5)]))
+
+    assert np.load(index.path / "vectors.npy", mmap_mode="r").shape[0] >= 5
+    for i in range(5):
+        assert hit_names(index.search(vectors[i], k=1)) == [f"p{i}"]
+
+
+def test_dimension_mismatch_is_rejected(index):
+    index.upsert(["a"], [[1, 0]], chunks("a"))
+
+    with pytest.raises(ValueError, match="dimension 3"):
+        index.upsert(["b"], [[1, 0, 0]], chunks("b"))
+
+
+def test_readers_pick_up_changes_from_another_process(index, reload_always):
+    reader = NumpyVectorIndex(index.path, "kb")
+    assert reader.search([1, 0], k=5) == []
+
+    index.upsert(["a"], [[1, 0]], chunks("a"))
+    assert hit_names(reader.search([1, 0], k=5)) == ["a"]
+
+    index.clear()
+    assert reader.search([1, 0], k=5) == []
+
+
+def test_float16_vectors_keep_the_ranking(tmp_path):
+    index = NumpyVectorIndex(tmp_path / "half", "kb", dtype="float16")
+    rng = np.random.default_rng(3)
+    vectors = rng.normal(size=(50, 16))
+    index.upsert([str(i) for i in range(50)], vectors.tolist(), chunks(*[str(i) for i in range(50)]))
+
+    assert np.load(index.path / "vectors.npy", mmap_mode="r").dtype == np.float16
+    assert hit_names(index.search(vectors[7], k=1)) == ["7"]
+
+
+def test_iter_batches_returns_every_point(index):
+    index.upsert(["a", "b", "c"], [[1, 0], [0, 1], [1, 1]], chunks("a", "b", "c"))
+
+    batches = list(index.iter_batches(batch_size=2))
+
+    assert [ids for ids, _ in batches] == [["a", "b"], ["c"]]
+    assert [doc.page_content for _, docs in batches for doc in docs] == ["a", "b", "c"]
+
+
+class FakeEmbeddings:
+    def embed_query(self, text):
+        return [1.0, 0.0] if "one" in text else [0.0, 1.0]
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+
+def test_vectorstore_adds_texts_and_ignores_qdrant_kwargs(index):
+    store = NumpyVectorStore(index, FakeEmbeddings())
+
+    ids = store.add_texts(["chunk one", "chunk two"], [{"n": 1}, {"n": 2}], ids=["x", "y"])
+    docs = store.similarity_search("one", k=1, search_params=object())
+
+    assert ids == ["x", "y"]
+    assert [doc.page_content for doc in docs] == ["chunk one"]
+    assert store.collection_name == "kb"
+    assert [doc.metadata["_id"] for doc in store.similarity_search_by_vector([0, 1], k=1)] == ["y"]
@@ -0,0 +1,199 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+from azure.core.exceptions import HttpResponseError, ServiceRequestError
+
+from src.core import ocr, ocr_cache
+from src.core.ocr import NO_TEXT_MESSAGE, OcrExecutor
+from src.core.ocr_cache import OcrCache
+
+# Captured before the `sleeps` fixture patches time.sleep for the executor
+real_sleep = time.sleep
+
+
+def read_result(text):
+    if not text:
+        return SimpleNamespace(read=None)
+    lines = [SimpleNamespace(text=line) for line in text.split("\n")]
+    return SimpleNamespace(read=SimpleNamespace(blocks=[SimpleNamespace(lines=lines)]))
+
+
+def http_error(status, retry_after=None):
+    exc = HttpResponseError(message=f"HTTP {status}")
+    exc.status_code = status
+    headers = {"Retry-After": retry_after} if retry_after is not None else {}
+    exc.response = SimpleNamespace(headers=headers)
+    return exc
+
+
+class FakeVisionClient:
+    """Stands in for ImageAnalysisClient: echoes the image bytes as OCR text.
+
+    `delays` maps image bytes to seconds to sleep, `failures` to a list of
+    exceptions raised by the first calls for that image.
+    """
+
+    def __init__(self, delays=None, failures=None):
+        self.delays = delays or {}
+        self.failures = {key: list(value) for key, value in (failures or {}).items()}
+        self.calls = []
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def analyze(self, image_data, visual_features):
+        with self._lock:
+            self.calls.append(image_data)
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            real_sleep(self.delays.get(image_data, 0))
+            pending = self.failures.get(image_data)
+            if pending:
+                raise pending.pop(0)
+            return read_result(image_data.decode())
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+@pytest.fixture
+def no_cache(config):
+    config.set_ocr_cache(enabled=False)
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Record backoff sleeps instead of waiting them out."""
+    recorded = []
+    monkeypatch.setattr(ocr.time, "sleep", recorded.append)
+    return recorded
+
+
+def write_images(tmp_path, contents):
+    paths = []
+    for i, content in enumerate(contents):
+        path = tmp_path / f"page_{i:03d}.jpg"
+        path.write_bytes(content.encode())
+        paths.append(str(path))
+    return paths
+
+
+def test_map_keeps_input_order_when_pages_finish_out_of_order(tmp_path, no_cache):
+    contents = [f"page {i}" for i in range(6)]
+    # Earlier pages take longest, so they complete last
+    client = FakeVisionClient(delays={c.encode(): 0.05 * (6 - i) for i, c in enumerate(contents)})
+    executor = OcrExecutor(client=client, max_workers=6)
+
+    results = executor.map(write_images(tmp_path, contents))
+
+    assert results == contents
+    assert client.max_active > 1
+
+
+def test_map_respects_max_workers(tmp_path, no_cache):
+    contents = [f"page {i}" for i in range(8)]
+    client = FakeVisionClient(delays={c.encode(): 0.02 for c in contents})
+
+    OcrExecutor(client=client, max_workers=2).map(write_images(tmp_path, contents))
+
+    assert client.max_active <= 2
+
+
+def test_retries_throttling_honouring_retry_after(tmp_path, no_cache, sleeps):
+    client = FakeVisionClient(failures={b"text": [http_error(429, "7"), http_error(503)]})
+    executor = OcrExecutor(client=client, max_retries=3, backoff_seconds=1.0)
+
+    assert executor.map(write_images(tmp_path, ["text"])) == ["text"]
+    assert executor.stats() == {"service_calls": 3, "retries": 2}
+    # Retry-After wins; the 503 without it backs off exponentially with jitter
+    assert sleeps[0] == 7.0
+    assert 1.0 <= sleeps[1] <= 3.0
+
+
+def test_backoff_is_capped(no_cache, sleeps):
+    client = FakeVisionClient(failures={b"x": [http_error(429, "3600")]})
+
+    OcrExecutor(client=client, max_retries=1).extract_text_from_bytes(b"x")
+
+    assert sleeps == [ocr.MAX_BACKOFF_SECONDS]
+
+
+def test_connection_errors_are_retried(no_cache, sleeps):
+    client = FakeVisionClient(failures={b"x": [ServiceRequestError("reset")]})
+
+    assert OcrExecutor(client=client, max_retries=1, backoff_seconds=0.1).extract_text_from_bytes(b"x") == "x"
+
+
+def test_gives_up_after_max_retries_and_reports_per_image(tmp_path, no_cache, sleeps):
+    client = FakeVisionClient(failures={b"bad": [http_error(429)] * 5})
+    executor = OcrExecutor(client=client, max_workers=2, max_retries=2, backoff_seconds=0.1)
+
+    good, bad = executor.map(write_images(tmp_path, ["good", "bad"]))
+
+    assert good == "good"
+    assert isinstance(bad, HttpResponseError)
+    assert client.calls.count(b"bad") == 3
+
+
+def test_client_errors_are_not_retried(no_cache, sleeps):
+    client = FakeVisionClient(failures={b"x": [http_error(400)]})
+    executor = OcrExecutor(client=client, max_retries=3)
+
+    with pytest.raises(HttpResponseError):
+        executor.extract_text_from_bytes(b"x")
+    assert sleeps == []
+
+
+def test_cache_hits_skip_the_service(tmp_path):
+    cache = OcrCache(tmp_path / "ocr.db")
+    client = FakeVisionClient()
+    executor = OcrExecutor(client=client, cache=cache, max_workers=2)
+    first = write_images(tmp_path, ["one", "two"])
+
+    assert executor.map(first) == ["one", "two"]
+    # Same bytes under another name are still a hit
+    renamed = tmp_path / "renamed.jpg"
+    renamed.write_bytes(b"two")
+    assert executor.map([str(renamed), first[0]]) == ["two", "one"]
+
+    assert client.calls.count(b"one") == client.calls.count(b"two") == 1
+    assert cache.stats()["hits"] == 2
+
+
+def test_cache_key_depends_on_settings(tmp_path):
+    client = FakeVisionClient()
+    OcrExecutor(client=client, cache=OcrCache(tmp_path / "ocr.db", settings="v1")).extract_text_from_bytes(b"x")
+    OcrExecutor(client=client, cache=OcrCache(tmp_path / "ocr.db", settings="v2")).extract_text_from_bytes(b"x")
+
+    assert client.calls == [b"x", b"x"]
+
+
+def test_empty_result_gets_placeholder_text(no_cache):
+    assert OcrExecutor(client=FakeVisionClient()).extract_text_from_bytes(b"") == NO_TEXT_MESSAGE
+
+
+def test_shared_cache_is_keyed_on_the_configured_model_and_features(tmp_path, config, monkeypatch):
+    config.set_ocr_cache(enabled=True, path=str(tmp_path / "ocr.db"))
+    monkeypatch.setattr(ocr_cache, "_CACHE", None)
+    client = FakeVisionClient()
+
+    def run():
+        OcrExecutor(client=client).extract_text_from_bytes(b"x")
+
+    run()
+    run()
+    config.set_ocr_model("another-model")
+    run()
+    config.set_ocr_visual_features(["read", "caption"])
+    run()
+
+    assert client.calls == [b"x", b"x", b"x"]
+    assert "features=caption,read" in ocr_cache.get_ocr_cache().settings
+
+
+def test_visual_features_must_include_read(config):
+    with pytest.raises(ValueError):
+        config.set_ocr_visual_features(["caption"])
@@ -0,0 +1,113 @@
+from types import SimpleNamespace
+
+import pytest
+from qdrant_client import models
+
+from src.core.embeddings import PAYLOAD_INDEX_FIELDS, ensure_collection, schema_differences
+
+
+def collection_info(m=16, ef_construct=100, quantization=None, on_disk=None, payload_schema=None):
+    return SimpleNamespace(
+        config=SimpleNamespace(
+            params=SimpleNamespace(
+                vectors=models.VectorParams(size=4, distance=models.Distance.COSINE, on_disk=on_disk)
+            ),
+            hnsw_config=SimpleNamespace(m=m, ef_construct=ef_construct),
+            quantization_config=quantization,
+        ),
+        payload_schema=payload_schema if payload_schema is not None else {},
+    )
+
+
+class FakeQdrant:
+    """Records schema calls against one existing (or missing) collection."""
+
+    def __init__(self, info=None):
+        self.info = info
+        self.created = None
+        self.updates = []
+        self.payload_indexes = []
+
+    def collection_exists(self, name):
+        return self.info is not None
+
+    def get_collection(self, name):
+        return self.info
+
+    def create_collection(self, collection_name, **kwargs):
+        self.created = kwargs
+
+    def update_collection(self, collection_name, **changes):
+        self.updates.append(changes)
+
+    def create_payload_index(self, collection_name, field_name, **kwargs):
+        self.payload_indexes.append(field_name)
+
+
+@pytest.fixture
+def schema(config):
+    config.set_qdrant_schema(hnsw_m=16, hnsw_ef_construct=100, quantization="none", on_disk=False)
+    config.qdrant_schema_migrate = False
+    return config
+
+
+def test_defaults_match_a_collection_created_with_qdrant_defaults(schema, monkeypatch):
+    for name in ("QUANTIZATION", "HNSW_M", "HNSW_EF_CONSTRUCT", "ON_DISK", "SCHEMA_MIGRATE"):
+        monkeypatch.delenv(f"QDRANT_{name}", raising=False)
+    defaults = type(schema)()
+
+    assert defaults.qdrant_quantization == "none"
+    assert (defaults.qdrant_hnsw_m, defaults.qdrant_hnsw_ef_construct) == (16, 100)
+    assert defaults.qdrant_on_disk is False
+    assert defaults.qdrant_schema_migrate is False
+    assert schema_differences(collection_info()) == {}
+
+
+def test_new_collection_gets_the_configured_schema(schema):
+    schema.set_qdrant_schema(quantization="scalar", on_disk=True)
+    client = FakeQdrant()
+
+    ensure_collection(client, "kb", 4)
+
+    assert isinstance(client.created["quantization_config"], models.ScalarQuantization)
+    assert client.created["vectors_config"].on_disk is True
+    assert client.payload_indexes == list(PAYLOAD_INDEX_FIELDS)
+
+
+def test_mismatch_is_reported_without_touching_the_collection(schema, capsys):
+    schema.set_qdrant_schema(hnsw_m=32, quantization="scalar")
+    client = FakeQdrant(collection_info(payload_schema={"metadata.source": "keyword"}))
+
+    ensure_collection(client, "kb", 4)
+
+    assert client.updates == []
+    output = capsys.readouterr().out
+    assert "differs from the configured schema" in output
+    assert "HNSW m=16, ef_construct=100 -> m=32, ef_construct=100" in output
+    assert "quantization none -> scalar" in output
+    # Payload indexes only speed up filters, so missing ones are still added
+    assert client.payload_indexes == ["metadata.doc_type", "metadata.note_group"]
+
+
+def test_migration_applies_only_the_differences(schema):
+    schema.set_qdrant_schema(quantization="none", on_disk=True, migrate=True)
+    scalar = models.ScalarQuantization(
+        scalar=models.ScalarQuantizationConfig(type=models.ScalarType.INT8)
+    )
+    client = FakeQdrant(collection_info(quantization=scalar))
+
+    ensure_collection(client, "kb", 4)
+
+    (update,) = client.updates
+    assert set(update) == {"quantization_config", "vectors_config"}
+    assert update["quantization_config"] == models.Disabled.DISABLED
+    assert update["vectors_config"][""].on_disk is True
+
+
+def test_explicit_argument_overrides_the_config(schema):
+    schema.set_qdrant_schema(hnsw_m=32, migrate=True)
+    client = FakeQdrant(collection_info())
+
+    ensure_collection(client, "kb", 4, migrate_schema=False)
+
+    assert client.updates == []
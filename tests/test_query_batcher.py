@@ -0,0 +1,105 @@
+import asyncio
+
+import pytest
+
+from src.core.query_batcher import QueryEmbeddingBatcher, get_query_batching_stats
+
+
+class FakeEmbeddings:
+    """Embeds a text as ``[len(text)]`` and records every upstream request."""
+
+    def __init__(self, error=None):
+        self.error = error
+        self.requests = []
+
+    def embed_documents(self, texts):
+        self.requests.append(("sync", list(texts)))
+        return [[float(len(text))] for text in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts):
+        self.requests.append(("async", list(texts)))
+        await asyncio.sleep(0)
+        if self.error is not None:
+            raise self.error
+        return [[float(len(text))] for text in texts]
+
+
+@pytest.fixture
+def batching(config):
+    config.query_batch_enabled = True
+    return config
+
+
+async def embed_concurrently(batcher, texts):
+    return await asyncio.gather(*(batcher.aembed_query(text) for text in texts), return_exceptions=True)
+
+
+def test_concurrent_queries_share_one_request(batching):
+    underlying = FakeEmbeddings()
+    batcher = QueryEmbeddingBatcher(underlying, max_size=8, wait_ms=5)
+    before = get_query_batching_stats()
+
+    vectors = asyncio.run(embed_concurrently(batcher, ["a", "bb", "ccc"]))
+
+    assert vectors == [[1.0], [2.0], [3.0]]
+    assert underlying.requests == [("async", ["a", "bb", "ccc"])]
+    after = get_query_batching_stats()
+    assert after["batches"] == before["batches"] + 1
+    assert after["requests_saved"] == before["requests_saved"] + 2
+
+
+def test_a_full_batch_is_sent_without_waiting(batching):
+    underlying = FakeEmbeddings()
+    # A wait this long would time the test out if full batches were not sent at once
+    batcher = QueryEmbeddingBatcher(underlying, max_size=2, wait_ms=60_000)
+
+    vectors = asyncio.run(asyncio.wait_for(embed_concurrently(batcher, ["a", "bb", "ccc", "dddd"]), 5))
+
+    assert vectors == [[1.0], [2.0], [3.0], [4.0]]
+    assert [texts for _, texts in underlying.requests] == [["a", "bb"], ["ccc", "dddd"]]
+
+
+def test_identical_texts_are_embedded_once(batching):
+    underlying = FakeEmbeddings()
+    batcher = QueryEmbeddingBatcher(underlying, max_size=8, wait_ms=5)
+
+    vectors = asyncio.run(embed_concurrently(batcher, ["same", "other", "same"]))
+
+    assert vectors == [[4.0], [5.0], [4.0]]
+    assert underlying.requests == [("async", ["same", "other"])]
+
+
+def test_an_upstream_error_reaches_every_caller(batching):
+    batcher = QueryEmbeddingBatcher(FakeEmbeddings(error=RuntimeError("HTTP 500")), max_size=8, wait_ms=5)
+
+    results = asyncio.run(embed_concurrently(batcher, ["a", "b"]))
+
+    assert [str(result) for result in results] == ["HTTP 500"] * 2
+
+
+def test_large_calls_sync_calls_and_disabled_batching_go_straight_through(batching):
+    underlying = FakeEmbeddings()
+    batcher = QueryEmbeddingBatcher(underlying, max_size=2, wait_ms=5)
+
+    asyncio.run(batcher.aembed_documents(["a", "b", "c"]))
+    batcher.embed_query("d")
+    batching.query_batch_enabled = False
+    asyncio.run(embed_concurrently(batcher, ["e", "f"]))
+
+    assert underlying.requests == [
+        ("async", ["a", "b", "c"]),
+        ("sync", ["d"]),
+        ("async", ["e"]),
+        ("async", ["f"]),
+    ]
+
+
+def test_the_batcher_can_be_reused_across_event_loops(batching):
+    underlying = FakeEmbeddings()
+    batcher = QueryEmbeddingBatcher(underlying, max_size=8, wait_ms=5)
+
+    assert asyncio.run(batcher.aembed_query("a")) == [1.0]
+    assert asyncio.run(batcher.aembed_query("bb")) == [2.0]
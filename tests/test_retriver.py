@@ -0,0 +1,112 @@
+import asyncio
+
+import pytest
+from langchain_core.documents import Document
+
+from src.core import retriver
+from src.core.lexical_index import LexicalIndex
+
+
+class FakeEmbeddings:
+    def __init__(self):
+        self.queries = []
+
+    def embed_query(self, text):
+        self.queries.append(text)
+        return [0.0]
+
+    async def aembed_query(self, text):
+        return self.embed_query(text)
+
+
+class FakeVectorStore:
+    """Returns `scored` documents above the search's score threshold, best first."""
+
+    collection_name = "kb"
+
+    def __init__(self, scored):
+        self.scored = scored
+        self.embeddings = FakeEmbeddings()
+
+    def similarity_search_by_vector(self, vector, k, score_threshold=None, **kwargs):
+        return [
+            Document(page_content=pid, metadata={"_id": pid})
+            for pid, score in self.scored
+            if score_threshold is None or score >= score_threshold
+        ][:k]
+
+    async def asimilarity_search_by_vector(self, vector, k, **kwargs):
+        return self.similarity_search_by_vector(vector, k, **kwargs)
+
+
+@pytest.fixture
+def lexical(tmp_path, monkeypatch):
+    index = LexicalIndex(tmp_path / "kb.lexical.db", "kb")
+    index.add(
+        ["lex-strong", "lex-weak"],
+        [
+            Document(page_content="error code E4711 during snapshot restore"),
+            Document(page_content="restore the office plants on friday"),
+        ],
+    )
+    monkeypatch.setattr(retriver, "get_lexical_index", lambda collection_name: index)
+    return index
+
+
+@pytest.fixture
+def retrieval(config, lexical):
+    config.retrieval_mode = "hybrid"
+    config.retriever_score_threshold = 0.5
+    config.lexical_min_score = None
+    config.coalescing_enabled = False
+    return config
+
+
+def ids(docs):
+    return [doc.metadata["_id"] for doc in docs]
+
+
+def retrieve(vectorstore, query):
+    sync = retriver.get_relevant_docs(vectorstore, query, k=4)
+    concurrent = asyncio.run(retriver.aget_relevant_docs(vectorstore, query, k=4))
+    assert ids(sync) == ids(concurrent)
+    return ids(sync)
+
+
+def test_lexical_hits_are_fused_with_dense_results(retrieval):
+    vectorstore = FakeVectorStore([("dense-1", 0.8), ("dense-2", 0.6)])
+
+    assert set(retrieve(vectorstore, "E4711 restore")) == {"dense-1", "dense-2", "lex-strong", "lex-weak"}
+
+
+def test_lexical_hits_do_not_bypass_the_score_threshold(retrieval):
+    vectorstore = FakeVectorStore([("dense-1", 0.3), ("dense-2", 0.2)])
+
+    assert retrieve(vectorstore, "restore the plants") == []
+
+
+def test_without_a_threshold_lexical_hits_are_kept(retrieval):
+    retrieval.retriever_score_threshold = None
+    vectorstore = FakeVectorStore([])
+
+    assert set(retrieve(vectorstore, "restore")) == {"lex-strong", "lex-weak"}
+
+
+def test_weak_bm25_hits_are_dropped_below_the_minimum_score(retrieval, lexical):
+    vectorstore = FakeVectorStore([("dense-1", 0.8)])
+    strong, weak = lexical.search("E4711 snapshot restore", k=2)
+    assert (strong.point_id, weak.point_id) == ("lex-strong", "lex-weak")
+    retrieval.lexical_min_score = (strong.score + weak.score) / 2
+
+    assert sorted(retrieve(vectorstore, "E4711 snapshot restore")) == ["dense-1", "lex-strong"]
+
+
+def test_fast_path_ignores_hits_below_the_minimum_score(retrieval, lexical):
+    retrieval.retrieval_mode = "hybrid_fast"
+    vectorstore = FakeVectorStore([("dense-1", 0.8)])
+
+    assert retrieve(vectorstore, "E4711") == ["lex-strong"]
+    assert vectorstore.embeddings.queries == []
+
+    retrieval.lexical_min_score = lexical.search("E4711", k=1)[0].score + 1
+    assert retrieve(vectorstore, "E4711") == ["dense-1"]
@@ -0,0 +1,69 @@
+import json
+
+import pytest
+
+from src.core.stream_parser import IncrementalJSONFieldParser
+
+RESPONSE = {
+    "category": "document_query",
+    "answer": 'Line one\nsays "hi" \\ café \U0001f600',
+    "diagram_suggested": True,
+    "context_used": False,
+}
+
+
+def feed_all(parser, text, size):
+    return "".join(parser.feed(text[i : i + size]) for i in range(0, len(text), size))
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 1000])
+def test_streams_answer_for_any_chunking(size):
+    text = json.dumps(RESPONSE)
+    parser = IncrementalJSONFieldParser()
+
+    assert feed_all(parser, text, size) == RESPONSE["answer"]
+    assert parser.value == RESPONSE["answer"]
+    assert parser.fields == RESPONSE
+
+
+def test_ascii_escaped_unicode_split_across_chunks():
+    # json.dumps escapes the emoji as a surrogate pair; cut inside both escapes
+    text = json.dumps({"answer": "x\U0001f600y"})
+    cut = text.index("\\u") + 3
+    parser = IncrementalJSONFieldParser()
+
+    first = parser.feed(text[:cut])
+    rest = parser.feed(text[cut:])
+
+    assert first == "x"
+    assert rest == "\U0001f600y"
+
+
+def test_ignores_code_fence_and_nested_values():
+    text = '```json\n{"meta": {"answer": "inner"}, "tags": ["a", "b"], "answer": "outer"}\n```'
+    parser = IncrementalJSONFieldParser()
+
+    assert feed_all(parser, text, 4) == "outer"
+    assert parser.fields["answer"] == "outer"
+    assert "meta" not in parser.fields
+
+
+def test_scalar_fields_reported_once_complete():
+    parser = IncrementalJSONFieldParser()
+    parser.feed('{"context_used": tr')
+    assert "context_used" not in parser.fields
+
+    parser.feed('ue, "answer": "a')
+    assert parser.fields["context_used"] is True
+    assert "answer" not in parser.fields
+
+
+def test_consumed_output_is_not_kept_in_the_buffer():
+    parser = IncrementalJSONFieldParser()
+    parser.feed('{"answer": "' + "word " * 1000)
+    assert parser._buffer == ""
+
+    parser.feed("tail \\u00")
+    assert parser._buffer == "\\u00"
+    assert parser.feed('e9"}') == "é"
+    assert parser._buffer == ""
@@ -0,0 +1,127 @@
+import asyncio
+import json
+from typing import Any, List, Optional
+
+import pytest
+from langchain_core.exceptions import OutputParserException
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from src.core import chat_manager
+from src.core.prompt import native_format_instructions
+
+REPLY = json.dumps(
+    {"category": "document_query", "answer": "Restore the snapshot.", "diagram_suggested": False, "context_used": True}
+)
+INPUTS = {"context_text": "Snapshots can be restored.", "query": "how do I restore?", "chat_history": ""}
+
+
+class FakeLLM(BaseChatModel):
+    """Replies with `reply` and records the prompt and call kwargs it was given."""
+
+    reply: str = REPLY
+    calls: List[dict] = []
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake"
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any):
+        self.calls.append({"prompt": messages[0].content, **kwargs})
+        message = AIMessage(
+            content=self.reply, usage_metadata={"input_tokens": 100, "output_tokens": 20, "total_tokens": 120}
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+@pytest.fixture
+def mode(config, monkeypatch):
+    monkeypatch.setattr(chat_manager, "_chains", {})
+    config.metrics_enabled = False
+
+    def set_mode(name):
+        config.set_structured_output(name)
+        return name
+
+    return set_mode
+
+
+def stats_delta(before, after, mode):
+    return {key: after[mode][key] - before[mode][key] for key in ("responses", "parse_failures")}
+
+
+def test_instructions_mode_puts_the_schema_in_the_prompt(mode):
+    mode("instructions")
+    llm = FakeLLM(calls=[])
+    before = chat_manager.get_structured_output_stats()
+
+    response = chat_manager._invoke_rag(llm, INPUTS)
+
+    assert response.answer == "Restore the snapshot."
+    (call,) = llm.calls
+    assert "response_json_schema" not in call
+    assert '"diagram_suggested"' in call["prompt"]
+    assert native_format_instructions not in call["prompt"]
+    after = chat_manager.get_structured_output_stats()
+    assert stats_delta(before, after, "instructions") == {"responses": 1, "parse_failures": 0}
+    assert after["mode"] == "instructions"
+
+
+def test_native_mode_binds_the_schema_to_the_model(mode):
+    mode("native")
+    llm = FakeLLM(calls=[])
+    before = chat_manager.get_structured_output_stats()
+
+    response = asyncio.run(chat_manager._ainvoke_rag(llm, INPUTS))
+
+    assert response.context_used is True
+    (call,) = llm.calls
+    assert call["response_mime_type"] == "application/json"
+    assert call["response_json_schema"] == chat_manager.QueryResponse.model_json_schema()
+    assert native_format_instructions in call["prompt"]
+    # The parser's schema dump is much longer than the one-line description
+    assert '"properties"' not in call["prompt"]
+    after = chat_manager.get_structured_output_stats()
+    assert stats_delta(before, after, "native") == {"responses": 1, "parse_failures": 0}
+    assert after["native"]["avg_prompt_tokens"] is not None
+
+
+@pytest.mark.parametrize("name", ["instructions", "native"])
+def test_a_reply_that_does_not_parse_is_counted_and_raised(mode, name):
+    mode(name)
+    llm = FakeLLM(calls=[], reply="Sure! The answer is: restore the snapshot.")
+    before = chat_manager.get_structured_output_stats()
+
+    with pytest.raises(OutputParserException):
+        chat_manager._invoke_rag(llm, INPUTS)
+
+    after = chat_manager.get_structured_output_stats()
+    assert stats_delta(before, after, name) == {"responses": 1, "parse_failures": 1}
+    assert after[name]["parse_failure_rate"] > 0
+
+
+def test_chains_are_compiled_once_per_llm_and_mode(mode):
+    first, second = FakeLLM(calls=[]), FakeLLM(calls=[])
+
+    mode("instructions")
+    chain = chat_manager.get_chain(first)
+    assert chat_manager.get_chain(first) is chain
+    assert chat_manager.get_chain(second) is not chain
+
+    mode("native")
+    native_mode, _, model, native_chain = chat_manager._compiled(first)
+    assert native_mode == "native"
+    assert model is not first
+    assert native_chain is not chain
+    mode("instructions")
+    assert chat_manager.get_chain(first) is chain
+    assert len(chat_manager._chains) == 3
+
+
+def test_get_chain_parses_end_to_end(mode):
+    mode("native")
+
+    response = chat_manager.get_chain(FakeLLM(calls=[])).invoke(INPUTS)
+
+    assert response.category == "document_query"
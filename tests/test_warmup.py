@@ -0,0 +1,112 @@
+import asyncio
+
+import httpx
+import pytest
+
+from src.core import chat_manager, warmup
+from src.core.warmup import DependencyStatus
+
+
+class Probes:
+    """Counts calls per dependency; names in `failing` raise."""
+
+    def __init__(self, monkeypatch):
+        self.calls = {}
+        self.failing = set()
+        monkeypatch.setattr(warmup, "_probe_vectorstore", self.probe("vectorstore"))
+        monkeypatch.setattr(warmup, "_probe_embeddings", self.probe("embeddings"))
+        monkeypatch.setattr(warmup, "_probe_chain", self.probe("chain"))
+        monkeypatch.setattr(chat_manager, "get_llm", self.probe("llm"))
+        monkeypatch.setattr(chat_manager, "get_session_history", self.probe("history"))
+        history = self.probe("history")
+
+        async def aprobe_history():
+            history()
+
+        monkeypatch.setattr(warmup, "_aprobe_history", aprobe_history)
+
+    def probe(self, name):
+        def run(*args):
+            self.calls[name] = self.calls.get(name, 0) + 1
+            if name in self.failing:
+                raise ConnectionError(f"{name} unreachable")
+            return self
+
+        return run
+
+
+@pytest.fixture
+def probes(monkeypatch, config):
+    config.retrieval_mode = "dense"
+    config.intent_router_enabled = False
+    monkeypatch.setattr(
+        warmup, "_status", {name: DependencyStatus() for name in warmup._status}
+    )
+    return Probes(monkeypatch)
+
+
+def test_warm_up_marks_every_dependency_warm(probes):
+    status = asyncio.run(warmup.awarm_up())
+
+    assert set(status) == {"vectorstore", "embeddings", "llm", "chain", "history"}
+    assert all(dependency.warm and dependency.error is None for dependency in status.values())
+    assert all(dependency.latency_ms is not None for dependency in status.values())
+
+
+def test_failures_are_recorded_instead_of_raised(probes):
+    probes.failing = {"vectorstore", "embeddings"}
+
+    status = warmup.warm_up()
+
+    assert status["vectorstore"] == DependencyStatus(
+        warm=False, latency_ms=status["vectorstore"].latency_ms, error="vectorstore unreachable"
+    )
+    assert not status["embeddings"].warm
+    assert status["llm"].warm and status["chain"].warm
+
+
+def test_readiness_reports_not_ready_until_cold_dependencies_recover(probes):
+    probes.failing = {"embeddings"}
+    warmup.warm_up()
+
+    report = asyncio.run(warmup.readiness())
+    assert report["ready"] is False
+    assert report["dependencies"]["embeddings"]["error"] == "embeddings unreachable"
+
+    probes.failing = set()
+    report = asyncio.run(warmup.readiness())
+    assert report["ready"] is True
+
+
+def test_readiness_does_not_reprobe_warm_model_clients(probes):
+    warmup.warm_up()
+    before = dict(probes.calls)
+
+    asyncio.run(warmup.readiness())
+    asyncio.run(warmup.readiness())
+
+    assert probes.calls["embeddings"] == before["embeddings"]
+    assert probes.calls["llm"] == before["llm"]
+    assert probes.calls["chain"] == before["chain"]
+    # Qdrant and the history store are checked on every probe
+    assert probes.calls["vectorstore"] == before["vectorstore"] + 2
+    assert probes.calls["history"] == before["history"] + 2
+
+
+def test_ready_endpoint_returns_503_until_warm(probes):
+    from src.chatbot_backend import rag_api
+
+    async def get_ready():
+        transport = httpx.ASGITransport(app=rag_api.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get("/ready")
+
+    probes.failing = {"llm"}
+    response = asyncio.run(get_ready())
+    assert response.status_code == 503
+    assert response.json()["dependencies"]["llm"]["warm"] is False
+
+    probes.failing = set()
+    response = asyncio.run(get_ready())
+    assert response.status_code == 200
+    assert response.json()["ready"] is True